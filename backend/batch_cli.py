@@ -0,0 +1,93 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: CLI de pré-diagnostic en masse (JSONL → JSONL)
+# =============================================================================
+
+"""
+Re-triage hors ligne
+--------------------
+Lit un fichier JSONL (ou l'entrée standard), traite les entrées par lots
+(encodage SBERT batché + un produit matriciel par lot) et écrit un
+résultat JSONL par entrée, dans l'ordre. La mémoire reste bornée par la
+taille d'un lot, quelle que soit la taille du fichier.
+
+Usage:
+    python batch_cli.py historique.jsonl -o resultats.jsonl
+    python batch_cli.py requests.jsonl --id-field request_id --text-field body --llm unique
+    cat export.jsonl | python batch_cli.py - > resultats.jsonl
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from main import BATCH_LLM_MODES, doctis_service, parse_batch_line, settings
+
+
+def iter_chunks(lines, chunk_size: int, id_field: str, text_field: str):
+    """Regroupe les lignes non vides en lots d'entrées normalisées (lignes numérotées à partir de 1)."""
+    chunk = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        chunk.append(parse_batch_line(line, line_number, id_field, text_field))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Fichier JSONL d'entrée ('-' pour stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Fichier JSONL de sortie ('-' pour stdout)")
+    parser.add_argument("--llm", choices=BATCH_LLM_MODES, default="none")
+    parser.add_argument("--chunk-size", type=int, default=settings.BATCH_CHUNK_SIZE)
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="symptoms")
+    args = parser.parse_args()
+
+    # Les logs de chargement vont sur stderr pour ne pas polluer la sortie JSONL
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    doctis_service.load_pathologies()
+    doctis_service.load_sbert_model()
+    if args.llm == "unique":
+        doctis_service.load_llm_model()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    target = stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    start = time.perf_counter()
+    processed = matched = errors = 0
+    llm_memo: dict = {}
+    try:
+        for chunk in iter_chunks(source, args.chunk_size, args.id_field, args.text_field):
+            for result in doctis_service.diagnose_records(chunk, args.llm, llm_memo):
+                target.write(json.dumps(result, ensure_ascii=False) + "\n")
+                processed += 1
+                matched += bool(result.get("matched"))
+                errors += not result["success"]
+            target.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not stdout:
+            target.close()
+        if doctis_service.inference_pool is not None:
+            doctis_service.inference_pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"✅ {processed} entrées traitées en {elapsed:.1f}s "
+        f"({processed / elapsed if elapsed else 0:.0f}/s) : "
+        f"{matched} pathologies identifiées, {errors} erreurs, "
+        f"{len(llm_memo)} réponses LLM générées"
+    )
+
+
+if __name__ == "__main__":
+    main()
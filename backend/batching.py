@@ -0,0 +1,143 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Micro-batching asynchrone des encodages SBERT
+# =============================================================================
+
+"""
+Micro-batcher SBERT
+-------------------
+Les requêtes /diagnose concurrentes déposent leur texte dans une file
+asyncio. Une tâche de fond regroupe les textes arrivés pendant quelques
+millisecondes (ou jusqu'à `max_batch_size`), les encode en une seule passe
+sur un thread dédié, puis rend à chaque appelant son propre vecteur.
+
+Avantages :
+- la boucle d'événements n'est jamais bloquée (/health reste réactif)
+- le transformer reçoit des batches > 1 sous charge (meilleur débit CPU)
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Regroupe des appels `encode(texte)` concurrents en batches.
+
+    `encode_fn` reçoit une liste de textes et retourne une matrice (n, dim).
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[list[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+    ):
+        self._encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Batch en cours d'encodage (annulé par `close`)
+        self._inflight: list[tuple[str, asyncio.Future]] = []
+        self._closed = False
+        # Un seul thread : torch parallélise déjà chaque forward pass
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sbert-batch")
+
+        # Statistiques (taille moyenne des batches = items / batches)
+        self.batches_run = 0
+        self.items_encoded = 0
+
+    def _ensure_worker(self) -> None:
+        """Démarre la tâche de fond au premier appel (dans la boucle courante)."""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode un texte en passant par le batch courant."""
+        if self._closed:
+            raise RuntimeError("Micro-batcher arrêté")
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[str, asyncio.Future]]:
+        """Attend un premier élément puis complète le batch jusqu'à l'échéance."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Vide d'abord ce qui est déjà en file, sans attendre
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Ignore les appelants déjà annulés (client déconnecté)
+        return [(text, fut) for text, fut in batch if not fut.done()]
+
+    async def _run(self) -> None:
+        """Boucle de la tâche de fond : collecte, encode, distribue."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+
+            texts = [text for text, _ in batch]
+            self._inflight = batch
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_fn, texts)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            finally:
+                self._inflight = []
+
+            self.batches_run += 1
+            self.items_encoded += len(texts)
+            for (_, fut), vector in zip(batch, vectors):
+                if not fut.done():
+                    fut.set_result(vector)
+
+    async def close(self) -> None:
+        """
+        Arrête la tâche de fond et libère le thread d'encodage. Les appelants
+        du batch en cours et ceux encore en file sont annulés ; les appels
+        suivants lèvent RuntimeError.
+        """
+        self._closed = True
+        inflight = self._inflight
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        # Ni le batch interrompu ni les appelants en file ne seront servis
+        pending = list(inflight)
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, fut in pending:
+            fut.cancel()
+        self._queue = None
+        self._executor.shutdown(wait=False)
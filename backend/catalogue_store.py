@@ -0,0 +1,472 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Catalogue de pathologies compilé (colonnes memory-mappées) + CLI de conversion
+# =============================================================================
+
+"""
+Catalogue compilé
+-----------------
+`pathologies.json` chargé en liste de dicts coûte, sur un gros catalogue,
+un `json.load` lent au démarrage et des centaines de Mo d'objets Python.
+Le format compilé (`.dcat`) est produit une fois depuis le JSON :
+
+    python backend/catalogue_store.py backend/data/pathologies.json
+
+puis servi en posant `DOCTIS_PATHOLOGIES_PATH=.../pathologies.dcat`.
+
+Un seul fichier, memory-mappé au démarrage (aucun parsing, pages partagées
+entre workers) :
+
+    b"DOCTISC1" | longueur de l'en-tête (uint64) | en-tête JSON | tableaux
+                                                     (alignés sur 64 octets)
+
+- colonnes : `severity_level` (uint8), `urgency` (codes uint8, libellés
+  dans l'en-tête), empreintes par entrée (diff au rechargement sans relire
+  les textes)
+- textes (`id`, `name`, `symptoms_description`, `advice`, `specialist`,
+  traductions, autres champs en JSON) : un blob UTF-8 commun et un tableau
+  d'offsets par colonne
+- une entrée n'est reconstruite en dict qu'à la demande (top-k d'une
+  requête), gardée dans un cache LRU borné
+
+`CompiledCatalogue` se comporte comme la liste de dicts (`len`, index,
+itération) ; `text_column`, `page`, ... lisent directement les colonnes.
+Au démarrage, `indexed_texts` + `content_hashes` donnent les clés du cache
+d'embeddings sans décoder les textes (hash des octets UTF-8 du fichier).
+Le catalogue est validé à la compilation (mêmes règles que le JSON).
+
+Compromis : démarrage ~10× plus rapide et RSS ~10× plus faible à 100k
+pathologies, mais une entrée servie est reconstruite depuis les colonnes
+(~20 µs contre un accès à un dict déjà en mémoire).
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from embedding_cache import content_hash
+from languages import localized, missing_translations
+from responses import build_responses
+
+COMPILED_SUFFIX = ".dcat"
+FORMAT_VERSION = 1
+_MAGIC = b"DOCTISC1"
+_ALIGN = 64
+
+# Champs texte stockés en colonnes (obligatoires, validés avec le JSON)
+TEXT_FIELDS = ("id", "name", "symptoms_description", "advice", "specialist")
+# Champs stockés hors texte (colonnes typées) ou à part (traductions)
+_TYPED_FIELDS = ("severity_level", "urgency", "translations")
+# Entrées reconstruites gardées en mémoire
+RECORD_CACHE_SIZE = 4096
+
+Catalogue = Union[list, "CompiledCatalogue"]
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def record_fingerprint(pathology: dict) -> tuple[int, int]:
+    """(empreinte de l'entrée complète, empreinte de sa description de symptômes)."""
+    return (
+        _digest(json.dumps(pathology, sort_keys=True, ensure_ascii=False)),
+        _digest(pathology["symptoms_description"]),
+    )
+
+
+def _translation_columns(pathologies: list[dict]) -> list[tuple[str, str]]:
+    """(langue, champ) présents dans au moins une traduction, ordre stable."""
+    columns = {}
+    for pathology in pathologies:
+        for lang, fields in pathology.get("translations", {}).items():
+            for field in fields:
+                columns[(lang, field)] = None
+    return list(columns)
+
+
+def _column_name(lang: str, field: str) -> str:
+    return f"translations.{lang}.{field}"
+
+
+class _Writer:
+    """Tableaux alignés accumulés avant l'écriture du fichier."""
+
+    def __init__(self):
+        self.arrays: dict[str, np.ndarray] = {}
+
+    def add(self, name: str, array: np.ndarray) -> None:
+        self.arrays[name] = np.ascontiguousarray(array)
+
+    def write(self, path: Path, header: dict) -> None:
+        # Offsets relatifs au début de la zone des tableaux : l'en-tête peut
+        # être sérialisé avant de connaître sa propre longueur
+        layout, position = {}, 0
+        for name, array in self.arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": position}
+            position += -(-array.nbytes // _ALIGN) * _ALIGN
+        encoded = json.dumps({**header, "arrays": layout}, ensure_ascii=False).encode("utf-8")
+        data_start = -(-(len(_MAGIC) + 8 + len(encoded)) // _ALIGN) * _ALIGN
+
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC + struct.pack("<Q", len(encoded)) + encoded)
+            for name, array in self.arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(array.tobytes())
+            f.truncate(data_start + position)
+        # Remplacement atomique : un serveur qui surveille le fichier ne lit
+        # jamais une version partielle (les mmaps ouverts restent valides)
+        os.replace(tmp, path)
+
+
+def compile_catalogue(pathologies: list[dict], disclaimer: str, path: Path) -> dict:
+    """
+    Écrit le catalogue compilé (`pathologies` déjà validées par `read_catalogue`).
+
+    Returns:
+        En-tête écrit (sans la disposition des tableaux)
+
+    Raises:
+        ValueError: Gravité ou champ de conseil invalide (mêmes règles que
+            les réponses pré-calculées)
+    """
+    build_responses(pathologies)
+    n = len(pathologies)
+    writer = _Writer()
+
+    urgency_labels = list(dict.fromkeys(p["urgency"] for p in pathologies))
+    if len(urgency_labels) > 255:
+        raise ValueError(f"Trop de niveaux d'urgence distincts ({len(urgency_labels)}, maximum 255)")
+    codes = {label: code for code, label in enumerate(urgency_labels)}
+    writer.add("severity_level", np.array([p["severity_level"] for p in pathologies], dtype=np.uint8))
+    writer.add("urgency", np.array([codes[p["urgency"]] for p in pathologies], dtype=np.uint8))
+    writer.add("fingerprints", np.array([record_fingerprint(p) for p in pathologies], dtype=np.uint64).reshape(n, 2))
+
+    # Colonnes texte : blob commun, offsets (n + 1) par colonne
+    translated = _translation_columns(pathologies)
+    columns = {field: [p[field] for p in pathologies] for field in TEXT_FIELDS}
+    for lang, field in translated:
+        values = [p.get("translations", {}).get(lang, {}).get(field) for p in pathologies]
+        writer.add(f"{_column_name(lang, field)}.present", np.array([v is not None for v in values], dtype=np.uint8))
+        columns[_column_name(lang, field)] = [v or "" for v in values]
+    # Autres champs (ex: typical_age_range) : un objet JSON par entrée
+    columns["extra"] = [
+        json.dumps(extra, ensure_ascii=False) if extra else ""
+        for extra in (
+            {k: v for k, v in p.items() if k not in TEXT_FIELDS and k not in _TYPED_FIELDS}
+            for p in pathologies
+        )
+    ]
+
+    chunks, position = [], 0
+    for name, values in columns.items():
+        offsets = np.empty(n + 1, dtype=np.int64)
+        offsets[0] = position
+        for i, value in enumerate(values):
+            encoded = value.encode("utf-8")
+            chunks.append(encoded)
+            position += len(encoded)
+            offsets[i + 1] = position
+        writer.add(f"{name}.offsets", offsets)
+    writer.add("blob", np.frombuffer(b"".join(chunks), dtype=np.uint8))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "count": n,
+        "disclaimer": disclaimer,
+        "urgency_labels": urgency_labels,
+        "text_columns": list(columns),
+        "translations": [[lang, field] for lang, field in translated],
+    }
+    writer.write(Path(path), header)
+    return header
+
+
+class CompiledCatalogue(Sequence):
+    """
+    Catalogue compilé, memory-mappé, vu comme une séquence de dicts.
+
+    `catalogue[i]` reconstruit l'entrée i (cache LRU de `RECORD_CACHE_SIZE`
+    entrées : la même pathologie reste le même objet tant qu'elle est servie).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Catalogue compilé invalide: {self.path}")
+            (header_size,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_size).decode("utf-8"))
+            if header.get("format") != FORMAT_VERSION:
+                raise ValueError(
+                    f"Version de catalogue compilé non prise en charge: {header.get('format')} "
+                    f"(attendue: {FORMAT_VERSION}) — recompiler depuis le JSON"
+                )
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        data_start = -(-(len(_MAGIC) + 8 + header_size) // _ALIGN) * _ALIGN
+        buffer = np.frombuffer(self._mmap, dtype=np.uint8)
+        self._arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            start = data_start + spec["offset"]
+            size = int(np.prod(shape)) * dtype.itemsize
+            self._arrays[name] = buffer[start:start + size].view(dtype).reshape(shape)
+
+        self.count = header["count"]
+        self.disclaimer = header["disclaimer"]
+        self.urgency_labels = header["urgency_labels"]
+        self.translations = [tuple(pair) for pair in header["translations"]]
+        self.severity = self._arrays["severity_level"]
+        self.urgency = self._arrays["urgency"]
+        self.fingerprints = self._arrays["fingerprints"]
+        self._blob = self._arrays["blob"]
+        # Lecture directe des textes dans le mmap (tranches de bytes, sans vue numpy)
+        self._blob_start = data_start + header["arrays"]["blob"]["offset"]
+        self._offsets = {
+            name[:-len(".offsets")]: array for name, array in self._arrays.items() if name.endswith(".offsets")
+        }
+        self._records: OrderedDict[int, dict] = OrderedDict()
+        self._records_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def nbytes(self) -> int:
+        """Taille du fichier mappé."""
+        return len(self._mmap)
+
+    def _raw(self, column: str, i: int) -> bytes:
+        start, stop = self._offsets[column][i:i + 2].tolist()
+        return self._mmap[self._blob_start + start:self._blob_start + stop]
+
+    def text(self, column: str, i: int) -> str:
+        return self._raw(column, i).decode("utf-8")
+
+    def _localized_column(self, field: str, lang: Optional[str], i: int) -> str:
+        """Colonne où lire `field` de l'entrée i dans `lang` (source si non traduite)."""
+        if lang is not None and (lang, field) in self.translations:
+            column = _column_name(lang, field)
+            if self._arrays[f"{column}.present"][i]:
+                return column
+        return field
+
+    def texts(self, column: str, start: int = 0, stop: Optional[int] = None) -> list[str]:
+        """Valeurs d'une colonne texte sur [start, stop), décodées d'un seul bloc."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return []
+        offsets = self._arrays[f"{column}.offsets"][start:stop + 1]
+        raw = self._blob[offsets[0]:offsets[-1]].tobytes()
+        bounds = (offsets - offsets[0]).tolist()
+        return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+    def localized_texts(self, field: str, lang: Optional[str]) -> list[str]:
+        """Colonne traduite dans `lang`, texte source pour les entrées non traduites."""
+        source = self.texts(field)
+        if lang is None or (lang, field) not in self.translations:
+            return source
+        present = self._arrays[f"{_column_name(lang, field)}.present"]
+        translated = self.texts(_column_name(lang, field))
+        return [t if ok else s for t, s, ok in zip(translated, source, present.tolist())]
+
+    def content_hashes(self, field: str, lang: Optional[str] = None) -> list[str]:
+        """
+        `content_hash` de chaque texte de `localized_texts(field, lang)`,
+        calculé sur les octets UTF-8 du fichier : aucun texte n'est décodé.
+        """
+        columns = [field]
+        choice = np.zeros(self.count, dtype=np.int8)
+        if lang is not None and (lang, field) in self.translations:
+            columns.append(_column_name(lang, field))
+            choice = self._arrays[f"{columns[1]}.present"].astype(np.int8)
+        bounds = [self._offsets[column].tolist() for column in columns]
+        base = self._blob_start
+        with memoryview(self._mmap) as data:
+            return [
+                hashlib.sha256(data[base + bounds[c][i]:base + bounds[c][i + 1]]).hexdigest()
+                for i, c in enumerate(choice.tolist())
+            ]
+
+    def missing_translations(self, lang: str) -> int:
+        if (lang, "symptoms_description") not in self.translations:
+            return self.count
+        present = self._arrays[f"{_column_name(lang, 'symptoms_description')}.present"]
+        return int(self.count - np.count_nonzero(present))
+
+    def _build_record(self, i: int) -> dict:
+        record = {field: self.text(field, i) for field in TEXT_FIELDS[:3]}
+        translations = {}
+        for lang, field in self.translations:
+            if self._arrays[f"{_column_name(lang, field)}.present"][i]:
+                translations.setdefault(lang, {})[field] = self.text(_column_name(lang, field), i)
+        if translations:
+            record["translations"] = translations
+        record["severity_level"] = int(self.severity[i])
+        record["urgency"] = self.urgency_labels[self.urgency[i]]
+        record.update({field: self.text(field, i) for field in TEXT_FIELDS[3:]})
+        extra = self.text("extra", i)
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        i = int(i)
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"Pathologie hors catalogue: {i}")
+
+        with self._records_lock:
+            record = self._records.get(i)
+            if record is not None:
+                self._records.move_to_end(i)
+                return record
+        record = self._build_record(i)
+        with self._records_lock:
+            # Une entrée construite en parallèle par un autre thread garde son objet
+            record = self._records.setdefault(i, record)
+            if len(self._records) > RECORD_CACHE_SIZE:
+                self._records.popitem(last=False)
+        return record
+
+    def summaries(self, start: int, stop: int) -> list[dict]:
+        """Champs de la liste `/pathologies`, lus dans les colonnes."""
+        stop = min(stop, self.count)
+        return [
+            {"id": pid, "name": name, "severity_level": int(severity)}
+            for pid, name, severity in zip(
+                self.texts("id", start, stop), self.texts("name", start, stop), self.severity[start:stop].tolist()
+            )
+        ]
+
+
+class TextColumn(Sequence):
+    """
+    Colonne texte (traduite) d'un catalogue compilé, décodée entrée par
+    entrée à la demande : le cache d'embeddings n'en lit que les entrées
+    à ré-encoder.
+    """
+
+    def __init__(self, catalogue: CompiledCatalogue, field: str, lang: Optional[str] = None):
+        self.catalogue = catalogue
+        self.field = field
+        self.lang = lang
+
+    def __len__(self) -> int:
+        return len(self.catalogue)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.catalogue.text(self.catalogue._localized_column(self.field, self.lang, i), i)
+
+    def content_hashes(self) -> list[str]:
+        return self.catalogue.content_hashes(self.field, self.lang)
+
+
+def open_catalogue(path: Path) -> tuple[CompiledCatalogue, str]:
+    """
+    Returns:
+        (catalogue, disclaimer), comme `read_catalogue`
+
+    Raises:
+        ValueError: Fichier qui n'est pas un catalogue compilé de ce format
+    """
+    catalogue = CompiledCatalogue(path)
+    return catalogue, catalogue.disclaimer
+
+
+# =============================================================================
+# Accès communs aux deux formats (liste de dicts ou catalogue compilé)
+# =============================================================================
+
+def text_column(pathologies: Catalogue, field: str, lang: Optional[str] = None) -> list[str]:
+    """Champ texte de chaque pathologie (traduit dans `lang` si disponible)."""
+    if isinstance(pathologies, CompiledCatalogue):
+        return pathologies.localized_texts(field, lang)
+    if lang is None:
+        return [p[field] for p in pathologies]
+    return [localized(p, field, lang) for p in pathologies]
+
+
+def indexed_texts(pathologies: Catalogue, field: str, lang: Optional[str] = None) -> Sequence[str]:
+    """
+    Textes à encoder : comme `text_column`, mais sans rien décoder pour un
+    catalogue compilé (colonne lue à la demande, hashée sur ses octets).
+    """
+    if isinstance(pathologies, CompiledCatalogue):
+        return TextColumn(pathologies, field, lang)
+    return text_column(pathologies, field, lang)
+
+
+def content_hashes(texts: Sequence[str]) -> list[str]:
+    """`content_hash` de chaque texte (sur les octets du fichier pour une `TextColumn`)."""
+    if isinstance(texts, TextColumn):
+        return texts.content_hashes()
+    return [content_hash(text) for text in texts]
+
+
+def count_missing_translations(pathologies: Catalogue, lang: str) -> int:
+    if isinstance(pathologies, CompiledCatalogue):
+        return pathologies.missing_translations(lang)
+    return missing_translations(pathologies, lang)
+
+
+def fingerprints(pathologies: Catalogue) -> dict[str, tuple[int, int]]:
+    """{id: (empreinte de l'entrée, empreinte des symptômes)}."""
+    if isinstance(pathologies, CompiledCatalogue):
+        return dict(zip(pathologies.texts("id"), map(tuple, pathologies.fingerprints.tolist())))
+    return {p["id"]: record_fingerprint(p) for p in pathologies}
+
+
+def entry_fingerprints(pathologies: Catalogue) -> dict[str, int]:
+    """{id: empreinte de l'entrée complète} (invalidation des réponses en cache)."""
+    return {pid: entry for pid, (entry, _) in fingerprints(pathologies).items()}
+
+
+def page(pathologies: Catalogue, offset: int, limit: int) -> list[dict]:
+    """Page de la liste `/pathologies` (id, nom, gravité)."""
+    if isinstance(pathologies, CompiledCatalogue):
+        return pathologies.summaries(offset, offset + limit)
+    return [
+        {"id": p["id"], "name": p["name"], "severity_level": p["severity_level"]}
+        for p in pathologies[offset:offset + limit]
+    ]
+
+
+def main_cli() -> None:
+    from knowledge_base import read_catalogue
+
+    parser = argparse.ArgumentParser(description="Compile pathologies.json en catalogue memory-mappé (.dcat)")
+    parser.add_argument("source", type=Path, help="Catalogue JSON")
+    parser.add_argument("-o", "--output", type=Path, help=f"Fichier compilé (défaut: source avec {COMPILED_SUFFIX})")
+    args = parser.parse_args()
+
+    output = args.output or args.source.with_suffix(COMPILED_SUFFIX)
+    pathologies, disclaimer = read_catalogue(args.source)
+    header = compile_catalogue(pathologies, disclaimer, output)
+    catalogue = CompiledCatalogue(output)
+    print(
+        f"✅ {header['count']} pathologies compilées → {output} "
+        f"({catalogue.nbytes / 1e6:.2f} Mo, {len(header['translations'])} colonnes traduites)"
+    )
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,199 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Cache disque des embeddings de pathologies (memory-mapped)
+# =============================================================================
+
+"""
+Cache persistant des embeddings
+-------------------------------
+Les embeddings du catalogue sont stockés dans un fichier `.npy` ouvert en
+memory-map (lecture seule) : tous les workers partagent les mêmes pages
+physiques, sans copie.
+
+Clé de cache :
+- nom du modèle d'encodage + version du format (répertoire dédié)
+- hash SHA-256 du texte de chaque entrée
+
+Au démarrage, seules les entrées nouvelles ou modifiées sont ré-encodées.
+
+Disposition sur disque :
+    <cache_dir>/<modèle>/index.json        → métadonnées + hashes ordonnés
+    <cache_dir>/<modèle>/emb-<digest>.npy  → matrice float32 (immuable)
+    <cache_dir>/<modèle>/emb-<digest>.<forme>.npy → formes dérivées (ex: int8),
+                                                  supprimées avec la matrice
+
+Les fichiers `.npy` ne sont jamais modifiés en place : une nouvelle version
+est écrite à côté puis `index.json` est remplacé atomiquement (`os.replace`),
+ce qui évite à un lecteur concurrent de voir un état incohérent.
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+# Version du format : à incrémenter si la disposition ou la normalisation change
+CACHE_FORMAT_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    """Hash stable du contenu d'une entrée du catalogue."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Cache disque des embeddings, versionné par modèle.
+
+    `encode_fn` reçoit une liste de textes et doit retourner une matrice
+    (n, dim) ; elle n'est appelée que pour les entrées absentes du cache.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str):
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.model_name = model_name
+        self.directory = Path(cache_dir) / f"{safe_name}-v{CACHE_FORMAT_VERSION}"
+        self.index_path = self.directory / "index.json"
+        self.last_encoded_count = 0
+        # Fichier de la matrice retournée par le dernier `get_embeddings`
+        self.current_file: Optional[str] = None
+
+    def _read_index(self) -> Optional[dict]:
+        """Lit l'index courant (None si absent, corrompu ou d'un autre modèle)."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if index.get("version") != CACHE_FORMAT_VERSION or index.get("model") != self.model_name:
+            return None
+        return index
+
+    def _open_matrix(self, index: dict) -> Optional[np.ndarray]:
+        """Ouvre la matrice référencée par l'index en memory-map lecture seule."""
+        try:
+            matrix = np.load(self.directory / index["file"], mmap_mode="r")
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+        if matrix.ndim != 2 or matrix.shape[0] != len(index.get("hashes", [])):
+            return None
+        return matrix
+
+    def _write(self, hashes: list[str], matrix: np.ndarray) -> np.ndarray:
+        """Écrit une nouvelle version du cache et retourne sa vue memory-mappée."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256("".join(hashes).encode("ascii")).hexdigest()[:16]
+        filename = f"emb-{digest}.npy"
+        target = self.directory / filename
+
+        # Écriture atomique de la matrice puis de l'index
+        tmp_matrix = self.directory / f".{filename}.{os.getpid()}.tmp"
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(tmp_matrix, target)
+
+        index = {
+            "version": CACHE_FORMAT_VERSION,
+            "model": self.model_name,
+            "dim": int(matrix.shape[1]),
+            "file": filename,
+            "hashes": hashes,
+        }
+        tmp_index = self.directory / f".index.json.{os.getpid()}.tmp"
+        with open(tmp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_index, self.index_path)
+
+        # Nettoyage des anciennes versions et de leurs formes dérivées
+        # (les mmaps déjà ouverts restent valides)
+        for stale in self.directory.glob("emb-*.npy"):
+            if stale.name.split(".")[0] != f"emb-{digest}":
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass
+
+        self.current_file = filename
+        return np.load(target, mmap_mode="r")
+
+    def get_embeddings(
+        self,
+        texts: Sequence[str],
+        encode_fn: Callable[[list[str]], np.ndarray],
+        hashes: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        """
+        Retourne la matrice d'embeddings alignée sur `texts`.
+
+        Args:
+            hashes: `content_hash` de chaque texte, s'ils sont déjà connus :
+                seuls les textes à ré-encoder sont alors lus dans `texts`
+
+        Returns:
+            Matrice float32 (n, dim) memory-mappée en lecture seule
+        """
+        hashes = [content_hash(t) for t in texts] if hashes is None else list(hashes)
+        self.last_encoded_count = 0
+
+        index = self._read_index()
+        cached = self._open_matrix(index) if index else None
+
+        # Cas nominal : catalogue inchangé → aucune copie, aucun encodage
+        if cached is not None and index["hashes"] == hashes:
+            self.current_file = index["file"]
+            return cached
+
+        known_rows = {}
+        if cached is not None:
+            known_rows = {h: i for i, h in enumerate(index["hashes"])}
+
+        missing = [i for i, h in enumerate(hashes) if h not in known_rows]
+        fresh = None
+        if missing:
+            fresh = np.asarray(encode_fn([texts[i] for i in missing]), dtype=np.float32)
+            self.last_encoded_count = len(missing)
+
+        if not texts:
+            self.current_file = None
+            return np.empty((0, cached.shape[1] if cached is not None else 0), dtype=np.float32)
+
+        dim = fresh.shape[1] if fresh is not None else cached.shape[1]
+        matrix = np.empty((len(hashes), dim), dtype=np.float32)
+        if fresh is not None:
+            matrix[missing] = fresh
+        reused = [i for i, h in enumerate(hashes) if h in known_rows]
+        if reused:
+            matrix[reused] = cached[[known_rows[hashes[i]] for i in reused]]
+
+        return self._write(hashes, matrix)
+
+    def derived(self, name: str, build_fn: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Tableau dérivé de la dernière matrice retournée (ex: forme quantifiée),
+        calculé une fois puis relu en memory-map aux démarrages suivants.
+
+        Returns:
+            Tableau memory-mappé en lecture seule (calculé en mémoire si le
+            catalogue est vide)
+        """
+        if self.current_file is None:
+            return build_fn()
+        target = self.directory / self.current_file.replace(".npy", f".{name}.npy")
+        try:
+            return np.load(target, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            pass
+
+        tmp = self.directory / f".{target.name}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(build_fn()))
+        os.replace(tmp, target)
+        return np.load(target, mmap_mode="r")
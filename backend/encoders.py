@@ -0,0 +1,233 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Backends d'encodage des phrases (PyTorch ou ONNX Runtime int8)
+# =============================================================================
+
+"""
+Encodeurs de phrases
+--------------------
+Tous les backends exposent la même méthode `encode` que
+`SentenceTransformer.encode` (sous-ensemble utilisé par Doctis AI).
+
+Backends :
+- "torch"     : SentenceTransformer d'origine (PyTorch, float32)
+- "onnx"      : même graphe exporté en ONNX, exécuté par ONNX Runtime
+- "onnx-int8" : export ONNX quantizé dynamiquement en int8 (poids ~4x plus
+                légers, PyTorch n'est pas chargé au runtime)
+
+L'export est fait une fois (PyTorch requis à ce moment-là) puis réutilisé :
+    <cache_dir>/onnx/<modèle>/encoder.json      → métadonnées (pooling, dim...)
+    <cache_dir>/onnx/<modèle>/model.onnx        → graphe float32
+    <cache_dir>/onnx/<modèle>/model.int8.onnx   → graphe quantizé
+    <cache_dir>/onnx/<modèle>/tokenizer*        → tokenizer Hugging Face
+
+Seuls les modèles « transformer + mean pooling (+ normalisation) » sont
+exportés, ce qui couvre les MiniLM utilisés par le backend et le serveur.
+La concordance avec PyTorch est testée par `tests/test_encoders.py` (si
+ONNX Runtime est installé) et mesurée par `benchmarks/bench_encoder.py`.
+"""
+
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Optional, Protocol, Sequence, Union
+
+import numpy as np
+
+from vector_index import normalize_rows
+
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model.int8.onnx"}
+
+
+class Encoder(Protocol):
+    """Interface commune (compatible `SentenceTransformer.encode`)."""
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        ...
+
+
+def encoder_cache_key(model_name: str, backend: str) -> str:
+    """
+    Nom de modèle pour le cache d'embeddings : les vecteurs int8 diffèrent
+    légèrement des vecteurs PyTorch, chaque backend a donc son cache.
+    """
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def load_encoder(
+    model_name: str,
+    backend: str = "torch",
+    cache_dir: Optional[Path] = None,
+    threads: Optional[int] = None,
+) -> Encoder:
+    """
+    Charge l'encodeur demandé (export ONNX au premier lancement si besoin).
+
+    Args:
+        model_name: Nom sentence-transformers (ex: all-MiniLM-L6-v2)
+        backend: "torch", "onnx" ou "onnx-int8"
+        cache_dir: Répertoire des exports ONNX (requis hors "torch")
+        threads: Threads intra-op ONNX Runtime (None = défaut du runtime)
+    """
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    if backend not in ONNX_FILES:
+        raise ValueError(f"Backend d'encodage inconnu: {backend} (attendu: {', '.join(ENCODER_BACKENDS)})")
+    if cache_dir is None:
+        raise ValueError(f"Le backend '{backend}' nécessite un répertoire de cache")
+
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    directory = Path(cache_dir) / "onnx" / safe_name
+    if not (directory / "encoder.json").exists():
+        print(f"⏳ Export ONNX de {model_name} (premier lancement)...")
+        export_onnx(model_name, directory)
+    return OnnxEncoder(directory, quantized=backend == "onnx-int8", threads=threads)
+
+
+def export_onnx(model_name: str, directory: Path) -> None:
+    """
+    Exporte un SentenceTransformer en ONNX (float32 + int8).
+
+    L'export est écrit dans un répertoire temporaire puis renommé : plusieurs
+    workers démarrant en même temps ne voient jamais un export partiel.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    modules = list(st_model)
+    pooling = modules[1] if len(modules) > 1 else None
+    if not isinstance(pooling, Pooling) or pooling.get_pooling_mode_str() != "mean":
+        raise ValueError(f"Export ONNX non supporté pour {model_name} (mean pooling requis)")
+    normalize = any(isinstance(m, Normalize) for m in modules)
+    if len(modules) > (3 if normalize else 2):
+        raise ValueError(f"Export ONNX non supporté pour {model_name} (couches supplémentaires)")
+
+    directory = Path(directory)
+    tmp_dir = directory.parent / f".{directory.name}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    tokenizer = st_model.tokenizer
+    sample = tokenizer(["exemple de symptômes"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names + ["last_hidden_state"]}
+
+    hf_model = modules[0].auto_model.eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            hf_model,
+            tuple(sample[n] for n in input_names),
+            str(tmp_dir / ONNX_FILES["onnx"]),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+    quantize_dynamic(
+        str(tmp_dir / ONNX_FILES["onnx"]),
+        str(tmp_dir / ONNX_FILES["onnx-int8"]),
+        weight_type=QuantType.QInt8,
+    )
+    tokenizer.save_pretrained(tmp_dir)
+
+    with open(tmp_dir / "encoder.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "model": model_name,
+            "dim": st_model.get_sentence_embedding_dimension(),
+            "max_seq_length": st_model.max_seq_length,
+            "normalize": normalize,
+        }, f)
+
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Un autre worker a terminé son export en premier : le sien fait foi
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print(f"✅ Export ONNX écrit dans {directory}")
+
+
+class OnnxEncoder:
+    """Encodeur ONNX Runtime : transformer exporté + mean pooling en numpy."""
+
+    def __init__(self, directory: Path, quantized: bool = True, threads: Optional[int] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        directory = Path(directory)
+        with open(directory / "encoder.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+
+        model_file = ONNX_FILES["onnx-int8" if quantized else "onnx"]
+        self.session = ort.InferenceSession(
+            str(directory / model_file), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.model_name = meta["model"]
+        self.dim = meta["dim"]
+        self.max_seq_length = meta["max_seq_length"]
+        self.normalize = meta["normalize"]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Encode une phrase ou une liste de phrases.
+
+        Returns:
+            Vecteur (dim,) pour une phrase, matrice (n, dim) float32 sinon
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.empty((len(texts), self.dim), dtype=np.float32)
+
+        # Tri par longueur (comme sentence-transformers) : moins de padding par lot
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            batch = self.tokenizer(
+                [texts[i] for i in rows],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {name: batch[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+            mask = batch["attention_mask"][..., None].astype(np.float32)
+            embeddings[rows] = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        if normalize_embeddings or self.normalize:
+            embeddings = normalize_rows(embeddings)
+        return embeddings[0] if single else embeddings
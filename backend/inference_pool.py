@@ -0,0 +1,274 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Pool borné de workers d'inférence LLM avec backpressure
+# =============================================================================
+
+"""
+Pool d'inférence LLM
+--------------------
+Chaque worker est un thread qui possède sa propre instance `Llama`
+(llama.cpp libère le GIL pendant l'évaluation). Les poids GGUF sont
+memory-mappés par llama.cpp (`use_mmap`) : N instances partagent les mêmes
+pages physiques, seul le KV-cache est dupliqué.
+
+Les jobs passent par une file de priorité bornée :
+- file pleine            → `QueueFullError` immédiate
+- attente > queue_timeout → `QueueTimeoutError` (le job est annulé)
+
+Les deux erreurs portent un `retry_after` (secondes) estimé à partir de
+la profondeur de file et du temps de service moyen, à renvoyer au client
+via HTTP 503 + `Retry-After`.
+
+`shutdown` ne bloque jamais : les workers terminent les jobs déjà en file
+puis s'arrêtent (drapeau d'arrêt vérifié dès que la file est vide).
+"""
+
+import asyncio
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+# Priorités (plus petit = servi en premier)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Attente maximale d'un worker inactif avant de revérifier le drapeau d'arrêt
+IDLE_POLL_S = 0.5
+
+
+class InferenceRejectedError(RuntimeError):
+    """Requête refusée par le pool (à traduire en HTTP 503)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFullError(InferenceRejectedError):
+    """La file d'attente a atteint sa taille maximale."""
+
+
+class QueueTimeoutError(InferenceRejectedError):
+    """Le job a attendu trop longtemps avant d'être pris par un worker."""
+
+
+class PoolClosedError(InferenceRejectedError):
+    """Le pool est en cours d'arrêt."""
+
+
+class InferenceJob:
+    """Job en file : fonction à exécuter avec le modèle d'un worker."""
+
+    def __init__(self, fn: Callable[[Any], Any], priority: int):
+        self.fn = fn
+        self.priority = priority
+        self.future: Future = Future()
+        self.started = threading.Event()
+        self.enqueued_at = time.monotonic()
+
+
+class InferencePool:
+    """
+    Pool de workers LLM alimenté par une file de priorité bornée.
+
+    `fn(model)` est exécutée par le premier worker libre avec son instance.
+    """
+
+    def __init__(
+        self,
+        models: list,
+        max_queue_size: int = 16,
+        queue_timeout: float = 10.0,
+        default_retry_after: int = 5,
+    ):
+        if not models:
+            raise ValueError("Le pool d'inférence nécessite au moins un modèle")
+
+        self.models = models
+        self.queue_timeout = queue_timeout
+        self.default_retry_after = default_retry_after
+
+        self._queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=max_queue_size)
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        # Métriques
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._wait_times: deque = deque(maxlen=1000)
+        self._service_times: deque = deque(maxlen=1000)
+
+        self._workers = [
+            threading.Thread(target=self._worker_loop, args=(model,), name=f"llm-worker-{i}", daemon=True)
+            for i, model in enumerate(models)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    # -------------------------------------------------------------------------
+    # Soumission
+    # -------------------------------------------------------------------------
+
+    def retry_after(self) -> int:
+        """Estimation (secondes) du délai avant qu'un worker se libère."""
+        with self._lock:
+            service_times = list(self._service_times)
+        if not service_times:
+            return self.default_retry_after
+        mean_service = sum(service_times) / len(service_times)
+        backlog = self._queue.qsize() + 1
+        return max(1, math.ceil(backlog * mean_service / len(self.models)))
+
+    def is_saturated(self) -> bool:
+        """Vrai si une nouvelle soumission serait refusée (file pleine)."""
+        return self._queue.full()
+
+    def submit(self, fn: Callable[[Any], Any], priority: int = PRIORITY_INTERACTIVE) -> InferenceJob:
+        """Place un job en file, ou lève `QueueFullError` (`PoolClosedError` après `shutdown`)."""
+        if self._stopping.is_set():
+            raise PoolClosedError("Pool d'inférence arrêté", self.default_retry_after)
+        job = InferenceJob(fn, priority)
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except queue.Full:
+            with self._lock:
+                self._rejected_full += 1
+            raise QueueFullError("File d'inférence pleine", self.retry_after())
+        return job
+
+    def _reject_if_not_started(self, job: InferenceJob) -> None:
+        """Annule un job encore en file après le délai d'attente maximal."""
+        if job.future.cancel():
+            with self._lock:
+                self._rejected_timeout += 1
+            raise QueueTimeoutError("Délai d'attente d'un worker LLM dépassé", self.retry_after())
+
+    def wait_started(self, job: InferenceJob) -> None:
+        """Bloque jusqu'au démarrage du job, ou lève `QueueTimeoutError`."""
+        if not job.started.wait(self.queue_timeout):
+            self._reject_if_not_started(job)
+
+    def run_sync(self, fn: Callable[[Any], Any], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Exécute `fn(model)` dans le pool et attend son résultat (appel bloquant)."""
+        job = self.submit(fn, priority)
+        self.wait_started(job)
+        return job.future.result()
+
+    async def run(self, fn: Callable[[Any], Any], priority: int = PRIORITY_INTERACTIVE) -> Any:
+        """Variante asynchrone de `run_sync` (n'occupe aucun thread pendant l'attente)."""
+        job = self.submit(fn, priority)
+        wrapped = asyncio.wrap_future(job.future)
+        done, _ = await asyncio.wait({wrapped}, timeout=self.queue_timeout)
+        if not done:
+            self._reject_if_not_started(job)
+        return await wrapped
+
+    # -------------------------------------------------------------------------
+    # Workers
+    # -------------------------------------------------------------------------
+
+    def _worker_loop(self, model) -> None:
+        """Boucle d'un worker : dépile par priorité et exécute avec son modèle."""
+        while True:
+            try:
+                _, _, job = self._queue.get(timeout=IDLE_POLL_S)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            if job is None:
+                return
+            # Job annulé pendant l'attente (timeout côté appelant)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            started_at = time.monotonic()
+            job.started.set()
+            with self._lock:
+                self._in_flight += 1
+                self._wait_times.append(started_at - job.enqueued_at)
+
+            error = None
+            try:
+                result = job.fn(model)
+            except Exception as e:
+                error = e
+
+            # Compteurs à jour avant de réveiller l'appelant (stats cohérentes)
+            with self._lock:
+                self._in_flight -= 1
+                self._service_times.append(time.monotonic() - started_at)
+                if error is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+    def shutdown(self) -> None:
+        """Arrête les workers après les jobs déjà en file (sans bloquer, même file pleine)."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        for _ in self._workers:
+            # Réveil immédiat des workers inactifs ; file pleine : ils verront
+            # le drapeau d'arrêt une fois la file vidée
+            try:
+                # Priorité la plus basse : passe après les jobs déjà en file
+                self._queue.put_nowait((float("inf"), next(self._sequence), None))
+            except queue.Full:
+                break
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Attend l'arrêt des workers ; retourne False si certains tournent encore."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        return not any(worker.is_alive() for worker in self._workers)
+
+    # -------------------------------------------------------------------------
+    # Métriques
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _percentile(values: list, pct: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))], 4)
+
+    def stats(self) -> dict:
+        """Profondeur de file, temps d'attente et compteurs (fenêtre glissante)."""
+        with self._lock:
+            wait_times = list(self._wait_times)
+            service_times = list(self._service_times)
+            counters = {
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected_queue_full": self._rejected_full,
+                "rejected_timeout": self._rejected_timeout,
+            }
+
+        return {
+            "workers": len(self.models),
+            "queue_depth": self._queue.qsize(),
+            "queue_max_size": self._queue.maxsize,
+            **counters,
+            "wait_seconds_p50": self._percentile(wait_times, 50),
+            "wait_seconds_p95": self._percentile(wait_times, 95),
+            "wait_seconds_max": round(max(wait_times), 4) if wait_times else None,
+            "service_seconds_p50": self._percentile(service_times, 50),
+        }
@@ -0,0 +1,208 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Catalogue de pathologies rechargeable à chaud (instantanés immuables)
+# =============================================================================
+
+"""
+Base de connaissances
+---------------------
+Le catalogue servi (pathologies + embeddings + index vectoriel) est regroupé
+dans un instantané `KnowledgeBase` jamais modifié après construction.
+
+Rechargement :
+1. lecture et validation du nouveau `pathologies.json` (+ index BM25 et
+   fragments de réponse pré-calculés), ou ouverture du catalogue compilé
+   (`.dcat`, voir `catalogue_store.py`)
+2. embeddings via le cache disque : seules les entrées ajoutées ou dont la
+   description a changé sont ré-encodées
+3. construction du nouvel index à côté de l'ancien
+4. remplacement de l'instantané par une seule affectation
+
+Une requête en cours garde la référence de l'instantané qu'elle a lu : elle
+ne voit jamais un catalogue à moitié mis à jour.
+
+Les langues autres que la langue source ont chacune leur instantané (mêmes
+pathologies, embeddings et BM25 construits sur les traductions), de même
+version que l'instantané source dont il dérive.
+
+`CatalogueWatcher` surveille le fichier (mtime + taille) et déclenche le
+rechargement à chaque modification.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from catalogue_store import (
+    COMPILED_SUFFIX, RECORD_CACHE_SIZE, Catalogue, CompiledCatalogue, fingerprints, open_catalogue
+)
+from languages import validate_translations
+from lexical_index import BM25Index
+from responses import PathologyResponses, build_responses
+from vector_index import VectorIndex
+
+DEFAULT_DISCLAIMER = "Consultez un médecin pour tout diagnostic médical."
+REQUIRED_FIELDS = ("id", "name", "symptoms_description")
+
+
+def read_catalogue(path: Path) -> tuple[Catalogue, str]:
+    """
+    Lit et valide le fichier de pathologies.
+
+    Returns:
+        (pathologies, disclaimer) ; pathologies est un `CompiledCatalogue`
+        memory-mappé pour un fichier `.dcat` (validé à la compilation)
+
+    Raises:
+        FileNotFoundError: Fichier absent
+        ValueError: JSON invalide, champ obligatoire manquant, id dupliqué ou
+            traduction mal formée
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Fichier pathologies.json non trouvé: {path}")
+    if path.suffix == COMPILED_SUFFIX:
+        return open_catalogue(path)
+
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON invalide ({path.name}): {e}") from e
+
+    pathologies = data.get("pathologies", [])
+    seen = set()
+    for position, pathology in enumerate(pathologies):
+        missing = [field for field in REQUIRED_FIELDS if field not in pathology]
+        if missing:
+            raise ValueError(f"Pathologie #{position}: champ(s) manquant(s) {', '.join(missing)}")
+        if pathology["id"] in seen:
+            raise ValueError(f"Identifiant de pathologie dupliqué: {pathology['id']}")
+        seen.add(pathology["id"])
+        validate_translations(pathology)
+
+    return pathologies, data.get("disclaimer", DEFAULT_DISCLAIMER)
+
+
+def diff_catalogues(old: Catalogue, new: Catalogue) -> dict:
+    """
+    Compare deux catalogues par identifiant (empreintes des entrées : lues
+    dans les colonnes d'un catalogue compilé, sans reconstruire les dicts).
+
+    Returns:
+        Nombre d'entrées ajoutées, supprimées, modifiées, dont la description
+        de symptômes a changé (à ré-encoder) et inchangées
+    """
+    old_by_id = fingerprints(old)
+    new_by_id = fingerprints(new)
+
+    added = [pid for pid in new_by_id if pid not in old_by_id]
+    removed = [pid for pid in old_by_id if pid not in new_by_id]
+    common = [pid for pid in new_by_id if pid in old_by_id]
+    modified = [pid for pid in common if new_by_id[pid][0] != old_by_id[pid][0]]
+    symptoms_changed = [pid for pid in modified if new_by_id[pid][1] != old_by_id[pid][1]]
+
+    return {
+        "added": len(added),
+        "removed": len(removed),
+        "modified": len(modified),
+        "symptoms_changed": len(symptoms_changed),
+        "unchanged": len(common) - len(modified),
+    }
+
+
+class KnowledgeBase:
+    """Instantané immuable du catalogue servi."""
+
+    def __init__(
+        self,
+        pathologies: Catalogue,
+        disclaimer: str = DEFAULT_DISCLAIMER,
+        embeddings: Optional[np.ndarray] = None,
+        index: Optional[VectorIndex] = None,
+        version: int = 0,
+        lexical_index: Optional[BM25Index] = None,
+        language: Optional[str] = None,
+    ):
+        self.pathologies = pathologies
+        self.disclaimer = disclaimer
+        self.embeddings = embeddings
+        self.index = index
+        self.lexical_index = lexical_index
+        # Fragments de réponse (template + payload PathologyMatch) : pré-calculés
+        # pour un catalogue JSON, construits au premier match pour un catalogue
+        # compilé (seules les pathologies servies sont matérialisées)
+        self.compiled = isinstance(pathologies, CompiledCatalogue)
+        self.responses: dict[str, PathologyResponses] = {} if self.compiled else build_responses(pathologies)
+        self._responses_lock = threading.Lock()
+        self.version = version
+        # Langue des textes indexés (None : langue source du catalogue)
+        self.language = language
+        self.loaded_at = time.time()
+
+    def pathology_responses(self, pathology: dict) -> PathologyResponses:
+        """Fragments de la pathologie (reconstruits si elle provient d'un autre instantané)."""
+        responses = self.responses.get(pathology["id"])
+        if responses is None or responses.pathology is not pathology:
+            responses = PathologyResponses(pathology)
+            if self.compiled:
+                with self._responses_lock:
+                    if len(self.responses) >= RECORD_CACHE_SIZE:
+                        self.responses.pop(next(iter(self.responses)))
+                    self.responses[pathology["id"]] = responses
+        return responses
+
+    def info(self) -> dict:
+        """Résumé exposé par /health et l'endpoint de rechargement."""
+        return {
+            "version": self.version,
+            "catalogue": "compiled" if self.compiled else "json",
+            "pathologies": len(self.pathologies),
+            "index": self.index.kind if self.index is not None else None,
+            "lexical_terms": len(self.lexical_index.vocabulary) if self.lexical_index is not None else None,
+            "loaded_at": round(self.loaded_at, 3),
+        }
+
+
+class CatalogueWatcher:
+    """Thread de surveillance d'un fichier par scrutation (mtime + taille)."""
+
+    def __init__(self, path: Path, on_change: Callable[[], object], interval: float = 5.0):
+        self.path = Path(path)
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._signature = self._stat()
+        self._thread = threading.Thread(target=self._run, name="catalogue-watcher", daemon=True)
+
+    def _stat(self) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            # Mémorisée avant l'appel : une écriture partielle invalide sera
+            # retentée à la modification suivante, pas en boucle
+            self._signature = signature
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"❌ Rechargement du catalogue échoué: {e}")
+
+    def stop(self) -> None:
+        self._stop.set()
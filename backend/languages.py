@@ -0,0 +1,105 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Détection de la langue des requêtes et textes localisés du catalogue
+# =============================================================================
+
+"""
+Langues des requêtes
+--------------------
+Le catalogue est rédigé en français ; chaque pathologie peut porter des
+traductions :
+
+    "translations": {
+        "en": {"name": "...", "symptoms_description": "..."},
+        "ar": {"name": "...", "symptoms_description": "..."}
+    }
+
+Chaque langue servie a sa propre matrice d'embeddings, construite à partir
+de ces traductions (repli sur le texte source pour une entrée non traduite).
+
+`detect_language` est volontairement simple et sans dépendance : trois
+langues dont une en alphabet arabe se distinguent par l'écriture puis par
+les mots-outils, en quelques microsecondes.
+"""
+
+import re
+from typing import Sequence
+
+_ARABIC_CHARS = re.compile(r"[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+_LATIN_WORDS = re.compile(r"[a-zàâäçéèêëîïôöùûüÿœæ]+")
+
+# Part minimale de lettres arabes pour classer un texte en arabe
+_ARABIC_MIN_RATIO = 0.3
+
+# Mots-outils et termes de symptômes fréquents, propres à chaque langue
+_MARKERS = {
+    "fr": frozenset(
+        "je j ai mal au aux le la les des du une un et est suis depuis avec dans sur mon ma mes "
+        "pas très ventre tête douleur douleurs fièvre vomis nausées toux fatigue gorge dos "
+        "jours hier matin soir quand beaucoup peu côté droite gauche".split()
+    ),
+    "en": frozenset(
+        "i have has had my the an and is am are since with in of not very "
+        "stomach belly head headache pain fever vomiting nausea cough tired throat back "
+        "days yesterday morning night when lot little side right left hurts".split()
+    ),
+}
+_FRENCH_CHARS = re.compile(r"[àâçéèêëîïôùûœ]")
+
+
+def detect_language(text: str, languages: Sequence[str], default: str) -> str:
+    """
+    Langue probable d'un texte de symptômes parmi `languages`.
+
+    Écriture arabe majoritaire → "ar" ; sinon comptage des marqueurs
+    français et anglais (les accents comptent pour le français). En cas
+    d'égalité ou de texte non reconnu, `default`.
+    """
+    letters = sum(1 for c in text if c.isalpha())
+    if not letters:
+        return default
+    if "ar" in languages and len(_ARABIC_CHARS.findall(text)) / letters >= _ARABIC_MIN_RATIO:
+        return "ar"
+
+    words = _LATIN_WORDS.findall(text.lower().replace("'", " "))
+    scores = {
+        lang: sum(1 for word in words if word in markers)
+        for lang, markers in _MARKERS.items()
+        if lang in languages
+    }
+    if "fr" in scores:
+        scores["fr"] += len(_FRENCH_CHARS.findall(text.lower()))
+    if not scores:
+        return default
+
+    best = max(scores, key=scores.get)
+    if scores[best] == 0 or list(scores.values()).count(scores[best]) > 1:
+        return default
+    return best
+
+
+def localized(pathology: dict, field: str, lang: str) -> str:
+    """Champ traduit de la pathologie (texte source si la traduction manque)."""
+    return pathology.get("translations", {}).get(lang, {}).get(field, pathology[field])
+
+
+def missing_translations(pathologies: list[dict], lang: str) -> int:
+    """Nombre d'entrées sans description de symptômes dans `lang`."""
+    return sum(
+        1 for p in pathologies
+        if "symptoms_description" not in p.get("translations", {}).get(lang, {})
+    )
+
+
+def validate_translations(pathology: dict) -> None:
+    """
+    Raises:
+        ValueError: Bloc `translations` mal formé
+    """
+    translations = pathology.get("translations", {})
+    if not isinstance(translations, dict):
+        raise ValueError(f"Pathologie {pathology['id']}: translations doit être un objet par langue")
+    for lang, fields in translations.items():
+        if not isinstance(fields, dict) or not all(isinstance(v, str) for v in fields.values()):
+            raise ValueError(f"Pathologie {pathology['id']}: traduction '{lang}' invalide")
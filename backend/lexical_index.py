@@ -0,0 +1,169 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Index lexical BM25 (postings compacts) et fusion avec le dense
+# =============================================================================
+
+"""
+Retrieval lexical
+-----------------
+Les termes médicaux exacts ("photophobie", "fosse iliaque droite") pèsent
+peu dans un embedding MiniLM. Un index BM25 sur les textes du catalogue
+les remet au premier plan.
+
+Index inversé construit une fois, postings au format CSR :
+    indptr   (n_termes + 1,)  → début des postings de chaque terme
+    doc_ids  (n_postings,)    → documents contenant le terme (int32)
+    weights  (n_postings,)    → poids BM25 précalculé idf × tf saturé (float32)
+
+Le score d'une requête est une seule somme pondérée (`np.bincount`) sur les
+postings concaténés de ses termes.
+
+Fusion avec les scores denses (`fuse_scores`) :
+- "rrf"      : reciprocal rank fusion, 1/(k + rang) sommé sur les deux listes
+- "weighted" : (1 - w) × cosinus + w × BM25 normalisé par le max de la requête
+"""
+
+import re
+import unicodedata
+from typing import Sequence
+
+import numpy as np
+
+from vector_index import top_k
+
+FUSION_METHODS = ("rrf", "weighted")
+
+# Lettres et chiffres de toute écriture (latin sans accents après NFKD, arabe)
+_TOKEN_PATTERN = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset(
+    "a au aux avec ce ces dans de des du elle en et il ils je j la le les leur lui ma mais me mes moi "
+    "mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une "
+    "vos votre vous y est sont ai as avez ont suis depuis tres plus peu "
+    "an and are as at be by for from has have i in is it my of on or the to with "
+    "في من على الى إلى عن مع و او أو انا أنا لدي عندي منذ هذا هذه"
+    .split()
+)
+# Article et conjonctions collés aux mots arabes (« والصداع » → « صداع »)
+_ARABIC_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Termes normalisés : minuscules, sans accents, sans mots vides, pluriel
+    simple retiré (« nausées » et « nausée » donnent le même terme), article
+    arabe retiré. Les voyelles arabes (diacritiques) disparaissent avec les
+    accents.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text):
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        if len(token) > 4 and token[-1] in "sx":
+            token = token[:-1]
+        for prefix in _ARABIC_PREFIXES:
+            if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+                token = token[len(prefix):]
+                break
+        terms.append(token)
+    return terms
+
+
+class BM25Index:
+    """Index inversé BM25 à postings contigus (recherche sans boucle par document)."""
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.n_docs = len(texts)
+        self.vocabulary: dict[str, int] = {}
+
+        term_ids, doc_ids = [], []
+        lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            terms = tokenize(text)
+            lengths[doc_id] = len(terms)
+            for term in terms:
+                term_ids.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                doc_ids.append(doc_id)
+
+        n_terms = len(self.vocabulary)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+
+        # Fréquences (terme, document) : paires uniques triées par terme puis document
+        pairs, tf = np.unique(term_ids * max(self.n_docs, 1) + doc_ids, return_counts=True)
+        posting_terms = pairs // max(self.n_docs, 1)
+        self.doc_ids = (pairs % max(self.n_docs, 1)).astype(np.int32)
+
+        df = np.bincount(posting_terms, minlength=n_terms)
+        self.indptr = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=self.indptr[1:])
+
+        idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_length = float(lengths.mean()) if self.n_docs else 0.0
+        norm = k1 * (1 - b + b * lengths[self.doc_ids] / max(avg_length, 1e-9))
+        self.weights = (idf[posting_terms] * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def scores(self, text: str) -> np.ndarray:
+        """Score BM25 de chaque document pour `text` (0 si aucun terme commun)."""
+        term_ids = [self.vocabulary[t] for t in tokenize(text) if t in self.vocabulary]
+        if not term_ids:
+            return np.zeros(self.n_docs, dtype=np.float32)
+        # Un terme répété dans la requête compte une fois par occurrence (BM25 classique)
+        slices = [np.arange(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        postings = np.concatenate(slices)
+        return np.bincount(
+            self.doc_ids[postings], weights=self.weights[postings], minlength=self.n_docs
+        ).astype(np.float32)
+
+    def search(self, text: str, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k documents ayant au moins un terme commun avec `text`."""
+        return self.search_scores(self.scores(text), k)
+
+    @staticmethod
+    def search_scores(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k de scores BM25 déjà calculés (`scores`), sans les documents à 0."""
+        best_scores, best_ids = top_k(scores, k)
+        keep = best_scores[0] > 0
+        return best_scores[:, keep], best_ids[:, keep]
+
+
+def fuse_scores(
+    dense: np.ndarray,
+    lexical: np.ndarray,
+    method: str = "rrf",
+    lexical_weight: float = 0.3,
+    rrf_k: int = 60,
+) -> np.ndarray:
+    """
+    Fusionne les scores denses et lexicaux d'un même ensemble de candidats.
+
+    Args:
+        dense: Similarités cosinus des candidats
+        lexical: Scores BM25 des mêmes candidats (0 = aucun terme commun)
+        method: "rrf" ou "weighted"
+
+    Returns:
+        Score de classement fusionné (plus grand = meilleur)
+    """
+    if method == "weighted":
+        top = float(lexical.max()) if len(lexical) else 0.0
+        normalized = lexical / top if top > 0 else np.zeros_like(lexical)
+        return (1 - lexical_weight) * dense + lexical_weight * normalized
+
+    if method != "rrf":
+        raise ValueError(f"Fusion inconnue: {method} (attendu: {', '.join(FUSION_METHODS)})")
+
+    def ranks(scores: np.ndarray) -> np.ndarray:
+        order = np.argsort(-scores, kind="stable")
+        rank = np.empty(len(scores), dtype=np.float64)
+        rank[order] = np.arange(1, len(scores) + 1)
+        return rank
+
+    fused = 1.0 / (rrf_k + ranks(dense))
+    # Un candidat sans terme commun ne reçoit pas de contribution lexicale
+    return fused + np.where(lexical > 0, 1.0 / (rrf_k + ranks(lexical)), 0.0)
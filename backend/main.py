@@ -8,36 +8,71 @@
 Doctis AI - Backend API
 -----------------------
 Architecture:
-1. SBERT (all-MiniLM-L6-v2) pour le matching sémantique des symptômes
+1. SBERT (all-MiniLM-L6-v2) pour le matching sémantique des symptômes ;
+   requêtes en anglais ou en arabe (détectées) comparées aux traductions du
+   catalogue, encodeur multilingue chargé au premier usage
 2. LLM quantizé (GGUF) pour la génération de réponses empathiques
 3. Base de données JSON de pathologies
 
 Endpoints:
 - POST /diagnose : Analyse des symptômes et pré-diagnostic
-- GET /health : Vérification de l'état du service
-- GET /pathologies : Liste des pathologies disponibles
+- POST /diagnose/stream : Idem, réponse IA streamée token par token (NDJSON)
+- POST /diagnose/batch : Pré-diagnostic en masse (NDJSON en entrée et en sortie)
+- POST /diagnose/session : Conversation multi-tours (seul le nouveau message est encodé)
+- GET /health : Liveness + état de chargement de chaque composant
+- GET /ready : Readiness (503 tant que le retrieval n'est pas prêt)
+- GET /metrics : Métriques Prometheus (latence par étape, caches, RSS)
+- GET /pathologies : Liste des pathologies disponibles (paginée)
+- POST /admin/reload : Rechargement à chaud du catalogue (ré-encodage incrémental)
 """
 
+import asyncio
+import importlib.util
 import json
 import os
+import queue
+import threading
+import time
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Iterator, Optional
 from contextlib import asynccontextmanager
 
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-
-# Tentative d'import de llama-cpp-python (optionnel si non installé)
-try:
-    from llama_cpp import Llama
-    LLAMA_AVAILABLE = True
-except ImportError:
-    LLAMA_AVAILABLE = False
+from starlette.requests import ClientDisconnect
+from batching import MicroBatcher
+from catalogue_store import (
+    Catalogue, content_hashes, count_missing_translations, entry_fingerprints, indexed_texts, page, text_column
+)
+from embedding_cache import EmbeddingCache
+from encoders import Encoder, encoder_cache_key, load_encoder
+from inference_pool import PRIORITY_BATCH, PRIORITY_INTERACTIVE, InferencePool, InferenceRejectedError
+from languages import detect_language, localized
+from lexical_index import BM25Index, fuse_scores
+from metrics import Metrics, process_rss_bytes
+from model_server import RemoteEncoder
+from knowledge_base import CatalogueWatcher, KnowledgeBase, diff_catalogues, read_catalogue
+from multi_vector import MultiVectorIndex, fragment_layout, text_fragments
+from prompt_cache import PromptPrefixCache
+from quantization import build_index
+from reranker import CrossEncoderReranker
+from response_cache import ResponseCache
+from responses import FastJSONResponse, PathologyResponses, diagnosis_payload, dumps
+from sessions import LexicalFn, ScoreFn, Session, SessionStore
+from vector_index import VectorIndex, top_k
+
+# llama-cpp-python (optionnel si non installé) : présence vérifiée sans import ;
+# le module et ses bibliothèques natives ne sont importés qu'au chargement du LLM
+LLAMA_AVAILABLE = importlib.util.find_spec("llama_cpp") is not None
+if not LLAMA_AVAILABLE:
     print("⚠️  llama-cpp-python non installé. Mode dégradé activé (réponses templates).")
+# Classe `llama_cpp.Llama`, résolue par `_llama_class` (remplaçable en benchmark)
+Llama = None
 
 
 # =============================================================================
@@ -54,18 +89,116 @@ class Settings:
     BASE_DIR: Path = Path(__file__).parent
     DATA_DIR: Path = BASE_DIR / "data"
     MODELS_DIR: Path = BASE_DIR / "models"
+    CACHE_DIR: Path = BASE_DIR / "cache"
 
     # Modèles
     SBERT_MODEL: str = "all-MiniLM-L6-v2"
+    # Backend d'encodage : "torch", "onnx" ou "onnx-int8" (ONNX Runtime, sans PyTorch au runtime)
+    ENCODER_BACKEND: str = os.getenv("DOCTIS_ENCODER_BACKEND", "torch")
+    ENCODER_THREADS: Optional[int] = None
+    # Serveur de modèles partagé (model_server.py) : SBERT n'est pas chargé par chaque worker
+    MODEL_SERVER_ADDRESS: Optional[str] = os.getenv("DOCTIS_MODEL_SERVER")
+    # Langues servies : détectées sur le texte (ou champ `lang`). La langue source
+    # utilise l'index principal ; chaque autre langue a sa matrice, construite à
+    # partir des traductions du catalogue et chargée avec son encodeur au premier usage.
+    SOURCE_LANGUAGE: str = "fr"
+    LANGUAGES: tuple = ("fr", "en", "ar")
+    MULTILINGUAL_MODEL: str = "paraphrase-multilingual-MiniLM-L12-v2"
+    # Encodeur par langue (défaut : MULTILINGUAL_MODEL) ; l'anglais réutilise SBERT
+    LANGUAGE_MODELS: dict = {"en": SBERT_MODEL}
     LLM_MODEL_PATH: str = str(MODELS_DIR / "llama-3-8b-instruct.Q4_K_M.gguf")
 
     # Seuils
     SIMILARITY_THRESHOLD: float = 0.4
+
+    # Index vectoriel : "exact" (argpartition) ou "ivf" (approximatif, gros catalogues)
+    VECTOR_INDEX: str = "exact"
+    RETRIEVAL_TOP_K: int = 5
+    IVF_NPROBE: int = 16
+    # Stockage de la matrice de l'index exact : "float32", "float16", "int8" (échelle
+    # par ligne) ou "binary" (1 bit/dim). Premier passage sur la forme compacte, puis
+    # re-scoring float32 des RESCORE_CANDIDATES meilleurs (0 = scores compacts)
+    EMBEDDING_STORAGE: str = os.getenv("DOCTIS_EMBEDDING_STORAGE", "float32")
+    RESCORE_CANDIDATES: int = 200
+
+    # Mode de retrieval : "single" (un vecteur par pathologie) ou "multi" (un
+    # vecteur par fragment de symptômes, scores fusionnés ; recherche exacte float32)
+    RETRIEVAL_MODE: str = "single"
+    MULTI_VECTOR_AGGREGATION: str = "mean"  # "mean" | "max" sur les fragments de la requête
+
+    # Retrieval hybride BM25 + dense : "none", "rrf" ou "weighted".
+    # "rrf" ne modifie que le classement (la confiance reste le cosinus) ;
+    # "weighted" utilise le score fusionné comme confiance.
+    RETRIEVAL_FUSION: str = "none"
+    HYBRID_LEXICAL_WEIGHT: float = 0.3
+    HYBRID_CANDIDATES: int = 50
+    # Au-delà de cette taille de catalogue, seuls les candidats BM25 sont scorés en dense
+    HYBRID_PREFILTER_MIN_SIZE: int = 20_000
+
+    # Re-classement des RERANK_TOP_K meilleurs candidats au-dessus du seuil par un
+    # cross-encoder (une passe en lot). Au-delà de RERANK_BUDGET_MS, l'ordre du
+    # bi-encodeur est conservé. La confiance comparée au seuil reste le cosinus.
+    RERANK_ENABLED: bool = os.getenv("DOCTIS_RERANK", "0") == "1"
+    RERANK_MODEL: str = os.getenv("DOCTIS_RERANK_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+    RERANK_TOP_K: int = 5
+    RERANK_BUDGET_MS: float = float(os.getenv("DOCTIS_RERANK_BUDGET_MS", 150))
+    RERANK_CACHE_SIZE: int = 50_000
+
+    # Chargement des modèles en arrière-plan (le serveur répond dès le démarrage)
+    BACKGROUND_LOADING: bool = True
+    STARTING_RETRY_AFTER_S: int = 10
+
+    # Rechargement à chaud du catalogue (POST /admin/reload et/ou surveillance du fichier)
+    # JSON, ou catalogue compilé (.dcat, memory-mappé) produit par catalogue_store.py
+    PATHOLOGIES_PATH: Path = Path(os.getenv("DOCTIS_PATHOLOGIES_PATH", DATA_DIR / "pathologies.json"))
+    PATHOLOGIES_PAGE_SIZE: int = 100
+    PATHOLOGIES_MAX_PAGE_SIZE: int = 1000
+    PATHOLOGIES_WATCH_INTERVAL_S: float = 0.0  # 0 = surveillance désactivée
+    ADMIN_TOKEN: Optional[str] = os.getenv("DOCTIS_ADMIN_TOKEN")
     LLM_MAX_TOKENS: int = 256
     LLM_TEMPERATURE: float = 0.7
 
+    # Pool d'inférence LLM (une instance Llama par worker, poids GGUF partagés via mmap)
+    LLM_WORKERS: int = 1
+    LLM_THREADS_PER_WORKER: int = 4
+    LLM_QUEUE_MAX_SIZE: int = 16
+    LLM_QUEUE_TIMEOUT_S: float = 10.0
+    LLM_RETRY_AFTER_S: int = 5
+    # Pré-évaluation du prompt système (KV-cache réutilisé à chaque requête)
+    LLM_PROMPT_PREFIX_CACHE: bool = True
+
+    # Cache des réponses LLM (SQLite partagé entre workers)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_PATH: Path = CACHE_DIR / "responses.sqlite3"
+    RESPONSE_CACHE_TTL_S: float = 24 * 3600
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000
+    RESPONSE_CACHE_SIMILARITY: float = 0.92
+    RESPONSE_LANG: str = "fr"
+
+    # Pré-diagnostic en masse (/diagnose/batch et batch_cli.py)
+    BATCH_CHUNK_SIZE: int = 256
+    BATCH_MAX_ITEMS: int = 100_000
+
+    # Métriques Prometheus (GET /metrics) et chronométrage par étape
+    METRICS_ENABLED: bool = True
+    # En-tête Server-Timing sur toutes les réponses (sinon sur demande : `X-Timing: 1`)
+    TIMING_HEADER: bool = False
+
+    # Micro-batching des encodages de requêtes
+    ENCODE_BATCH_MAX_SIZE: int = 32
+    ENCODE_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Sessions multi-tours (POST /diagnose/session) : en mémoire, expirées après
+    # SESSION_TTL_S d'inactivité, LRU au-delà du nombre ou de la taille maximale
+    SESSION_TTL_S: float = 1800.0
+    SESSION_MAX_COUNT: int = 10_000
+    SESSION_MAX_MB: int = 256
+    # Fenêtre de tours agrégés (les plus anciens sont retirés des agrégats)
+    SESSION_MAX_TURNS: int = 20
+
 
 settings = Settings()
+metrics = Metrics("doctis", enabled=settings.METRICS_ENABLED)
 
 
 # =============================================================================
@@ -81,6 +214,31 @@ class SymptomInput(BaseModel):
         description="Description des symptômes en langage naturel",
         example="J'ai mal au ventre en bas à droite et je vomis depuis ce matin"
     )
+    lang: Optional[str] = Field(
+        None,
+        description="Langue des symptômes (fr, en, ar) ; détectée sur le texte si absente",
+        example="fr"
+    )
+
+
+class SessionTurnInput(BaseModel):
+    """Tour d'une session : seul le nouveau message est envoyé."""
+    symptoms: str = Field(
+        ...,
+        min_length=3,
+        max_length=2000,
+        description="Nouveau message du patient (sans les précédents)",
+        example="Et depuis ce soir j'ai aussi de la fièvre"
+    )
+    session_id: Optional[str] = Field(
+        None,
+        description="Session à poursuivre ; une nouvelle session est créée si absente"
+    )
+    lang: Optional[str] = Field(
+        None,
+        description="Langue de la session (premier tour) ; détectée sur le texte si absente",
+        example="fr"
+    )
 
 
 class PathologyMatch(BaseModel):
@@ -102,17 +260,121 @@ class DiagnosisResponse(BaseModel):
     ai_response: str
     disclaimer: str
     authors: list[str] = settings.AUTHORS
+    language: Optional[str] = None
+
+
+class SessionDiagnosisResponse(DiagnosisResponse):
+    """Pré-diagnostic de la conversation entière d'une session."""
+    session_id: str
+    turns: int
 
 
 class HealthResponse(BaseModel):
     """Réponse du health check."""
     status: str
+    ready: bool
     app_name: str
     version: str
     models_loaded: dict
+    components: dict
+    load_times: dict
+    inference_queue: Optional[dict] = None
+    response_cache: Optional[dict] = None
+    knowledge_base: Optional[dict] = None
     authors: list[str]
 
 
+# =============================================================================
+# Prompts LLM
+# =============================================================================
+
+# Prompt système médical, préfixe commun à toutes les générations
+SYSTEM_PROMPT = """Tu es Doctis AI, un assistant médical bienveillant et professionnel.
+Tu dois générer une réponse empathique pour un patient qui présente des symptômes.
+Reste rassurant mais prudent. Rappelle toujours l'importance de consulter un médecin.
+Réponds en français, de manière concise (2-3 phrases maximum)."""
+
+PROMPT_PREFIX = f"<|system|>\n{SYSTEM_PROMPT}<|end|>\n"
+
+# Réponse lorsqu'aucune pathologie ne peut être évaluée
+NO_ANALYSIS_MESSAGE = "Je n'ai pas pu analyser vos symptômes. Veuillez reformuler votre description ou consulter un médecin."
+
+
+# =============================================================================
+# Pré-diagnostic en masse
+# =============================================================================
+
+# Modes de génération en batch :
+# - "none"   : réponse template (aucun appel LLM)
+# - "unique" : un appel LLM par couple (pathologie, tranche de confiance)
+BATCH_LLM_MODES = ("none", "unique")
+
+
+def parse_batch_line(
+    line,
+    line_number: int,
+    id_field: str = "id",
+    text_field: str = "symptoms"
+) -> dict:
+    """
+    Normalise une ligne JSONL d'entrée en {"id", "line", "symptoms", "lang"}.
+
+    `line` est le numéro de ligne (à partir de 1), toujours renvoyé à côté
+    de l'id fourni (None si absent) : les deux ne se confondent jamais.
+    Une ligne invalide donne {"id", "line", "error"}.
+    """
+    try:
+        record = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {"id": None, "line": line_number, "error": "Ligne JSON invalide"}
+
+    if not isinstance(record, dict):
+        return {"id": None, "line": line_number, "error": "Chaque ligne doit être un objet JSON"}
+
+    return {
+        "id": record.get(id_field),
+        "line": line_number,
+        "symptoms": record.get(text_field),
+        "lang": record.get("lang")
+    }
+
+
+async def request_lines(request: Request) -> AsyncIterator[bytes]:
+    """Lignes du corps de la requête, produites au fil de la réception."""
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *complete, buffer = buffer.split(b"\n")
+        for line in complete:
+            yield line
+    if buffer:
+        yield buffer
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    Réponse streamée dont le contenu lit lui-même le corps de la requête.
+
+    `StreamingResponse` écoute `receive` en parallèle pour détecter une
+    déconnexion et consommerait le corps : ici, seul le contenu lit
+    `receive` (une déconnexion interrompt la lecture du corps).
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+
+
+def _llama_class():
+    """`llama_cpp.Llama`, importée au premier chargement du LLM."""
+    global Llama
+    if Llama is None:
+        from llama_cpp import Llama
+    return Llama
+
+
 # =============================================================================
 # Services
 # =============================================================================
@@ -124,38 +386,401 @@ class DoctisAIService:
     """
 
     def __init__(self):
-        self.sbert_model: Optional[SentenceTransformer] = None
-        self.llm_model: Optional[Llama] = None
-        self.pathologies: list = []
-        self.pathology_embeddings: Optional[np.ndarray] = None
-        self.disclaimer: str = ""
+        self.sbert_model: Optional[Encoder] = None
+        self.llm_model = None  # llama_cpp.Llama (premier worker du pool)
+        self.inference_pool: Optional[InferencePool] = None
+        self.response_cache: Optional[ResponseCache] = None
+        self.prompt_prefix_cache: Optional[PromptPrefixCache] = None
+        # Catalogue servi : instantané remplacé d'un bloc lors d'un rechargement
+        self.knowledge_base = KnowledgeBase([])
+        self.catalogue_watcher: Optional[CatalogueWatcher] = None
+        self._reload_lock = threading.Lock()
+        self.query_batcher: Optional[MicroBatcher] = None
+        # Encodeurs des autres langues (par modèle, chargés au premier usage) et
+        # instantanés par langue, dérivés de l'instantané source
+        self.encoders: dict[str, Encoder] = {}
+        self.query_batchers: dict[str, MicroBatcher] = {}
+        self.language_bases: dict[str, KnowledgeBase] = {}
+        self._language_lock = threading.Lock()
+        self._encoder_lock = threading.Lock()
+
+        # État de chargement par composant : pending | loading | ready | unavailable | failed
+        self.component_status: dict = {"pathologies": "pending", "sbert": "pending", "llm": "pending"}
+        self.reranker: Optional[CrossEncoderReranker] = None
+        if settings.RERANK_ENABLED:
+            self.reranker = CrossEncoderReranker(
+                settings.RERANK_MODEL,
+                budget_ms=settings.RERANK_BUDGET_MS,
+                cache_size=settings.RERANK_CACHE_SIZE
+            )
+            self.component_status["reranker"] = "pending"
+        self.component_errors: dict = {}
+        self.load_times: dict = {}
+
+        self.sessions = SessionStore(
+            max_sessions=settings.SESSION_MAX_COUNT,
+            ttl_seconds=settings.SESSION_TTL_S,
+            max_bytes=settings.SESSION_MAX_MB * 1024 * 1024,
+            max_turns=settings.SESSION_MAX_TURNS
+        )
 
-    def load_pathologies(self) -> None:
-        """Charge la base de données des pathologies."""
-        pathologies_path = settings.DATA_DIR / "pathologies.json"
+    def _load_component(self, name: str, loader) -> None:
+        """Exécute un chargeur en suivant son état et sa durée."""
+        self.component_status[name] = "loading"
+        start = time.perf_counter()
+        try:
+            loader()
+        except Exception as e:
+            self.component_status[name] = "failed"
+            self.component_errors[name] = str(e)
+            print(f"❌ Échec du chargement ({name}): {e}")
+            return
 
-        if not pathologies_path.exists():
-            raise FileNotFoundError(f"Fichier pathologies.json non trouvé: {pathologies_path}")
+        self.load_times[name] = round(time.perf_counter() - start, 2)
+        if name == "llm" and self.llm_model is None:
+            # LLM absent : mode dégradé assumé (réponses templates)
+            self.component_status[name] = "unavailable"
+        else:
+            self.component_status[name] = "ready"
 
-        with open(pathologies_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    async def load_models(self) -> None:
+        """
+        Chargement par étapes, hors boucle d'événements :
+        1. catalogue des pathologies
+        2. SBERT (+ embeddings), LLM et cross-encoder en parallèle
+        """
+        await asyncio.to_thread(self._load_component, "pathologies", self.load_pathologies)
+        loaders = [
+            asyncio.to_thread(self._load_component, "sbert", self.load_sbert_model),
+            asyncio.to_thread(self._load_component, "llm", self.load_llm_model),
+        ]
+        if self.reranker is not None:
+            loaders.append(asyncio.to_thread(self._load_component, "reranker", self.load_reranker))
+        await asyncio.gather(*loaders)
+
+    @property
+    def retrieval_ready(self) -> bool:
+        """Vrai dès que le matching sémantique peut servir des requêtes."""
+        return self.component_status["sbert"] == "ready" and self.vector_index is not None
+
+    # Vues de l'instantané courant (lecture seule)
+    @property
+    def pathologies(self) -> Catalogue:
+        return self.knowledge_base.pathologies
+
+    @property
+    def pathology_embeddings(self) -> Optional[np.ndarray]:
+        return self.knowledge_base.embeddings
+
+    @property
+    def vector_index(self) -> Optional[VectorIndex]:
+        return self.knowledge_base.index
+
+    @property
+    def disclaimer(self) -> str:
+        return self.knowledge_base.disclaimer
 
-        self.pathologies = data.get("pathologies", [])
-        self.disclaimer = data.get("disclaimer", "Consultez un médecin pour tout diagnostic médical.")
+    def load_pathologies(self) -> None:
+        """Charge la base de données des pathologies."""
+        pathologies, disclaimer = read_catalogue(settings.PATHOLOGIES_PATH)
+        self.knowledge_base = KnowledgeBase(
+            pathologies, disclaimer,
+            lexical_index=self._build_lexical_index(pathologies, settings.SOURCE_LANGUAGE),
+            language=settings.SOURCE_LANGUAGE
+        )
 
-        print(f"✅ {len(self.pathologies)} pathologies chargées")
+        print(f"✅ {len(pathologies)} pathologies chargées")
+
+    @staticmethod
+    def _build_lexical_index(pathologies: Catalogue, lang: str) -> Optional[BM25Index]:
+        """Index BM25 sur nom + description dans `lang` (None si la fusion est désactivée)."""
+        if settings.RETRIEVAL_FUSION == "none":
+            return None
+        return BM25Index([
+            f"{name}. {symptoms}"
+            for name, symptoms in zip(
+                text_column(pathologies, "name", lang), text_column(pathologies, "symptoms_description", lang)
+            )
+        ])
 
     def load_sbert_model(self) -> None:
         """Charge le modèle SBERT pour les embeddings."""
-        print(f"⏳ Chargement du modèle SBERT: {settings.SBERT_MODEL}...")
-        self.sbert_model = SentenceTransformer(settings.SBERT_MODEL)
+        print(f"⏳ Chargement du modèle SBERT: {settings.SBERT_MODEL} ({settings.ENCODER_BACKEND})...")
+        self.sbert_model = self._load_encoder(settings.SBERT_MODEL)
+        self.query_batcher = self._create_batcher(self.sbert_model)
         print("✅ Modèle SBERT chargé")
 
-        # Pré-calcul des embeddings des pathologies
+        # Pré-calcul des embeddings des pathologies (cache disque memory-mappé)
         if self.pathologies:
-            symptoms_texts = [p["symptoms_description"] for p in self.pathologies]
-            self.pathology_embeddings = self.sbert_model.encode(symptoms_texts)
-            print(f"✅ Embeddings pré-calculés pour {len(symptoms_texts)} pathologies")
+            self.knowledge_base, _ = self._build_knowledge_base(
+                self.pathologies, self.disclaimer, self.knowledge_base.version,
+                lexical_index=self.knowledge_base.lexical_index
+            )
+
+    def load_reranker(self) -> None:
+        """Charge le cross-encoder (désactivé en cas d'échec : ordre du bi-encodeur)."""
+        print(f"⏳ Chargement du cross-encoder: {settings.RERANK_MODEL}...")
+        try:
+            self.reranker.warm_up()
+        except Exception:
+            self.reranker = None
+            raise
+        print("✅ Cross-encoder chargé")
+
+    @staticmethod
+    def _load_encoder(model_name: str) -> Encoder:
+        """Encodeur local, ou client du serveur de modèles (modèle chargé une fois pour tous les workers)."""
+        if settings.MODEL_SERVER_ADDRESS:
+            return RemoteEncoder(settings.MODEL_SERVER_ADDRESS, model_name, settings.ENCODER_BACKEND)
+        return load_encoder(
+            model_name,
+            settings.ENCODER_BACKEND,
+            cache_dir=settings.CACHE_DIR,
+            threads=settings.ENCODER_THREADS
+        )
+
+    def _create_batcher(self, encoder: Encoder) -> MicroBatcher:
+        return MicroBatcher(
+            partial(self._encode_corpus, encoder=encoder),
+            max_batch_size=settings.ENCODE_BATCH_MAX_SIZE,
+            max_wait_ms=settings.ENCODE_BATCH_MAX_WAIT_MS,
+        )
+
+    @staticmethod
+    def _language_model(lang: Optional[str]) -> str:
+        """Modèle d'encodage d'une langue (SBERT pour la langue source)."""
+        if lang is None or lang == settings.SOURCE_LANGUAGE:
+            return settings.SBERT_MODEL
+        return settings.LANGUAGE_MODELS.get(lang, settings.MULTILINGUAL_MODEL)
+
+    def _encoder(self, lang: Optional[str]) -> Encoder:
+        """Encodeur d'une langue ; un modèle autre que SBERT est chargé au premier usage."""
+        model_name = self._language_model(lang)
+        if model_name == settings.SBERT_MODEL:
+            return self.sbert_model
+        with self._encoder_lock:
+            if model_name not in self.encoders:
+                print(f"⏳ Chargement de l'encodeur {model_name} ({settings.ENCODER_BACKEND})...")
+                encoder = self._load_encoder(model_name)
+                self.query_batchers[model_name] = self._create_batcher(encoder)
+                self.encoders[model_name] = encoder
+                print(f"✅ Encodeur {model_name} chargé")
+            return self.encoders[model_name]
+
+    def _query_batcher(self, lang: Optional[str]) -> Optional[MicroBatcher]:
+        model_name = self._language_model(lang)
+        if model_name == settings.SBERT_MODEL:
+            return self.query_batcher
+        return self.query_batchers.get(model_name)
+
+    def _build_knowledge_base(
+        self,
+        pathologies: Catalogue,
+        disclaimer: str,
+        version: int,
+        lexical_index: Optional[BM25Index] = None,
+        lang: str = settings.SOURCE_LANGUAGE
+    ) -> tuple[KnowledgeBase, int]:
+        """
+        Construit un instantané complet (embeddings + index) sans toucher
+        à celui en service. Hors langue source, les textes indexés sont les
+        traductions (cache d'embeddings propre à la langue).
+
+        Returns:
+            (instantané, nombre d'entrées ré-encodées)
+        """
+        # Catalogue compilé : textes lus à la demande (seuls ceux à ré-encoder sont décodés)
+        symptoms_texts = indexed_texts(pathologies, "symptoms_description", lang)
+        encode = partial(self._encode_corpus, encoder=self._encoder(lang))
+        cache_key = encoder_cache_key(self._language_model(lang), settings.ENCODER_BACKEND)
+        if lang != settings.SOURCE_LANGUAGE:
+            cache_key = f"{cache_key}#{lang}"
+            missing = count_missing_translations(pathologies, lang)
+            if missing:
+                print(f"⚠️  {missing} pathologie(s) sans traduction '{lang}' : texte source indexé")
+
+        if settings.RETRIEVAL_MODE == "multi":
+            # Index multi-vecteurs : matrice des fragments en float32 uniquement
+            if settings.EMBEDDING_STORAGE != "float32":
+                raise ValueError(
+                    f"Stockage {settings.EMBEDDING_STORAGE} indisponible en mode multi-vecteurs "
+                    "(DOCTIS_EMBEDDING_STORAGE=float32, ou RETRIEVAL_MODE \"single\")"
+                )
+            # Un vecteur par fragment (cache distinct : autre liste de textes)
+            fragment_texts, owners = fragment_layout(text_column(pathologies, "symptoms_description", lang))
+            cache = EmbeddingCache(settings.CACHE_DIR, f"{cache_key}#fragments")
+            fragment_embeddings = cache.get_embeddings(fragment_texts, encode)
+            index = MultiVectorIndex(
+                fragment_embeddings,
+                owners,
+                aggregation=settings.MULTI_VECTOR_AGGREGATION,
+                normalized=True
+            )
+            embeddings = index.document_vectors()
+            print(
+                f"✅ Embeddings [{lang}] prêts pour {len(fragment_texts)} fragments de "
+                f"{len(symptoms_texts)} pathologies ({cache.last_encoded_count} ré-encodés)"
+            )
+        elif settings.RETRIEVAL_MODE == "single":
+            cache = EmbeddingCache(settings.CACHE_DIR, cache_key)
+            embeddings = cache.get_embeddings(symptoms_texts, encode, content_hashes(symptoms_texts))
+            print(
+                f"✅ Embeddings [{lang}] prêts pour {len(symptoms_texts)} pathologies "
+                f"({cache.last_encoded_count} ré-encodées)"
+            )
+            # Forme compacte éventuelle écrite à côté de la matrice du cache
+            index = build_index(
+                settings.VECTOR_INDEX,
+                embeddings,
+                settings.EMBEDDING_STORAGE,
+                settings.RESCORE_CANDIDATES,
+                store=cache.derived,
+                nprobe=settings.IVF_NPROBE
+            )
+        else:
+            raise ValueError(f"Mode de retrieval inconnu: {settings.RETRIEVAL_MODE}")
+        print(f"✅ Index vectoriel '{index.kind}' construit")
+        if lexical_index is None:
+            lexical_index = self._build_lexical_index(pathologies, lang)
+        return (
+            KnowledgeBase(pathologies, disclaimer, embeddings, index, version, lexical_index, lang),
+            cache.last_encoded_count
+        )
+
+    def resolve_language(self, symptoms: str, requested: Optional[str] = None) -> str:
+        """
+        Langue de la requête : `requested` si fournie, sinon détectée sur le texte.
+
+        Raises:
+            ValueError: Langue demandée non servie
+        """
+        if requested:
+            if requested not in settings.LANGUAGES:
+                raise ValueError(
+                    f"Langue non prise en charge: {requested} (valeurs possibles: {', '.join(settings.LANGUAGES)})"
+                )
+            return requested
+        return detect_language(symptoms, settings.LANGUAGES, settings.SOURCE_LANGUAGE)
+
+    def language_loaded(self, lang: str) -> bool:
+        """Vrai si la langue est servie sans chargement (encodeur et matrice à jour)."""
+        if lang == settings.SOURCE_LANGUAGE:
+            return True
+        base = self.language_bases.get(lang)
+        return base is not None and base.version == self.knowledge_base.version
+
+    def load_language(self, lang: str) -> str:
+        """
+        Prépare l'instantané d'une langue (bloquant au premier usage : encodeur
+        et embeddings des traductions).
+
+        Returns:
+            `lang`, ou la langue source si son chargement a échoué
+        """
+        component = f"language:{lang}"
+        if lang == settings.SOURCE_LANGUAGE or self.component_status.get(component) == "failed":
+            return settings.SOURCE_LANGUAGE
+        if not self.language_loaded(lang):
+            self._load_component(component, lambda: self.language_base(lang))
+        return lang if self.language_loaded(lang) else settings.SOURCE_LANGUAGE
+
+    def language_base(self, lang: Optional[str] = None, source: Optional[KnowledgeBase] = None) -> KnowledgeBase:
+        """
+        Instantané d'une langue, dérivé de `source` (l'instantané courant par
+        défaut) : même version, mêmes pathologies, textes traduits.
+        """
+        if source is None:
+            source = self.knowledge_base
+        if lang is None or lang == settings.SOURCE_LANGUAGE:
+            return source
+        base = self.language_bases.get(lang)
+        if base is not None and base.version == source.version:
+            return base
+
+        with self._language_lock:
+            base = self.language_bases.get(lang)
+            if base is None or base.version != source.version:
+                base, _ = self._build_knowledge_base(source.pathologies, source.disclaimer, source.version, lang=lang)
+                # Un instantané dérivé d'un catalogue remplacé entre-temps n'est pas publié
+                if source is self.knowledge_base:
+                    self.language_bases = {**self.language_bases, lang: base}
+        return base
+
+    def reload_pathologies(self) -> dict:
+        """
+        Recharge `pathologies.json` à chaud.
+
+        Seules les entrées nouvelles ou modifiées sont ré-encodées ; le nouvel
+        index est construit à côté puis publié d'un bloc. En cas d'erreur,
+        le catalogue en service reste inchangé.
+
+        Returns:
+            Différences appliquées, nombre d'entrées ré-encodées et durée
+        """
+        if not self.retrieval_ready:
+            raise RuntimeError("Modèle SBERT non initialisé")
+
+        # Un seul rechargement à la fois (endpoint admin et surveillance du fichier)
+        with self._reload_lock:
+            start = time.perf_counter()
+            current = self.knowledge_base
+            pathologies, disclaimer = read_catalogue(settings.PATHOLOGIES_PATH)
+            diff = diff_catalogues(current.pathologies, pathologies)
+
+            if not any((diff["added"], diff["removed"], diff["modified"])) and disclaimer == current.disclaimer:
+                return {"reloaded": False, **diff, "reencoded": 0, "knowledge_base": current.info()}
+
+            knowledge_base, reencoded = self._build_knowledge_base(pathologies, disclaimer, current.version + 1)
+            # Réponses LLM des pathologies modifiées ou retirées : supprimées avant publication
+            purged = 0
+            if self.response_cache is not None:
+                purged = self.response_cache.sync_catalogue(entry_fingerprints(pathologies))
+            # Langues déjà chargées : reconstruites (ré-encodage incrémental) et publiées avec
+            with self._language_lock:
+                language_bases = {
+                    lang: self._build_knowledge_base(pathologies, disclaimer, knowledge_base.version, lang=lang)[0]
+                    for lang in self.language_bases
+                }
+                self.knowledge_base = knowledge_base
+                self.language_bases = language_bases
+            # Scores calculés sur les anciens textes des pathologies
+            if self.reranker is not None:
+                self.reranker.clear()
+
+        duration = round(time.perf_counter() - start, 3)
+        print(
+            f"🔄 Catalogue rechargé (v{knowledge_base.version}) : +{diff['added']} "
+            f"-{diff['removed']} ~{diff['modified']}, {reencoded} ré-encodées, "
+            f"{purged} réponse(s) en cache invalidée(s) en {duration}s"
+        )
+        return {
+            "reloaded": True,
+            **diff,
+            "reencoded": reencoded,
+            "responses_invalidated": purged,
+            "duration_seconds": duration,
+            "knowledge_base": knowledge_base.info(),
+        }
+
+    def start_catalogue_watcher(self) -> None:
+        """Active le rechargement automatique si un intervalle est configuré."""
+        if settings.PATHOLOGIES_WATCH_INTERVAL_S <= 0 or self.catalogue_watcher is not None:
+            return
+        self.catalogue_watcher = CatalogueWatcher(
+            settings.PATHOLOGIES_PATH,
+            self._reload_when_ready,
+            interval=settings.PATHOLOGIES_WATCH_INTERVAL_S
+        )
+        self.catalogue_watcher.start()
+
+    def _reload_when_ready(self) -> None:
+        # Pendant le chargement initial, le catalogue lu sera déjà le plus récent
+        if self.retrieval_ready:
+            self.reload_pathologies()
+
+    def _encode_corpus(self, texts: list[str], encoder: Optional[Encoder] = None) -> np.ndarray:
+        """Encode des textes en vecteurs normalisés (float32), SBERT par défaut."""
+        return (encoder or self.sbert_model).encode(texts, normalize_embeddings=True, convert_to_numpy=True)
 
     def load_llm_model(self) -> None:
         """Charge le modèle LLM quantizé (GGUF)."""
@@ -169,54 +794,202 @@ class DoctisAIService:
             return
 
         print(f"⏳ Chargement du modèle LLM: {settings.LLM_MODEL_PATH}...")
-        self.llm_model = Llama(
-            model_path=settings.LLM_MODEL_PATH,
-            n_ctx=2048,
-            n_threads=4,
-            verbose=False
+        llama_class = _llama_class()
+        # Une instance par worker : les poids sont partagés (mmap), seul le KV-cache est dupliqué
+        models = [
+            llama_class(
+                model_path=settings.LLM_MODEL_PATH,
+                n_ctx=2048,
+                n_threads=settings.LLM_THREADS_PER_WORKER,
+                use_mmap=True,
+                verbose=False
+            )
+            for _ in range(settings.LLM_WORKERS)
+        ]
+        if settings.LLM_PROMPT_PREFIX_CACHE:
+            self.prompt_prefix_cache = PromptPrefixCache(PROMPT_PREFIX)
+            for model in models:
+                n_prefix = self.prompt_prefix_cache.prepare(model)
+            print(f"✅ Préfixe système pré-évalué ({n_prefix} tokens)")
+        if settings.RESPONSE_CACHE_ENABLED:
+            response_cache = ResponseCache(
+                settings.RESPONSE_CACHE_PATH,
+                ttl_seconds=settings.RESPONSE_CACHE_TTL_S,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY
+            )
+            # Réponses générées sur une version antérieure du catalogue (avant redémarrage)
+            purged = response_cache.sync_catalogue(entry_fingerprints(self.pathologies))
+            if purged:
+                print(f"🧹 {purged} réponse(s) LLM en cache invalidée(s) (catalogue modifié)")
+            self.response_cache = response_cache
+        self.inference_pool = InferencePool(
+            models,
+            max_queue_size=settings.LLM_QUEUE_MAX_SIZE,
+            queue_timeout=settings.LLM_QUEUE_TIMEOUT_S,
+            default_retry_after=settings.LLM_RETRY_AFTER_S
         )
-        print("✅ Modèle LLM chargé")
+        # Publié en dernier : les requêtes concurrentes restent en mode template
+        # tant que le pool et les caches ne sont pas prêts
+        self.llm_model = models[0]
+        print(f"✅ Modèle LLM chargé ({settings.LLM_WORKERS} worker(s))")
+
+    async def encode_query(self, user_input: str, lang: Optional[str] = None) -> np.ndarray:
+        """
+        Encode l'input utilisateur via le micro-batcher de l'encodeur de sa
+        langue (hors boucle d'événements ; la langue doit être chargée).
 
-    def compute_similarity(self, user_input: str) -> list[tuple[dict, float]]:
+        Returns:
+            Vecteur (dim,) en mode "single" ; en mode "multi", matrice
+            (1 + n_fragments, dim) dont la première ligne est le texte complet
+        """
+        batcher = self._query_batcher(lang)
+        if batcher is None:
+            raise RuntimeError(f"Encodeur non initialisé ({self._language_model(lang)})")
+        with metrics.stage("encode"):
+            if settings.RETRIEVAL_MODE != "multi":
+                return await batcher.encode(user_input)
+            # Les fragments rejoignent les micro-lots des requêtes concurrentes
+            vectors = await asyncio.gather(
+                *(batcher.encode(fragment) for fragment in text_fragments(user_input))
+            )
+            return np.stack(vectors)
+
+    def _embed_query(self, user_input: str, lang: Optional[str] = None) -> np.ndarray:
+        """Équivalent synchrone de `encode_query` (sans micro-batching)."""
+        encoder = self._encoder(lang)
+        with metrics.stage("encode"):
+            if settings.RETRIEVAL_MODE != "multi":
+                return self._encode_corpus([user_input], encoder)[0]
+            return self._encode_corpus(text_fragments(user_input), encoder)
+
+    @staticmethod
+    def _whole_text_vector(user_embedding: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Vecteur du texte complet (première ligne en mode multi-vecteurs)."""
+        if user_embedding is None:
+            return None
+        return np.atleast_2d(user_embedding)[0]
+
+    def compute_similarity(
+        self,
+        user_input: str,
+        user_embedding: Optional[np.ndarray] = None,
+        top_k: int = settings.RETRIEVAL_TOP_K,
+        lang: Optional[str] = None
+    ) -> list[tuple[dict, float]]:
         """
         Calcule la similarité cosinus entre l'input utilisateur
         et les descriptions de symptômes des pathologies.
 
+        Args:
+            user_input: Texte de l'utilisateur
+            user_embedding: Embedding déjà calculé (ex: par le micro-batcher),
+                avec l'encodeur de `lang`
+            top_k: Nombre de pathologies retournées
+            lang: Langue de la requête (matrice de ses traductions) ; None
+                pour la langue source
+
         Returns:
-            Liste de tuples (pathologie, score) triée par score décroissant
+            Liste des top_k tuples (pathologie, score) triée par score décroissant
         """
-        if self.sbert_model is None or self.pathology_embeddings is None:
+        if self.sbert_model is None:
+            raise RuntimeError("Modèle SBERT non initialisé")
+        # Un seul instantané par requête : index et pathologies restent cohérents
+        knowledge_base = self.language_base(lang)
+        if knowledge_base.index is None:
             raise RuntimeError("Modèle SBERT non initialisé")
 
-        # Encode l'input utilisateur
-        user_embedding = self.sbert_model.encode([user_input])
-
-        # Calcule la similarité cosinus
-        similarities = cosine_similarity(user_embedding, self.pathology_embeddings)[0]
+        # Encode l'input utilisateur (si non fourni)
+        if user_embedding is None:
+            user_embedding = self._embed_query(user_input, lang)
+
+        with metrics.stage("search"):
+            if knowledge_base.lexical_index is None:
+                # Recherche des top-k via l'index (sans tri complet du catalogue)
+                scores, ids = knowledge_base.index.search(user_embedding, top_k)
+                ids, scores = ids[0], scores[0]
+            else:
+                ids, scores = self._hybrid_search(knowledge_base, user_input, user_embedding, top_k)
+
+        return [
+            (knowledge_base.pathologies[i], float(score))
+            for i, score in zip(ids, scores)
+            if i >= 0
+        ]
+
+    def _hybrid_search(
+        self,
+        knowledge_base: KnowledgeBase,
+        user_input: str,
+        user_embedding: np.ndarray,
+        top_k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieval hybride : candidats denses et BM25, puis fusion.
 
-        # Associe chaque pathologie à son score
-        results = list(zip(self.pathologies, similarities))
+        Sur un gros catalogue, BM25 sert de préfiltre : seuls ses candidats
+        sont scorés en dense (repli sur l'index dense si aucun terme commun).
+        Les scores BM25 ne sont calculés qu'une fois par requête.
+        """
+        lexical = knowledge_base.lexical_index.scores(user_input)
+        depth = max(top_k, settings.HYBRID_CANDIDATES)
 
-        # Trie par score décroissant
-        results.sort(key=lambda x: x[1], reverse=True)
+        if len(knowledge_base.pathologies) >= settings.HYBRID_PREFILTER_MIN_SIZE and lexical.any():
+            candidates = knowledge_base.lexical_index.search_scores(lexical, depth)[1][0]
+            dense = knowledge_base.embeddings[candidates] @ self._whole_text_vector(user_embedding)
+            return self._fuse_candidates(candidates, dense, lexical, top_k)
 
-        return results
+        dense_scores, dense_ids = knowledge_base.index.search(user_embedding, depth)
+        return self._merge_lexical(
+            knowledge_base, user_embedding, dense_scores[0], dense_ids[0], lexical, top_k
+        )
 
-    def generate_llm_response(self, pathology: dict, confidence: float) -> str:
+    def _merge_lexical(
+        self,
+        knowledge_base: KnowledgeBase,
+        user_embedding: np.ndarray,
+        dense_scores: np.ndarray,
+        dense_ids: np.ndarray,
+        lexical: np.ndarray,
+        top_k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
-        Génère une réponse empathique via le LLM.
-        Si le LLM n'est pas disponible, utilise un template.
+        Ajoute les meilleurs candidats BM25 aux candidats denses puis fusionne
+        (sélection partielle : le catalogue n'est jamais trié en entier).
         """
-        if self.llm_model is None:
-            # Mode dégradé : template de réponse
-            return self._generate_template_response(pathology, confidence)
-
-        # Prompt système médical
-        system_prompt = """Tu es Doctis AI, un assistant médical bienveillant et professionnel.
-Tu dois générer une réponse empathique pour un patient qui présente des symptômes.
-Reste rassurant mais prudent. Rappelle toujours l'importance de consulter un médecin.
-Réponds en français, de manière concise (2-3 phrases maximum)."""
+        found = dense_ids >= 0
+        dense_ids, dense_scores = dense_ids[found], dense_scores[found]
+        if not lexical.any():
+            # Aucun terme commun : seuls les candidats denses sont classés
+            return self._fuse_candidates(dense_ids, dense_scores, lexical, top_k)
+
+        lexical_ids = knowledge_base.lexical_index.search_scores(lexical, len(dense_ids) or top_k)[1][0]
+        extra = np.setdiff1d(lexical_ids, dense_ids)
+
+        candidates = np.concatenate([dense_ids, extra])
+        dense = np.concatenate([
+            dense_scores,
+            knowledge_base.embeddings[extra] @ self._whole_text_vector(user_embedding)
+        ]) if len(extra) else dense_scores
+        return self._fuse_candidates(candidates, dense, lexical, top_k)
+
+    @staticmethod
+    def _fuse_candidates(
+        candidates: np.ndarray,
+        dense: np.ndarray,
+        lexical: np.ndarray,
+        top_k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Classe les candidats par score fusionné ; retourne (ids, confiances)."""
+        fused = fuse_scores(
+            dense, lexical[candidates], settings.RETRIEVAL_FUSION, settings.HYBRID_LEXICAL_WEIGHT
+        )
+        order = np.argsort(-fused, kind="stable")[:top_k]
+        confidence = fused if settings.RETRIEVAL_FUSION == "weighted" else dense
+        return candidates[order], confidence[order]
 
+    def _build_prompt(self, pathology: dict, confidence: float) -> str:
+        """Construit le prompt complet (préfixe système + patient) pour le LLM."""
         user_prompt = f"""Le patient présente des symptômes correspondant à : {pathology['name']}
 Niveau de confiance de l'analyse : {confidence*100:.0f}%
 Gravité : {pathology['severity_level']}/5
@@ -224,94 +997,559 @@ Conseil médical de base : {pathology['advice']}
 
 Génère une réponse empathique et rassurante pour le patient."""
 
-        # Génération via LLM
-        full_prompt = f"<|system|>\n{system_prompt}<|end|>\n<|user|>\n{user_prompt}<|end|>\n<|assistant|>\n"
+        return f"{PROMPT_PREFIX}<|user|>\n{user_prompt}<|end|>\n<|assistant|>\n"
 
-        response = self.llm_model(
-            full_prompt,
+    def _complete(self, model, prompt: str, stream: bool = False):
+        """
+        Appel llama.cpp depuis un worker du pool. Le KV-cache du préfixe
+        système est restauré au préalable : seul le suffixe est évalué.
+        """
+        if self.prompt_prefix_cache is not None:
+            self.prompt_prefix_cache.restore(model)
+        return model(
+            prompt,
             max_tokens=settings.LLM_MAX_TOKENS,
             temperature=settings.LLM_TEMPERATURE,
-            stop=["<|end|>", "<|user|>"]
+            stop=["<|end|>", "<|user|>"],
+            stream=stream
         )
 
-        return response["choices"][0]["text"].strip()
-
-    def _generate_template_response(self, pathology: dict, confidence: float) -> str:
-        """Génère une réponse template si le LLM n'est pas disponible."""
-        severity_messages = {
-            1: "Il s'agit généralement d'une condition bénigne.",
-            2: "Cette condition est généralement modérée et gérable.",
-            3: "Cette condition mérite une attention médicale.",
-            4: "Cette condition nécessite une consultation médicale rapide.",
-            5: "Cette condition peut être sérieuse et nécessite une attention médicale urgente."
-        }
+    def _timed_completion(self, model, prompt: str, timings=None) -> Iterator[str]:
+        """
+        Complétion streamée et chronométrée : l'attente du premier token
+        correspond à l'évaluation du prompt, la suite à la génération.
+        """
+        start = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        for chunk in self._complete(model, prompt, stream=True):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics.observe("llm_prompt_eval", first_token_at - start, timings)
+            tokens += 1
+            yield chunk["choices"][0]["text"]
+
+        if first_token_at is not None:
+            generation = time.perf_counter() - first_token_at
+            metrics.observe("llm_generation", generation, timings)
+            # Le premier token est compté dans l'évaluation du prompt
+            metrics.observe_tokens_per_second(tokens - 1, generation)
+
+    def _cached_response(
+        self,
+        pathology: dict,
+        confidence: float,
+        query_embedding: Optional[np.ndarray],
+        lang: Optional[str] = None
+    ) -> Optional[str]:
+        """Réponse LLM déjà générée pour une requête équivalente (ou None)."""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(
+            pathology["id"], confidence, self._response_cache_lang(lang), self._whole_text_vector(query_embedding)
+        )
 
-        severity_msg = severity_messages.get(pathology['severity_level'], "")
+    @staticmethod
+    def _response_cache_lang(lang: Optional[str]) -> str:
+        """
+        Partition du cache de réponses par langue de requête : des embeddings
+        produits par des encodeurs différents ne sont jamais comparés.
+        """
+        if lang is None or lang == settings.SOURCE_LANGUAGE:
+            return settings.RESPONSE_LANG
+        return f"{settings.RESPONSE_LANG}@{lang}"
+
+    def _store_response(
+        self,
+        pathology: dict,
+        confidence: float,
+        query_embedding: Optional[np.ndarray],
+        response: str,
+        lang: Optional[str] = None
+    ) -> None:
+        """Enregistre une réponse LLM générée dans le cache partagé."""
+        if self.response_cache is not None and response:
+            self.response_cache.put(
+                pathology["id"], confidence, self._response_cache_lang(lang), response,
+                self._whole_text_vector(query_embedding)
+            )
 
-        response = f"""D'après l'analyse de vos symptômes, je détecte une possible **{pathology['name']}** avec un niveau de confiance de {confidence*100:.0f}%.
+    def generate_llm_response(
+        self,
+        pathology: dict,
+        confidence: float,
+        query_embedding: Optional[np.ndarray] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        lang: Optional[str] = None
+    ) -> str:
+        """
+        Génère une réponse empathique via le LLM.
+        Si le LLM n'est pas disponible, utilise un template.
+        """
+        if self.llm_model is None:
+            # Mode dégradé : template de réponse
+            return self._generate_template_response(pathology, confidence)
 
-{severity_msg}
+        cached = self._cached_response(pathology, confidence, query_embedding, lang)
+        if cached is not None:
+            return cached
+
+        prompt = self._build_prompt(pathology, confidence)
+        # Les workers du pool ne voient pas le contexte de la requête
+        timings = metrics.current_timings()
+
+        # Génération via le pool de workers (peut lever InferenceRejectedError)
+        text = self.inference_pool.run_sync(
+            lambda model: "".join(self._timed_completion(model, prompt, timings)),
+            priority
+        ).strip()
+        self._store_response(pathology, confidence, query_embedding, text, lang)
+        return text
+
+    def stream_llm_response(
+        self,
+        pathology: dict,
+        confidence: float,
+        query_embedding: Optional[np.ndarray] = None,
+        lang: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Variante streaming de `generate_llm_response` : produit les tokens
+        au fil de la génération llama.cpp (bloquant, à consommer hors boucle).
+        """
+        if self.llm_model is None:
+            # Mode dégradé : le template est envoyé en un seul fragment
+            yield self._generate_template_response(pathology, confidence)
+            return
 
-**Recommandation :** {pathology['advice']}
+        # Réponse en cache : envoyée en un seul fragment
+        cached = self._cached_response(pathology, confidence, query_embedding, lang)
+        if cached is not None:
+            yield cached
+            return
 
-N'oubliez pas : seul un professionnel de santé peut établir un diagnostic définitif. Si vos symptômes persistent ou s'aggravent, consultez rapidement un médecin."""
+        prompt = self._build_prompt(pathology, confidence)
+        chunks: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        timings = metrics.current_timings()
+
+        def generate(model) -> None:
+            # Exécuté par un worker du pool : relaie les tokens vers `chunks`
+            try:
+                for text in self._timed_completion(model, prompt, timings):
+                    if stop.is_set():
+                        break
+                    if text:
+                        chunks.put(text)
+            finally:
+                chunks.put(None)
+
+        job = self.inference_pool.submit(generate)
+        self.inference_pool.wait_started(job)
+        parts = []
+        try:
+            while (text := chunks.get()) is not None:
+                parts.append(text)
+                yield text
+            # Propage une éventuelle erreur de génération
+            job.future.result()
+            self._store_response(pathology, confidence, query_embedding, "".join(parts).strip(), lang)
+        finally:
+            # Client déconnecté : libère le worker au prochain token
+            stop.set()
 
+    def _generate_template_response(self, pathology: dict, confidence: float) -> str:
+        """Génère une réponse template si le LLM n'est pas disponible."""
+        start = time.perf_counter()
+        response = self._pathology_responses(pathology).template(confidence)
+        metrics.observe("template", time.perf_counter() - start)
         return response
 
-    def diagnose(self, symptoms: str) -> DiagnosisResponse:
-        """
-        Effectue le pré-diagnostic complet.
+    def _pathology_responses(self, pathology: dict) -> PathologyResponses:
+        """Fragments pré-calculés de la pathologie (reconstruits si elle provient d'un ancien instantané)."""
+        return self.knowledge_base.pathology_responses(pathology)
 
-        Args:
-            symptoms: Description des symptômes par l'utilisateur
+    def find_best_match(
+        self,
+        symptoms: str,
+        user_embedding: Optional[np.ndarray] = None,
+        lang: Optional[str] = None
+    ) -> tuple[Optional[dict], float, Optional[str]]:
+        """
+        Étape de retrieval : meilleure pathologie au-dessus du seuil.
 
         Returns:
-            DiagnosisResponse avec le résultat du diagnostic
+            (pathologie, score, None) si match, sinon (None, score, message patient)
         """
         # Calcul de similarité
-        matches = self.compute_similarity(symptoms)
+        top_k = settings.RETRIEVAL_TOP_K
+        if self.reranker is not None:
+            top_k = max(top_k, settings.RERANK_TOP_K)
+        matches = self.compute_similarity(symptoms, user_embedding, top_k=top_k, lang=lang)
 
         if not matches:
-            return DiagnosisResponse(
-                success=True,
-                matched=False,
-                ai_response="Je n'ai pas pu analyser vos symptômes. Veuillez reformuler votre description ou consulter un médecin.",
-                disclaimer=self.disclaimer
-            )
+            return None, 0.0, NO_ANALYSIS_MESSAGE
+        if self.reranker is not None:
+            matches = self._rerank(symptoms, matches, lang)
 
         # Prend le meilleur match
         best_match, best_score = matches[0]
+        return self._apply_threshold(best_match, best_score)
 
-        # Vérifie le seuil de similarité
-        if best_score < settings.SIMILARITY_THRESHOLD:
-            return DiagnosisResponse(
-                success=True,
-                matched=False,
-                ai_response=f"Vos symptômes ne correspondent pas de manière suffisamment précise à une pathologie connue dans ma base de données (score: {best_score*100:.0f}%). Je vous recommande de consulter un médecin pour une évaluation personnalisée.",
-                disclaimer=self.disclaimer
+    def _rerank(self, symptoms: str, matches: list[tuple[dict, float]], lang: Optional[str]) -> list[tuple[dict, float]]:
+        """
+        Réordonne par score cross-encoder les candidats au-dessus du seuil (les
+        autres ne peuvent pas être retenus). Ordre du bi-encodeur conservé si
+        le budget est dépassé.
+        """
+        # Désactivé entre-temps si son chargement a échoué
+        reranker = self.reranker
+        admissible = [m for m in matches if m[1] >= settings.SIMILARITY_THRESHOLD][:settings.RERANK_TOP_K]
+        if reranker is None or len(admissible) < 2:
+            return matches
+        lang = lang or settings.SOURCE_LANGUAGE
+        texts = [
+            f"{localized(pathology, 'name', lang)}. {localized(pathology, 'symptoms_description', lang)}"
+            for pathology, _ in admissible
+        ]
+        with metrics.stage("rerank"):
+            # Clé liée au texte : une requête servie par l'ancien instantané pendant
+            # un rechargement ne peut pas fournir de score aux nouveaux textes
+            scores = reranker.rerank(symptoms, [
+                ((lang, pathology["id"], hash(text)), text)
+                for (pathology, _), text in zip(admissible, texts)
+            ])
+        if scores is None:
+            return matches
+        return [admissible[i] for i in np.argsort(-scores, kind="stable")]
+
+    @staticmethod
+    def _apply_threshold(
+        pathology: dict,
+        score: float
+    ) -> tuple[Optional[dict], float, Optional[str]]:
+        """Vérifie le seuil de similarité du meilleur match."""
+        if score < settings.SIMILARITY_THRESHOLD:
+            return None, score, f"Vos symptômes ne correspondent pas de manière suffisamment précise à une pathologie connue dans ma base de données (score: {score*100:.0f}%). Je vous recommande de consulter un médecin pour une évaluation personnalisée."
+
+        return pathology, score, None
+
+    def diagnose(
+        self,
+        symptoms: str,
+        user_embedding: Optional[np.ndarray] = None,
+        lang: Optional[str] = None
+    ) -> dict:
+        """
+        Effectue le pré-diagnostic complet.
+
+        Args:
+            symptoms: Description des symptômes par l'utilisateur
+            user_embedding: Embedding des symptômes s'il est déjà calculé
+                (avec l'encodeur de `lang`)
+            lang: Langue déjà chargée (`load_language`) ; détectée et chargée
+                ici si ni elle ni l'embedding ne sont fournis
+
+        Returns:
+            Corps de la réponse au schéma `DiagnosisResponse`, construit à
+            partir des fragments pré-calculés de la pathologie
+        """
+        disclaimer = self.disclaimer
+        if lang is None:
+            lang = settings.SOURCE_LANGUAGE if user_embedding is not None else self.load_language(
+                self.resolve_language(symptoms)
             )
+        if user_embedding is None:
+            user_embedding = self._embed_query(symptoms, lang)
+        best_match, best_score, fallback_message = self.find_best_match(symptoms, user_embedding, lang)
+
+        if best_match is None:
+            return diagnosis_payload(disclaimer, fallback_message, settings.AUTHORS, language=lang)
 
         # Génère la réponse IA
-        ai_response = self.generate_llm_response(best_match, best_score)
-
-        # Construit la réponse
-        pathology_match = PathologyMatch(
-            id=best_match["id"],
-            name=best_match["name"],
-            confidence_score=round(float(best_score), 3),
-            severity_level=best_match["severity_level"],
-            urgency=best_match["urgency"],
-            advice=best_match["advice"],
-            specialist=best_match["specialist"]
+        ai_response = self.generate_llm_response(best_match, best_score, user_embedding, lang=lang)
+
+        return diagnosis_payload(
+            disclaimer,
+            ai_response,
+            settings.AUTHORS,
+            pathology=self._pathology_responses(best_match).match(best_score),
+            language=lang
         )
 
-        return DiagnosisResponse(
-            success=True,
-            matched=True,
-            pathology=pathology_match,
-            ai_response=ai_response,
-            disclaimer=self.disclaimer
-        )
+    def diagnose_records(
+        self,
+        records: list[dict],
+        llm_mode: str = "none",
+        llm_memo: Optional[dict] = None
+    ) -> list[dict]:
+        """
+        Pré-diagnostic d'un lot d'entrées {"id", "symptoms", "lang"}.
+
+        Les textes valides d'une même langue sont encodés en un seul batch
+        puis comparés à la matrice de cette langue en une seule
+        multiplication matricielle. Si le re-classement est activé, les
+        candidats de chaque entrée passent par le cross-encoder comme pour
+        /diagnose (même pathologie retenue pour un même texte) : une passe par
+        entrée, chacune bornée par le budget et servie par le cache de scores.
+
+        Args:
+            records: Entrées normalisées (voir `parse_batch_line`)
+            llm_mode: "none" (template) ou "unique" (LLM par couple
+                pathologie / tranche de confiance)
+            llm_memo: Réponses déjà générées, partagées entre les lots d'un
+                même job (taille bornée par le catalogue)
+
+        Returns:
+            Un résultat par entrée, dans l'ordre
+        """
+        knowledge_base = self.knowledge_base
+        if self.sbert_model is None or knowledge_base.index is None:
+            raise RuntimeError("Modèle SBERT non initialisé")
+        if llm_memo is None:
+            llm_memo = {}
+
+        results: list[Optional[dict]] = [None] * len(records)
+        by_language: dict[str, list[int]] = {}
+        for i, record in enumerate(records):
+            error = record.get("error")
+            symptoms = record.get("symptoms")
+            if error is None and not (isinstance(symptoms, str) and 10 <= len(symptoms.strip()) <= 2000):
+                error = "Le champ des symptômes doit contenir entre 10 et 2000 caractères"
+            if error is None:
+                try:
+                    lang = self.resolve_language(symptoms, record.get("lang"))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                results[i] = {"id": record.get("id"), "line": record.get("line"), "success": False, "error": error}
+            else:
+                by_language.setdefault(lang, []).append(i)
+
+        # Lu une fois : désactivé entre-temps si son chargement a échoué
+        reranker = self.reranker
+        depth = 1 if reranker is None else settings.RERANK_TOP_K
+        for lang, valid in by_language.items():
+            lang = self.load_language(lang)
+            language_base = self.language_base(lang, knowledge_base)
+            ids, scores = self._search_records(
+                language_base, lang, [records[i]["symptoms"] for i in valid], depth
+            )
+
+            for row, i in enumerate(valid):
+                matches = [
+                    (language_base.pathologies[idx], float(score))
+                    for idx, score in zip(ids[row], scores[row]) if idx >= 0
+                ]
+                if reranker is not None:
+                    matches = self._rerank(records[i]["symptoms"], matches, lang)
+                if not matches:
+                    best_match, best_score, fallback_message = None, 0.0, NO_ANALYSIS_MESSAGE
+                else:
+                    best_match, best_score, fallback_message = self._apply_threshold(*matches[0])
+
+                if best_match is None:
+                    response = diagnosis_payload(language_base.disclaimer, fallback_message, language=lang)
+                else:
+                    response = diagnosis_payload(
+                        language_base.disclaimer,
+                        self._batch_ai_response(best_match, best_score, llm_mode, llm_memo),
+                        pathology=self._pathology_responses(best_match).match(best_score),
+                        language=lang
+                    )
+                results[i] = {"id": records[i].get("id"), "line": records[i].get("line"), **response}
+
+        return results
+
+    def _search_records(
+        self,
+        knowledge_base: KnowledgeBase,
+        lang: str,
+        texts: list[str],
+        top_k: int = 1
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Meilleures pathologies de chaque texte : un encodage et une recherche
+        pour tout le lot.
+
+        Returns:
+            (ids, scores) de forme (len(texts), top_k) au plus, triés par
+            score décroissant, id -1 si aucun candidat
+        """
+        encoder = self._encoder(lang)
+        depth = top_k if knowledge_base.lexical_index is None else max(top_k, settings.HYBRID_CANDIDATES)
+        if settings.RETRIEVAL_MODE == "multi":
+            # Fragments de toutes les entrées : un seul encodage, un seul produit matriciel
+            fragments = [text_fragments(text) for text in texts]
+            offsets = np.cumsum([0] + [len(group) for group in fragments[:-1]])
+            with metrics.stage("encode"):
+                embeddings = self._encode_corpus([f for group in fragments for f in group], encoder)
+            query_rows = offsets
+            with metrics.stage("search"):
+                scores, ids = knowledge_base.index.search(embeddings, depth, offsets=offsets)
+        else:
+            with metrics.stage("encode"):
+                embeddings = self._encode_corpus(texts, encoder)
+            query_rows = np.arange(len(texts))
+            with metrics.stage("search"):
+                scores, ids = knowledge_base.index.search(embeddings, depth)
+
+        if knowledge_base.lexical_index is not None:
+            # Fusion BM25 par entrée, sur les candidats denses déjà calculés en lot
+            with metrics.stage("search_fusion"):
+                for row, text in enumerate(texts):
+                    fused_ids, fused_scores = self._merge_lexical(
+                        knowledge_base, embeddings[query_rows[row]], scores[row], ids[row],
+                        knowledge_base.lexical_index.scores(text), top_k
+                    )
+                    ids[row, :top_k], scores[row, :top_k] = -1, 0.0
+                    ids[row, :len(fused_ids)] = fused_ids
+                    scores[row, :len(fused_scores)] = fused_scores
+
+        return ids[:, :top_k], scores[:, :top_k]
+
+    @staticmethod
+    def _session_scorers(knowledge_base: KnowledgeBase) -> tuple[Optional[ScoreFn], Optional[LexicalFn]]:
+        """
+        Scores incrémentaux d'une session contre un instantané. Le vecteur de
+        scores denses n'est tenu que pour l'index exact float32 (qui parcourt
+        déjà toute la matrice) ; sinon la requête agrégée passe par l'index.
+        """
+        score_fn = None
+        if knowledge_base.index.kind == "exact":
+            embeddings = knowledge_base.embeddings
+            score_fn = lambda vector: embeddings @ vector  # noqa: E731
+        lexical_fn = knowledge_base.lexical_index.scores if knowledge_base.lexical_index is not None else None
+        return score_fn, lexical_fn
+
+    def _session_search(
+        self,
+        knowledge_base: KnowledgeBase,
+        session: Session,
+        k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Meilleures pathologies de la conversation ; retourne (ids, confiances)."""
+        query = session.query_vector()
+        depth = k if knowledge_base.lexical_index is None else max(k, settings.HYBRID_CANDIDATES)
+        dense = session.dense_scores()
+        if dense is not None:
+            scores, ids = top_k(dense, depth)
+        else:
+            scores, ids = knowledge_base.index.search(query, depth)
+        if session.lexical is None:
+            return ids[0][:k], scores[0][:k]
+        return self._merge_lexical(knowledge_base, query, scores[0], ids[0], session.lexical, k)
+
+    def diagnose_turn(self, session: Session, symptoms: str, user_embedding: np.ndarray) -> dict:
+        """
+        Ajoute un tour à la session puis pré-diagnostique la conversation entière.
+
+        Args:
+            symptoms: Nouveau message seulement
+            user_embedding: Son embedding (encodeur de la langue de la session)
+
+        Returns:
+            Corps `SessionDiagnosisResponse`
+        """
+        with session.lock:
+            knowledge_base = self.language_base(session.lang)
+            if knowledge_base.index is None:
+                raise RuntimeError("Modèle SBERT non initialisé")
+            score_fn, lexical_fn = self._session_scorers(knowledge_base)
+            # Catalogue rechargé depuis le tour précédent : scores recalculés sans ré-encodage
+            if session.version != knowledge_base.version:
+                session.rebase(knowledge_base.version, score_fn, lexical_fn)
+            session.add_turn(symptoms, self._whole_text_vector(user_embedding), score_fn, lexical_fn)
+            with metrics.stage("search"):
+                ids, scores = self._session_search(knowledge_base, session, 1)
+            query = session.query_vector()
+            turns = len(session)
+        self.sessions.update(session)
+
+        if len(ids) == 0 or ids[0] < 0:
+            best_match, best_score, fallback_message = None, 0.0, NO_ANALYSIS_MESSAGE
+        else:
+            best_match, best_score, fallback_message = self._apply_threshold(
+                knowledge_base.pathologies[int(ids[0])], float(scores[0])
+            )
+
+        if best_match is None:
+            payload = diagnosis_payload(
+                knowledge_base.disclaimer, fallback_message, settings.AUTHORS, language=session.lang
+            )
+        else:
+            payload = diagnosis_payload(
+                knowledge_base.disclaimer,
+                self.generate_llm_response(best_match, best_score, query, lang=session.lang),
+                settings.AUTHORS,
+                pathology=self._pathology_responses(best_match).match(best_score),
+                language=session.lang
+            )
+        return {**payload, "session_id": session.id, "turns": turns}
+
+    def _batch_ai_response(self, pathology: dict, score: float, llm_mode: str, llm_memo: dict) -> str:
+        """Réponse IA d'une entrée batch, générée au plus une fois par couple unique."""
+        if llm_mode != "unique" or self.llm_model is None:
+            return self._generate_template_response(pathology, score)
+
+        key = (pathology["id"], int(score * 10))
+        if key not in llm_memo:
+            try:
+                llm_memo[key] = self.generate_llm_response(pathology, score, priority=PRIORITY_BATCH)
+            except InferenceRejectedError:
+                # Le trafic interactif est prioritaire : repli template, non mémorisé
+                return self._generate_template_response(pathology, score)
+        return llm_memo[key]
+
+    def diagnose_stream(
+        self,
+        symptoms: str,
+        user_embedding: Optional[np.ndarray] = None,
+        lang: str = settings.SOURCE_LANGUAGE
+    ) -> Iterator[bytes]:
+        """
+        Pré-diagnostic en streaming NDJSON (une ligne JSON par événement).
+
+        Événements émis, dans l'ordre :
+        - {"type": "match", ...}  : résultat du retrieval, envoyé immédiatement
+        - {"type": "token", "text": ...} : fragments de la réponse IA
+        - {"type": "done", "ai_response": ...} : réponse complète
+        - {"type": "error", "detail": ...} : en cas d'échec en cours de flux
+        """
+        def event(payload: dict) -> bytes:
+            return dumps(payload) + b"\n"
+
+        try:
+            if user_embedding is None:
+                user_embedding = self._embed_query(symptoms, lang)
+            best_match, best_score, fallback_message = self.find_best_match(symptoms, user_embedding, lang)
+            pathology = self._pathology_responses(best_match).match(best_score) if best_match else None
+
+            yield event({
+                "type": "match",
+                "success": True,
+                "matched": pathology is not None,
+                "pathology": pathology,
+                "disclaimer": self.disclaimer,
+                "authors": settings.AUTHORS,
+                "language": lang
+            })
+
+            if best_match is None:
+                chunks = [fallback_message]
+            else:
+                chunks = self.stream_llm_response(best_match, best_score, user_embedding, lang)
+
+            parts = []
+            for text in chunks:
+                parts.append(text)
+                yield event({"type": "token", "text": text})
+
+            yield event({"type": "done", "ai_response": "".join(parts).strip()})
+        except InferenceRejectedError as e:
+            yield event({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            yield event({"type": "error", "detail": f"Erreur lors de l'analyse: {str(e)}"})
 
 
 # =============================================================================
@@ -322,6 +1560,54 @@ N'oubliez pas : seul un professionnel de santé peut établir un diagnostic déf
 doctis_service = DoctisAIService()
 
 
+def _response_cache_lookups() -> Optional[dict]:
+    if doctis_service.response_cache is None:
+        return None
+    stats = doctis_service.response_cache.stats()
+    return {"exact": stats["hits_exact"], "semantic": stats["hits_semantic"], "miss": stats["misses"]}
+
+
+def _rerank_results() -> Optional[dict]:
+    if doctis_service.reranker is None:
+        return None
+    stats = doctis_service.reranker.stats()
+    return {key: stats[key] for key in ("reranked", "timeouts", "skipped", "errors")}
+
+
+def _inference_queue_stat(key: str):
+    pool = doctis_service.inference_pool
+    return None if pool is None else pool.stats()[key]
+
+
+# Jauges lues à chaque scrape de /metrics
+metrics.gauge("process_resident_memory_bytes", "RSS du processus", process_rss_bytes)
+metrics.gauge("model_load_seconds", "Durée de chargement par composant", lambda: doctis_service.load_times, label="component")
+metrics.gauge("pathologies", "Taille du catalogue servi", lambda: len(doctis_service.pathologies))
+metrics.gauge("sessions", "Sessions multi-tours actives", lambda: len(doctis_service.sessions))
+metrics.gauge(
+    "response_cache_lookups_total", "Recherches dans le cache de réponses LLM",
+    _response_cache_lookups, label="result", kind="counter"
+)
+metrics.gauge(
+    "response_cache_hit_ratio", "Taux de succès du cache de réponses LLM",
+    lambda: doctis_service.response_cache.stats()["hit_rate"] if doctis_service.response_cache else None
+)
+metrics.gauge(
+    "rerank_total", "Re-classements cross-encoder (appliqués ou repli sur l'ordre du bi-encodeur)",
+    _rerank_results, label="result", kind="counter"
+)
+metrics.gauge("inference_queue_depth", "Jobs LLM en attente", lambda: _inference_queue_stat("queue_depth"))
+metrics.gauge("inference_in_flight", "Jobs LLM en cours", lambda: _inference_queue_stat("in_flight"))
+metrics.gauge(
+    "inference_rejected_total", "Jobs LLM refusés (file pleine ou délai dépassé)",
+    lambda: None if doctis_service.inference_pool is None else {
+        "queue_full": _inference_queue_stat("rejected_queue_full"),
+        "timeout": _inference_queue_stat("rejected_timeout"),
+    },
+    label="reason", kind="counter"
+)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gestion du cycle de vie de l'application."""
@@ -331,15 +1617,29 @@ async def lifespan(app: FastAPI):
     print(f"   Auteurs: {', '.join(settings.AUTHORS)}")
     print("="*60 + "\n")
 
-    doctis_service.load_pathologies()
-    doctis_service.load_sbert_model()
-    doctis_service.load_llm_model()
-
-    print("\n✅ Doctis AI prêt à recevoir des requêtes!\n")
+    if settings.BACKGROUND_LOADING:
+        # /health répond immédiatement ; les modèles se chargent en arrière-plan
+        loading_task = asyncio.create_task(doctis_service.load_models())
+        print("\n⏳ Chargement des modèles en arrière-plan...\n")
+    else:
+        loading_task = None
+        await doctis_service.load_models()
+        print("\n✅ Doctis AI prêt à recevoir des requêtes!\n")
+    doctis_service.start_catalogue_watcher()
 
     yield
 
     # Shutdown
+    if doctis_service.catalogue_watcher is not None:
+        doctis_service.catalogue_watcher.stop()
+    if loading_task is not None and not loading_task.done():
+        loading_task.cancel()
+    if doctis_service.inference_pool is not None:
+        doctis_service.inference_pool.shutdown()
+    if doctis_service.query_batcher is not None:
+        await doctis_service.query_batcher.close()
+    for batcher in doctis_service.query_batchers.values():
+        await batcher.close()
     print("\n👋 Arrêt de Doctis AI\n")
 
 
@@ -360,13 +1660,74 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "Retry-After"],
 )
 
 
+if settings.METRICS_ENABLED:
+    @app.middleware("http")
+    async def timing_middleware(request: Request, call_next):
+        """Chronométrage par requête (histogrammes + en-tête Server-Timing optionnel)."""
+        token = metrics.start_request()
+        timings = metrics.current_timings()
+        try:
+            response = await call_next(request)
+        finally:
+            metrics.finish_request(token)
+
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.observe("total", time.perf_counter() - timings.started_at)
+        metrics.inc(
+            "http_requests_total", "Requêtes HTTP par route et statut",
+            {"route": path, "status": response.status_code}
+        )
+        # Réponses streamées : seules les étapes avant le premier octet figurent dans l'en-tête
+        if settings.TIMING_HEADER or request.headers.get("x-timing") == "1":
+            response.headers["Server-Timing"] = timings.header()
+        return response
+
+
 # =============================================================================
 # Endpoints
 # =============================================================================
 
+def ensure_retrieval_ready() -> None:
+    """
+    Refuse rapidement (503 + Retry-After) tant que SBERT n'est pas chargé.
+    Le LLM n'est pas requis : sans lui, la réponse template est servie.
+    """
+    if not doctis_service.retrieval_ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service en cours de démarrage (SBERT: {doctis_service.component_status['sbert']})",
+            headers={"Retry-After": str(settings.STARTING_RETRY_AFTER_S)}
+        )
+
+
+async def query_language(input_data: SymptomInput) -> str:
+    """
+    Langue de la requête (champ `lang` ou détection). Au premier usage d'une
+    langue, son encodeur et sa matrice sont chargés dans le threadpool.
+    """
+    try:
+        lang = doctis_service.resolve_language(input_data.symptoms, input_data.lang)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if doctis_service.language_loaded(lang):
+        return lang
+    return await run_in_threadpool(doctis_service.load_language, lang)
+
+
+def overloaded_error(error: InferenceRejectedError) -> HTTPException:
+    """Traduit un refus du pool d'inférence en HTTP 503 + Retry-After."""
+    return HTTPException(
+        status_code=503,
+        detail=f"Service surchargé: {str(error)}",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @app.get("/", tags=["Info"])
 async def root():
     """Page d'accueil de l'API."""
@@ -377,17 +1738,35 @@ async def root():
         "documentation": "/docs",
         "endpoints": {
             "diagnose": "POST /diagnose",
+            "diagnose_stream": "POST /diagnose/stream",
+            "diagnose_batch": "POST /diagnose/batch",
+            "diagnose_session": "POST /diagnose/session",
             "health": "GET /health",
-            "pathologies": "GET /pathologies"
+            "ready": "GET /ready",
+            "metrics": "GET /metrics",
+            "pathologies": "GET /pathologies",
+            "reload": "POST /admin/reload"
         }
     }
 
 
 @app.get("/health", response_model=HealthResponse, tags=["Système"])
 async def health_check():
-    """Vérifie l'état de santé du service."""
+    """
+    Liveness : répond toujours 200 dès que le processus tourne.
+    L'état de chaque composant indique la progression du chargement.
+    """
+    components = doctis_service.component_status
+    if doctis_service.retrieval_ready:
+        status = "healthy"
+    elif "failed" in (components["pathologies"], components["sbert"]):
+        status = "unhealthy"
+    else:
+        status = "starting"
+
     return HealthResponse(
-        status="healthy",
+        status=status,
+        ready=doctis_service.retrieval_ready,
         app_name=settings.APP_NAME,
         version=settings.APP_VERSION,
         models_loaded={
@@ -395,27 +1774,88 @@ async def health_check():
             "llm": doctis_service.llm_model is not None,
             "pathologies_count": len(doctis_service.pathologies)
         },
+        components={
+            name: {"status": state, "error": doctis_service.component_errors.get(name)}
+            for name, state in components.items()
+        },
+        load_times=doctis_service.load_times,
+        inference_queue=(
+            doctis_service.inference_pool.stats()
+            if doctis_service.inference_pool is not None else None
+        ),
+        response_cache=(
+            doctis_service.response_cache.stats()
+            if doctis_service.response_cache is not None else None
+        ),
+        knowledge_base={
+            **doctis_service.knowledge_base.info(),
+            "languages_loaded": sorted(doctis_service.language_bases),
+        },
         authors=settings.AUTHORS
     )
 
 
+@app.get("/ready", tags=["Système"])
+async def readiness_check():
+    """Readiness : 200 quand /diagnose peut être servi, 503 sinon."""
+    ensure_retrieval_ready()
+    return {
+        "ready": True,
+        "llm": doctis_service.component_status["llm"]
+    }
+
+
+@app.get("/metrics", tags=["Système"])
+async def metrics_endpoint():
+    """Métriques au format texte Prometheus (latences par étape, caches, mémoire)."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Métriques désactivées")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/pathologies", tags=["Données"])
-async def get_pathologies():
-    """Retourne la liste des pathologies disponibles."""
+async def get_pathologies(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(settings.PATHOLOGIES_PAGE_SIZE, ge=1, le=settings.PATHOLOGIES_MAX_PAGE_SIZE)
+):
+    """Retourne une page de la liste des pathologies disponibles (`count` : total)."""
+    # Un seul instantané : total et page cohérents pendant un rechargement
+    pathologies = doctis_service.pathologies
     return {
-        "count": len(doctis_service.pathologies),
-        "pathologies": [
-            {
-                "id": p["id"],
-                "name": p["name"],
-                "severity_level": p["severity_level"]
-            }
-            for p in doctis_service.pathologies
-        ],
+        "count": len(pathologies),
+        "offset": offset,
+        "limit": limit,
+        "pathologies": page(pathologies, offset, limit),
         "authors": settings.AUTHORS
     }
 
 
+@app.post("/admin/reload", tags=["Administration"])
+async def reload_pathologies(x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Recharge `pathologies.json` sans redémarrage.
+
+    Seules les entrées ajoutées ou modifiées sont ré-encodées ; les requêtes
+    en cours continuent sur l'ancien catalogue jusqu'au basculement.
+    Protégé par l'en-tête `X-Admin-Token` si `DOCTIS_ADMIN_TOKEN` est défini.
+    """
+    if settings.ADMIN_TOKEN and x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Jeton d'administration invalide")
+    ensure_retrieval_ready()
+    try:
+        return await run_in_threadpool(doctis_service.reload_pathologies)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Catalogue invalide, rechargement annulé: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors du rechargement: {str(e)}"
+        )
+
+
 @app.post("/diagnose", response_model=DiagnosisResponse, tags=["Diagnostic"])
 async def diagnose(input_data: SymptomInput):
     """
@@ -428,9 +1868,21 @@ async def diagnose(input_data: SymptomInput):
     **⚠️ Disclaimer:** Ce service est fourni à titre informatif uniquement
     et ne remplace pas une consultation médicale professionnelle.
     """
+    # Réception + validation pydantic, jusqu'à l'entrée dans l'endpoint
+    metrics.mark_since_request_start("validation")
+    ensure_retrieval_ready()
+    lang = await query_language(input_data)
     try:
-        result = doctis_service.diagnose(input_data.symptoms)
-        return result
+        # Encodage groupé avec les requêtes concurrentes, hors boucle d'événements
+        user_embedding = await doctis_service.encode_query(input_data.symptoms, lang)
+        # L'attente d'un worker LLM se fait dans le threadpool
+        result = await run_in_threadpool(
+            doctis_service.diagnose, input_data.symptoms, user_embedding, lang
+        )
+        # Dict déjà conforme au schéma : sérialisé sans repasser par Pydantic
+        return FastJSONResponse(result)
+    except InferenceRejectedError as e:
+        raise overloaded_error(e)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -438,6 +1890,142 @@ async def diagnose(input_data: SymptomInput):
         )
 
 
+@app.post("/diagnose/stream", tags=["Diagnostic"])
+async def diagnose_stream(input_data: SymptomInput):
+    """
+    Variante streaming de /diagnose (NDJSON, `application/x-ndjson`).
+
+    La pathologie retenue est envoyée dès la fin du retrieval, puis la
+    réponse IA est streamée au fil de la génération du LLM. La génération
+    tourne dans le threadpool : la boucle d'événements n'est jamais bloquée.
+    """
+    # Réception + validation pydantic, jusqu'à l'entrée dans l'endpoint
+    metrics.mark_since_request_start("validation")
+    ensure_retrieval_ready()
+
+    # Backpressure : refus immédiat plutôt qu'un flux ouvert qui échouera
+    pool = doctis_service.inference_pool
+    if pool is not None and pool.is_saturated():
+        raise overloaded_error(InferenceRejectedError("File d'inférence pleine", pool.retry_after()))
+
+    lang = await query_language(input_data)
+    try:
+        user_embedding = await doctis_service.encode_query(input_data.symptoms, lang)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'analyse: {str(e)}"
+        )
+
+    # Un itérateur synchrone est consommé par Starlette via iterate_in_threadpool
+    return StreamingResponse(
+        doctis_service.diagnose_stream(input_data.symptoms, user_embedding, lang),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/diagnose/session", response_model=SessionDiagnosisResponse, tags=["Diagnostic"])
+async def diagnose_session(input_data: SessionTurnInput):
+    """
+    Pré-diagnostic d'une conversation en plusieurs messages.
+
+    Sans `session_id`, une session est créée (langue fixée au premier tour).
+    Chaque tour n'envoie que le nouveau message : seul celui-ci est encodé,
+    la requête agrégée et les scores de la session sont mis à jour. Une
+    session inactive depuis `SESSION_TTL_S` (ou évincée) répond 404.
+    """
+    metrics.mark_since_request_start("validation")
+    ensure_retrieval_ready()
+    if input_data.session_id is None:
+        session = doctis_service.sessions.create(await query_language(input_data))
+    else:
+        session = doctis_service.sessions.get(input_data.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session inconnue ou expirée")
+        if input_data.lang and input_data.lang != session.lang:
+            raise HTTPException(
+                status_code=422, detail=f"La langue d'une session ne change pas (session: {session.lang})"
+            )
+    try:
+        user_embedding = await doctis_service.encode_query(input_data.symptoms, session.lang)
+        result = await run_in_threadpool(
+            doctis_service.diagnose_turn, session, input_data.symptoms, user_embedding
+        )
+        return FastJSONResponse(result)
+    except InferenceRejectedError as e:
+        raise overloaded_error(e)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'analyse: {str(e)}"
+        )
+
+
+@app.delete("/diagnose/session/{session_id}", status_code=204, tags=["Diagnostic"])
+async def end_session(session_id: str):
+    """Termine une session (ses embeddings et scores sont libérés)."""
+    if not doctis_service.sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session inconnue ou expirée")
+    return Response(status_code=204)
+
+
+@app.post("/diagnose/batch", tags=["Diagnostic"])
+async def diagnose_batch(request: Request, llm: str = "none"):
+    """
+    Pré-diagnostic en masse (re-triage hors ligne).
+
+    Corps : NDJSON, une entrée `{"id": ..., "symptoms": "..."}` par ligne.
+    Réponse : NDJSON, un résultat par entrée, dans l'ordre, avec l'id fourni
+    et le numéro de ligne (`line`, à partir de 1). Chaque lot de
+    `BATCH_CHUNK_SIZE` entrées est traité dès sa réception (encodage SBERT
+    batché + un produit matriciel par lot) : la mémoire est bornée par un lot.
+    Au-delà de `BATCH_MAX_ITEMS` entrées, le flux se termine par une ligne d'erreur.
+
+    Paramètre `llm` : "none" (réponses template) ou "unique" (un appel LLM
+    par couple pathologie / tranche de confiance).
+    """
+    ensure_retrieval_ready()
+    if llm not in BATCH_LLM_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Paramètre llm invalide (valeurs possibles: {', '.join(BATCH_LLM_MODES)})"
+        )
+
+    llm_memo: dict = {}
+
+    async def process(records: list[dict]) -> bytes:
+        # Un lot à la fois, dans le threadpool
+        results = await run_in_threadpool(doctis_service.diagnose_records, records, llm, llm_memo)
+        return b"".join(dumps(result) + b"\n" for result in results)
+
+    async def results() -> AsyncIterator[bytes]:
+        chunk: list[dict] = []
+        items = 0
+        line_number = 0
+        async for line in request_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            items += 1
+            if items > settings.BATCH_MAX_ITEMS:
+                # Statut déjà envoyé : la limite est signalée par la dernière ligne
+                chunk.append({
+                    "id": None,
+                    "line": line_number,
+                    "error": f"Trop d'entrées (max {settings.BATCH_MAX_ITEMS}), utilisez batch_cli.py"
+                })
+                break
+            chunk.append(parse_batch_line(line, line_number))
+            if len(chunk) >= settings.BATCH_CHUNK_SIZE:
+                yield await process(chunk)
+                chunk = []
+        if chunk:
+            yield await process(chunk)
+
+    return BodyStreamingResponse(results(), media_type="application/x-ndjson")
+
+
 # =============================================================================
 # Point d'entrée
 # =============================================================================
@@ -450,3 +2038,4 @@ if __name__ == "__main__":
         port=8000,
         reload=True
     )
+
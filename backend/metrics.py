@@ -0,0 +1,251 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Métriques Prometheus (format texte) et chronométrage par étape
+# =============================================================================
+
+"""
+Métriques
+---------
+Registre minimal au format d'exposition texte Prometheus (pas de dépendance
+externe), partagé par le backend FastAPI et le serveur Flask :
+
+- `<ns>_stage_seconds{stage=...}`     histogramme de latence par étape du pipeline
+- `<ns>_llm_tokens_per_second`        histogramme du débit de génération
+- compteurs (`inc`) et jauges calculées à la lecture (`gauge`)
+
+Chronométrage d'une étape :
+    with metrics.stage("encode"):
+        ...
+
+Chaque requête HTTP peut porter un `RequestTimings` (contextvar) qui
+accumule ses étapes ; il est rendu dans l'en-tête standard `Server-Timing`.
+Les threads qui ne voient pas le contexte (workers LLM) reçoivent l'objet
+explicitement.
+
+Désactivé (`enabled=False`), `stage` retourne un context manager vide
+partagé et `observe` sort immédiatement : le surcoût est un appel de méthode.
+"""
+
+import contextvars
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Optional, Union
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+
+_NULL_CONTEXT = nullcontext()
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+def process_rss_bytes() -> int:
+    """RSS courant du processus (Linux : /proc), sinon pic de RSS."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss : Ko sous Linux, octets sous macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class Histogram:
+    """Histogramme à seaux fixes, une série par valeur de label."""
+
+    def __init__(self, name: str, help_text: str, buckets: tuple, label: Optional[str] = None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.label = label
+        self._series: dict = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: str = "") -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # [comptes par seau (+Inf en dernier), somme, total]
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: ([*v[0]], v[1], v[2]) for k, v in self._series.items()}
+        for label_value, (counts, total, count) in sorted(snapshot.items()):
+            base = {self.label: label_value} if self.label else {}
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels({**base, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(base)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(base)} {count}")
+        return lines
+
+
+class RequestTimings:
+    """Étapes chronométrées d'une requête (rendues dans `Server-Timing`)."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: list[tuple[str, float]] = []
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages.append((stage, seconds))
+
+    def header(self) -> str:
+        total = time.perf_counter() - self.started_at
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages]
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class Metrics:
+    """Registre de métriques d'un processus."""
+
+    def __init__(self, namespace: str, enabled: bool = True):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.stage_seconds = Histogram(
+            f"{namespace}_stage_seconds", "Latence par étape du pipeline", LATENCY_BUCKETS, label="stage"
+        )
+        self.tokens_per_second = Histogram(
+            f"{namespace}_llm_tokens_per_second", "Débit de génération LLM", TOKENS_PER_SECOND_BUCKETS
+        )
+        self._counters: dict = {}
+        self._counter_help: dict = {}
+        self._gauges: list = []
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Enregistrement
+    # -------------------------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float, timings: Optional[RequestTimings] = None) -> None:
+        """Enregistre la durée d'une étape (et l'ajoute aux timings de la requête)."""
+        if not self.enabled:
+            return
+        self.stage_seconds.observe(seconds, stage)
+        timings = timings or _current_timings.get()
+        if timings is not None:
+            timings.add(stage, seconds)
+
+    def stage(self, name: str, timings: Optional[RequestTimings] = None):
+        """Context manager chronométrant une étape (vide si désactivé)."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name, timings)
+
+    @contextmanager
+    def _timed(self, name: str, timings: Optional[RequestTimings]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, timings)
+
+    def observe_tokens_per_second(self, tokens: int, seconds: float) -> None:
+        if self.enabled and tokens and seconds > 0:
+            self.tokens_per_second.observe(tokens / seconds)
+
+    def inc(self, name: str, help_text: str, labels: Optional[dict] = None, value: float = 1) -> None:
+        """Incrémente un compteur `<ns>_<name>`."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._counter_help[name] = help_text
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        fn: Callable[[], Union[float, dict, None]],
+        label: Optional[str] = None,
+        kind: str = "gauge",
+    ) -> None:
+        """
+        Déclare une valeur calculée à chaque lecture de /metrics.
+
+        `fn` retourne un nombre, ou un dict {valeur de label: nombre} si
+        `label` est fourni (None = série absente).
+        """
+        self._gauges.append((name, help_text, fn, label, kind))
+
+    # -------------------------------------------------------------------------
+    # Contexte de requête
+    # -------------------------------------------------------------------------
+
+    def start_request(self) -> Optional[contextvars.Token]:
+        """Attache un `RequestTimings` neuf au contexte courant."""
+        if not self.enabled:
+            return None
+        return _current_timings.set(RequestTimings())
+
+    def finish_request(self, token: Optional[contextvars.Token]) -> None:
+        if token is not None:
+            _current_timings.reset(token)
+
+    @staticmethod
+    def current_timings() -> Optional[RequestTimings]:
+        return _current_timings.get()
+
+    def mark_since_request_start(self, stage: str) -> None:
+        """Enregistre le temps écoulé depuis le début de la requête (ex: validation)."""
+        timings = _current_timings.get()
+        if self.enabled and timings is not None:
+            self.observe(stage, time.perf_counter() - timings.started_at, timings)
+
+    # -------------------------------------------------------------------------
+    # Exposition
+    # -------------------------------------------------------------------------
+
+    def render(self) -> str:
+        """Toutes les métriques au format texte Prometheus 0.0.4."""
+        lines = self.stage_seconds.render() + self.tokens_per_second.render()
+
+        with self._lock:
+            counters = dict(self._counters)
+            counter_help = dict(self._counter_help)
+        for name in sorted(counter_help):
+            full_name = f"{self.namespace}_{name}"
+            lines += [f"# HELP {full_name} {counter_help[name]}", f"# TYPE {full_name} counter"]
+            for (counter_name, labels), value in sorted(counters.items()):
+                if counter_name == name:
+                    lines.append(f"{full_name}{_format_labels(dict(labels))} {value}")
+
+        for name, help_text, fn, label, kind in self._gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            full_name = f"{self.namespace}_{name}"
+            lines += [f"# HELP {full_name} {help_text}", f"# TYPE {full_name} {kind}"]
+            if label is None:
+                lines.append(f"{full_name} {float(value)}")
+            else:
+                for label_value, item in sorted(value.items()):
+                    if item is not None:
+                        lines.append(f"{full_name}{_format_labels({label: label_value})} {float(item)}")
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,352 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Serveur de modèles partagé par les workers HTTP (IPC locale)
+# =============================================================================
+
+"""
+Serveur de modèles
+------------------
+Avec N workers HTTP, chaque worker chargeait son propre encodeur SBERT
+(PyTorch : plusieurs centaines de Mo de RSS par copie). Ici un seul
+processus charge les encodeurs et les workers l'interrogent par socket
+locale (Unix, ou TCP sur localhost) :
+
+    workers HTTP (N, légers)  ──encode(textes)──▶  serveur de modèles (1)
+        │                                              │ un encodeur par
+        │ embeddings du catalogue : cache .npy         │ (modèle, backend),
+        ▼ memory-mappé, pages partagées                ▼ chargé à la demande
+
+- les requêtes de tous les workers sont regroupées en lots (même principe
+  que `MicroBatcher`, entre processus) : le débit CPU de l'encodeur profite
+  de la concurrence de tous les workers
+- `RemoteEncoder` a la même interface `encode` que les encodeurs locaux :
+  le reste du pipeline (cache d'embeddings, index, micro-batcher) est inchangé
+- authentification HMAC de `multiprocessing.connection` : clé lue dans
+  `DOCTIS_MODEL_SERVER_KEY`, sinon générée dans `<socket>.key` (mode 0600).
+  Le fichier est remplacé atomiquement avant l'ouverture de la socket et
+  supprimé à l'arrêt ; un worker qui a lu la clé d'une exécution
+  précédente la relit jusqu'à son délai de connexion
+
+Le LLM GGUF reste chargé par chaque worker : llama.cpp mappe le fichier
+(`use_mmap=True`), les poids sont déjà partagés via le cache de pages et
+seul le KV-cache est propre au processus.
+
+Usage :
+    python model_server.py --address /tmp/doctis-models.sock --preload all-MiniLM-L6-v2
+    DOCTIS_MODEL_SERVER=/tmp/doctis-models.sock uvicorn main:app --workers 4
+"""
+
+import argparse
+import os
+import queue
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from encoders import ENCODER_BACKENDS, load_encoder
+
+KEY_ENV = "DOCTIS_MODEL_SERVER_KEY"
+
+
+def parse_address(address: str) -> Union[str, tuple[str, int]]:
+    """`/chemin/socket` (Unix) ou `hôte:port` (TCP, ex: 127.0.0.1:7071)."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host, int(port)
+    return address
+
+
+def _key_path(address: str) -> Path:
+    return Path(f"{address}.key")
+
+
+def read_authkey(address: str) -> bytes:
+    """Clé partagée : variable d'environnement, sinon fichier écrit par le serveur."""
+    key = os.getenv(KEY_ENV)
+    if key:
+        return key.encode("utf-8")
+    path = _key_path(address)
+    if not path.exists():
+        raise ConnectionError(f"Serveur de modèles absent (ni {KEY_ENV} ni {path})")
+    return path.read_bytes()
+
+
+class _EncodingQueue:
+    """Regroupe les demandes concurrentes pour un même encodeur en lots."""
+
+    def __init__(self, encoder, normalize: bool, max_batch_size: int, max_wait_ms: float):
+        self.encoder = encoder
+        self.normalize = normalize
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._requests: queue.Queue = queue.Queue()
+        threading.Thread(target=self._run, name="encoding-queue", daemon=True).start()
+
+    def submit(self, texts: list[str]) -> Future:
+        future: Future = Future()
+        self._requests.put((texts, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            # Les gros envois (catalogue) partent seuls ; les requêtes unitaires s'agrègent
+            while size < self.max_batch_size:
+                try:
+                    item = self._requests.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = np.asarray(
+                    self.encoder.encode(texts, normalize_embeddings=self.normalize, convert_to_numpy=True),
+                    dtype=np.float32,
+                )
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for item_texts, future in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+class ModelServer:
+    """Processus propriétaire des encodeurs, servant les workers par socket locale."""
+
+    def __init__(
+        self,
+        address: str,
+        cache_dir: Optional[Path] = None,
+        threads: Optional[int] = None,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.address = address
+        self.cache_dir = cache_dir
+        self.threads = threads
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._encoders: dict = {}
+        self._queues: dict = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def encoder(self, model_name: str, backend: str):
+        """Encodeur (modèle, backend), chargé au premier usage."""
+        with self._lock:
+            key = (model_name, backend)
+            if key not in self._encoders:
+                if backend not in ENCODER_BACKENDS:
+                    raise ValueError(f"Backend d'encodage inconnu: {backend}")
+                print(f"⏳ Chargement de l'encodeur {model_name} ({backend})...")
+                self._encoders[key] = load_encoder(model_name, backend, cache_dir=self.cache_dir, threads=self.threads)
+                print(f"✅ Encodeur {model_name} ({backend}) prêt")
+            return self._encoders[key]
+
+    def _queue(self, model_name: str, backend: str, normalize: bool) -> _EncodingQueue:
+        encoder = self.encoder(model_name, backend)
+        with self._lock:
+            key = (model_name, backend, normalize)
+            if key not in self._queues:
+                self._queues[key] = _EncodingQueue(encoder, normalize, self.max_batch_size, self.max_wait_ms)
+            return self._queues[key]
+
+    def handle(self, message: tuple):
+        """Traite un message client ; retourne la réponse à renvoyer."""
+        command = message[0]
+        if command == "encode":
+            _, model_name, backend, normalize, texts = message
+            return self._queue(model_name, backend, normalize).submit(list(texts)).result()
+        if command == "info":
+            _, model_name, backend = message
+            encoder = self.encoder(model_name, backend)
+            probe = np.asarray(encoder.encode(["dimension"], convert_to_numpy=True))
+            return {"pid": os.getpid(), "model": model_name, "backend": backend, "dim": int(probe.shape[1])}
+        raise ValueError(f"Commande inconnue: {command}")
+
+    def _serve_connection(self, connection: Connection) -> None:
+        with connection:
+            while True:
+                try:
+                    message = connection.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    connection.send(("ok", self.handle(message)))
+                except Exception as e:
+                    connection.send(("error", f"{type(e).__name__}: {e}"))
+
+    def _authkey(self) -> tuple[bytes, Optional[Path]]:
+        """Clé partagée et fichier écrit pour les workers (None si clé d'environnement)."""
+        key = os.getenv(KEY_ENV)
+        if key:
+            return key.encode("utf-8"), None
+        # Clé aléatoire lisible uniquement par l'utilisateur du service, écrite
+        # à côté puis renommée : un worker ne lit jamais un fichier à moitié écrit
+        key = secrets.token_hex(32).encode("ascii")
+        path = _key_path(self.address)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        os.replace(tmp_path, path)
+        return key, path
+
+    def serve_forever(self) -> None:
+        address = parse_address(self.address)
+        if isinstance(address, str) and os.path.exists(address):
+            os.unlink(address)  # socket laissée par un arrêt brutal
+        # Nouvelle clé en place avant que la socket n'accepte de connexion
+        authkey, key_path = self._authkey()
+        try:
+            with Listener(address, authkey=authkey) as listener:
+                print(f"🧠 Serveur de modèles en écoute sur {self.address} (pid {os.getpid()})")
+                while not self._stopping.is_set():
+                    try:
+                        connection = listener.accept()
+                    except (OSError, EOFError, AuthenticationError) as e:
+                        if self._stopping.is_set():
+                            break
+                        # Échec d'authentification ou client interrompu
+                        print(f"⚠️  Connexion refusée: {e}")
+                        continue
+                    threading.Thread(target=self._serve_connection, args=(connection,), daemon=True).start()
+        finally:
+            # Une clé périmée ne doit pas survivre au serveur
+            if key_path is not None:
+                key_path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """Arrête `serve_forever` (depuis un autre thread)."""
+        self._stopping.set()
+        # Réveille `accept` : connexion brute, refusée à l'authentification
+        address = parse_address(self.address)
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        try:
+            with socket.socket(family) as sock:
+                sock.connect(address)
+        except OSError:
+            pass
+
+
+class RemoteEncoder:
+    """
+    Encodeur distant (même interface `encode` que les encodeurs locaux).
+
+    Une connexion par thread et par processus : les appels concurrents
+    d'un worker et de tous les workers sont regroupés côté serveur.
+    """
+
+    def __init__(self, address: str, model_name: str, backend: str = "torch", timeout: float = 120.0):
+        self.address = address
+        self.model_name = model_name
+        self.backend = backend
+        self.timeout = timeout
+        self._local = threading.local()
+        # Premier échange : charge le modèle côté serveur et valide la connexion
+        self.info = self._call(("info", model_name, backend))
+        self.dim = self.info["dim"]
+
+    def _connection(self) -> Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    connection = Client(parse_address(self.address), authkey=read_authkey(self.address))
+                    break
+                except (ConnectionError, FileNotFoundError, AuthenticationError) as e:
+                    # Serveur en cours de démarrage (gunicorn le lance avant les workers),
+                    # ou clé lue juste avant son remplacement : relue au prochain essai
+                    if time.monotonic() > deadline:
+                        raise ConnectionError(f"Serveur de modèles injoignable ({self.address}): {e}") from e
+                    time.sleep(0.2)
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _call(self, message: tuple):
+        for attempt in (1, 2):
+            connection = self._connection()
+            try:
+                connection.send(message)
+                status, payload = connection.recv()
+                break
+            except (EOFError, OSError):
+                # Serveur redémarré : une nouvelle connexion, une seule fois
+                self._local.connection = None
+                if attempt == 2:
+                    raise
+        if status != "ok":
+            raise RuntimeError(f"Serveur de modèles: {payload}")
+        return payload
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs,
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = self._call(("encode", self.model_name, self.backend, normalize_embeddings, texts))
+        return vectors[0] if single else vectors
+
+
+def spawn_model_server(address: str, cache_dir: Optional[Path] = None, threads: Optional[int] = None) -> subprocess.Popen:
+    """
+    Lance le serveur dans un processus séparé (hook gunicorn `on_starting`) ;
+    les workers attendent sa socket à leur première connexion.
+    """
+    command = [sys.executable, str(Path(__file__).resolve()), "--address", address]
+    if cache_dir is not None:
+        command += ["--cache-dir", str(cache_dir)]
+    if threads:
+        command += ["--threads", str(threads)]
+    return subprocess.Popen(command)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=os.getenv("DOCTIS_MODEL_SERVER", "/tmp/doctis-models.sock"))
+    parser.add_argument("--cache-dir", type=Path, default=Path(__file__).resolve().parent / "cache")
+    parser.add_argument("--threads", type=int, help="Threads intra-op de l'encodeur (ONNX Runtime)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--backend", choices=ENCODER_BACKENDS, default="torch")
+    parser.add_argument("--preload", nargs="*", default=[], help="Modèles chargés dès le démarrage")
+    args = parser.parse_args()
+
+    server = ModelServer(args.address, args.cache_dir, args.threads, args.max_batch_size, args.max_wait_ms)
+    for model_name in args.preload:
+        server.encoder(model_name, args.backend)
+    # SIGTERM (arrêt gunicorn / Render) : sortie propre, la socket Unix est supprimée
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Retrieval multi-vecteurs par fragments de symptômes (fusion tardive)
+# =============================================================================
+
+"""
+Retrieval multi-vecteurs
+------------------------
+Un seul embedding pour une longue description (ou un long récit patient)
+moyenne des symptômes distincts. Ici chaque phrase / élément de liste
+devient un vecteur :
+
+- catalogue : tous les fragments dans une matrice contiguë (n_fragments, dim)
+  + un tableau `owners` (pathologie propriétaire de chaque ligne, trié)
+- requête   : texte complet + ses fragments, découpés de la même manière
+
+Score d'une pathologie (fusion tardive, type MaxSim) :
+1. un seul produit matriciel  requête × catalogue  → (m, n_fragments)
+2. max par pathologie sur ses fragments  (`np.maximum.reduceat`)
+3. agrégation sur les fragments de la requête : moyenne ("mean", chaque
+   symptôme mentionné compte) ou maximum ("max")
+
+Le texte complet figure parmi les fragments des deux côtés : une requête
+courte se comporte comme en mode mono-vecteur.
+"""
+
+import re
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from vector_index import VectorIndex, normalize_rows, top_k
+
+FRAGMENT_AGGREGATIONS = ("mean", "max")
+
+# Séparateurs de symptômes : ponctuation, retours à la ligne, puces et conjonctions
+_FRAGMENT_SEPARATORS = re.compile(r"[.;,!?\n•،؛؟]+|\s+-\s+|\s+(?:et|and|avec|with|puis)\s+", re.IGNORECASE)
+_MIN_FRAGMENT_CHARS = 3
+
+
+def split_fragments(text: str) -> list[str]:
+    """Découpe un texte en fragments de symptômes (au moins un fragment)."""
+    parts = [p.strip(" -\t") for p in _FRAGMENT_SEPARATORS.split(text)]
+    fragments = [p for p in parts if len(p) >= _MIN_FRAGMENT_CHARS]
+    return fragments or [text.strip()]
+
+
+def text_fragments(document: Union[str, Sequence[str]]) -> list[str]:
+    """
+    Fragments indexés pour un texte ou une liste de symptômes.
+
+    Le texte complet vient en premier, suivi des fragments s'il y en a
+    plusieurs (une liste est jointe par ", " pour le texte complet).
+    """
+    if isinstance(document, str):
+        whole, parts = document.strip(), split_fragments(document)
+    else:
+        parts = [item.strip() for item in document if item and item.strip()]
+        whole = ", ".join(parts)
+    return [whole] + parts if len(parts) > 1 else [whole]
+
+
+def fragment_layout(documents: Sequence[Union[str, Sequence[str]]]) -> tuple[list[str], np.ndarray]:
+    """
+    Aplatit les fragments de tous les documents.
+
+    Returns:
+        (textes des fragments, owners) où owners[i] est l'indice du document
+        du fragment i (croissant, fragments d'un document contigus)
+    """
+    texts: list[str] = []
+    owners: list[int] = []
+    for doc_id, document in enumerate(documents):
+        fragments = text_fragments(document)
+        texts.extend(fragments)
+        owners.extend([doc_id] * len(fragments))
+    return texts, np.asarray(owners, dtype=np.int64)
+
+
+class MultiVectorIndex(VectorIndex):
+    """
+    Index exact sur fragments, scores fusionnés par document.
+
+    `search(queries, k)` considère toutes les lignes de `queries` comme les
+    fragments d'une même requête ; `offsets` permet d'en passer plusieurs
+    (début de chaque groupe de lignes) dans le même produit matriciel.
+    """
+
+    kind = "multi"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        owners: np.ndarray,
+        aggregation: str = "mean",
+        normalized: bool = False,
+    ):
+        if aggregation not in FRAGMENT_AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue: {aggregation} (attendu: {', '.join(FRAGMENT_AGGREGATIONS)})")
+        owners = np.asarray(owners, dtype=np.int64)
+        if len(owners) != vectors.shape[0]:
+            raise ValueError("owners doit contenir un propriétaire par fragment")
+        if len(owners) and (owners[0] != 0 or not np.all(np.isin(np.diff(owners), (0, 1)))):
+            raise ValueError("Les fragments doivent être groupés par document (owners 0, 0, 1, 2, 2, ...)")
+
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.owners = owners
+        self.aggregation = aggregation
+        # Première ligne de chaque document (bornes pour reduceat)
+        self.starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if len(owners) else owners
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def document_vectors(self) -> np.ndarray:
+        """Vecteur du texte complet de chaque document (premier fragment)."""
+        return self.vectors[self.starts]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        offsets: Optional[Sequence[int]] = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Args:
+            queries: Fragments (m, dim) d'une requête, ou de plusieurs avec `offsets`
+            k: Nombre de documents retournés par requête
+            offsets: Indice de la première ligne de chaque requête (défaut: [0])
+
+        Returns:
+            (scores, ids) de forme (n_queries, k)
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        offsets = np.asarray([0] if offsets is None else offsets, dtype=np.int64)
+        if len(self) == 0:
+            return top_k(np.empty((len(offsets), 0), dtype=np.float32), k)
+
+        # (m, n_fragments) → max par document → (m, n_documents)
+        fragment_scores = queries @ self.vectors.T
+        document_scores = np.maximum.reduceat(fragment_scores, self.starts, axis=1)
+
+        # Fusion sur les fragments de chaque requête → (n_queries, n_documents)
+        if self.aggregation == "max":
+            fused = np.maximum.reduceat(document_scores, offsets, axis=0)
+        else:
+            counts = np.diff(np.r_[offsets, queries.shape[0]])
+            fused = np.add.reduceat(document_scores, offsets, axis=0) / counts[:, None]
+        return top_k(fused, k)
@@ -0,0 +1,62 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Réutilisation du KV-cache du préfixe système (llama.cpp)
+# =============================================================================
+
+"""
+Cache du préfixe de prompt
+--------------------------
+Chaque prompt commence par le même long prompt système. Son évaluation
+représente une part importante de la latence CPU.
+
+Au démarrage, le préfixe est évalué une fois par instance `Llama` et l'état
+llama.cpp (KV-cache + tokens) est sauvegardé. Avant chaque requête :
+- si le contexte courant commence déjà par le préfixe (cas nominal : la
+  requête précédente utilisait le même système), rien à faire ; llama.cpp
+  ne ré-évalue que le suffixe grâce à sa correspondance de préfixe
+- sinon l'état sauvegardé est restauré (`load_state`)
+
+Dans les deux cas seul le suffixe (prompt patient) est évalué.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+
+class PromptPrefixCache:
+    """États llama.cpp pré-évalués pour un préfixe de prompt fixe."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.tokens: Optional[np.ndarray] = None
+        self._states: dict = {}
+        self.restores = 0
+
+    def prepare(self, model) -> int:
+        """
+        Évalue le préfixe sur `model` et sauvegarde l'état obtenu.
+
+        Returns:
+            Nombre de tokens du préfixe
+        """
+        tokens = model.tokenize(self.prefix.encode("utf-8"), add_bos=True, special=True)
+        model.reset()
+        model.eval(tokens)
+        self._states[id(model)] = model.save_state()
+        self.tokens = np.asarray(tokens, dtype=np.intc)
+        return len(tokens)
+
+    def restore(self, model) -> None:
+        """Garantit que le contexte de `model` commence par le préfixe évalué."""
+        state = self._states.get(id(model))
+        if state is None or self.tokens is None:
+            return
+
+        n = len(self.tokens)
+        if model.n_tokens >= n and np.array_equal(model.input_ids[:n], self.tokens):
+            return
+
+        model.load_state(state)
+        self.restores += 1
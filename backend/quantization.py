@@ -0,0 +1,283 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Stockage compact des embeddings (float16 / int8 / binaire) + re-scoring exact
+# =============================================================================
+
+"""
+Embeddings compacts
+-------------------
+À 500k pathologies × 384 dimensions, la matrice float32 pèse 730 Mo : plus
+que le budget RAM du déploiement. La recherche se fait en deux temps :
+
+1. premier passage sur une forme compacte de la matrice (`CompactMatrix`)
+       float16 : 2 octets / dim     (÷2)
+       int8    : 1 octet / dim + une échelle float32 par ligne   (÷4)
+       binary  : 1 bit / dim (signe), distance de Hamming   (÷32)
+2. re-scoring exact (float32) des `rescore` meilleurs candidats seulement,
+   lus dans la matrice memory-mappée du cache disque : seules les pages de
+   ces lignes sont chargées
+
+Les formes compactes sont elles-mêmes écrites à côté de la matrice du cache
+(`EmbeddingCache.derived`) et memory-mappées : partagées entre workers et
+non recalculées au redémarrage.
+
+Scores sans re-scoring : exacts à l'arrondi près (float16), erreur de
+l'ordre de 1e-3 (int8), estimation grossière cos(π·hamming/dim) (binary).
+
+Compromis mesurés (benchmarks/bench_quantization.py, 384 dimensions,
+une requête, latence du premier passage) :
+
+- float16 : numpy n'a pas de produit matriciel float16 accéléré, chaque
+  requête reconvertit la matrice en float32 : à 100k pathologies, 5 à 8×
+  plus lent que le float32 (70-97 ms contre 12-16 ms). Utile seulement si
+  la mémoire prime sur la latence
+- int8 : ÷4 en mémoire pour une latence proche du float32 (17-19 ms à
+  100k), rappel@k de 0,98 sans re-scoring et 1,0 avec : le choix d'un
+  grand catalogue
+- binary : ÷32 et le plus rapide, mais inutilisable sans re-scoring
+  (rappel@k 0,05 à 0,15) et encore imparfait avec 200 candidats sur des
+  pathologies proches (0,3 à 100k, 0,67 à 5k) : `rescore` à augmenter
+
+Sous `DENSE_CACHE_BYTES` (≈ 20k pathologies en 384 dimensions), le gain
+mémoire ne vaut pas la reconversion : la forme compacte est décompressée
+une fois en float32 et le premier passage float16 / int8 coûte un produit
+BLAS, comme l'index float32 (0,4 ms à 5k au lieu de 3,3 ms en float16 et
+0,9 ms en int8). La mémoire servie dépasse alors celle du float32 : un
+petit catalogue n'a pas besoin de stockage compact.
+"""
+
+import mmap
+from typing import Callable, Optional
+
+import numpy as np
+
+from vector_index import VectorIndex, create_index, normalize_rows, top_k
+
+STORAGE_KINDS = ("float32", "float16", "int8", "binary")
+
+# Lignes converties à la fois (mémoire temporaire bornée : 64k × 384 × 4 o ≈ 100 Mo)
+_CHUNK_ROWS = 65536
+# Blocs du premier passage, re-convertis à chaque requête : plus petits (≈ 25 Mo)
+_SCORE_CHUNK_ROWS = 16384
+
+# Taille float32 maximale d'une forme compacte décompressée une fois pour toutes
+DENSE_CACHE_BYTES = 32 * 1024 * 1024
+
+# popcount par octet pour numpy < 2.0 (sans np.bitwise_count)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _chunks(n: int, size: int = _CHUNK_ROWS):
+    for start in range(0, n, size):
+        yield slice(start, min(n, start + size))
+
+
+def to_float16(vectors: np.ndarray) -> np.ndarray:
+    out = np.empty(vectors.shape, dtype=np.float16)
+    for rows in _chunks(vectors.shape[0]):
+        out[rows] = vectors[rows]
+    return out
+
+
+def int8_scales(vectors: np.ndarray) -> np.ndarray:
+    """Échelle par ligne : max |x| / 127 (une ligne nulle garde l'échelle 1)."""
+    scales = np.empty(vectors.shape[0], dtype=np.float32)
+    for rows in _chunks(vectors.shape[0]):
+        scales[rows] = np.abs(vectors[rows]).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    return scales
+
+
+def int8_codes(vectors: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    out = np.empty(vectors.shape, dtype=np.int8)
+    for rows in _chunks(vectors.shape[0]):
+        out[rows] = np.rint(vectors[rows] / scales[rows, None])
+    return out
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """Un bit par dimension (1 si positive), lignes de dim/8 octets."""
+    out = np.empty((vectors.shape[0], (vectors.shape[1] + 7) // 8), dtype=np.uint8)
+    for rows in _chunks(vectors.shape[0]):
+        out[rows] = np.packbits(vectors[rows] > 0, axis=1)
+    return out
+
+
+def _popcount(bits: np.ndarray) -> np.ndarray:
+    """Nombre de bits à 1 par ligne."""
+    if hasattr(np, "bitwise_count"):
+        # Lignes vues en mots de 64 bits si possible (4 à 8 fois moins d'éléments)
+        if bits.shape[1] % 8 == 0 and bits.flags.c_contiguous:
+            bits = bits.view(np.uint64)
+        return np.bitwise_count(bits).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[bits].sum(axis=1, dtype=np.int32)
+
+
+def release_pages(array: np.ndarray) -> None:
+    """
+    Rend au noyau les pages lues d'une matrice memory-mappée (après sa
+    conversion) : elles ne comptent plus dans le RSS. Sans effet sinon.
+    """
+    while array is not None and not hasattr(array, "_mmap"):
+        array = getattr(array, "base", None)
+    handle = getattr(array, "_mmap", None)
+    if handle is not None and hasattr(mmap, "MADV_DONTNEED"):
+        try:
+            handle.madvise(mmap.MADV_DONTNEED)
+        except (OSError, ValueError):
+            pass
+
+
+class CompactMatrix:
+    """Matrice du catalogue sous forme compacte et son produit scalaire approché."""
+
+    def __init__(self, storage: str, codes: np.ndarray, dim: int, scales: Optional[np.ndarray] = None):
+        if storage not in STORAGE_KINDS[1:]:
+            raise ValueError(f"Stockage compact inconnu: {storage} (valeurs possibles: {', '.join(STORAGE_KINDS[1:])})")
+        self.storage = storage
+        self.codes = codes
+        self.dim = dim
+        self.scales = scales
+        # Petit catalogue : copie float32 décompressée (évite la reconversion par requête)
+        self.dense: Optional[np.ndarray] = None
+        if storage != "binary" and codes.shape[0] * dim * 4 <= DENSE_CACHE_BYTES:
+            self.dense = self._dequantize(slice(None))
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire servie (copie float32 éventuelle comprise)."""
+        return int(
+            self.codes.nbytes
+            + (self.scales.nbytes if self.scales is not None else 0)
+            + (self.dense.nbytes if self.dense is not None else 0)
+        )
+
+    def _dequantize(self, rows: slice) -> np.ndarray:
+        """Lignes `rows` en float32 (float16 / int8)."""
+        block = self.codes[rows].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows, None]
+        return block
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        Similarités approchées (n_queries, n) de requêtes normalisées.
+
+        float16 / int8 : produit matriciel float32 sur la copie décompressée
+        (petit catalogue), sinon par blocs convertis à la volée (BLAS,
+        mémoire temporaire bornée). binary : Hamming sur les signes, ramené
+        à une estimation du cosinus.
+        """
+        queries = np.atleast_2d(queries).astype(np.float32, copy=False)
+        if self.dense is not None:
+            return queries @ self.dense.T
+        out = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+
+        if self.storage == "binary":
+            query_bits = pack_signs(queries)
+            for q in range(queries.shape[0]):
+                for rows in _chunks(len(self), _SCORE_CHUNK_ROWS):
+                    distance = _popcount(np.bitwise_xor(self.codes[rows], query_bits[q]))
+                    out[q, rows] = np.cos(np.pi * distance / self.dim)
+            return out
+
+        for rows in _chunks(len(self), _SCORE_CHUNK_ROWS):
+            block = self.codes[rows].astype(np.float32) @ queries.T
+            # Échelle int8 appliquée aux scores (n valeurs) plutôt qu'au bloc (n × dim)
+            if self.scales is not None:
+                block *= self.scales[rows, None]
+            out[:, rows] = block.T
+        return out
+
+
+def compact_matrix(
+    vectors: np.ndarray,
+    storage: str,
+    store: Optional[Callable[[str, Callable[[], np.ndarray]], np.ndarray]] = None,
+) -> CompactMatrix:
+    """
+    Forme compacte de `vectors` (normalisés).
+
+    Args:
+        store: `EmbeddingCache.derived` pour écrire / relire la forme compacte
+            à côté de la matrice du cache ; calculée en mémoire si None
+    """
+    if store is None:
+        store = lambda name, build: build()  # noqa: E731
+    dim = vectors.shape[1]
+    if storage == "float16":
+        compact = CompactMatrix(storage, store("float16", lambda: to_float16(vectors)), dim)
+    elif storage == "int8":
+        scales = store("int8-scales", lambda: int8_scales(vectors))
+        compact = CompactMatrix(storage, store("int8", lambda: int8_codes(vectors, scales)), dim, scales)
+    elif storage == "binary":
+        compact = CompactMatrix(storage, store("binary", lambda: pack_signs(vectors)), dim)
+    else:
+        raise ValueError(f"Stockage compact inconnu: {storage} (valeurs possibles: {', '.join(STORAGE_KINDS[1:])})")
+    # Pages float32 lues pour la conversion : rendues au noyau (relues au re-scoring)
+    release_pages(vectors)
+    return compact
+
+
+class QuantizedIndex(VectorIndex):
+    """
+    Index exact sur forme compacte, avec re-scoring float32 des meilleurs candidats.
+
+    Args:
+        vectors: Matrice float32 normalisée (idéalement memory-mappée : seules
+            les lignes re-scorées sont lues)
+        compact: Forme compacte de `vectors`
+        rescore: Candidats re-scorés exactement par requête (0 : scores compacts)
+    """
+
+    def __init__(self, vectors: np.ndarray, compact: CompactMatrix, rescore: int = 200):
+        self.vectors = vectors
+        self.compact = compact
+        self.rescore = rescore
+        self.kind = f"exact-{compact.storage}"
+
+    def __len__(self) -> int:
+        return len(self.compact)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(np.atleast_2d(queries))
+        approx = self.compact.scores(queries)
+        if self.rescore <= 0:
+            return top_k(approx, k)
+
+        _, candidates = top_k(approx, max(k, self.rescore))
+        # Lignes lues dans l'ordre du fichier (accès memory-map plus séquentiels)
+        candidates = np.sort(candidates, axis=1)
+        exact = np.empty(candidates.shape, dtype=np.float32)
+        for q in range(queries.shape[0]):
+            exact[q] = np.asarray(self.vectors[candidates[q]], dtype=np.float32) @ queries[q]
+        scores, local = top_k(exact, k)
+        return scores, np.take_along_axis(candidates, local, axis=1)
+
+
+def build_index(
+    kind: str,
+    vectors: np.ndarray,
+    storage: str = "float32",
+    rescore: int = 200,
+    store: Optional[Callable[[str, Callable[[], np.ndarray]], np.ndarray]] = None,
+    **kwargs,
+) -> VectorIndex:
+    """
+    `create_index` sur vecteurs normalisés, avec stockage compact de l'index exact.
+
+    Raises:
+        ValueError: Stockage inconnu, ou compact demandé pour un index IVF
+            (qui garde sa propre copie float32 réordonnée)
+    """
+    if storage not in STORAGE_KINDS:
+        raise ValueError(f"Stockage d'embeddings inconnu: {storage} (valeurs possibles: {', '.join(STORAGE_KINDS)})")
+    if storage == "float32":
+        return create_index(kind, vectors, normalized=True, **kwargs)
+    if kind != "exact":
+        raise ValueError(f"Stockage {storage} disponible pour l'index exact uniquement (index: {kind})")
+    return QuantizedIndex(vectors, compact_matrix(vectors, storage, store), rescore)
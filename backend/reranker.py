@@ -0,0 +1,218 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Re-classement cross-encoder des meilleurs candidats, sous budget de latence
+# =============================================================================
+
+"""
+Re-classement cross-encoder
+---------------------------
+Le bi-encodeur (SBERT) compare deux vecteurs calculés séparément ; un
+cross-encoder lit la requête et la description de la pathologie ensemble,
+plus précis mais trop coûteux pour tout le catalogue. Il n'est donc appliqué
+qu'aux meilleurs candidats du retrieval :
+
+- une seule passe avant, en lot, pour les couples (requête, pathologie)
+  absents du cache
+- cache LRU des scores par (hash de la requête normalisée, pathologie)
+- `clear` (rechargement du catalogue) change de génération : les scores
+  d'une passe lancée avant ne sont pas mis en cache
+- budget de latence : passé ce délai, `rerank` retourne None et l'appelant
+  garde l'ordre du bi-encodeur. La passe en cours n'est pas interrompue,
+  ses scores alimentent le cache. Une seule passe à la fois : une requête
+  attend la passe en cours dans la limite de son budget, sans jamais
+  empiler de passes derrière elle.
+
+Le modèle (sentence_transformers.CrossEncoder) n'est importé et chargé
+qu'au premier usage ou par `warm_up`.
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Callable, Hashable, Optional, Sequence
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Forme canonique d'une requête (casse, espaces, formes Unicode)."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def query_key(text: str) -> str:
+    """Hash de la requête normalisée (clé du cache de scores)."""
+    return hashlib.blake2b(normalize_query(text).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_cross_encoder(model_name: str):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name)
+
+
+class CrossEncoderReranker:
+    """Scores cross-encoder des candidats (doc_id, texte), mis en cache et bornés en temps."""
+
+    def __init__(
+        self,
+        model_name: str,
+        budget_ms: float = 150.0,
+        cache_size: int = 50_000,
+        loader: Callable[[str], object] = load_cross_encoder,
+    ):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.cache_size = cache_size
+        self._loader = loader
+        self._model = None
+        self._load_lock = threading.Lock()
+        # Un seul thread : une passe avant à la fois
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        self._pending: Optional[Future] = None
+        self._cache: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+        # Incrémentée par `clear` : écarte les scores des textes d'avant
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.reranked = 0
+        self.timeouts = 0
+        self.skipped = 0
+        self.errors = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def warm_up(self) -> None:
+        """Charge le modèle (sinon chargé par la première passe, hors budget)."""
+        self._load()
+
+    def _load(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._loader(self.model_name)
+        return self._model
+
+    def rerank(
+        self,
+        query: str,
+        candidates: Sequence[tuple[Hashable, str]],
+        budget_ms: Optional[float] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Args:
+            query: Texte du patient
+            candidates: (identifiant stable, texte) de chaque candidat
+            budget_ms: Budget de cet appel (défaut: `budget_ms` du reranker)
+
+        Returns:
+            Score de chaque candidat (plus grand = plus pertinent), ou None si
+            le budget est dépassé, le modèle occupé ou en erreur
+        """
+        deadline = time.perf_counter() + (self.budget_ms if budget_ms is None else budget_ms) / 1000
+        key = query_key(query)
+        scores = np.empty(len(candidates), dtype=np.float32)
+        missing = []
+        with self._lock:
+            for i, (doc_id, _) in enumerate(candidates):
+                score = self._cache.get((key, doc_id))
+                if score is None:
+                    missing.append(i)
+                else:
+                    self._cache.move_to_end((key, doc_id))
+                    scores[i] = score
+            self.hits += len(candidates) - len(missing)
+            self.misses += len(missing)
+            if not missing:
+                self.reranked += 1
+                return scores
+            pending = self._pending
+
+        # Passe d'une requête précédente (hors budget) encore en cours : attendue
+        # dans la limite du budget, jamais mise en file
+        if pending is not None and not pending.done():
+            wait([pending], timeout=max(0.0, deadline - time.perf_counter()))
+        with self._lock:
+            if self._pending is not None and not self._pending.done():
+                self.skipped += 1
+                return None
+            future = self._pending = self._executor.submit(
+                self._score, key, query, [candidates[i] for i in missing], self._generation
+            )
+
+        try:
+            missing_scores = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            return None
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            print(f"⚠️  Re-classement indisponible: {e}")
+            return None
+        scores[missing] = missing_scores
+        with self._lock:
+            self.reranked += 1
+        return scores
+
+    def _score(
+        self,
+        key: str,
+        query: str,
+        candidates: list[tuple[Hashable, str]],
+        generation: int,
+    ) -> np.ndarray:
+        """
+        Passe avant en lot (thread du reranker) ; les scores vont au cache même
+        hors budget, sauf si `clear` a été appelé depuis la soumission.
+        """
+        model = self._load()
+        scores = np.asarray(
+            model.predict(
+                [(query, text) for _, text in candidates],
+                batch_size=len(candidates),
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            ),
+            dtype=np.float32,
+        ).reshape(len(candidates), -1)[:, -1]  # modèles à 2 classes : logit « pertinent »
+        with self._lock:
+            if generation != self._generation:
+                return scores
+            for (doc_id, _), score in zip(candidates, scores):
+                self._cache[(key, doc_id)] = float(score)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return scores
+
+    def clear(self) -> None:
+        """
+        Vide le cache (textes des pathologies modifiés par un rechargement) ;
+        une passe en cours n'y écrira pas ses scores.
+        """
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "loaded": self.loaded,
+                "budget_ms": self.budget_ms,
+                "reranked": self.reranked,
+                "timeouts": self.timeouts,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "cache_entries": len(self._cache),
+                "cache_hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
@@ -0,0 +1,230 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Cache sémantique des réponses LLM (SQLite partagé entre workers)
+# =============================================================================
+
+"""
+Cache de réponses
+-----------------
+Les appels LLM sont majoritairement des quasi-doublons : même pathologie,
+même niveau de confiance, formulation différente. Le cache évite de
+régénérer une réponse déjà produite.
+
+Recherche en deux temps :
+1. Clé exacte (pathologie, tranche de confiance, langue)
+2. Repli sémantique : parmi les entrées de la même pathologie et langue,
+   réutilise celle dont l'embedding de requête est le plus proche, si la
+   similarité cosinus dépasse `similarity_threshold`
+
+Stockage SQLite (mode WAL) : un seul fichier partagé par tous les workers
+gunicorn / uvicorn. Expiration par TTL et éviction LRU (`last_access`).
+
+Le cache garde l'empreinte de chaque pathologie servie (`sync_catalogue`) :
+les réponses d'une pathologie modifiée ou retirée sont supprimées au
+chargement du nouveau catalogue, y compris après un redémarrage.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Hashable, Iterable, Optional
+
+import numpy as np
+
+
+class ResponseCache:
+    """Cache (pathologie, tranche de confiance, langue) → réponse générée."""
+
+    def __init__(
+        self,
+        db_path: Path,
+        ttl_seconds: float = 24 * 3600,
+        max_entries: int = 5000,
+        similarity_threshold: float = 0.92,
+        bucket_width: float = 0.1,
+    ):
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.bucket_width = bucket_width
+
+        # Une connexion par thread (sqlite3 n'est pas partageable entre threads)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._hits_exact = 0
+        self._hits_semantic = 0
+        self._misses = 0
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    pathology_id TEXT NOT NULL,
+                    lang TEXT NOT NULL,
+                    embedding BLOB,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_responses_pathology ON responses (pathology_id, lang)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalogue (pathology_id TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def bucket(self, confidence: float) -> int:
+        """Tranche de confiance (ex: 0.73 → 7 pour une largeur de 0.1)."""
+        return int(float(confidence) / self.bucket_width)
+
+    def _key(self, pathology_id: str, confidence: float, lang: str) -> str:
+        return f"{pathology_id}|{self.bucket(confidence)}|{lang}"
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(
+        self,
+        pathology_id: str,
+        confidence: float,
+        lang: str,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> Optional[str]:
+        """Retourne une réponse en cache, ou None."""
+        conn = self._connection()
+        now = time.time()
+        min_created = now - self.ttl_seconds
+
+        key = self._key(pathology_id, confidence, lang)
+        row = conn.execute(
+            "SELECT response FROM responses WHERE key = ? AND created_at >= ?",
+            (key, min_created),
+        ).fetchone()
+        if row is not None:
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._count("_hits_exact")
+            return row[0]
+
+        if query_embedding is not None:
+            rows = conn.execute(
+                "SELECT key, embedding, response FROM responses "
+                "WHERE pathology_id = ? AND lang = ? AND created_at >= ? AND embedding IS NOT NULL",
+                (pathology_id, lang, min_created),
+            ).fetchall()
+            if rows:
+                query = np.asarray(query_embedding, dtype=np.float32).ravel()
+                query = query / (np.linalg.norm(query) or 1.0)
+                cached = np.stack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                cached = cached / np.maximum(np.linalg.norm(cached, axis=1, keepdims=True), 1e-12)
+                similarities = cached @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, rows[best][0]))
+                    self._count("_hits_semantic")
+                    return rows[best][2]
+
+        self._count("_misses")
+        return None
+
+    def put(
+        self,
+        pathology_id: str,
+        confidence: float,
+        lang: str,
+        response: str,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> None:
+        """Enregistre une réponse puis applique TTL et limite LRU."""
+        conn = self._connection()
+        now = time.time()
+        blob = None
+        if query_embedding is not None:
+            blob = np.asarray(query_embedding, dtype=np.float32).ravel().tobytes()
+
+        conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(key, pathology_id, lang, embedding, response, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self._key(pathology_id, confidence, lang), pathology_id, lang, blob, response, now, now),
+        )
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def invalidate(self, pathology_ids: Iterable[str]) -> int:
+        """Supprime les réponses des pathologies données ; retourne le nombre supprimé."""
+        ids = list(pathology_ids)
+        conn = self._connection()
+        deleted = 0
+        # Par blocs : nombre de paramètres SQLite limité
+        for start in range(0, len(ids), 500):
+            block = ids[start:start + 500]
+            deleted += conn.execute(
+                f"DELETE FROM responses WHERE pathology_id IN ({', '.join('?' * len(block))})", block
+            ).rowcount
+        return deleted
+
+    def sync_catalogue(self, fingerprints: dict[str, Hashable]) -> int:
+        """
+        Aligne le cache sur le catalogue servi ({id: empreinte de l'entrée}) :
+        supprime les réponses des pathologies modifiées ou retirées depuis la
+        dernière synchronisation (par ce processus ou un autre).
+
+        Returns:
+            Nombre de réponses supprimées
+        """
+        current = {str(pid): str(fingerprint) for pid, fingerprint in fingerprints.items()}
+        conn = self._connection()
+        known = dict(conn.execute("SELECT pathology_id, fingerprint FROM catalogue").fetchall())
+        stale = {pid for pid, fingerprint in known.items() if current.get(pid) != fingerprint}
+        stale.update(
+            pid for (pid,) in conn.execute("SELECT DISTINCT pathology_id FROM responses") if pid not in current
+        )
+        deleted = self.invalidate(stale)
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM catalogue")
+            conn.executemany("INSERT INTO catalogue (pathology_id, fingerprint) VALUES (?, ?)", current.items())
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return deleted
+
+    def stats(self) -> dict:
+        """Compteurs du processus courant + taille du cache partagé."""
+        with self._stats_lock:
+            hits = self._hits_exact + self._hits_semantic
+            lookups = hits + self._misses
+            counters = {
+                "hits_exact": self._hits_exact,
+                "hits_semantic": self._hits_semantic,
+                "misses": self._misses,
+            }
+        entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            **counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "entries": entries,
+        }
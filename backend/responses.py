@@ -0,0 +1,133 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Réponses pré-calculées par pathologie et sérialisation JSON rapide
+# =============================================================================
+
+"""
+Réponses pré-calculées
+----------------------
+En mode dégradé (sans LLM), une réponse /diagnose ne dépend que de la
+pathologie retenue et du score. Tout le reste est calculé une fois, au
+chargement du catalogue (`PathologyResponses`) :
+
+- réponse template découpée autour du pourcentage de confiance :
+  `head + "87" + tail` (une seule concaténation par requête)
+- champs de `PathologyMatch` déjà extraits et validés ; seul
+  `confidence_score` est ajouté à la requête
+
+La réponse HTTP est un dict sérialisé directement (`FastJSONResponse`,
+orjson si installé) : pas de modèle Pydantic construit puis ré-encodé par
+l'encodeur générique de FastAPI. Les schémas Pydantic restent la
+documentation OpenAPI de l'endpoint.
+"""
+
+import json
+from typing import Any, Optional
+
+from starlette.responses import Response
+
+# Tentative d'import d'orjson (optionnel : repli sur json de la stdlib)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+SEVERITY_MESSAGES = {
+    1: "Il s'agit généralement d'une condition bénigne.",
+    2: "Cette condition est généralement modérée et gérable.",
+    3: "Cette condition mérite une attention médicale.",
+    4: "Cette condition nécessite une consultation médicale rapide.",
+    5: "Cette condition peut être sérieuse et nécessite une attention médicale urgente."
+}
+
+TEMPLATE_FOOTER = (
+    "N'oubliez pas : seul un professionnel de santé peut établir un diagnostic définitif. "
+    "Si vos symptômes persistent ou s'aggravent, consultez rapidement un médecin."
+)
+
+MATCH_FIELDS = ("urgency", "advice", "specialist")
+
+
+def dumps(payload: Any) -> bytes:
+    """JSON UTF-8 compact (orjson si disponible, même sortie sinon)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """Réponse JSON sans passage par `jsonable_encoder` (contenu déjà sérialisable)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class PathologyResponses:
+    """Fragments de réponse d'une pathologie, construits au chargement du catalogue."""
+
+    __slots__ = ("pathology", "head", "tail", "identity", "details")
+
+    def __init__(self, pathology: dict):
+        severity = pathology.get("severity_level")
+        if not isinstance(severity, int) or not 1 <= severity <= 5:
+            raise ValueError(f"Pathologie {pathology.get('id')}: severity_level doit être un entier de 1 à 5")
+        missing = [field for field in MATCH_FIELDS if not isinstance(pathology.get(field), str)]
+        if missing:
+            raise ValueError(f"Pathologie {pathology['id']}: champ(s) manquant(s) {', '.join(missing)}")
+
+        self.pathology = pathology
+        self.head = (
+            f"D'après l'analyse de vos symptômes, je détecte une possible **{pathology['name']}** "
+            f"avec un niveau de confiance de "
+        )
+        self.tail = (
+            f"%.\n\n{SEVERITY_MESSAGES[severity]}\n\n"
+            f"**Recommandation :** {pathology['advice']}\n\n{TEMPLATE_FOOTER}"
+        )
+        # Ordre des champs de PathologyMatch : id, name, confidence_score, puis le reste
+        self.identity = {"id": pathology["id"], "name": pathology["name"]}
+        self.details = {"severity_level": severity, **{field: pathology[field] for field in MATCH_FIELDS}}
+
+    def template(self, confidence: float) -> str:
+        """Réponse du mode dégradé pour ce niveau de confiance."""
+        return f"{self.head}{confidence * 100:.0f}{self.tail}"
+
+    def match(self, score: float) -> dict:
+        """Payload `PathologyMatch` (score arrondi comme le schéma)."""
+        return {**self.identity, "confidence_score": round(float(score), 3), **self.details}
+
+
+def build_responses(pathologies: list[dict]) -> dict[str, PathologyResponses]:
+    """
+    Fragments de tout le catalogue, indexés par identifiant.
+
+    Raises:
+        ValueError: Gravité hors de 1-5 ou champ de conseil manquant
+    """
+    return {p["id"]: PathologyResponses(p) for p in pathologies}
+
+
+def diagnosis_payload(
+    disclaimer: str,
+    ai_response: str,
+    authors: Optional[list] = None,
+    pathology: Optional[dict] = None,
+    language: Optional[str] = None
+) -> dict:
+    """Corps d'une réponse `DiagnosisResponse` (même ordre de champs)."""
+    payload = {
+        "success": True,
+        "matched": pathology is not None,
+        "pathology": pathology,
+        "ai_response": ai_response,
+        "disclaimer": disclaimer,
+    }
+    if authors is not None:
+        payload["authors"] = authors
+    if language is not None:
+        payload["language"] = language
+    return payload
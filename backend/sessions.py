@@ -0,0 +1,219 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Sessions de consultation multi-tours (agrégats incrémentaux, TTL + LRU)
+# =============================================================================
+
+"""
+Sessions multi-tours
+--------------------
+Un patient qui précise ses symptômes en plusieurs messages ne renvoie que
+le nouveau message : seul celui-ci est encodé. La session garde, pour une
+fenêtre des `max_turns` derniers tours :
+
+- l'embedding de chaque tour et leur somme : la requête agrégée est
+  `normalize(Σ e_t)`
+- si fourni (`score_fn`), la somme des scores denses de chaque tour contre
+  le catalogue : `Σ M·e_t = M·Σ e_t`, soit les cosinus de la requête
+  agrégée à un facteur près (un produit matrice-vecteur par tour, jamais
+  sur l'historique)
+- si fournie (`lexical_fn`), la somme des scores BM25 de chaque tour : BM25
+  étant additif sur les termes de la requête, c'est le score du texte
+  complet de la conversation
+
+Un tour sorti de la fenêtre est soustrait des sommes. Après un rechargement
+du catalogue, les scores sont recalculés depuis les embeddings conservés
+(`rebase`), sans ré-encodage.
+
+`SessionStore` borne la mémoire : TTL depuis le dernier tour, nombre de
+sessions et taille totale, éviction LRU.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+ScoreFn = Callable[[np.ndarray], np.ndarray]
+LexicalFn = Callable[[str], np.ndarray]
+
+
+class Session:
+    """Conversation d'un patient : tours récents et agrégats incrémentaux."""
+
+    def __init__(self, session_id: str, lang: str, max_turns: int = 20):
+        self.id = session_id
+        self.lang = lang
+        self.max_turns = max_turns
+        self.texts: list[str] = []
+        self.vectors: list[np.ndarray] = []
+        self.vector_sum: Optional[np.ndarray] = None
+        self.scores: Optional[np.ndarray] = None
+        self.lexical: Optional[np.ndarray] = None
+        # Version du catalogue contre laquelle les scores ont été calculés
+        self.version: Optional[int] = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+        self._accounted = 0
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [a for a in (self.vector_sum, self.scores, self.lexical) if a is not None]
+        return (
+            sum(a.nbytes for a in arrays)
+            + sum(v.nbytes for v in self.vectors)
+            + sum(len(t) for t in self.texts)
+        )
+
+    def add_turn(
+        self,
+        text: str,
+        vector: np.ndarray,
+        score_fn: Optional[ScoreFn] = None,
+        lexical_fn: Optional[LexicalFn] = None,
+    ) -> None:
+        """
+        Ajoute un tour (embedding normalisé du seul nouveau texte).
+
+        Args:
+            score_fn: Scores denses (n,) d'un vecteur contre le catalogue ;
+                None : pas de vecteur de scores (recherche par l'index)
+            lexical_fn: Scores BM25 (n,) d'un texte ; None sans fusion
+        """
+        vector = np.asarray(vector, dtype=np.float32)
+        self.texts.append(text)
+        self.vectors.append(vector)
+        self.vector_sum = vector.copy() if self.vector_sum is None else self.vector_sum + vector
+        self.scores = self._accumulate(self.scores, score_fn, vector)
+        self.lexical = self._accumulate(self.lexical, lexical_fn, text)
+
+        if len(self.texts) > self.max_turns:
+            old_text, old_vector = self.texts.pop(0), self.vectors.pop(0)
+            self.vector_sum -= old_vector
+            if self.scores is not None:
+                self.scores -= score_fn(old_vector)
+            if self.lexical is not None:
+                self.lexical -= lexical_fn(old_text)
+        self.last_seen = time.monotonic()
+
+    @staticmethod
+    def _accumulate(total: Optional[np.ndarray], fn: Optional[Callable], value) -> Optional[np.ndarray]:
+        if fn is None:
+            return None
+        contribution = np.asarray(fn(value), dtype=np.float32)
+        return contribution.copy() if total is None else total + contribution
+
+    def rebase(self, version: int, score_fn: Optional[ScoreFn] = None, lexical_fn: Optional[LexicalFn] = None) -> None:
+        """Recalcule les scores contre un autre catalogue (embeddings conservés, pas de ré-encodage)."""
+        self.scores = (
+            np.asarray(score_fn(self.vector_sum), dtype=np.float32)
+            if score_fn is not None and self.vector_sum is not None else None
+        )
+        self.lexical = (
+            np.asarray(sum(lexical_fn(text) for text in self.texts), dtype=np.float32)
+            if lexical_fn is not None and self.texts else None
+        )
+        self.version = version
+
+    def query_vector(self) -> np.ndarray:
+        """Requête agrégée normalisée (moyenne des tours, en direction)."""
+        norm = float(np.linalg.norm(self.vector_sum))
+        return self.vector_sum / norm if norm > 0 else self.vector_sum
+
+    def dense_scores(self) -> Optional[np.ndarray]:
+        """Cosinus de la requête agrégée avec chaque pathologie (None sans `score_fn`)."""
+        if self.scores is None:
+            return None
+        norm = float(np.linalg.norm(self.vector_sum))
+        return self.scores / norm if norm > 0 else self.scores
+
+
+class SessionStore:
+    """
+    Sessions en mémoire, bornées en nombre, en taille et en durée d'inactivité.
+
+    L'ordre LRU est aussi l'ordre d'inactivité : les sessions expirées sont
+    en tête et purgées à chaque accès.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10_000,
+        ttl_seconds: float = 1800.0,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_turns: int = 20,
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_turns = max_turns
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, lang: str) -> Session:
+        session = Session(secrets.token_urlsafe(16), lang, self.max_turns)
+        with self._lock:
+            self._sessions[session.id] = session
+            self._purge()
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Session active (None si inconnue, expirée ou évincée)."""
+        with self._lock:
+            self._purge()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.last_seen = time.monotonic()
+            return session
+
+    def update(self, session: Session) -> None:
+        """Comptabilise la nouvelle taille d'une session après un tour (puis évince)."""
+        with self._lock:
+            if self._sessions.get(session.id) is not session:
+                return
+            size = session.nbytes
+            self._bytes += size - session._accounted
+            session._accounted = size
+            self._purge()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._bytes -= session._accounted
+            return session is not None
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen > self.ttl_seconds:
+                self.expired += 1
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                self.evicted += 1
+            else:
+                break
+            self._sessions.popitem(last=False)
+            self._bytes -= session._accounted
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
@@ -0,0 +1,197 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Profil du démarrage à froid (temps par import et par phase d'initialisation)
+# =============================================================================
+
+"""
+Profil de démarrage
+-------------------
+Sur des instances autoscalées, chaque démarrage à froid retarde les
+premières requêtes. Ce script mesure où part ce temps :
+
+- imports : temps propre de chaque module importé (hors sous-imports),
+  regroupé par paquet racine (`fastapi`, `numpy`, `torch`, ...)
+- phases : import de l'application, puis (avec --load) chargement de chaque
+  composant (catalogue, SBERT + embeddings, LLM) ou du moteur du serveur Flask
+
+Les imports faits pendant le chargement (sentence_transformers, torch,
+llama_cpp, différés jusqu'à leur premier usage) apparaissent donc à part de
+ceux de l'import de l'application.
+
+Usage :
+    python backend/startup_profile.py                  # import de main.py
+    python backend/startup_profile.py --load           # + chargement des modèles
+    python backend/startup_profile.py --server --load  # server/app.py
+    python backend/startup_profile.py --json           # rapport JSON
+"""
+
+import argparse
+import asyncio
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).resolve().parent.parent / "server"
+
+
+class ImportTimer:
+    """
+    Chronomètre les imports (remplace `builtins.__import__` tant qu'il est actif).
+
+    Temps inclusif et temps propre (sous-imports déduits) de chaque module
+    chargé pour la première fois, comme `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.timings: dict[str, tuple[float, float]] = {}
+        self._local = threading.local()
+        self._original = None
+
+    def __enter__(self) -> "ImportTimer":
+        self._original = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc) -> None:
+        builtins.__import__ = self._original
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = name
+        if level:
+            try:
+                module = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__"))
+            except (ImportError, ValueError):
+                pass
+        if module in sys.modules:
+            # `from paquet import sous_module` : le paquet est déjà chargé mais
+            # le sous-module est importé par la machinerie interne, hors de ce hook
+            missing = [
+                f"{module}.{item}" for item in fromlist or ()
+                if item != "*" and not hasattr(sys.modules[module], item)
+                and f"{module}.{item}" not in sys.modules
+            ]
+            if not missing:
+                return self._original(name, globals, locals, fromlist, level)
+            module = ", ".join(missing)
+
+        # Pile par thread : temps des sous-imports à déduire du module parent
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            if module not in self.timings:
+                self.timings[module] = (elapsed, elapsed - children)
+
+    def by_package(self) -> dict[str, float]:
+        """Temps propre cumulé par paquet racine, décroissant."""
+        totals: dict[str, float] = {}
+        for module, (_, own) in self.timings.items():
+            root = module.split(".")[0]
+            totals[root] = totals.get(root, 0.0) + own
+        return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+class StartupProfile:
+    """Durées des phases de démarrage et imports faits pendant celles-ci."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.imports = ImportTimer()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def report(self, top: int = 15) -> dict:
+        packages = self.imports.by_package()
+        return {
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            "imports_total_s": round(sum(packages.values()), 3),
+            "imports_by_package": {name: round(seconds, 3) for name, seconds in list(packages.items())[:top]},
+            "modules_imported": len(self.imports.timings),
+        }
+
+
+def print_report(report: dict) -> None:
+    print("\n⏱️  Phases de démarrage")
+    for name, seconds in report["phases"].items():
+        print(f"   {name:<32} {seconds:8.3f} s")
+    print(
+        f"\n📦 Imports : {report['imports_total_s']:.3f} s, {report['modules_imported']} modules "
+        f"(temps propre par paquet)"
+    )
+    for name, seconds in report["imports_by_package"].items():
+        print(f"   {name:<32} {seconds:8.3f} s")
+
+
+def profile_backend(profile: StartupProfile, load: bool) -> None:
+    """Import de main.py puis, si demandé, chargement séquentiel des composants."""
+    with profile.phase("import main"):
+        import main
+    if not load:
+        return
+    with profile.phase("load_models"):
+        asyncio.run(main.doctis_service.load_models())
+    # Sous-phases mesurées par le service (SBERT et LLM chargés en parallèle)
+    for name, seconds in main.doctis_service.load_times.items():
+        profile.phases[f"load_models/{name}"] = seconds
+    for name, error in main.doctis_service.component_errors.items():
+        print(f"⚠️  {name}: {error}")
+
+
+def profile_server(profile: StartupProfile, load: bool) -> None:
+    """Import de server/app.py (sans thread de chargement) puis, si demandé, du moteur."""
+    os.environ["ENGINE_AUTOSTART"] = "0"
+    sys.path.insert(0, str(SERVER_DIR))
+    with profile.phase("import app"):
+        import app
+    if not load:
+        return
+    with profile.phase("initialize_engine"):
+        app.initialize_engine()
+    if app.engine_state["error"]:
+        print(f"⚠️  engine: {app.engine_state['error']}")
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", action="store_true", help="Profiler server/app.py au lieu de backend/main.py")
+    parser.add_argument("--load", action="store_true", help="Inclure le chargement des modèles")
+    parser.add_argument("--top", type=int, default=15, help="Paquets affichés")
+    parser.add_argument("--json", action="store_true", help="Rapport JSON sur la sortie standard")
+    args = parser.parse_args()
+
+    profile = StartupProfile()
+    # En JSON, les journaux de chargement passent sur la sortie d'erreur
+    with profile.imports, redirect_stdout(sys.stderr) if args.json else nullcontext():
+        if args.server:
+            profile_server(profile, args.load)
+        else:
+            profile_backend(profile, args.load)
+
+    report = profile.report(args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,144 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Fixtures communes des tests du backend (encodeur factice, chemins)
+# =============================================================================
+
+"""
+Les tests tournent hors ligne : aucun modèle n'est téléchargé. `WordEncoder`
+remplace SBERT (sac de mots haché, même interface `encode`) et compte ses
+appels, ce qui suffit à vérifier caches, index et fusion. `FakeLlama`
+remplace llama_cpp.Llama (tokens prédéfinis, streamés ou non).
+
+Les tests d'API chargent le service sur une copie du catalogue fourni, avec
+un répertoire de cache temporaire (fixtures `service` et `client`).
+
+Usage :
+    cd backend
+    pytest tests/ -v
+"""
+
+import shutil
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator, Sequence, Union
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+class WordEncoder:
+    """Encodeur déterministe : chaque mot ajoute ±1 à une dimension hachée."""
+
+    def __init__(self, dim: int = 64):
+        self.dim = dim
+        self.calls: list[list[str]] = []
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.calls.append(texts)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                h = zlib.crc32(word.strip(".,;:!?").encode("utf-8"))
+                vectors[row, h % self.dim] += 1.0 if h & 1 << 31 else -1.0
+        vectors[:, 0] += 1e-3
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+    @property
+    def encoded_count(self) -> int:
+        return sum(len(texts) for texts in self.calls)
+
+
+class FakeLlama:
+    """Modèle llama.cpp factice : produit `tokens` un par un (ou d'un bloc)."""
+
+    def __init__(self, tokens: Sequence[str] = ("Reposez-vous ", "et ", "hydratez-vous."), delay: float = 0.0):
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.prompts: list[str] = []
+
+    def __call__(self, prompt: str, stream: bool = False, **kwargs):
+        self.prompts.append(prompt)
+        if not stream:
+            return {"choices": [{"text": "".join(self.tokens)}]}
+        return self._stream()
+
+    def _stream(self) -> Iterator[dict]:
+        for token in self.tokens:
+            if self.delay:
+                time.sleep(self.delay)
+            yield {"choices": [{"text": token}]}
+
+
+@pytest.fixture
+def encoder() -> WordEncoder:
+    return WordEncoder()
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def catalogue_path(tmp_path) -> Path:
+    """Copie modifiable du catalogue fourni."""
+    path = tmp_path / "pathologies.json"
+    shutil.copy(BACKEND_DIR / "data" / "pathologies.json", path)
+    return path
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path, encoder, catalogue_path):
+    """Service neuf (WordEncoder, sans LLM), installé comme `main.doctis_service`."""
+    import main
+
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(main.settings, "CACHE_DIR", cache_dir)
+    monkeypatch.setattr(main.settings, "RESPONSE_CACHE_PATH", cache_dir / "responses.sqlite3")
+    monkeypatch.setattr(main.settings, "PATHOLOGIES_PATH", catalogue_path)
+    monkeypatch.setattr(main.settings, "BACKGROUND_LOADING", False)
+    monkeypatch.setattr(main.DoctisAIService, "_load_encoder", staticmethod(lambda model_name: encoder))
+    service = main.DoctisAIService()
+    monkeypatch.setattr(main, "doctis_service", service)
+    return service
+
+
+@pytest.fixture
+def client(service):
+    """Client HTTP : le cycle de vie de l'application charge `service` au démarrage."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def llm(service):
+    """Branche un `FakeLlama` (pool d'un worker) sur le service."""
+    from inference_pool import InferencePool
+
+    model = FakeLlama()
+    service.inference_pool = InferencePool([model], max_queue_size=1, queue_timeout=1.0)
+    service.llm_model = model
+    yield model
+    service.inference_pool.shutdown()
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+from batch_cli import iter_chunks
+from main import parse_batch_line
+
+MIGRAINE = "Mal de tête intense et pulsatile, d'un seul côté, avec nausées et sensibilité à la lumière"
+
+
+def ndjson(*records) -> bytes:
+    return b"".join(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n" for r in records)
+
+
+def read_results(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_line_numbers_never_collide_with_explicit_ids():
+    assert parse_batch_line(b'{"id": 2, "symptoms": "x"}', 1)["id"] == 2
+    implicit = parse_batch_line(b'{"symptoms": "x"}', 2)
+    assert implicit["id"] is None and implicit["line"] == 2
+    assert parse_batch_line(b"{pas du json", 3) == {"id": None, "line": 3, "error": "Ligne JSON invalide"}
+    assert "error" in parse_batch_line(b"[1, 2]", 4)
+
+
+def test_cli_chunks_skip_blank_lines_and_count_from_one():
+    lines = ['{"symptoms": "a"}', "", '{"symptoms": "b"}', '{"symptoms": "c"}']
+    chunks = list(iter_chunks(lines, 2, "id", "symptoms"))
+    assert [[r["line"] for r in chunk] for chunk in chunks] == [[1, 3], [4]]
+
+
+def test_batch_results_keep_input_order_ids_and_lines(client):
+    body = ndjson(
+        {"id": "a", "symptoms": MIGRAINE, "lang": "fr"},
+        {"symptoms": "court"},
+    ) + b"\n{invalide\n" + ndjson({"id": "d", "symptoms": MIGRAINE, "lang": "de"})
+    response = client.post("/diagnose/batch", content=body)
+    assert response.status_code == 200
+
+    results = read_results(response)
+    assert [(r["id"], r["line"], r["success"]) for r in results] == [
+        ("a", 1, True), (None, 2, False), (None, 4, False), ("d", 5, False)
+    ]
+    assert results[0]["pathology"]["id"] == "migraine"
+
+
+def test_invalid_llm_mode_is_rejected(client):
+    assert client.post("/diagnose/batch?llm=tous", content=b"").status_code == 422
+
+
+def test_item_limit_ends_the_stream_with_an_error_line(client, monkeypatch):
+    monkeypatch.setattr(main.settings, "BATCH_MAX_ITEMS", 2)
+    body = ndjson(*({"id": i, "symptoms": MIGRAINE, "lang": "fr"} for i in range(4)))
+    results = read_results(client.post("/diagnose/batch", content=body))
+    assert [r["id"] for r in results] == [0, 1, None]
+    assert results[-1]["line"] == 3 and "max 2" in results[-1]["error"]
+
+
+def run_asgi(body_parts: list[bytes], events: list[str]) -> bytes:
+    """Appel ASGI direct : le corps arrive en plusieurs messages (ASGI 2.3)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.3"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/diagnose/batch", "raw_path": b"/diagnose/batch",
+        "root_path": "", "query_string": b"", "headers": [], "client": ("test", 1), "server": ("test", 80),
+    }
+    parts = list(body_parts)
+    output = []
+
+    async def receive():
+        if parts:
+            events.append("body")
+            body = parts.pop(0)
+            return {"type": "http.request", "body": body, "more_body": bool(parts)}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        output.append(message.get("body", b""))
+
+    asyncio.run(main.app(scope, receive, send))
+    return b"".join(output)
+
+
+def test_chunks_are_diagnosed_while_the_body_is_still_arriving(service, monkeypatch):
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    monkeypatch.setattr(main.settings, "BATCH_CHUNK_SIZE", 2)
+    events = []
+    diagnose_records = service.diagnose_records
+
+    def record(records, *args):
+        events.append(f"diagnose:{len(records)}")
+        return diagnose_records(records, *args)
+
+    monkeypatch.setattr(service, "diagnose_records", record)
+    line = ndjson({"symptoms": MIGRAINE, "lang": "fr"})
+    # Dernière ligne coupée entre deux messages
+    output = run_asgi([line, line, line, line[:20], line[20:]], events)
+
+    assert events == ["body", "body", "diagnose:2", "body", "body", "body", "diagnose:2"]
+    assert [json.loads(l)["line"] for l in output.splitlines()] == [1, 2, 3, 4]
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_calls_share_one_batch(encoder):
+    batcher = MicroBatcher(encoder.encode, max_batch_size=8, max_wait_ms=50)
+
+    async def scenario():
+        texts = [f"symptôme numéro {i}" for i in range(5)]
+        vectors = await asyncio.gather(*(batcher.encode(t) for t in texts))
+        await batcher.close()
+        return texts, vectors
+
+    texts, vectors = run(scenario())
+    assert batcher.batches_run == 1
+    assert encoder.calls == [texts]
+    for text, vector in zip(texts, vectors):
+        np.testing.assert_array_equal(vector, encoder.encode(text))
+
+
+def test_batches_are_capped_at_max_size(encoder):
+    batcher = MicroBatcher(encoder.encode, max_batch_size=3, max_wait_ms=50)
+
+    async def scenario():
+        await asyncio.gather(*(batcher.encode(f"texte {i}") for i in range(7)))
+        await batcher.close()
+
+    run(scenario())
+    assert [len(call) for call in encoder.calls] == [3, 3, 1]
+
+
+def test_encoding_error_reaches_every_caller_and_worker_survives():
+    calls = []
+
+    def encode(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    batcher = MicroBatcher(encode, max_batch_size=8, max_wait_ms=20)
+
+    async def scenario():
+        results = await asyncio.gather(batcher.encode("a"), batcher.encode("b"), return_exceptions=True)
+        after = await batcher.encode("c")
+        await batcher.close()
+        return results, after
+
+    results, after = run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert after.shape == (4,)
+
+
+def test_encoding_runs_off_the_event_loop_thread(encoder):
+    threads = []
+
+    def encode(texts):
+        threads.append(threading.current_thread().name)
+        return encoder.encode(texts)
+
+    batcher = MicroBatcher(encode, max_wait_ms=1)
+
+    async def scenario():
+        await batcher.encode("fièvre")
+        await batcher.close()
+
+    run(scenario())
+    assert threads and threads[0].startswith("sbert-batch")
+
+
+def test_close_cancels_waiting_callers(encoder):
+    release = threading.Event()
+
+    def slow(texts):
+        release.wait(1)
+        return encoder.encode(texts)
+
+    batcher = MicroBatcher(slow, max_batch_size=1, max_wait_ms=1)
+
+    async def scenario():
+        first = asyncio.ensure_future(batcher.encode("premier"))
+        queued = asyncio.ensure_future(batcher.encode("second"))
+        await asyncio.sleep(0.05)
+        await batcher.close()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        first.cancel()
+
+    run(scenario())
+
+
+def test_close_cancels_the_batch_being_encoded(encoder):
+    release = threading.Event()
+
+    def slow(texts):
+        release.wait(1)
+        return encoder.encode(texts)
+
+    batcher = MicroBatcher(slow, max_wait_ms=1)
+
+    async def scenario():
+        inflight = asyncio.ensure_future(batcher.encode("en cours"))
+        await asyncio.sleep(0.05)
+        await batcher.close()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(inflight, 1)
+
+    run(scenario())
+
+
+def test_encode_after_close_raises_a_clean_error(encoder):
+    batcher = MicroBatcher(encoder.encode, max_wait_ms=1)
+
+    async def scenario():
+        await batcher.encode("fièvre")
+        await batcher.close()
+        with pytest.raises(RuntimeError, match="arrêté"):
+            await batcher.encode("toux")
+
+    run(scenario())
+    assert batcher._worker is None and batcher._queue is None
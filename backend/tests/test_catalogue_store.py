@@ -0,0 +1,111 @@
+import pytest
+
+import catalogue_store
+from catalogue_store import (
+    CompiledCatalogue, TextColumn, compile_catalogue, content_hashes, entry_fingerprints, fingerprints,
+    indexed_texts, page, text_column
+)
+from embedding_cache import content_hash
+from knowledge_base import read_catalogue
+
+
+@pytest.fixture
+def catalogues(catalogue_path, tmp_path):
+    """(liste de dicts du JSON, même catalogue compilé)."""
+    pathologies, disclaimer = read_catalogue(catalogue_path)
+    # Entrée partiellement traduite et champ hors schéma : repli et colonne `extra`
+    pathologies[1] = {**pathologies[1], "translations": {"en": pathologies[1]["translations"]["en"]}}
+    pathologies[2] = {**pathologies[2], "typical_age_range": "Adulte"}
+    path = tmp_path / "pathologies.dcat"
+    header = compile_catalogue(pathologies, disclaimer, path)
+    assert header["count"] == 3
+    compiled, compiled_disclaimer = read_catalogue(path)
+    assert compiled_disclaimer == disclaimer
+    return pathologies, compiled
+
+
+def test_records_round_trip(catalogues):
+    pathologies, compiled = catalogues
+    assert isinstance(compiled, CompiledCatalogue) and len(compiled) == 3
+    assert list(compiled) == pathologies
+    assert compiled[-1] == pathologies[-1]
+    assert compiled[0] is compiled[0]
+    assert compiled[1:] == pathologies[1:]
+    with pytest.raises(IndexError):
+        compiled[3]
+
+
+def test_columns_match_the_json_catalogue(catalogues):
+    pathologies, compiled = catalogues
+    for lang in (None, "en", "ar"):
+        for field in ("name", "symptoms_description"):
+            assert text_column(compiled, field, lang) == text_column(pathologies, field, lang)
+    assert text_column(compiled, "name", "ar")[1] == pathologies[1]["name"]
+    assert fingerprints(compiled) == fingerprints(pathologies)
+    assert entry_fingerprints(compiled) == entry_fingerprints(pathologies)
+    assert page(compiled, 1, 5) == page(pathologies, 1, 5)
+    assert page(compiled, 3, 5) == []
+
+
+@pytest.mark.parametrize("lang", [None, "en", "ar"])
+def test_content_hashes_are_computed_without_decoding(monkeypatch, catalogues, lang):
+    pathologies, compiled = catalogues
+    expected = [content_hash(text) for text in text_column(pathologies, "symptoms_description", lang)]
+    assert content_hashes(indexed_texts(pathologies, "symptoms_description", lang)) == expected
+
+    column = indexed_texts(compiled, "symptoms_description", lang)
+    assert isinstance(column, TextColumn)
+    monkeypatch.setattr(CompiledCatalogue, "text", lambda *args: pytest.fail("texte décodé"))
+    assert content_hashes(column) == expected
+
+
+def test_text_column_decodes_on_demand(catalogues):
+    pathologies, compiled = catalogues
+    column = indexed_texts(compiled, "symptoms_description", "ar")
+    assert len(column) == 3
+    assert column[1] == pathologies[1]["symptoms_description"]
+    assert column[:1] == [pathologies[0]["translations"]["ar"]["symptoms_description"]]
+
+
+def test_invalid_files_are_rejected(tmp_path, catalogues):
+    bad = tmp_path / "bad.dcat"
+    bad.write_bytes(b"pas un catalogue")
+    with pytest.raises(ValueError, match="invalide"):
+        CompiledCatalogue(bad)
+
+    _, compiled = catalogues
+    data = compiled.path.read_bytes().replace(b'"format": 1', b'"format": 9', 1)
+    newer = tmp_path / "newer.dcat"
+    newer.write_bytes(data)
+    with pytest.raises(ValueError, match="recompiler"):
+        CompiledCatalogue(newer)
+
+
+def test_invalid_entries_are_rejected_at_compile_time(tmp_path, catalogues):
+    pathologies, _ = catalogues
+    with pytest.raises(ValueError):
+        compile_catalogue([{**pathologies[0], "severity_level": 9}], "", tmp_path / "x.dcat")
+
+
+def test_service_serves_a_compiled_catalogue(monkeypatch, service, catalogues, encoder):
+    import main
+
+    pathologies, compiled = catalogues
+    monkeypatch.setattr(main.settings, "PATHOLOGIES_PATH", compiled.path)
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    assert service.knowledge_base.compiled
+    assert encoder.calls[-1] == text_column(pathologies, "symptoms_description")
+
+    # Redémarrage : clés du cache lues sur les octets, aucun texte à ré-encoder
+    calls = len(encoder.calls)
+    restarted = main.DoctisAIService()
+    monkeypatch.setattr(main, "doctis_service", restarted)
+    restarted._load_component("pathologies", restarted.load_pathologies)
+    restarted._load_component("sbert", restarted.load_sbert_model)
+    assert restarted.component_status["sbert"] == "ready"
+    assert len(encoder.calls) == calls
+
+    query = "Mal de tête intense et pulsatile, nausées et sensibilité à la lumière"
+    result = restarted.diagnose(query, restarted._embed_query(query), "fr")
+    assert result["pathology"]["id"] == "migraine"
@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+TEXTS = ["fièvre et toux", "mal de tête et nausées", "douleur abdominale"]
+
+
+def encode_with(encoder):
+    return lambda texts: encoder.encode(texts, normalize_embeddings=True)
+
+
+def test_second_start_reads_cache_without_encoding(tmp_path, encoder):
+    first = EmbeddingCache(tmp_path, "model").get_embeddings(TEXTS, encode_with(encoder))
+    assert encoder.encoded_count == 3
+
+    cache = EmbeddingCache(tmp_path, "model")
+    again = cache.get_embeddings(TEXTS, encode_with(encoder))
+    assert encoder.encoded_count == 3
+    assert cache.last_encoded_count == 0
+    assert isinstance(again, np.memmap)
+    np.testing.assert_array_equal(first, again)
+
+
+def test_only_new_or_changed_entries_are_encoded(tmp_path, encoder):
+    EmbeddingCache(tmp_path, "model").get_embeddings(TEXTS, encode_with(encoder))
+    changed = [TEXTS[0], "mal de tête, nausées et photophobie", TEXTS[2], "éruption cutanée"]
+
+    cache = EmbeddingCache(tmp_path, "model")
+    matrix = cache.get_embeddings(changed, encode_with(encoder))
+    assert cache.last_encoded_count == 2
+    assert encoder.calls[-1] == [changed[1], changed[3]]
+    np.testing.assert_allclose(matrix, encoder.encode(changed, normalize_embeddings=True), atol=1e-6)
+
+
+def test_cache_is_separate_per_model(tmp_path, encoder):
+    EmbeddingCache(tmp_path, "model-a").get_embeddings(TEXTS, encode_with(encoder))
+    cache = EmbeddingCache(tmp_path, "model-b")
+    cache.get_embeddings(TEXTS, encode_with(encoder))
+    assert cache.last_encoded_count == 3
+
+
+def test_corrupted_index_triggers_full_reencode(tmp_path, encoder):
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.get_embeddings(TEXTS, encode_with(encoder))
+    cache.index_path.write_text("{not json")
+
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.get_embeddings(TEXTS, encode_with(encoder))
+    assert cache.last_encoded_count == 3
+    assert json.loads(cache.index_path.read_text())["model"] == "model"
+
+
+def test_stale_matrices_are_removed(tmp_path, encoder):
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.get_embeddings(TEXTS, encode_with(encoder))
+    cache.derived("int8", lambda: np.zeros(3, dtype=np.int8))
+    cache.get_embeddings(TEXTS[:2], encode_with(encoder))
+    assert sorted(p.name for p in cache.directory.glob("emb-*.npy")) == [cache.current_file]
+
+
+def test_derived_array_is_built_once(tmp_path, encoder):
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.get_embeddings(TEXTS, encode_with(encoder))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return np.arange(3, dtype=np.int8)
+
+    first = cache.derived("codes", build)
+    second = EmbeddingCache(tmp_path, "model")
+    second.get_embeddings(TEXTS, encode_with(encoder))
+    np.testing.assert_array_equal(second.derived("codes", build), first)
+    assert len(builds) == 1
+
+
+def test_known_hashes_read_only_texts_to_encode(tmp_path, encoder):
+    from embedding_cache import content_hash
+
+    EmbeddingCache(tmp_path, "model").get_embeddings(TEXTS, encode_with(encoder))
+    changed = [TEXTS[0], "éruption cutanée", TEXTS[2]]
+
+    class Texts(list):
+        read = []
+
+        def __getitem__(self, i):
+            self.read.append(i)
+            return super().__getitem__(i)
+
+    cache = EmbeddingCache(tmp_path, "model")
+    cache.get_embeddings(Texts(changed), encode_with(encoder), [content_hash(t) for t in changed])
+    assert Texts.read == [1]
+    assert encoder.calls[-1] == ["éruption cutanée"]
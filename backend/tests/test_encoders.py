@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from encoders import encoder_cache_key, load_encoder
+from vector_index import normalize_rows
+
+MODEL = "all-MiniLM-L6-v2"
+# Cosinus minimal avec les vecteurs PyTorch (comme benchmarks/bench_encoder.py)
+MIN_COSINE = {"onnx": 0.999, "onnx-int8": 0.98}
+
+SYMPTOMS = [
+    "Douleur abdominale intense en bas à droite du ventre, nausées et fièvre légère",
+    "Diarrhée aqueuse fréquente, crampes abdominales et vomissements",
+    "Mal de tête pulsatile d'un seul côté avec sensibilité à la lumière",
+    "Toux sèche, fièvre élevée, courbatures et grande fatigue",
+    "Severe lower right abdominal pain that gets worse when walking",
+    "Pounding headache with nausea, I can't stand bright light",
+    "J'ai mal au ventre",
+    "fièvre",
+]
+
+
+def test_each_backend_has_its_own_cache_key():
+    assert encoder_cache_key(MODEL, "torch") == MODEL
+    assert encoder_cache_key(MODEL, "onnx-int8") == f"{MODEL}@onnx-int8"
+
+
+def test_unknown_backend_or_missing_cache_dir_is_rejected():
+    with pytest.raises(ValueError):
+        load_encoder(MODEL, "tensorrt")
+    with pytest.raises(ValueError):
+        load_encoder(MODEL, "onnx")
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """Vecteurs PyTorch de référence (ignoré sans modèle local ni réseau)."""
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("transformers")
+    pytest.importorskip("sentence_transformers")
+    try:
+        encoder = load_encoder(MODEL, "torch")
+    except OSError as e:
+        pytest.skip(f"Modèle {MODEL} indisponible: {e}")
+    return encoder.encode(SYMPTOMS, normalize_embeddings=True, convert_to_numpy=True)
+
+
+@pytest.mark.parametrize("backend", ["onnx", "onnx-int8"])
+def test_onnx_embeddings_match_pytorch(backend, reference, tmp_path_factory):
+    cache_dir = tmp_path_factory.getbasetemp() / "encoders"
+    encoder = load_encoder(MODEL, backend, cache_dir=cache_dir)
+    vectors = encoder.encode(SYMPTOMS, normalize_embeddings=True, convert_to_numpy=True)
+
+    assert vectors.shape == reference.shape
+    cosines = np.sum(normalize_rows(vectors) * normalize_rows(reference), axis=1)
+    assert cosines.min() >= MIN_COSINE[backend]
+    # Même voisin le plus proche pour chaque texte
+    similarities, expected = vectors @ vectors.T, reference @ reference.T
+    np.fill_diagonal(similarities, -1)
+    np.fill_diagonal(expected, -1)
+    assert np.argmax(similarities, axis=1).tolist() == np.argmax(expected, axis=1).tolist()
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from inference_pool import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, InferencePool, PoolClosedError, QueueFullError, QueueTimeoutError
+)
+
+
+@pytest.fixture
+def gate():
+    """Bloque le worker unique tant que l'évènement n'est pas levé."""
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def occupy(pool, gate):
+    job = pool.submit(lambda model: gate.wait(5))
+    assert job.started.wait(1)
+    return job
+
+
+def test_jobs_run_with_the_worker_model():
+    pool = InferencePool(["modèle"])
+    assert pool.run_sync(lambda model: model.upper()) == "MODÈLE"
+    assert asyncio.run(pool.run(lambda model: len(model))) == 6
+    assert pool.stats()["completed"] == 2
+    pool.shutdown()
+
+
+def test_interactive_jobs_are_served_before_batch(gate):
+    pool = InferencePool(["m"], max_queue_size=4)
+    occupy(pool, gate)
+    order = []
+    batch = pool.submit(lambda model: order.append("batch"), PRIORITY_BATCH)
+    interactive = pool.submit(lambda model: order.append("interactive"), PRIORITY_INTERACTIVE)
+    gate.set()
+    batch.future.result(1)
+    interactive.future.result(1)
+    assert order == ["interactive", "batch"]
+    pool.shutdown()
+
+
+def test_full_queue_is_rejected_with_retry_after(gate):
+    pool = InferencePool(["m"], max_queue_size=1, default_retry_after=7)
+    occupy(pool, gate)
+    pool.submit(lambda model: None)
+    assert pool.is_saturated()
+    with pytest.raises(QueueFullError) as error:
+        pool.submit(lambda model: None)
+    assert error.value.retry_after == 7
+    assert pool.stats()["rejected_queue_full"] == 1
+    pool.shutdown()
+
+
+def test_job_waiting_too_long_is_cancelled(gate):
+    pool = InferencePool(["m"], max_queue_size=2, queue_timeout=0.05)
+    occupy(pool, gate)
+    ran = []
+    with pytest.raises(QueueTimeoutError):
+        pool.run_sync(lambda model: ran.append(1))
+    gate.set()
+    pool.shutdown()
+    assert pool.join(2)
+    assert ran == []
+    assert pool.stats()["rejected_timeout"] == 1
+
+
+def test_job_errors_reach_the_caller():
+    pool = InferencePool(["m"])
+
+    def fail(model):
+        raise ValueError("prompt trop long")
+
+    with pytest.raises(ValueError):
+        pool.run_sync(fail)
+    assert pool.run_sync(lambda model: "ok") == "ok"
+    assert pool.stats()["failed"] == 1
+    pool.shutdown()
+
+
+def test_shutdown_does_not_block_on_a_full_queue(gate):
+    pool = InferencePool(["m"], max_queue_size=1)
+    occupy(pool, gate)
+    queued = pool.submit(lambda model: "servi")
+
+    start = time.monotonic()
+    pool.shutdown()
+    assert time.monotonic() - start < 0.1
+    with pytest.raises(PoolClosedError):
+        pool.submit(lambda model: None)
+
+    # Les jobs déjà en file sont servis avant l'arrêt des workers
+    gate.set()
+    assert queued.future.result(1) == "servi"
+    assert pool.join(2)
+
+
+def test_shutdown_is_idempotent():
+    pool = InferencePool(["a", "b"])
+    pool.shutdown()
+    pool.shutdown()
+    assert pool.join(2)
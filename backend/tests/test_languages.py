@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from languages import detect_language, localized, missing_translations, validate_translations
+
+LANGUAGES = ("fr", "en", "ar")
+ENGLISH_MIGRAINE = "Intense throbbing headache on one side of the head, sensitivity to light and nausea"
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("J'ai mal au ventre depuis hier avec de la fièvre", "fr"),
+    ("I have a headache and fever since yesterday", "en"),
+    ("عندي صداع شديد وغثيان منذ أمس", "ar"),
+    ("Céphalée", "fr"),          # accents : français
+    ("12345 !!", "fr"),          # pas de lettres : langue par défaut
+    ("Migraine", "fr"),          # aucun marqueur : langue par défaut
+])
+def test_detect_language(text, expected):
+    assert detect_language(text, LANGUAGES, "fr") == expected
+
+
+def test_detection_is_restricted_to_served_languages():
+    assert detect_language("عندي صداع شديد", ("fr", "en"), "fr") == "fr"
+    assert detect_language("I have a headache", ("fr",), "fr") == "fr"
+    # Égalité des marqueurs : langue par défaut
+    assert detect_language("pain douleur", ("fr", "en"), "en") == "en"
+
+
+def test_localized_falls_back_to_source_text():
+    pathology = {"id": "p", "name": "Migraine", "translations": {"ar": {"name": "الصداع النصفي"}}}
+    assert localized(pathology, "name", "ar") == "الصداع النصفي"
+    assert localized(pathology, "name", "en") == "Migraine"
+    assert missing_translations([pathology, {"id": "q"}], "ar") == 2
+
+
+@pytest.mark.parametrize("translations", [["en"], {"en": "Migraine"}, {"en": {"name": 3}}])
+def test_malformed_translations_are_rejected(translations):
+    with pytest.raises(ValueError, match="Pathologie p"):
+        validate_translations({"id": "p", "translations": translations})
+
+
+def test_language_base_indexes_translations(service):
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+
+    assert service.load_language("en") == "en"
+    base = service.language_base("en")
+    assert base.language == "en" and base.version == service.knowledge_base.version
+    assert base is service.language_base("en")
+    assert service.language_base("fr") is service.knowledge_base
+
+    query = service.sbert_model.encode([ENGLISH_MIGRAINE], normalize_embeddings=True)
+    _, ids = base.index.search(query, 1)
+    assert base.pathologies[int(ids[0, 0])]["id"] == "migraine"
+
+
+def test_language_base_is_rebuilt_after_reload(service, catalogue_path):
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    before = service.language_base("en")
+
+    data = json.loads(catalogue_path.read_text(encoding="utf-8"))
+    data["pathologies"][0]["translations"]["en"]["symptoms_description"] += " Fever."
+    catalogue_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    service.reload_pathologies()
+
+    # Langue déjà chargée : reconstruite et publiée avec le nouveau catalogue
+    assert service.language_loaded("en")
+    after = service.language_bases["en"]
+    assert after is not before and after.version == service.knowledge_base.version
+    assert after.pathologies[0]["translations"]["en"]["symptoms_description"].endswith("Fever.")
+
+
+def test_diagnose_reports_the_query_language(client):
+    body = client.post("/diagnose", json={"symptoms": ENGLISH_MIGRAINE}).json()
+    assert body["language"] == "en"
+    body = client.post("/diagnose", json={"symptoms": ENGLISH_MIGRAINE, "lang": "ar"}).json()
+    assert body["language"] == "ar"
+
+
+def test_unsupported_language_is_rejected(client):
+    response = client.post("/diagnose", json={"symptoms": ENGLISH_MIGRAINE, "lang": "de"})
+    assert response.status_code == 422
+    assert "Langue non prise en charge" in response.text
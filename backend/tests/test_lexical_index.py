@@ -0,0 +1,123 @@
+import numpy as np
+import pytest
+
+from lexical_index import BM25Index, fuse_scores, tokenize
+
+DOCUMENTS = [
+    "Douleur abdominale dans la fosse iliaque droite, nausées et fièvre",
+    "Mal de tête pulsatile avec photophobie et nausées",
+    "Toux sèche, fièvre élevée et courbatures",
+]
+
+
+def test_tokenize_normalizes_accents_plurals_and_stopwords():
+    assert tokenize("Les nausées et la Fièvre") == ["nausee", "fievre"]
+    assert tokenize("nausée") == tokenize("nausées")
+    assert tokenize("والصداع") == ["صداع"]
+
+
+def test_bm25_ranks_documents_sharing_rare_terms():
+    index = BM25Index(DOCUMENTS)
+    scores = index.scores("photophobie et nausées")
+    assert np.argmax(scores) == 1
+    assert scores[2] == 0
+    # Terme présent partout : idf plus faible qu'un terme rare
+    assert index.scores("nausées")[1] < index.scores("photophobie")[1]
+
+
+def test_unknown_terms_score_zero_and_are_not_returned():
+    index = BM25Index(DOCUMENTS)
+    assert not index.scores("éruption cutanée").any()
+    scores, ids = index.search("fièvre", 3)
+    assert sorted(ids[0].tolist()) == [0, 2]
+    assert np.all(scores > 0)
+
+
+def test_search_scores_reuses_precomputed_scores():
+    index = BM25Index(DOCUMENTS)
+    scores = index.scores("fièvre et nausées")
+    for expected, found in zip(index.search("fièvre et nausées", 2), index.search_scores(scores, 2)):
+        np.testing.assert_array_equal(found, expected)
+    assert index.search_scores(np.zeros(3, dtype=np.float32), 2)[1].shape == (1, 0)
+
+
+def test_postings_match_a_naive_bm25(rng):
+    words = [f"mot{i}" for i in range(30)]
+    texts = [" ".join(rng.choice(words, size=rng.integers(3, 15))) for _ in range(40)]
+    index = BM25Index(texts, k1=1.2, b=0.75)
+    query = "mot1 mot2 mot7"
+
+    tokenized = [tokenize(t) for t in texts]
+    avg = np.mean([len(t) for t in tokenized])
+    expected = np.zeros(len(texts))
+    for term in tokenize(query):
+        df = sum(term in t for t in tokenized)
+        idf = np.log1p((len(texts) - df + 0.5) / (df + 0.5))
+        for doc, terms in enumerate(tokenized):
+            tf = terms.count(term)
+            expected[doc] += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(terms) / avg))
+    np.testing.assert_allclose(index.scores(query), expected, rtol=1e-4)
+
+
+def test_rrf_only_uses_ranks():
+    dense = np.array([0.9, 0.8, 0.1])
+    lexical = np.array([0.0, 5.0, 1.0])
+    fused = fuse_scores(dense, lexical, "rrf", rrf_k=60)
+    np.testing.assert_allclose(fused, [1 / 61, 1 / 62 + 1 / 61, 1 / 63 + 1 / 62])
+    assert np.argmax(fused) == 1
+
+
+def test_weighted_fusion_normalizes_bm25_by_the_best_candidate():
+    dense = np.array([0.6, 0.5])
+    fused = fuse_scores(dense, np.array([2.0, 4.0]), "weighted", lexical_weight=0.5)
+    np.testing.assert_allclose(fused, [0.55, 0.75])
+    np.testing.assert_allclose(fuse_scores(dense, np.zeros(2), "weighted", 0.5), dense * 0.5)
+    with pytest.raises(ValueError):
+        fuse_scores(dense, dense, "borda")
+
+
+@pytest.mark.parametrize("fusion", ["rrf", "weighted"])
+def test_hybrid_retrieval_in_the_service(monkeypatch, service, fusion):
+    import main
+
+    monkeypatch.setattr(main.settings, "RETRIEVAL_FUSION", fusion)
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    assert service.knowledge_base.lexical_index is not None
+
+    query = "Douleur dans la fosse iliaque droite qui s'aggrave à la marche"
+    matches = service.compute_similarity(query, service._embed_query(query), lang="fr")
+    assert matches[0][0]["id"] == "appendicitis"
+
+
+@pytest.fixture
+def hybrid(monkeypatch, service):
+    import main
+
+    monkeypatch.setattr(main.settings, "RETRIEVAL_FUSION", "rrf")
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    index = service.knowledge_base.lexical_index
+    calls = []
+    monkeypatch.setattr(index, "scores", lambda text, scores=index.scores: calls.append(text) or scores(text))
+    return service, calls
+
+
+def test_prefilter_scores_bm25_once_per_query(monkeypatch, hybrid):
+    import main
+
+    service, calls = hybrid
+    monkeypatch.setattr(main.settings, "HYBRID_PREFILTER_MIN_SIZE", 0)
+    query = "Douleur dans la fosse iliaque droite qui s'aggrave à la marche"
+    matches = service.compute_similarity(query, service._embed_query(query), lang="fr")
+    assert matches[0][0]["id"] == "appendicitis"
+    assert calls == [query]
+
+
+def test_queries_without_common_terms_keep_the_dense_ranking(hybrid):
+    service, _ = hybrid
+    query = "xyzzy plugh"
+    embedding = service._embed_query(query)
+    matches = service.compute_similarity(query, embedding, lang="fr")
+    scores, ids = service.knowledge_base.index.search(embedding, len(matches))
+    assert [m[0]["id"] for m in matches] == [service.knowledge_base.pathologies[i]["id"] for i in ids[0]]
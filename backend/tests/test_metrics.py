@@ -0,0 +1,81 @@
+from metrics import Histogram, Metrics, RequestTimings, process_rss_bytes
+
+MIGRAINE = "Mal de tête intense et pulsatile, d'un seul côté, avec nausées et sensibilité à la lumière"
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latence", "Latence", (0.1, 1.0), label="stage")
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "encode")
+    lines = histogram.render()
+    assert 'latence_bucket{stage="encode",le="0.1"} 1' in lines
+    assert 'latence_bucket{stage="encode",le="1.0"} 3' in lines
+    assert 'latence_bucket{stage="encode",le="+Inf"} 4' in lines
+    assert 'latence_count{stage="encode"} 4' in lines
+
+
+def test_stage_feeds_histogram_and_request_timings():
+    metrics = Metrics("test")
+    token = metrics.start_request()
+    with metrics.stage("search"):
+        pass
+    timings = metrics.current_timings()
+    metrics.finish_request(token)
+
+    assert [stage for stage, _ in timings.stages] == ["search"]
+    assert timings.header().startswith("search;dur=") and "total;dur=" in timings.header()
+    assert 'test_stage_seconds_count{stage="search"} 1' in metrics.render()
+    assert metrics.current_timings() is None
+
+
+def test_counters_gauges_and_label_escaping():
+    metrics = Metrics("test")
+    metrics.inc("requests_total", "Requêtes", {"route": "/diagnose", "status": 200})
+    metrics.inc("requests_total", "Requêtes", {"route": "/diagnose", "status": 200})
+    metrics.gauge("queue", "File", lambda: 3)
+    metrics.gauge("hits", "Succès", lambda: {"exact": 2, 'a"b': 1, "absent": None}, label="kind", kind="counter")
+    metrics.gauge("missing", "Absente", lambda: None)
+    metrics.gauge("broken", "En erreur", lambda: 1 / 0)
+
+    text = metrics.render()
+    assert 'test_requests_total{route="/diagnose",status="200"} 2' in text
+    assert "test_queue 3.0" in text
+    assert "# TYPE test_hits counter" in text
+    assert 'test_hits{kind="a\\"b"} 1.0' in text and "absent" not in text
+    assert "test_missing" not in text and "test_broken" not in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics("test", enabled=False)
+    assert metrics.start_request() is None
+    with metrics.stage("encode"):
+        pass
+    metrics.inc("requests_total", "Requêtes")
+    metrics.observe_tokens_per_second(10, 1.0)
+    assert "test_stage_seconds_count" not in metrics.render()
+    assert "requests_total" not in metrics.render()
+
+
+def test_explicit_timings_reach_worker_threads():
+    metrics = Metrics("test")
+    timings = RequestTimings()
+    metrics.observe("llm_generation", 0.2, timings)
+    metrics.observe_tokens_per_second(20, 1.0)
+    assert timings.stages == [("llm_generation", 0.2)]
+    assert "test_llm_tokens_per_second_count 1" in metrics.render()
+
+
+def test_process_rss_is_positive():
+    assert process_rss_bytes() > 0
+
+
+def test_metrics_endpoint_and_server_timing_header(client):
+    response = client.post("/diagnose", json={"symptoms": MIGRAINE, "lang": "fr"}, headers={"X-Timing": "1"})
+    assert response.status_code == 200
+    stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    assert {"validation", "encode", "search", "total"} <= set(stages)
+
+    text = client.get("/metrics").text
+    assert 'doctis_http_requests_total{route="/diagnose",status="200"}' in text
+    assert 'doctis_stage_seconds_count{stage="encode"}' in text
+    assert "doctis_pathologies 3.0" in text
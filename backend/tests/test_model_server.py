@@ -0,0 +1,96 @@
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import model_server
+from model_server import KEY_ENV, ModelServer, RemoteEncoder, parse_address
+
+
+@pytest.fixture
+def address(tmp_path, monkeypatch):
+    monkeypatch.delenv(KEY_ENV, raising=False)
+    return str(tmp_path / "models.sock")
+
+
+@pytest.fixture
+def start_server(monkeypatch, encoder):
+    """Lance un `ModelServer` (WordEncoder) dans un thread ; arrêté en fin de test."""
+    monkeypatch.setattr(model_server, "load_encoder", lambda model_name, backend, **kwargs: encoder)
+    servers = []
+
+    def start(address):
+        server = ModelServer(address, max_wait_ms=20)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(address):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        servers.append((server, thread))
+        return server, thread
+
+    yield start
+    for server, thread in servers:
+        server.shutdown()
+        thread.join(5)
+
+
+def test_parse_address():
+    assert parse_address("/tmp/doctis.sock") == "/tmp/doctis.sock"
+    assert parse_address("127.0.0.1:7071") == ("127.0.0.1", 7071)
+
+
+def test_remote_encoder_matches_local_encoder(address, start_server, encoder):
+    start_server(address)
+    remote = RemoteEncoder(address, "model", timeout=5)
+    assert remote.get_sentence_embedding_dimension() == encoder.dim
+
+    texts = ["fièvre et toux", "mal de tête"]
+    np.testing.assert_allclose(
+        remote.encode(texts, normalize_embeddings=True), encoder.encode(texts, normalize_embeddings=True)
+    )
+    assert remote.encode("fièvre").shape == (encoder.dim,)
+
+
+def test_concurrent_requests_share_batches(address, start_server, encoder):
+    start_server(address)
+    remote = RemoteEncoder(address, "model", timeout=5)
+    calls_before = len(encoder.calls)
+    with ThreadPoolExecutor(8) as executor:
+        vectors = list(executor.map(remote.encode, [f"symptôme {i}" for i in range(8)]))
+    assert len(vectors) == 8
+    assert len(encoder.calls) - calls_before < 8
+
+
+def test_key_file_is_private_and_removed_on_exit(address, start_server):
+    server, thread = start_server(address)
+    key_path = model_server._key_path(address)
+    assert stat.S_IMODE(key_path.stat().st_mode) == 0o600
+    assert [p.name for p in key_path.parent.iterdir() if p.name.endswith(".tmp")] == []
+
+    server.shutdown()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not key_path.exists()
+
+
+def test_client_rereads_a_stale_key(address, start_server):
+    start_server(address)
+    key_path = model_server._key_path(address)
+    current = key_path.read_bytes()
+    key_path.write_bytes(b"cle-d-une-execution-precedente")
+    # La clé correcte arrive pendant que le client réessaie
+    threading.Timer(0.3, key_path.write_bytes, args=(current,)).start()
+
+    remote = RemoteEncoder(address, "model", timeout=5)
+    assert remote.dim > 0
+
+
+def test_unreachable_server_times_out(address):
+    with pytest.raises(ConnectionError, match="injoignable"):
+        RemoteEncoder(address, "model", timeout=0.3)
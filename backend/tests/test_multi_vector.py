@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from multi_vector import MultiVectorIndex, fragment_layout, split_fragments, text_fragments
+from vector_index import normalize_rows
+
+
+def test_text_is_split_on_punctuation_and_conjunctions():
+    assert split_fragments("Fièvre, toux sèche et fatigue. Maux de tête") == [
+        "Fièvre", "toux sèche", "fatigue", "Maux de tête"
+    ]
+    assert split_fragments("ok") == ["ok"]
+
+
+def test_whole_text_comes_first_and_lists_are_joined():
+    assert text_fragments("fièvre et toux") == ["fièvre et toux", "fièvre", "toux"]
+    assert text_fragments("fièvre") == ["fièvre"]
+    assert text_fragments(["nausea", " ", "vomiting"]) == ["nausea, vomiting", "nausea", "vomiting"]
+
+
+def test_layout_groups_fragments_by_document():
+    texts, owners = fragment_layout(["fièvre et toux", "migraine", ["nausea", "vomiting"]])
+    assert len(texts) == 7
+    assert owners.tolist() == [0, 0, 0, 1, 2, 2, 2]
+
+
+def test_owners_must_be_contiguous():
+    with pytest.raises(ValueError):
+        MultiVectorIndex(np.eye(3), [0, 1, 0])
+    with pytest.raises(ValueError):
+        MultiVectorIndex(np.eye(3), [0, 1])
+    with pytest.raises(ValueError):
+        MultiVectorIndex(np.eye(2), [0, 1], aggregation="sum")
+
+
+def test_document_score_is_its_best_fragment():
+    # Document 0 : fragments e0 et e1 ; document 1 : e2
+    index = MultiVectorIndex(np.eye(3), [0, 0, 1])
+    scores, ids = index.search(np.array([0.0, 1.0, 0.2]), 2)
+    assert ids[0].tolist() == [0, 1]
+    np.testing.assert_allclose(scores[0], normalize_rows(np.array([[1.0, 0.2]]))[0], rtol=1e-6)
+    assert len(index) == 2
+    np.testing.assert_array_equal(index.document_vectors(), np.eye(3)[[0, 2]])
+
+
+def test_mean_rewards_documents_covering_every_symptom():
+    # Document 0 couvre e0 et e1, document 1 seulement e0 (parfaitement)
+    vectors = np.array([[1, 0, 0], [0, 1, 0], [1, 0, 0]], dtype=np.float32)
+    query = np.array([[1, 0, 0], [0, 1, 0]], dtype=np.float32)
+
+    mean_scores, mean_ids = MultiVectorIndex(vectors, [0, 0, 1], aggregation="mean").search(query, 2)
+    assert mean_ids[0].tolist() == [0, 1]
+    np.testing.assert_allclose(mean_scores[0], [1.0, 0.5])
+
+    max_scores, _ = MultiVectorIndex(vectors, [0, 0, 1], aggregation="max").search(query, 2)
+    np.testing.assert_allclose(max_scores[0], [1.0, 1.0])
+
+
+def test_several_queries_share_one_search_with_offsets(rng):
+    vectors = rng.normal(size=(12, 8))
+    owners = np.repeat(np.arange(4), 3)
+    index = MultiVectorIndex(vectors, owners)
+    first, second = rng.normal(size=(2, 8)), rng.normal(size=(3, 8))
+
+    scores, ids = index.search(np.vstack([first, second]), 2, offsets=[0, 2])
+    for row, query in enumerate((first, second)):
+        expected_scores, expected_ids = index.search(query, 2)
+        assert ids[row].tolist() == expected_ids[0].tolist()
+        np.testing.assert_allclose(scores[row], expected_scores[0], rtol=1e-5)
+
+
+def test_empty_index_returns_no_result():
+    scores, ids = MultiVectorIndex(np.empty((0, 4)), []).search(np.ones(4), 3)
+    assert ids.shape == (1, 0)
+
+
+def test_service_in_multi_vector_mode(monkeypatch, service):
+    import main
+
+    monkeypatch.setattr(main.settings, "RETRIEVAL_MODE", "multi")
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    assert service.vector_index.kind == "multi"
+
+    query = "Mal de tête intense et pulsatile. Nausées, sensibilité à la lumière"
+    result = service.diagnose(query, service._embed_query(query), "fr")
+    assert result["pathology"]["id"] == "migraine"
+
+
+def test_compact_storage_is_refused_in_multi_vector_mode(monkeypatch, service):
+    import main
+
+    monkeypatch.setattr(main.settings, "RETRIEVAL_MODE", "multi")
+    monkeypatch.setattr(main.settings, "EMBEDDING_STORAGE", "int8")
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    assert service.component_status["sbert"] == "failed"
+    assert "indisponible en mode multi-vecteurs" in service.component_errors["sbert"]
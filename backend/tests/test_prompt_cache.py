@@ -0,0 +1,80 @@
+import numpy as np
+
+from prompt_cache import PromptPrefixCache
+
+
+class StatefulLlama:
+    """Contexte llama.cpp minimal : tokens évalués, sauvegarde / restauration."""
+
+    def __init__(self):
+        self.input_ids = np.zeros(0, dtype=np.intc)
+        self.evaluated = 0
+        self.loads = 0
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self.input_ids)
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> list[int]:
+        return [1] * add_bos + [byte for byte in text]
+
+    def reset(self) -> None:
+        self.input_ids = np.zeros(0, dtype=np.intc)
+
+    def eval(self, tokens) -> None:
+        self.evaluated += len(tokens)
+        self.input_ids = np.concatenate([self.input_ids, np.asarray(tokens, dtype=np.intc)])
+
+    def save_state(self):
+        return self.input_ids.copy()
+
+    def load_state(self, state) -> None:
+        self.loads += 1
+        self.input_ids = state.copy()
+
+
+def test_prefix_is_evaluated_once_per_model():
+    cache = PromptPrefixCache("<|system|>Tu es un assistant médical.")
+    model = StatefulLlama()
+    n = cache.prepare(model)
+    assert n == len(cache.tokens) == model.evaluated
+    assert model.input_ids.tolist() == cache.tokens.tolist()
+
+
+def test_context_starting_with_the_prefix_is_kept():
+    cache = PromptPrefixCache("système")
+    model = StatefulLlama()
+    cache.prepare(model)
+    model.eval(model.tokenize(b"patient", add_bos=False))
+
+    cache.restore(model)
+    assert model.loads == 0 and cache.restores == 0
+
+
+def test_foreign_context_is_replaced_by_the_saved_prefix():
+    cache = PromptPrefixCache("système")
+    model = StatefulLlama()
+    cache.prepare(model)
+    model.reset()
+    model.eval(model.tokenize(b"autre prompt"))
+
+    cache.restore(model)
+    assert cache.restores == 1
+    assert model.input_ids.tolist() == cache.tokens.tolist()
+
+
+def test_unprepared_model_is_left_untouched():
+    cache = PromptPrefixCache("système")
+    prepared, other = StatefulLlama(), StatefulLlama()
+    cache.prepare(prepared)
+    cache.restore(other)
+    assert other.loads == 0 and other.n_tokens == 0
+
+
+def test_prompts_start_with_the_cached_prefix(service):
+    from main import PROMPT_PREFIX
+
+    service._load_component("pathologies", service.load_pathologies)
+    prompt = service._build_prompt(service.pathologies[0], 0.8)
+    assert prompt.startswith(PROMPT_PREFIX)
+    assert prompt != service._build_prompt(service.pathologies[1], 0.8)
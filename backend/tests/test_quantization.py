@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import quantization
+from quantization import CompactMatrix, QuantizedIndex, build_index, compact_matrix
+from vector_index import ExactIndex, normalize_rows
+
+
+@pytest.fixture
+def vectors(rng):
+    return normalize_rows(rng.standard_normal((500, 64)).astype(np.float32))
+
+
+@pytest.fixture
+def queries(rng, vectors):
+    return normalize_rows(vectors[:20] + 0.1 * rng.standard_normal((20, 64)).astype(np.float32))
+
+
+@pytest.mark.parametrize("storage, atol", [("float16", 1e-3), ("int8", 2e-2)])
+def test_compact_scores_approximate_exact_scores(vectors, queries, storage, atol):
+    np.testing.assert_allclose(compact_matrix(vectors, storage).scores(queries), queries @ vectors.T, atol=atol)
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8"])
+def test_dense_copy_gives_the_chunked_scores(monkeypatch, vectors, queries, storage):
+    dense = compact_matrix(vectors, storage)
+    assert dense.dense is not None
+    assert dense.nbytes >= vectors.nbytes
+
+    monkeypatch.setattr(quantization, "DENSE_CACHE_BYTES", 0)
+    monkeypatch.setattr(quantization, "_SCORE_CHUNK_ROWS", 128)
+    chunked = compact_matrix(vectors, storage)
+    assert chunked.dense is None
+    assert chunked.nbytes < vectors.nbytes
+    np.testing.assert_allclose(dense.scores(queries), chunked.scores(queries), atol=1e-5)
+
+
+def test_binary_scores_estimate_cosine_from_hamming(vectors):
+    binary = compact_matrix(vectors, "binary")
+    assert binary.dense is None and binary.codes.shape == (500, 8)
+    scores = binary.scores(vectors[:3])
+    np.testing.assert_allclose(scores[np.arange(3), np.arange(3)], 1.0)
+    np.testing.assert_allclose(binary.scores(-vectors[:1])[0, 0], -1.0)
+
+
+@pytest.mark.parametrize("storage", ["float16", "int8", "binary"])
+def test_rescoring_restores_the_exact_top_k(vectors, queries, storage):
+    index = build_index("exact", vectors, storage, rescore=100)
+    assert isinstance(index, QuantizedIndex) and index.kind == f"exact-{storage}"
+    exact_scores, exact_ids = ExactIndex(vectors, normalized=True).search(queries, 5)
+    scores, ids = index.search(queries, 5)
+    np.testing.assert_array_equal(ids[:, 0], exact_ids[:, 0])
+    np.testing.assert_allclose(scores[:, 0], exact_scores[:, 0], rtol=1e-5)
+
+
+def test_invalid_storage_combinations_are_rejected(vectors):
+    with pytest.raises(ValueError, match="inconnu"):
+        build_index("exact", vectors, "int4")
+    with pytest.raises(ValueError, match="index exact uniquement"):
+        build_index("ivf", vectors, "int8")
+    with pytest.raises(ValueError):
+        CompactMatrix("float32", vectors, vectors.shape[1])
+    assert not isinstance(build_index("exact", vectors, "float32"), QuantizedIndex)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import main
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def loaded(service):
+    service._load_component("pathologies", service.load_pathologies)
+    service._load_component("sbert", service.load_sbert_model)
+    return service
+
+
+def edit_catalogue(path, edit):
+    data = json.loads(path.read_text(encoding="utf-8"))
+    edit(data["pathologies"])
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def test_unchanged_catalogue_is_not_rebuilt(loaded):
+    version = loaded.knowledge_base.version
+    assert loaded.reload_pathologies()["reloaded"] is False
+    assert loaded.knowledge_base.version == version
+
+
+def test_only_changed_symptoms_are_reencoded(loaded, catalogue_path, encoder):
+    def edit(pathologies):
+        pathologies[0]["advice"] = "Nouveau conseil."
+        pathologies[1]["symptoms_description"] += " Crampes."
+        pathologies.append({**pathologies[2], "id": "cephalee", "symptoms_description": "Céphalée de tension."})
+
+    edit_catalogue(catalogue_path, edit)
+    before = encoder.encoded_count
+    result = loaded.reload_pathologies()
+
+    assert (result["added"], result["removed"], result["modified"], result["symptoms_changed"]) == (1, 0, 2, 1)
+    assert result["reencoded"] == encoder.encoded_count - before == 2
+    assert len(loaded.pathologies) == 4
+    assert loaded.pathologies[0]["advice"] == "Nouveau conseil."
+
+
+def test_invalid_catalogue_keeps_the_served_snapshot(loaded, catalogue_path):
+    served = loaded.knowledge_base
+    catalogue_path.write_text("{pas du json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        loaded.reload_pathologies()
+    assert loaded.knowledge_base is served
+
+
+def test_reload_invalidates_cached_answers_of_changed_pathologies(loaded, catalogue_path, tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3")
+    cache.sync_catalogue(main.entry_fingerprints(loaded.pathologies))
+    loaded.response_cache = cache
+    for pathology in loaded.pathologies:
+        cache.put(pathology["id"], 0.8, "fr", f"réponse {pathology['id']}")
+
+    def edit(pathologies):
+        pathologies[0]["advice"] = "Consultez en urgence."
+        del pathologies[1]
+
+    edit_catalogue(catalogue_path, edit)
+    result = loaded.reload_pathologies()
+
+    assert result["responses_invalidated"] == 2
+    assert cache.get("appendicitis", 0.8, "fr") is None
+    assert cache.get("gastroenteritis", 0.8, "fr") is None
+    assert cache.get("migraine", 0.8, "fr") == "réponse migraine"
+
+
+def test_admin_reload_endpoint(client, catalogue_path, monkeypatch):
+    monkeypatch.setattr(main.settings, "ADMIN_TOKEN", "secret")
+    assert client.post("/admin/reload").status_code == 403
+
+    edit_catalogue(catalogue_path, lambda pathologies: pathologies.pop())
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["removed"] == 1
+    assert client.get("/health").json()["models_loaded"]["pathologies_count"] == 2
+
+
+def test_ivf_index_accepts_an_empty_catalogue(loaded, catalogue_path, monkeypatch):
+    monkeypatch.setattr(main.settings, "VECTOR_INDEX", "ivf")
+    edit_catalogue(catalogue_path, lambda pathologies: pathologies.clear())
+    assert loaded.reload_pathologies()["removed"] == 3
+    assert len(loaded.knowledge_base.index) == 0
+    assert loaded.find_best_match("Mal de tête et nausées", lang="fr")[0] is None
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+import pytest
+
+import main
+from reranker import CrossEncoderReranker, normalize_query, query_key
+
+MIGRAINE = "Mal de tête intense et pulsatile, d'un seul côté, avec nausées et sensibilité à la lumière"
+CANDIDATES = [("a", "fièvre et toux"), ("b", "mal de tête"), ("c", "douleur abdominale")]
+
+
+class FakeCrossEncoder:
+    """Cross-encoder factice : score = rang inversé du candidat, passe bloquable."""
+
+    def __init__(self, logits: int = 1):
+        self.logits = logits
+        self.calls: list[list[tuple[str, str]]] = []
+        self.release = threading.Event()
+        self.release.set()
+        self.error = None
+
+    def predict(self, pairs, **kwargs):
+        self.calls.append(list(pairs))
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        scores = np.arange(len(pairs), dtype=np.float32)
+        return np.stack([-scores, scores], axis=1) if self.logits == 2 else scores
+
+
+def make_reranker(model: FakeCrossEncoder, **options) -> CrossEncoderReranker:
+    return CrossEncoderReranker("fake", loader=lambda name: model, **options)
+
+
+def test_query_key_ignores_case_spacing_and_unicode_forms():
+    assert normalize_query("  Mal  de\tTÊTE ") == "mal de tête"
+    assert query_key("Mal de tête") == query_key("mal  de tête")
+    assert query_key("mal de tête") != query_key("mal de dos")
+
+
+def test_scores_come_from_one_pass_then_from_the_cache():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model)
+    np.testing.assert_array_equal(reranker.rerank("Mal de tête", CANDIDATES), [0, 1, 2])
+    assert model.calls == [[("Mal de tête", text) for _, text in CANDIDATES]]
+
+    np.testing.assert_array_equal(reranker.rerank("mal  DE tête", CANDIDATES[::-1]), [2, 1, 0])
+    assert len(model.calls) == 1
+    stats = reranker.stats()
+    assert stats["reranked"] == 2 and stats["cache_entries"] == 3 and stats["cache_hit_rate"] == 0.5
+
+
+def test_only_uncached_candidates_are_scored():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model)
+    reranker.rerank("fièvre", CANDIDATES[:2])
+    scores = reranker.rerank("fièvre", CANDIDATES)
+    assert model.calls[-1] == [("fièvre", "douleur abdominale")]
+    np.testing.assert_array_equal(scores, [0, 1, 0])
+
+
+def test_two_class_models_use_the_relevant_logit():
+    reranker = make_reranker(FakeCrossEncoder(logits=2))
+    np.testing.assert_array_equal(reranker.rerank("toux", CANDIDATES), [0, 1, 2])
+
+
+def test_budget_overrun_returns_none_and_the_pass_still_fills_the_cache():
+    model = FakeCrossEncoder()
+    model.release.clear()
+    reranker = make_reranker(model, budget_ms=20)
+    assert reranker.rerank("toux", CANDIDATES) is None
+    assert reranker.stats()["timeouts"] == 1
+
+    model.release.set()
+    reranker._pending.result(timeout=5)
+    assert reranker.rerank("toux", CANDIDATES) is not None
+    assert len(model.calls) == 1
+
+
+def test_requests_never_queue_behind_a_pending_pass():
+    model = FakeCrossEncoder()
+    model.release.clear()
+    reranker = make_reranker(model, budget_ms=20)
+    reranker.rerank("toux", CANDIDATES)
+    assert reranker.rerank("fièvre", CANDIDATES) is None
+    assert reranker.stats()["skipped"] == 1
+    assert len(model.calls) == 1
+    model.release.set()
+
+
+def test_model_errors_fall_back_to_none():
+    model = FakeCrossEncoder()
+    model.error = RuntimeError("boom")
+    reranker = make_reranker(model)
+    assert reranker.rerank("toux", CANDIDATES) is None
+    assert reranker.stats()["errors"] == 1 and reranker.stats()["cache_entries"] == 0
+
+
+def test_cache_is_bounded_and_cleared():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model, cache_size=4)
+    reranker.rerank("toux", CANDIDATES)
+    reranker.rerank("fièvre", CANDIDATES)
+    assert reranker.stats()["cache_entries"] == 4
+
+    reranker.clear()
+    assert reranker.stats()["cache_entries"] == 0
+    reranker.rerank("fièvre", CANDIDATES)
+    assert len(model.calls) == 3
+
+
+def test_pass_started_before_clear_does_not_fill_the_cache():
+    model = FakeCrossEncoder()
+    model.release.clear()
+    reranker = make_reranker(model, budget_ms=20)
+    assert reranker.rerank("toux", CANDIDATES) is None
+
+    reranker.clear()
+    model.release.set()
+    reranker._pending.result(timeout=5)
+    assert reranker.stats()["cache_entries"] == 0
+    assert reranker.rerank("toux", CANDIDATES) is not None
+    assert len(model.calls) == 2
+
+
+def test_model_is_loaded_once_by_warm_up():
+    loads = []
+    reranker = CrossEncoderReranker("fake", loader=lambda name: loads.append(name) or FakeCrossEncoder())
+    assert not reranker.loaded
+    reranker.warm_up()
+    reranker.rerank("toux", CANDIDATES)
+    assert loads == ["fake"] and reranker.stats()["loaded"]
+
+
+@pytest.fixture
+def reranked(service, monkeypatch):
+    """Reranker factice qui inverse l'ordre du bi-encodeur ; tous les candidats passent le seuil."""
+    monkeypatch.setattr(main.settings, "SIMILARITY_THRESHOLD", -1.0)
+    service.reranker = make_reranker(FakeCrossEncoder())
+    return service
+
+
+def test_batch_and_single_diagnosis_apply_the_same_reranking(reranked):
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        single = client.post("/diagnose", json={"symptoms": MIGRAINE, "lang": "fr"}).json()
+        batch = reranked.diagnose_records([{"id": 1, "symptoms": MIGRAINE, "lang": "fr"}])[0]
+
+    matches = reranked.compute_similarity(MIGRAINE, top_k=main.settings.RERANK_TOP_K, lang="fr")
+    expected = matches[-1][0]["id"]
+    assert len(matches) > 1
+    assert single["pathology"]["id"] == batch["pathology"]["id"] == expected != matches[0][0]["id"]
+    assert reranked.reranker.stats()["reranked"] == 2
+
+
+def test_edited_pathology_text_is_rescored_after_a_reload(reranked, catalogue_path):
+    import json
+
+    reranked._load_component("pathologies", reranked.load_pathologies)
+    reranked._load_component("sbert", reranked.load_sbert_model)
+    model = reranked.reranker._load()
+    reranked.find_best_match(MIGRAINE, lang="fr")
+    passes = len(model.calls)
+
+    data = json.loads(catalogue_path.read_text(encoding="utf-8"))
+    for pathology in data["pathologies"]:
+        pathology["name"] += " (révisé)"
+    catalogue_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    reranked.reload_pathologies()
+
+    reranked.find_best_match(MIGRAINE, lang="fr")
+    assert len(model.calls) == passes + 1
+    assert all("(révisé)" in text for _, text in model.calls[-1])
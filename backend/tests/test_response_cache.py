@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(tmp_path / "responses.sqlite3", similarity_threshold=0.9)
+
+
+def unit(*values):
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_exact_key_is_pathology_bucket_and_language(cache):
+    cache.put("migraine", 0.73, "fr", "réponse")
+    assert cache.get("migraine", 0.71, "fr") == "réponse"
+    assert cache.get("migraine", 0.81, "fr") is None
+    assert cache.get("migraine", 0.73, "en") is None
+    assert cache.get("grippe", 0.73, "fr") is None
+    assert cache.stats()["hits_exact"] == 1
+
+
+def test_semantic_fallback_requires_similar_query(cache):
+    cache.put("migraine", 0.73, "fr", "réponse", unit(1, 0, 0))
+    assert cache.get("migraine", 0.55, "fr", unit(1, 0.1, 0)) == "réponse"
+    assert cache.get("migraine", 0.55, "fr", unit(0, 1, 0)) is None
+    # Jamais d'une pathologie ou d'une langue à l'autre
+    assert cache.get("grippe", 0.55, "fr", unit(1, 0, 0)) is None
+    assert cache.get("migraine", 0.55, "ar", unit(1, 0, 0)) is None
+    assert cache.stats()["hits_semantic"] == 1
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", ttl_seconds=-1)
+    cache.put("migraine", 0.7, "fr", "périmée")
+    assert cache.get("migraine", 0.7, "fr") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite3", max_entries=2)
+    cache.put("a", 0.5, "fr", "A")
+    cache.put("b", 0.5, "fr", "B")
+    cache.get("a", 0.5, "fr")
+    cache.put("c", 0.5, "fr", "C")
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b", 0.5, "fr") is None
+    assert cache.get("a", 0.5, "fr") == "A"
+
+
+def test_cache_is_shared_through_the_database_file(tmp_path):
+    ResponseCache(tmp_path / "responses.sqlite3").put("migraine", 0.7, "fr", "partagée")
+    assert ResponseCache(tmp_path / "responses.sqlite3").get("migraine", 0.7, "fr") == "partagée"
+
+
+def test_sync_drops_answers_of_modified_and_removed_pathologies(cache):
+    cache.sync_catalogue({"migraine": 1, "grippe": 2, "angine": 3})
+    for pathology_id in ("migraine", "grippe", "angine"):
+        cache.put(pathology_id, 0.7, "fr", pathology_id)
+
+    assert cache.sync_catalogue({"migraine": 1, "grippe": 20}) == 2
+    assert cache.get("migraine", 0.7, "fr") == "migraine"
+    assert cache.get("grippe", 0.7, "fr") is None
+    assert cache.get("angine", 0.7, "fr") is None
+
+
+def test_sync_detects_changes_made_before_a_restart(tmp_path):
+    path = tmp_path / "responses.sqlite3"
+    first = ResponseCache(path)
+    first.sync_catalogue({"migraine": 1})
+    first.put("migraine", 0.7, "fr", "ancienne")
+
+    restarted = ResponseCache(path)
+    assert restarted.sync_catalogue({"migraine": 2}) == 1
+    assert restarted.get("migraine", 0.7, "fr") is None
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import responses
+from responses import FastJSONResponse, PathologyResponses, build_responses, diagnosis_payload, dumps
+
+PATHOLOGY = {
+    "id": "migraine",
+    "name": "Migraine",
+    "severity_level": 2,
+    "urgency": "Non urgent",
+    "advice": "Reposez-vous dans le noir.",
+    "specialist": "Neurologue",
+}
+
+
+def test_template_splices_the_confidence_percentage():
+    text = PathologyResponses(PATHOLOGY).template(0.874)
+    assert "possible **Migraine** avec un niveau de confiance de 87%." in text
+    assert responses.SEVERITY_MESSAGES[2] in text
+    assert "**Recommandation :** Reposez-vous dans le noir." in text
+    assert text.endswith(responses.TEMPLATE_FOOTER)
+
+
+def test_match_follows_the_pathology_match_schema():
+    from main import PathologyMatch
+
+    match = PathologyResponses(PATHOLOGY).match(0.87654)
+    assert match["confidence_score"] == 0.877
+    assert list(match) == list(PathologyMatch.model_fields)
+    assert PathologyMatch(**match).model_dump() == match
+
+
+@pytest.mark.parametrize("change", [
+    {"severity_level": 0}, {"severity_level": 6}, {"severity_level": "3"}, {"advice": None},
+])
+def test_invalid_entries_are_rejected(change):
+    with pytest.raises(ValueError, match="migraine"):
+        build_responses([{**PATHOLOGY, **change}])
+
+
+def test_build_responses_indexes_by_id():
+    other = {**PATHOLOGY, "id": "cephalee", "name": "Céphalée"}
+    built = build_responses([PATHOLOGY, other])
+    assert list(built) == ["migraine", "cephalee"]
+    assert built["cephalee"].pathology is other
+
+
+def test_dumps_is_compact_utf8_with_or_without_orjson(monkeypatch):
+    payload = {"name": "Céphalée", "score": 0.5, "tags": [1, None]}
+    expected = '{"name":"Céphalée","score":0.5,"tags":[1,null]}'.encode("utf-8")
+    assert dumps(payload) == expected
+    monkeypatch.setattr(responses, "ORJSON_AVAILABLE", False)
+    assert dumps(payload) == expected
+
+
+def test_fast_json_response_renders_payload():
+    payload = diagnosis_payload("Avertissement", "Réponse", pathology=PathologyResponses(PATHOLOGY).match(0.9))
+    response = FastJSONResponse(payload)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == payload
+    assert list(payload) == ["success", "matched", "pathology", "ai_response", "disclaimer"]
+
+
+def test_degraded_diagnosis_uses_the_template(client):
+    response = client.post("/diagnose", json={"symptoms": "Mal de tête pulsatile avec nausées et sensibilité à la lumière"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["matched"] is True
+    assert body["ai_response"].startswith(f"D'après l'analyse de vos symptômes, je détecte une possible **{body['pathology']['name']}**")
+    assert body["ai_response"].endswith(responses.TEMPLATE_FOOTER)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from sessions import Session, SessionStore
+
+MIGRAINE_TURNS = ["J'ai mal à la tête d'un seul côté", "avec des nausées", "et la lumière me gêne beaucoup"]
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_aggregates_match_a_recomputation_over_the_window():
+    catalogue = np.eye(3, dtype=np.float32)
+    lexical = {"a": np.array([1.0, 0, 0]), "b": np.array([0, 2.0, 0]), "c": np.array([0, 0, 3.0])}
+    session = Session("s", "fr", max_turns=2)
+    vectors = {"a": unit(1, 0, 0), "b": unit(1, 1, 0), "c": unit(0, 1, 1)}
+    for text in ("a", "b", "c"):
+        session.add_turn(text, vectors[text], catalogue.__matmul__, lexical.__getitem__)
+
+    # Tour « a » sorti de la fenêtre : soustrait des sommes
+    assert session.texts == ["b", "c"] and len(session) == 2
+    total = vectors["b"] + vectors["c"]
+    np.testing.assert_allclose(session.query_vector(), total / np.linalg.norm(total), atol=1e-6)
+    np.testing.assert_allclose(session.dense_scores(), catalogue @ (total / np.linalg.norm(total)), atol=1e-6)
+    np.testing.assert_allclose(session.lexical, [0, 2, 3])
+
+
+def test_rebase_recomputes_scores_without_reencoding():
+    session = Session("s", "fr")
+    session.add_turn("a", unit(1, 1, 0), np.eye(3).__matmul__)
+    session.rebase(2, np.eye(3)[:2].__matmul__, lambda text: np.ones(2))
+    assert session.version == 2
+    assert session.scores.shape == (2,) and session.lexical.tolist() == [1, 1]
+    session.rebase(3)
+    assert session.scores is None and session.lexical is None
+
+
+def test_sessions_expire_after_ttl():
+    store = SessionStore(ttl_seconds=60)
+    session = store.create("fr")
+    assert store.get(session.id) is session
+    session.last_seen -= 61
+    assert store.get(session.id) is None
+    assert store.stats()["expired"] == 1
+
+
+def test_least_recently_used_session_is_evicted_first():
+    store = SessionStore(max_sessions=2)
+    first, second = store.create("fr"), store.create("fr")
+    store.get(first.id)
+    third = store.create("fr")
+    assert [store.get(s.id) is not None for s in (first, second, third)] == [True, False, True]
+    assert store.stats()["evicted"] == 1
+
+
+def test_size_budget_evicts_and_delete_frees_bytes():
+    store = SessionStore(max_bytes=1000)
+    first = store.create("fr")
+    first.add_turn("x" * 100, np.zeros(64, dtype=np.float32))
+    store.update(first)
+    assert store.stats()["bytes"] == first.nbytes
+
+    second = store.create("fr")
+    second.add_turn("y" * 100, np.zeros(64, dtype=np.float32))
+    store.update(second)
+    assert store.get(first.id) is None and store.get(second.id) is second
+
+    assert store.delete(second.id) and not store.delete(second.id)
+    assert store.stats()["bytes"] == 0 and len(store) == 0
+
+
+def test_conversation_endpoint(client):
+    first = client.post("/diagnose/session", json={"symptoms": MIGRAINE_TURNS[0]})
+    assert first.status_code == 200
+    session_id = first.json()["session_id"]
+    assert first.json()["turns"] == 1 and first.json()["language"] == "fr"
+
+    for turn, text in enumerate(MIGRAINE_TURNS[1:], start=2):
+        body = client.post("/diagnose/session", json={"symptoms": text, "session_id": session_id}).json()
+        assert body["turns"] == turn
+    assert body["matched"] and body["pathology"]["id"] == "migraine"
+
+    changed = client.post("/diagnose/session", json={"symptoms": "headache", "session_id": session_id, "lang": "en"})
+    assert changed.status_code == 422
+
+    assert client.delete(f"/diagnose/session/{session_id}").status_code == 204
+    gone = client.post("/diagnose/session", json={"symptoms": MIGRAINE_TURNS[0], "session_id": session_id})
+    assert gone.status_code == 404
+    assert client.delete(f"/diagnose/session/{session_id}").status_code == 404
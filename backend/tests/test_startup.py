@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+MIGRAINE = "Mal de tête intense et pulsatile, d'un seul côté, avec nausées et sensibilité à la lumière"
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "délai dépassé"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def gated_loading(monkeypatch, service, encoder):
+    """Chargement en arrière-plan de SBERT bloqué jusqu'à `release.set()`."""
+    release = threading.Event()
+
+    def load_encoder(model_name):
+        release.wait(5)
+        return encoder
+
+    monkeypatch.setattr(main.settings, "BACKGROUND_LOADING", True)
+    monkeypatch.setattr(main.DoctisAIService, "_load_encoder", staticmethod(load_encoder))
+    yield release
+    release.set()
+
+
+def test_health_answers_while_models_load_in_background(service, gated_loading):
+    with TestClient(main.app) as client:
+        health = client.get("/health").json()
+        assert health["status"] == "starting" and health["ready"] is False
+
+        ready = client.get("/ready")
+        assert ready.status_code == 503 and ready.headers["retry-after"] == str(main.settings.STARTING_RETRY_AFTER_S)
+        assert client.post("/diagnose", json={"symptoms": MIGRAINE}).status_code == 503
+
+        gated_loading.set()
+        wait_until(lambda: service.retrieval_ready)
+        assert client.get("/ready").json() == {"ready": True, "llm": "unavailable"}
+
+        health = client.get("/health").json()
+        assert health["status"] == "healthy"
+        assert health["components"]["sbert"] == {"status": "ready", "error": None}
+        assert health["models_loaded"]["pathologies_count"] == 3
+        assert set(health["load_times"]) >= {"pathologies", "sbert", "llm"}
+
+
+def test_failed_component_is_reported_unhealthy(service, monkeypatch):
+    def broken(model_name):
+        raise OSError("modèle introuvable")
+
+    monkeypatch.setattr(main.DoctisAIService, "_load_encoder", staticmethod(broken))
+    with TestClient(main.app) as client:
+        health = client.get("/health")
+        assert health.status_code == 200
+        assert health.json()["status"] == "unhealthy"
+        assert health.json()["components"]["sbert"] == {"status": "failed", "error": "modèle introuvable"}
+        assert client.get("/ready").status_code == 503
+
+
+def test_missing_llm_is_a_degraded_mode_not_a_failure(service):
+    service._load_component("llm", service.load_llm_model)
+    assert service.component_status["llm"] == "unavailable"
+    assert "llm" not in service.component_errors
@@ -0,0 +1,78 @@
+import builtins
+import json
+import sys
+import time
+
+import pytest
+
+import startup_profile
+from startup_profile import ImportTimer, StartupProfile, profile_backend
+
+
+@pytest.fixture
+def package(tmp_path, monkeypatch):
+    """Paquet jetable : `slowpkg.parent` importe `slowpkg.child` (import relatif)."""
+    root = tmp_path / "slowpkg"
+    root.mkdir()
+    (root / "__init__.py").write_text("")
+    (root / "child.py").write_text("import time\ntime.sleep(0.05)\n")
+    (root / "parent.py").write_text("import time\ntime.sleep(0.02)\nfrom . import child\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield "slowpkg"
+    for name in [m for m in sys.modules if m.split(".")[0] == "slowpkg"]:
+        del sys.modules[name]
+
+
+def test_import_timer_separates_own_time_from_sub_imports(package):
+    original = builtins.__import__
+    with ImportTimer() as timer:
+        import slowpkg.parent  # noqa: F401
+    assert builtins.__import__ is original
+
+    inclusive, own = timer.timings["slowpkg.parent"]
+    assert inclusive >= 0.07
+    assert 0.02 <= own < 0.05
+    assert timer.timings["slowpkg.child"][1] >= 0.05
+    assert list(timer.by_package())[0] == "slowpkg"
+
+
+def test_modules_already_imported_are_not_timed():
+    with ImportTimer() as timer:
+        import json  # noqa: F401
+        from json import dumps  # noqa: F401
+    assert timer.timings == {}
+
+
+def test_phase_is_recorded_even_on_error():
+    profile = StartupProfile()
+    with pytest.raises(RuntimeError):
+        with profile.phase("échec"):
+            time.sleep(0.01)
+            raise RuntimeError("boom")
+    assert profile.phases["échec"] >= 0.01
+
+
+def test_report_keeps_the_slowest_packages(package):
+    profile = StartupProfile()
+    with profile.imports, profile.phase("import"):
+        import slowpkg.parent  # noqa: F401
+    profile.imports.timings["autre.module"] = (0.001, 0.001)
+
+    report = profile.report(top=1)
+    assert list(report["imports_by_package"]) == ["slowpkg"]
+    assert report["modules_imported"] == len(profile.imports.timings)
+    assert report["phases"]["import"] >= 0.07
+
+
+def test_backend_profile_includes_component_load_times(service):
+    profile = StartupProfile()
+    profile_backend(profile, load=True)
+    assert {"import main", "load_models", "load_models/pathologies", "load_models/sbert"} <= set(profile.phases)
+
+
+def test_json_report(monkeypatch, capsys, service):
+    monkeypatch.setattr(sys, "argv", ["startup_profile.py", "--json", "--top", "3"])
+    startup_profile.main_cli()
+    report = json.loads(capsys.readouterr().out)
+    assert set(report) == {"phases", "imports_total_s", "imports_by_package", "modules_imported"}
+    assert "import main" in report["phases"]
@@ -0,0 +1,69 @@
+import json
+import threading
+
+import pytest
+
+MIGRAINE = "Mal de tête intense et pulsatile, d'un seul côté, avec nausées et sensibilité à la lumière"
+
+
+def read_events(response) -> list[dict]:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def post_stream(client, symptoms=MIGRAINE):
+    return client.post("/diagnose/stream", json={"symptoms": symptoms, "lang": "fr"})
+
+
+def test_match_is_sent_before_streamed_tokens(client, llm):
+    response = post_stream(client)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    events = read_events(response)
+    assert [e["type"] for e in events] == ["match", "token", "token", "token", "done"]
+    assert events[0]["matched"] and events[0]["pathology"]["id"] == "migraine"
+    assert [e["text"] for e in events[1:-1]] == llm.tokens
+    assert events[-1]["ai_response"] == "".join(llm.tokens).strip()
+
+
+def test_template_is_streamed_in_one_chunk_without_llm(client):
+    events = read_events(post_stream(client))
+    assert [e["type"] for e in events] == ["match", "token", "done"]
+    assert "Migraine" in events[1]["text"]
+
+
+def test_unmatched_query_streams_the_fallback_message(client, llm):
+    events = read_events(post_stream(client, "bonjour, tout va bien aujourd'hui merci"))
+    assert events[0]["matched"] is False and events[0]["pathology"] is None
+    assert events[-1]["ai_response"]
+    assert llm.prompts == []
+
+
+def test_generation_error_ends_the_stream_with_an_error_event(client, llm, monkeypatch):
+    def failing_stream():
+        yield {"choices": [{"text": "Début"}]}
+        raise RuntimeError("contexte épuisé")
+
+    monkeypatch.setattr(llm, "_stream", failing_stream)
+    events = read_events(post_stream(client))
+    assert [e["type"] for e in events] == ["match", "token", "error"]
+    assert "contexte épuisé" in events[-1]["detail"]
+
+
+def test_saturated_pool_is_refused_before_streaming(client, service, llm):
+    release = threading.Event()
+    busy = service.inference_pool.submit(lambda model: release.wait(5))
+    try:
+        # Le worker est occupé : le job suivant remplit la file (taille 1)
+        assert busy.started.wait(1)
+        service.inference_pool.submit(lambda model: None)
+        response = post_stream(client)
+    finally:
+        release.set()
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
+
+
+@pytest.mark.parametrize("payload", [{"symptoms": "court"}, {"symptoms": MIGRAINE, "lang": "de"}])
+def test_invalid_input_is_rejected(client, payload):
+    assert client.post("/diagnose/stream", json=payload).status_code == 422
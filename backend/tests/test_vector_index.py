@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vector_index import ExactIndex, IVFIndex, create_index, normalize_rows, top_k
+
+
+def test_top_k_returns_sorted_best_scores():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.3, 0.2, 0.8, 0.1]])
+    values, ids = top_k(scores, 2)
+    assert ids.tolist() == [[1, 3], [2, 0]]
+    np.testing.assert_allclose(values, [[0.9, 0.7], [0.8, 0.3]])
+
+
+def test_top_k_clamps_k_and_accepts_1d():
+    values, ids = top_k(np.array([0.2, 0.6, 0.4]), 10)
+    assert ids.shape == (1, 3)
+    assert ids[0].tolist() == [1, 2, 0]
+    assert top_k(np.zeros((2, 3)), 0)[1].shape == (2, 0)
+
+
+def test_normalize_rows_keeps_zero_rows():
+    normalized = normalize_rows(np.array([[3.0, 4.0], [0.0, 0.0]]))
+    np.testing.assert_allclose(normalized, [[0.6, 0.8], [0.0, 0.0]])
+    assert normalized.dtype == np.float32
+
+
+def test_exact_index_matches_brute_force(rng):
+    vectors = rng.normal(size=(200, 16))
+    queries = rng.normal(size=(5, 16))
+    scores, ids = ExactIndex(vectors).search(queries, 4)
+
+    expected = normalize_rows(queries) @ normalize_rows(vectors).T
+    assert ids.tolist() == np.argsort(-expected, axis=1)[:, :4].tolist()
+    np.testing.assert_allclose(scores, np.sort(expected, axis=1)[:, ::-1][:, :4], rtol=1e-5)
+
+
+def test_ivf_probing_every_list_equals_exact(rng):
+    vectors = rng.normal(size=(500, 16))
+    queries = rng.normal(size=(10, 16))
+    ivf = IVFIndex(vectors, n_lists=8, exact_below=0)
+    ivf.nprobe = ivf.n_lists
+
+    _, exact_ids = ExactIndex(vectors).search(queries, 5)
+    _, ivf_ids = ivf.search(queries, 5)
+    assert ivf_ids.tolist() == exact_ids.tolist()
+    assert len(ivf) == 500
+
+
+def test_ivf_pads_missing_results(rng):
+    vectors = normalize_rows(np.eye(4)[[0, 0, 0, 1]] + rng.normal(scale=1e-3, size=(4, 4)))
+    ivf = IVFIndex(vectors, n_lists=2, nprobe=1, exact_below=0)
+    scores, ids = ivf.search(np.array([1.0, 0.0, 0.0, 0.0]), 4)
+    found = ids[0] >= 0
+    assert set(ids[0][found]) <= {0, 1, 2, 3}
+    assert np.all(np.isneginf(scores[0][~found]))
+
+
+def test_ivf_on_an_empty_catalogue_returns_no_results():
+    ivf = IVFIndex(np.empty((0, 8), dtype=np.float32))
+    scores, ids = ivf.search(np.ones(8), 5)
+    assert len(ivf) == 0 and ids.shape == scores.shape == (1, 0)
+
+
+def test_small_ivf_catalogues_are_searched_exhaustively(rng):
+    vectors = rng.normal(size=(3, 16))
+    queries = rng.normal(size=(4, 16))
+    ivf = IVFIndex(vectors)
+    assert ivf.n_lists == ivf.nprobe == 1
+
+    _, exact_ids = ExactIndex(vectors).search(queries, 5)
+    assert ivf.search(queries, 5)[1].tolist() == exact_ids.tolist()
+
+
+def test_ivf_probing_every_list_is_built_as_one_list(rng):
+    ivf = IVFIndex(rng.normal(size=(2000, 8)), n_lists=4, nprobe=4)
+    assert ivf.n_lists == 1 and ivf.offsets.tolist() == [0, 2000]
+
+
+def test_create_index_dispatches_by_kind(rng):
+    vectors = rng.normal(size=(50, 8))
+    assert isinstance(create_index("exact", vectors), ExactIndex)
+    assert isinstance(create_index("ivf", vectors, n_lists=4), IVFIndex)
+    with pytest.raises(ValueError):
+        create_index("hnsw", vectors)
@@ -0,0 +1,218 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Index vectoriels (exact et approximatif) pour le retrieval
+# =============================================================================
+
+"""
+Index vectoriels
+----------------
+Abstraction commune `VectorIndex` pour la recherche des k pathologies les
+plus proches d'une requête (similarité cosinus sur vecteurs normalisés).
+
+Backends :
+- "exact" : matrice float32 normalisée, produit scalaire + `argpartition`
+  (O(N) par requête, sans tri complet du catalogue)
+- "ivf"   : index inversé (k-means sphérique construit localement en numpy),
+  seules les `nprobe` listes les plus proches sont parcourues. Sur un petit
+  catalogue (ou si toutes les listes seraient sondées), parcours exhaustif
+
+Les deux backends exposent la même API :
+    scores, ids = index.search(queries, k)   # tableaux (n_queries, k)
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# En dessous, l'IVF parcourt tout le catalogue : le partitionnement ne ferait
+# que perdre du rappel pour un gain négligeable
+IVF_EXACT_BELOW = 1024
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalise chaque ligne (norme L2) en float32."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Sélectionne les k meilleurs scores de chaque ligne, triés par ordre décroissant.
+
+    Returns:
+        (scores, indices) de forme (n, k)
+    """
+    scores = np.atleast_2d(scores)
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(scores.dtype), empty.astype(np.int64)
+
+    if k < scores.shape[1]:
+        # Sélection partielle O(N), puis tri des k candidats seulement
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(candidate_scores, order, axis=1),
+        np.take_along_axis(candidates, order, axis=1).astype(np.int64),
+    )
+
+
+class VectorIndex:
+    """Interface commune des index vectoriels."""
+
+    kind: str = "base"
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les k vecteurs les plus similaires à chaque requête.
+
+        Args:
+            queries: Vecteur (dim,) ou matrice (n_queries, dim)
+            k: Nombre de résultats par requête
+
+        Returns:
+            (scores, ids) de forme (n_queries, k), triés par score décroissant.
+            Un index approximatif peut compléter avec des ids -1 s'il trouve
+            moins de k candidats.
+        """
+        raise NotImplementedError
+
+
+class ExactIndex(VectorIndex):
+    """Recherche exhaustive par produit scalaire sur vecteurs normalisés."""
+
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray, normalized: bool = False):
+        # Si les vecteurs sont déjà normalisés (cache disque), on garde la vue
+        # memory-mappée telle quelle : aucune copie
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(np.atleast_2d(queries))
+        return top_k(queries @ self.vectors.T, k)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Index inversé approximatif (IVF-Flat).
+
+    Les vecteurs sont répartis en `n_lists` clusters (k-means sphérique) et
+    stockés de manière contiguë par cluster. Une requête ne parcourt que les
+    `nprobe` clusters dont le centroïde est le plus proche.
+
+    Sous `exact_below` vecteurs (catalogue vide compris), ou si `nprobe`
+    couvre toutes les listes, une seule liste : la recherche est exacte.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        n_lists: Optional[int] = None,
+        nprobe: Optional[int] = None,
+        n_iter: int = 10,
+        seed: int = 0,
+        exact_below: int = IVF_EXACT_BELOW,
+    ):
+        vectors = normalize_rows(vectors)
+        n = vectors.shape[0]
+
+        self.n_lists = max(1, min(n, n_lists or int(4 * np.sqrt(n))))
+        self.nprobe = max(1, min(self.n_lists, nprobe or max(1, self.n_lists // 16)))
+
+        if n < max(1, exact_below) or self.nprobe >= self.n_lists:
+            # Liste unique, toujours sondée : le centroïde n'intervient pas
+            self.n_lists = self.nprobe = 1
+            self.centroids = np.zeros((1, vectors.shape[1]), dtype=np.float32)
+            assignments = np.zeros(n, dtype=np.int64)
+        else:
+            rng = np.random.default_rng(seed)
+            self.centroids = self._train(vectors, n_iter, rng)
+            assignments = self._assign(vectors)
+
+        # Listes inversées contiguës : vecteurs réordonnés + ids d'origine
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.ids = order.astype(np.int64)
+        self.vectors = np.ascontiguousarray(vectors[order])
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def _assign(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Affecte chaque vecteur à son centroïde le plus proche (par blocs)."""
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _train(self, vectors: np.ndarray, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+        """K-means sphérique sur un sous-échantillon du catalogue."""
+        n = vectors.shape[0]
+        sample_size = min(n, 256 * self.n_lists)
+        sample = vectors[rng.choice(n, size=sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, size=self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.n_lists)
+
+            # Clusters vides : ré-initialisés sur un point aléatoire
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        return centroids
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(np.atleast_2d(queries))
+        n_queries = queries.shape[0]
+        k = min(k, len(self))
+
+        out_scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+        out_ids = np.full((n_queries, k), -1, dtype=np.int64)
+
+        _, probes = top_k(queries @ self.centroids.T, self.nprobe)
+        for q in range(n_queries):
+            # Plages contiguës des listes sondées
+            rows = np.concatenate([
+                np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes[q]
+            ])
+            if rows.size == 0:
+                continue
+            scores, local = top_k(self.vectors[rows] @ queries[q], k)
+            found = scores.shape[1]
+            out_scores[q, :found] = scores[0]
+            out_ids[q, :found] = self.ids[rows[local[0]]]
+
+        return out_scores, out_ids
+
+
+def create_index(kind: str, vectors: np.ndarray, normalized: bool = False, **kwargs) -> VectorIndex:
+    """Construit un index du type demandé ("exact" ou "ivf")."""
+    if kind == "exact":
+        return ExactIndex(vectors, normalized=normalized)
+    if kind == "ivf":
+        return IVFIndex(vectors, **kwargs)
+    raise ValueError(f"Type d'index inconnu: {kind}")
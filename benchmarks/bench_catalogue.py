@@ -0,0 +1,129 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Benchmark du catalogue JSON (liste de dicts) vs compilé (memory-mappé)
+# =============================================================================
+
+"""
+Benchmark du format de catalogue
+--------------------------------
+Pour chaque taille de catalogue synthétique, compare `pathologies.json` et
+sa version compilée (`catalogue_store.py`) :
+
+- chargement : `read_catalogue` + instantané `KnowledgeBase` (fragments de
+  réponse) + hash des textes à indexer (clés du cache d'embeddings, comme
+  au démarrage du service), durée et croissance du RSS (processus forké
+  par cas)
+- requête : lecture des top-k pathologies d'une recherche (dict complet +
+  payload de réponse)
+- liste : pages de `/pathologies` à des positions aléatoires (p50)
+
+Usage :
+    python benchmarks/bench_catalogue.py --sizes 10000 100000 500000
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import BACKEND_DIR, latency_summary, print_table, save_results, synthetic_catalogue, write_catalogue
+
+sys.path.insert(0, str(BACKEND_DIR))
+from catalogue_store import compile_catalogue, content_hashes, indexed_texts, page  # noqa: E402
+from knowledge_base import KnowledgeBase, read_catalogue  # noqa: E402
+from metrics import process_rss_bytes  # noqa: E402
+
+COLUMNS = [
+    ("case", "cas", ""), ("file_mb", "fichier (Mo)", ".1f"), ("load_s", "chargement (s)", ".3f"),
+    ("rss_growth_mb", "RSS + (Mo)", ".1f"), ("p50_ms", "top-k p50 (ms)", ".3f"),
+    ("p95_ms", "top-k p95 (ms)", ".3f"), ("page_p50_ms", "page p50 (ms)", ".3f"),
+]
+
+
+def run_case(path: Path, hits: np.ndarray, pages: np.ndarray, page_size: int) -> dict:
+    """Chargement puis requêtes simulées (dans un processus dédié)."""
+    rss_before = process_rss_bytes()
+    start = time.perf_counter()
+    pathologies, disclaimer = read_catalogue(path)
+    knowledge_base = KnowledgeBase(pathologies, disclaimer)
+    # Clés du cache d'embeddings calculées au démarrage (sans décodage en compilé)
+    hashes = content_hashes(indexed_texts(pathologies, "symptoms_description"))
+    load_s = time.perf_counter() - start
+    rss_growth = process_rss_bytes() - rss_before
+    del hashes
+
+    latencies = []
+    for row in hits:
+        start = time.perf_counter()
+        for i in row:
+            pathology = knowledge_base.pathologies[i]
+            knowledge_base.pathology_responses(pathology).match(0.8)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    page_latencies = []
+    for offset in pages:
+        start = time.perf_counter()
+        page(pathologies, int(offset), page_size)
+        page_latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "load_s": load_s, "rss_growth_mb": rss_growth / 1e6, "latencies": latencies,
+        "page_p50_ms": float(np.median(page_latencies)),
+    }
+
+
+def in_subprocess(*args) -> dict:
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(run_case, args)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=50, help="Pages lues par cas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            pathologies = synthetic_catalogue(n, rng)
+            json_path = write_catalogue(Path(tmp) / f"catalogue-{n}.json", pathologies)
+            compiled_path = json_path.with_suffix(".dcat")
+            compile_catalogue(pathologies, "", compiled_path)
+            del pathologies
+            hits = rng.integers(0, n, size=(args.queries, args.k))
+            pages = rng.integers(0, max(1, n - args.page_size), size=args.pages)
+
+            for label, path in (("json", json_path), ("compiled", compiled_path)):
+                print(f"⏳ n={n} : {label}...")
+                run = in_subprocess(path, hits, pages, args.page_size)
+                results.append({
+                    "case": f"{label}/n={n}",
+                    "n": n,
+                    "format": label,
+                    "file_mb": round(path.stat().st_size / 1e6, 2),
+                    "load_s": round(run["load_s"], 4),
+                    "rss_growth_mb": round(run["rss_growth_mb"], 1),
+                    **latency_summary(run["latencies"]),
+                    "page_p50_ms": round(run["page_p50_ms"], 3),
+                })
+
+    print()
+    print_table(results, COLUMNS)
+    if not args.no_save:
+        save_results("catalogue", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,150 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Concordance et coût des backends d'encodage (PyTorch vs ONNX)
+# =============================================================================
+
+"""
+Benchmark / contrôle de concordance des encodeurs
+-------------------------------------------------
+Chaque backend est chargé dans un sous-processus séparé (RSS mesuré sans
+interférence) et encode les descriptions du catalogue ainsi qu'un jeu de
+requêtes patient. Le processus parent compare ensuite chaque backend à la
+référence PyTorch :
+- cosinus minimal / moyen entre vecteurs homologues
+- accord du top-1 de retrieval (requêtes → catalogue)
+- latence p50 d'une requête isolée et pic de RSS
+
+Le code de sortie est non nul si le cosinus minimal passe sous `--min-cosine`
+(utilisable comme contrôle avant de changer `ENCODER_BACKEND` en production).
+
+Usage (nécessite sentence-transformers, PyTorch et onnxruntime) :
+    python benchmarks/bench_encoder.py --model all-MiniLM-L6-v2 --backends onnx onnx-int8
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from encoders import ENCODER_BACKENDS, load_encoder  # noqa: E402
+from vector_index import normalize_rows  # noqa: E402
+
+QUERIES = [
+    "J'ai mal au ventre en bas à droite et je vomis depuis ce matin",
+    "Forte fièvre, toux sèche et courbatures depuis deux jours",
+    "Douleur dans la poitrine qui irradie dans le bras gauche",
+    "Maux de tête violents d'un seul côté avec nausées",
+    "Je me sens essoufflé et j'ai une toux grasse",
+    "Brûlures en urinant et envie fréquente d'aller aux toilettes",
+    "Éruption cutanée qui démange après avoir mangé des fruits de mer",
+    "Fatigue intense, perte de poids et soif permanente",
+]
+
+
+def catalogue_texts() -> list[str]:
+    with open(BACKEND_DIR / "data" / "pathologies.json", "r", encoding="utf-8") as f:
+        return [p["symptoms_description"] for p in json.load(f)["pathologies"]]
+
+
+def worker(backend: str, model: str, cache_dir: Path, output: Path, repeats: int) -> None:
+    """Sous-processus : encode catalogue + requêtes et rapporte ses mesures."""
+    start = time.perf_counter()
+    encoder = load_encoder(model, backend, cache_dir=cache_dir)
+    load_seconds = time.perf_counter() - start
+
+    texts = catalogue_texts()
+    catalogue = encoder.encode(texts, normalize_embeddings=True)
+    queries = encoder.encode(QUERIES, normalize_embeddings=True)
+
+    latencies = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            encoder.encode([query], normalize_embeddings=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    np.savez(output, catalogue=catalogue, queries=queries)
+    # ru_maxrss est en Ko sous Linux
+    print(json.dumps({
+        "load_seconds": round(load_seconds, 2),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def run_backend(backend: str, args, tmp_dir: Path) -> tuple[dict, dict]:
+    output = tmp_dir / f"{backend}.npz"
+    completed = subprocess.run(
+        [
+            sys.executable, __file__, "--worker", backend, "--model", args.model,
+            "--cache-dir", str(args.cache_dir), "--output", str(output), "--repeats", str(args.repeats),
+        ],
+        check=True, capture_output=True, text=True,
+    )
+    metrics = json.loads(completed.stdout.strip().splitlines()[-1])
+    with np.load(output) as data:
+        vectors = {name: data[name] for name in data.files}
+    return metrics, vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx-int8"], choices=ENCODER_BACKENDS[1:])
+    parser.add_argument("--cache-dir", type=Path, default=BACKEND_DIR / "cache")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--worker", choices=ENCODER_BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.model, args.cache_dir, args.output, args.repeats)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        ref_metrics, ref = run_backend("torch", args, tmp_dir)
+        ref_top1 = np.argmax(ref["queries"] @ ref["catalogue"].T, axis=1)
+
+        print(f"{'backend':<10} {'load (s)':>9} {'p50 (ms)':>9} {'RSS (Mo)':>9} {'cos min':>8} {'cos moy':>8} {'top-1':>6}")
+        print(
+            f"{'torch':<10} {ref_metrics['load_seconds']:>9.2f} {ref_metrics['p50_ms']:>9.2f} "
+            f"{ref_metrics['peak_rss_mb']:>9.1f} {1.0:>8.4f} {1.0:>8.4f} {1.0:>6.2f}"
+        )
+
+        failed = []
+        for backend in args.backends:
+            metrics, vectors = run_backend(backend, args, tmp_dir)
+            cosines = np.concatenate([
+                np.sum(normalize_rows(vectors[name]) * normalize_rows(ref[name]), axis=1)
+                for name in ("catalogue", "queries")
+            ])
+            top1 = np.argmax(vectors["queries"] @ vectors["catalogue"].T, axis=1)
+            agreement = float(np.mean(top1 == ref_top1))
+            print(
+                f"{backend:<10} {metrics['load_seconds']:>9.2f} {metrics['p50_ms']:>9.2f} "
+                f"{metrics['peak_rss_mb']:>9.1f} {cosines.min():>8.4f} {cosines.mean():>8.4f} {agreement:>6.2f}"
+            )
+            if cosines.min() < args.min_cosine:
+                failed.append(backend)
+
+    if failed:
+        print(f"❌ Concordance insuffisante (cosinus < {args.min_cosine}): {', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ Tous les backends au-dessus de cosinus {args.min_cosine}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Générateur de charge de bout en bout sur l'API FastAPI (hors ligne)
+# =============================================================================
+
+"""
+Test de charge de bout en bout
+------------------------------
+Rejoue un trafic de requêtes patient contre l'application FastAPI du backend,
+dans le même processus (transport ASGI de httpx : pas de socket, pas de
+serveur à lancer) :
+
+- trafic : fichier JSONL au format de /diagnose/batch (`--traffic`), ou
+  requêtes synthétiques tirées du catalogue
+- catalogue : synthétique, de `--catalogue` pathologies
+- backends factices (`common.py`) : encodeur `StubEncoder` et LLM `StubLlama`
+  aux latences configurables, pour exercer micro-batching, pool d'inférence,
+  backpressure et cache de réponses sans modèle téléchargé
+
+Deux modes d'injection :
+- boucle fermée (défaut) : `--concurrency` clients envoient leur requête
+  suivante dès la réponse précédente
+- boucle ouverte (`--rate`) : arrivées à débit fixe ; la latence est comptée
+  depuis l'instant d'arrivée prévu (file d'attente incluse)
+
+Rapport par niveau de concurrence : p50/p95/p99, débit, statuts HTTP, durée
+moyenne par étape lue sur /metrics, pic de RSS ; résultats JSON dans
+`benchmarks/results/`.
+
+Usage :
+    python benchmarks/bench_load.py --catalogue 10000 --concurrency 1 8 32 --requests 500
+    python benchmarks/bench_load.py --traffic requetes.jsonl --text-field body --llm none
+"""
+
+import argparse
+import asyncio
+import functools
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from common import (
+    BACKEND_DIR, StubEncoder, StubLlama, latency_summary, peak_rss_mb, print_table, read_traffic,
+    save_results, synthetic_catalogue, synthetic_queries, write_catalogue,
+)
+
+sys.path.insert(0, str(BACKEND_DIR))
+import main  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+ENDPOINTS = ("/diagnose", "/diagnose/stream")
+COLUMNS = [
+    ("case", "cas", ""), ("count", "requêtes", "d"), ("errors", "erreurs", "d"),
+    ("p50_ms", "p50 (ms)", ".1f"), ("p95_ms", "p95 (ms)", ".1f"), ("p99_ms", "p99 (ms)", ".1f"),
+    ("throughput_rps", "débit (/s)", ".1f"), ("peak_rss_mb", "pic RSS (Mo)", ".1f"),
+]
+_STAGE_LINE = re.compile(r'^doctis_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+def configure_app(args, tmp_dir: Path) -> list[dict]:
+    """Branche catalogue synthétique, backends factices et caches temporaires."""
+    rng = np.random.default_rng(args.seed)
+    pathologies = synthetic_catalogue(args.catalogue, rng)
+
+    settings = main.settings
+    settings.PATHOLOGIES_PATH = write_catalogue(tmp_dir / "pathologies.json", pathologies)
+    settings.CACHE_DIR = tmp_dir
+    settings.BACKGROUND_LOADING = False
+    settings.PATHOLOGIES_WATCH_INTERVAL_S = 0.0
+    settings.RESPONSE_CACHE_ENABLED = not args.no_response_cache
+    settings.LLM_WORKERS = args.llm_workers
+
+    encoder = StubEncoder(args.dim, args.encoder_ms)
+    main.load_encoder = lambda *a, **kw: encoder
+
+    if args.llm == "stub":
+        settings.LLM_MODEL_PATH = str(tmp_dir / "stub.gguf")
+        Path(settings.LLM_MODEL_PATH).touch()
+        main.LLAMA_AVAILABLE = True
+        main.Llama = functools.partial(
+            StubLlama, prompt_ms=args.llm_prompt_ms, token_ms=args.llm_token_ms, max_tokens=args.llm_tokens
+        )
+    else:
+        main.LLAMA_AVAILABLE = False
+    return pathologies
+
+
+def reset_response_cache(tmp_dir: Path, label: str) -> None:
+    """Cache de réponses vide pour chaque niveau (mesures indépendantes)."""
+    if main.doctis_service.response_cache is not None:
+        settings = main.settings
+        main.doctis_service.response_cache = ResponseCache(
+            tmp_dir / f"responses-{label}.sqlite3",
+            ttl_seconds=settings.RESPONSE_CACHE_TTL_S,
+            max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+            similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY
+        )
+
+
+async def stage_totals(client: httpx.AsyncClient) -> dict:
+    """Cumul (somme, nombre) par étape du pipeline, lu sur /metrics."""
+    response = await client.get("/metrics")
+    totals: dict = {}
+    for line in response.text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            totals.setdefault(stage, {"sum": 0.0, "count": 0.0})[kind] = float(value)
+    return totals
+
+
+def stage_means_ms(before: dict, after: dict) -> dict:
+    """Durée moyenne (ms) de chaque étape entre deux relevés de /metrics."""
+    means = {}
+    for stage, total in after.items():
+        previous = before.get(stage, {"sum": 0.0, "count": 0.0})
+        count = total["count"] - previous["count"]
+        if count > 0:
+            means[stage] = round(1000 * (total["sum"] - previous["sum"]) / count, 3)
+    return means
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, text: str) -> int:
+    response = await client.post(endpoint, json={"symptoms": text})
+    # Flux NDJSON : la requête n'est terminée qu'à la lecture complète du corps
+    await response.aread()
+    return response.status_code
+
+
+async def closed_loop(client, endpoint: str, texts: list[str], concurrency: int) -> list[tuple[float, int]]:
+    """`concurrency` clients enchaînent les requêtes jusqu'à épuisement du trafic."""
+    samples: list[tuple[float, int]] = []
+    cursor = iter(texts)
+
+    async def worker() -> None:
+        for text in cursor:
+            start = time.perf_counter()
+            status = await send(client, endpoint, text)
+            samples.append(((time.perf_counter() - start) * 1000, status))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+async def open_loop(client, endpoint: str, texts: list[str], rate: float) -> list[tuple[float, int]]:
+    """Arrivées à débit fixe ; latence mesurée depuis l'arrivée prévue."""
+    samples: list[tuple[float, int]] = []
+    origin = time.perf_counter()
+
+    async def one(i: int, text: str) -> None:
+        scheduled = origin + i / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        status = await send(client, endpoint, text)
+        samples.append(((time.perf_counter() - scheduled) * 1000, status))
+
+    await asyncio.gather(*(one(i, text) for i, text in enumerate(texts)))
+    return samples
+
+
+async def run(args, tmp_dir: Path) -> list[dict]:
+    pathologies = configure_app(args, tmp_dir)
+    if args.traffic:
+        texts = read_traffic(args.traffic, args.id_field, args.text_field)
+    else:
+        texts = synthetic_queries(pathologies, args.requests, np.random.default_rng(args.seed + 1))
+    # Le trafic est rejoué en boucle jusqu'à `--requests` requêtes
+    texts = [texts[i % len(texts)] for i in range(args.requests)]
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Tour de chauffe hors mesure (premiers lots, pool, allocations)
+            await closed_loop(client, args.endpoint, texts[:args.warmup], 1)
+
+            levels = [("rate", r) for r in args.rate] if args.rate else [("c", c) for c in args.concurrency]
+            for mode, level in levels:
+                reset_response_cache(tmp_dir, f"{mode}{level}")
+                before = await stage_totals(client)
+                start = time.perf_counter()
+                if mode == "rate":
+                    samples = await open_loop(client, args.endpoint, texts, level)
+                else:
+                    samples = await closed_loop(client, args.endpoint, texts, level)
+                wall = time.perf_counter() - start
+                after = await stage_totals(client)
+
+                statuses = Counter(status for _, status in samples)
+                ok = [latency for latency, status in samples if status == 200]
+                results.append({
+                    "case": f"load{args.endpoint}/{mode}={level}/n={args.catalogue}",
+                    **latency_summary(ok),
+                    "errors": len(samples) - len(ok),
+                    "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                    "throughput_rps": round(len(ok) / wall, 2),
+                    "wall_seconds": round(wall, 3),
+                    "stages_mean_ms": stage_means_ms(before, after),
+                    "peak_rss_mb": peak_rss_mb(),
+                })
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="/diagnose")
+    parser.add_argument("--catalogue", type=int, default=1000, help="Taille du catalogue synthétique")
+    parser.add_argument("--requests", type=int, default=300, help="Requêtes par niveau")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rate", type=float, nargs="+", help="Débits d'arrivée (req/s), boucle ouverte")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--traffic", type=Path, help="Fichier JSONL de requêtes à rejouer")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--text-field", default="symptoms")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--encoder-ms", type=float, default=5.0, help="Latence simulée d'un lot d'encodage")
+    parser.add_argument("--llm", choices=["stub", "none"], default="stub", help="none = réponses templates")
+    parser.add_argument("--llm-workers", type=int, default=1)
+    parser.add_argument("--llm-prompt-ms", type=float, default=40.0)
+    parser.add_argument("--llm-token-ms", type=float, default=8.0)
+    parser.add_argument("--llm-tokens", type=int, default=24)
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(run(args, Path(tmp)))
+
+    print()
+    print_table(results, COLUMNS)
+    for row in results:
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in sorted(row["stages_mean_ms"].items()))
+        print(f"   {row['case']}: statuts {row['statuses']} | étapes (ms) {stages or '-'}")
+    if not args.no_save:
+        save_results("load", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
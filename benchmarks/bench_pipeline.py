@@ -0,0 +1,191 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Micro-benchmarks des étapes du pipeline de diagnostic
+# =============================================================================
+
+"""
+Micro-benchmarks du pipeline
+----------------------------
+Mesure, sur des catalogues synthétiques de 10 à 100k pathologies :
+- `similarity` : `DoctisAIService.compute_similarity` (backend FastAPI),
+  embedding de requête fourni comme sur /diagnose (encodé par le batcher)
+- `triage`     : endpoint `/api/triage` du serveur Flask (encodage, recherche,
+  boucle de scores et cache de résumés ; sans clé Gemini)
+- `template`   : `_generate_template_response` (mode dégradé sans LLM)
+
+L'encodeur est le `StubEncoder` de `common.py` : aucun modèle n'est
+téléchargé et le temps mesuré est celui du code du pipeline. Les
+embeddings du catalogue passent par le cache disque habituel, dans un
+répertoire temporaire.
+
+Usage :
+    python benchmarks/bench_pipeline.py --sizes 10 1000 10000 100000
+    python benchmarks/bench_pipeline.py --cases similarity --index ivf --fusion rrf
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import (
+    BACKEND_DIR, SERVER_DIR, StubEncoder, latency_summary, print_table, save_results,
+    synthetic_catalogue, synthetic_queries,
+)
+
+sys.path.insert(0, str(BACKEND_DIR))
+import main  # noqa: E402
+from knowledge_base import DEFAULT_DISCLAIMER, KnowledgeBase  # noqa: E402
+from metrics import process_rss_bytes  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+from vector_index import create_index  # noqa: E402
+
+CASES = ("similarity", "triage", "template")
+COLUMNS = [
+    ("case", "cas", ""), ("build_s", "build (s)", ".2f"), ("p50_ms", "p50 (ms)", ".3f"),
+    ("p95_ms", "p95 (ms)", ".3f"), ("p99_ms", "p99 (ms)", ".3f"),
+    ("throughput_rps", "débit (/s)", ".0f"), ("rss_mb", "RSS (Mo)", ".1f"),
+]
+
+
+def timed_calls(fn, inputs) -> list[float]:
+    """Latence (ms) de `fn(x)` pour chaque entrée, appels séquentiels."""
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def result_row(case: str, latencies: list[float], **extra) -> dict:
+    summary = latency_summary(latencies)
+    return {
+        "case": case,
+        **extra,
+        **summary,
+        "throughput_rps": round(1000 * len(latencies) / max(sum(latencies), 1e-9), 1),
+        "rss_mb": round(process_rss_bytes() / (1024 * 1024), 1),
+    }
+
+
+def bench_similarity(n: int, args, encoder: StubEncoder, rng: np.random.Generator) -> dict:
+    """compute_similarity sur un instantané construit comme au démarrage du backend."""
+    pathologies = synthetic_catalogue(n, rng)
+    queries = synthetic_queries(pathologies, args.queries, rng)
+
+    service = main.DoctisAIService()
+    service.sbert_model = encoder
+    start = time.perf_counter()
+    service.knowledge_base, _ = service._build_knowledge_base(pathologies, DEFAULT_DISCLAIMER, 0)
+    build = time.perf_counter() - start
+
+    embeddings = [service._embed_query(q) for q in queries]
+    pairs = list(zip(queries, embeddings))
+    # Tour de chauffe (allocations, caches CPU)
+    timed_calls(lambda p: service.compute_similarity(*p), pairs[:5])
+    latencies = timed_calls(lambda p: service.compute_similarity(*p), pairs)
+    fusion = "" if args.fusion == "none" else f"+{args.fusion}"
+    return result_row(f"similarity/{args.index}{fusion}/n={n}", latencies, n=n, build_s=round(build, 3))
+
+
+def load_server_app():
+    """Importe le serveur Flask sans démarrer son moteur ni appeler Gemini."""
+    os.environ["ENGINE_AUTOSTART"] = "0"
+    os.environ["GOOGLE_API_KEY"] = ""
+    sys.path.insert(0, str(SERVER_DIR))
+    try:
+        import app as server_app
+    except ImportError as e:
+        print(f"⚠️  Benchmark triage ignoré (dépendance du serveur manquante: {e.name})")
+        return None
+    return server_app
+
+
+def bench_triage(server_app, n: int, args, encoder: StubEncoder, rng: np.random.Generator, tmp_dir: Path) -> dict:
+    """/api/triage avec un moteur publié comme le fait `initialize_engine`."""
+    pathologies = synthetic_catalogue(n, rng)
+    queries = synthetic_queries(pathologies, args.queries, rng)
+    data = [
+        {"id": p["id"], "name": p["name"], "symptoms": p["symptoms_description"].rstrip(".").split(", ")}
+        for p in pathologies
+    ]
+
+    start = time.perf_counter()
+    embeddings = encoder.encode([", ".join(p["symptoms"]) for p in data], normalize_embeddings=True)
+    index = create_index(args.index, embeddings, normalized=True)
+    build = time.perf_counter() - start
+
+    server_app.model, server_app.pathology_data = encoder, data
+    server_app.pathology_embeddings, server_app.pathology_index = embeddings, index
+    server_app.response_cache = ResponseCache(tmp_dir / f"triage-{n}.sqlite3")
+    server_app.engine_state.update(status="ready")
+
+    client = server_app.app.test_client()
+
+    def call(query: str) -> None:
+        response = client.post("/api/triage", json={"description": query, "lang": "fr"})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/triage: HTTP {response.status_code} {response.get_data(as_text=True)}")
+
+    timed_calls(call, queries[:5])
+    latencies = timed_calls(call, queries)
+    return result_row(f"triage/{args.index}/n={n}", latencies, n=n, build_s=round(build, 3))
+
+
+def bench_template(args, rng: np.random.Generator) -> dict:
+    """Réponse template (mode dégradé) sur des pathologies et confiances variées."""
+    service = main.DoctisAIService()
+    pathologies = synthetic_catalogue(100, rng)
+    # Fragments de réponse pré-calculés au chargement, comme en service
+    service.knowledge_base = KnowledgeBase(pathologies)
+    inputs = [(pathologies[i % 100], float(c)) for i, c in enumerate(rng.uniform(0.4, 1.0, args.iterations))]
+    latencies = timed_calls(lambda p: service._generate_template_response(*p), inputs)
+    return result_row("template", latencies)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000, 100000])
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--queries", type=int, default=200, help="Requêtes mesurées par taille")
+    parser.add_argument("--iterations", type=int, default=10000, help="Appels mesurés (template)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--index", choices=["exact", "ivf"], default="exact")
+    parser.add_argument("--fusion", choices=["none", "rrf", "weighted"], default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    main.settings.VECTOR_INDEX = args.index
+    main.settings.RETRIEVAL_FUSION = args.fusion
+    rng = np.random.default_rng(args.seed)
+    encoder = StubEncoder(args.dim)
+    server_app = load_server_app() if "triage" in args.cases else None
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        main.settings.CACHE_DIR = tmp_dir
+        for n in args.sizes:
+            if "similarity" in args.cases:
+                results.append(bench_similarity(n, args, encoder, rng))
+            if server_app is not None:
+                results.append(bench_triage(server_app, n, args, encoder, rng, tmp_dir))
+        if "template" in args.cases:
+            results.append(bench_template(args, rng))
+
+    print()
+    print_table(results, COLUMNS)
+    if not args.no_save:
+        save_results("pipeline", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,91 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Benchmark du gain d'évaluation de prompt (préfixe KV-cache)
+# =============================================================================
+
+"""
+Benchmark du cache de préfixe
+-----------------------------
+Mesure le temps d'évaluation du prompt par requête, avec et sans
+réutilisation du KV-cache du prompt système (`PromptPrefixCache`).
+
+Chaque requête génère un seul token : le temps mesuré est dominé par
+l'évaluation du prompt. Les pathologies du catalogue sont parcourues en
+boucle pour que le suffixe change à chaque requête.
+
+Usage (nécessite llama-cpp-python et un fichier GGUF) :
+    python benchmarks/bench_prompt_prefix.py --model backend/models/phi-3-mini-4k-instruct-q4.gguf
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from main import PROMPT_PREFIX, DoctisAIService  # noqa: E402
+from prompt_cache import PromptPrefixCache  # noqa: E402
+
+
+def run(model, prompts: list[str], prefix_cache) -> list[float]:
+    """Temps (ms) d'une complétion d'un token pour chaque prompt."""
+    timings = []
+    for prompt in prompts:
+        if prefix_cache is None:
+            # Sans cache : contexte vidé, tout le prompt est ré-évalué
+            model.reset()
+        else:
+            prefix_cache.restore(model)
+        start = time.perf_counter()
+        model(prompt, max_tokens=1, temperature=0.0)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", required=True, help="Chemin du fichier GGUF")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    try:
+        from llama_cpp import Llama
+    except ImportError:
+        sys.exit("llama-cpp-python n'est pas installé")
+
+    with open(BACKEND_DIR / "data" / "pathologies.json", "r", encoding="utf-8") as f:
+        pathologies = json.load(f)["pathologies"]
+
+    service = DoctisAIService()
+    prompts = [
+        service._build_prompt(pathologies[i % len(pathologies)], 0.5 + (i % 5) / 10)
+        for i in range(args.requests)
+    ]
+
+    model = Llama(model_path=args.model, n_ctx=2048, n_threads=args.threads, verbose=False)
+    prefix_cache = PromptPrefixCache(PROMPT_PREFIX)
+    n_prefix = prefix_cache.prepare(model)
+    n_prompt = statistics.mean(len(model.tokenize(p.encode("utf-8"), special=True)) for p in prompts)
+
+    # Tour de chauffe (allocations, caches CPU)
+    run(model, prompts[:2], None)
+
+    baseline = run(model, prompts, None)
+    cached = run(model, prompts, prefix_cache)
+
+    print(f"Tokens du préfixe système : {n_prefix} / {n_prompt:.0f} tokens par prompt en moyenne")
+    print(f"{'mode':<14} {'moyenne (ms)':>13} {'p50 (ms)':>9}")
+    for label, timings in (("sans cache", baseline), ("préfixe KV", cached)):
+        print(f"{label:<14} {statistics.mean(timings):>13.1f} {statistics.median(timings):>9.1f}")
+    saved = statistics.mean(baseline) - statistics.mean(cached)
+    print(f"Gain par requête : {saved:.1f} ms ({saved / statistics.mean(baseline) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Benchmark mémoire / latence / fidélité des embeddings compacts
+# =============================================================================
+
+"""
+Benchmark des embeddings compacts
+---------------------------------
+Compare l'index exact float32 actuel (produit scalaire sur la matrice
+memory-mappée) aux stockages compacts de `quantization.py`, avec et sans
+re-scoring float32 des meilleurs candidats :
+
+- mémoire : taille de la matrice servie, gain par rapport au float32 et
+  croissance du RSS (chaque configuration dans un processus forké, matrice
+  float32 relue depuis un fichier memory-mappé comme en production)
+- latence : p50 / p95 / p99 d'une requête
+- fidélité : rappel@k et accord du top-1 par rapport au float32, erreur
+  absolue moyenne du score du top-1 (score de confiance comparé au seuil)
+
+Catalogue synthétique regroupé en clusters (variantes d'une même
+condition), requêtes = entrées bruitées du catalogue.
+
+Usage :
+    python benchmarks/bench_quantization.py --sizes 100000 500000
+    python benchmarks/bench_quantization.py --storages int8 binary --rescore 0 100 400
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import BACKEND_DIR, latency_summary, print_table, save_results
+
+sys.path.insert(0, str(BACKEND_DIR))
+from metrics import process_rss_bytes  # noqa: E402
+from quantization import STORAGE_KINDS, build_index  # noqa: E402
+from vector_index import normalize_rows  # noqa: E402
+
+COLUMNS = [
+    ("case", "cas", ""), ("matrix_mb", "matrice (Mo)", ".1f"), ("saved_pct", "gain (%)", ".1f"),
+    ("rss_growth_mb", "RSS + (Mo)", ".1f"), ("build_s", "build (s)", ".2f"),
+    ("p50_ms", "p50 (ms)", ".2f"), ("p95_ms", "p95 (ms)", ".2f"),
+    ("recall_at_k", "rappel@k", ".3f"), ("top1_agreement", "top-1", ".3f"),
+    ("top1_score_error", "err. score", ".4f"),
+]
+
+_CHUNK_ROWS = 65536
+
+
+def write_catalogue_matrix(path: Path, n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Matrice normalisée (n, dim) écrite par blocs dans un `.npy` : n vecteurs
+    autour de ~sqrt(n) centres, sans jamais tenir deux copies en mémoire.
+    """
+    centers = rng.normal(size=(max(1, int(np.sqrt(n))), dim)).astype(np.float32)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, _CHUNK_ROWS):
+        size = min(_CHUNK_ROWS, n - start)
+        owners = rng.integers(0, centers.shape[0], size=size)
+        noise = rng.normal(scale=0.6, size=(size, dim)).astype(np.float32)
+        matrix[start:start + size] = normalize_rows(centers[owners] + noise)
+    matrix.flush()
+    del matrix
+    return np.load(path, mmap_mode="r")
+
+
+def run_config(path: Path, queries: np.ndarray, storage: str, rescore: int, k: int) -> dict:
+    """Construit l'index et exécute les requêtes (dans un processus dédié)."""
+    vectors = np.load(path, mmap_mode="r")
+    rss_before = process_rss_bytes()
+
+    start = time.perf_counter()
+    index = build_index("exact", vectors, storage, rescore)
+    build_s = time.perf_counter() - start
+
+    latencies, ids, scores = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        found_scores, found_ids = index.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(found_ids[0])
+        scores.append(found_scores[0])
+
+    matrix_bytes = vectors.nbytes if storage == "float32" else index.compact.nbytes
+    return {
+        "build_s": round(build_s, 3),
+        "matrix_bytes": int(matrix_bytes),
+        "rss_growth_mb": round((process_rss_bytes() - rss_before) / 1e6, 1),
+        "latencies": latencies,
+        "ids": np.array(ids),
+        "scores": np.array(scores),
+    }
+
+
+def in_subprocess(*args) -> dict:
+    """`run_config` dans un processus forké : RSS mesuré sans les configurations précédentes."""
+    with multiprocessing.get_context("fork").Pool(1) as pool:
+        return pool.apply(run_config, args)
+
+
+def agreement(reference: dict, found: dict) -> dict:
+    """Rappel@k, accord du top-1 et erreur du score du top-1 par rapport au float32."""
+    ref_ids, ids = reference["ids"], found["ids"]
+    recall = np.mean([len(set(r) & set(f)) / len(r) for r, f in zip(ref_ids, ids)])
+    return {
+        "recall_at_k": round(float(recall), 4),
+        "top1_agreement": round(float(np.mean(ref_ids[:, 0] == ids[:, 0])), 4),
+        "top1_score_error": round(float(np.mean(np.abs(reference["scores"][:, 0] - found["scores"][:, 0]))), 5),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--storages", nargs="+", choices=STORAGE_KINDS[1:], default=list(STORAGE_KINDS[1:]))
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 200], help="Candidats re-scorés (0 = aucun)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = Path(tmp) / f"catalogue-{n}.npy"
+            catalogue = write_catalogue_matrix(path, n, args.dim, rng)
+            picks = rng.integers(0, n, size=args.queries)
+            queries = normalize_rows(catalogue[picks] + rng.normal(scale=0.3, size=(args.queries, args.dim)))
+            del catalogue
+            print(f"⏳ n={n} : référence float32...")
+
+            # Référence : index exact float32 actuel
+            reference = in_subprocess(path, queries, "float32", 0, args.k)
+            float32_bytes = reference["matrix_bytes"]
+            configs = [("float32", 0, reference)]
+            for storage in args.storages:
+                for rescore in args.rescore:
+                    print(f"⏳ n={n} : {storage}, re-scoring {rescore}...")
+                    configs.append((storage, rescore, in_subprocess(path, queries, storage, rescore, args.k)))
+
+            for storage, rescore, run in configs:
+                label = storage if storage == "float32" else f"{storage}/rescore={rescore}"
+                results.append({
+                    "case": f"{label}/n={n}",
+                    "n": n,
+                    "storage": storage,
+                    "rescore": rescore,
+                    "matrix_mb": round(run["matrix_bytes"] / 1e6, 2),
+                    "saved_pct": round(100 * (1 - run["matrix_bytes"] / float32_bytes), 1),
+                    "rss_growth_mb": run["rss_growth_mb"],
+                    "build_s": run["build_s"],
+                    **latency_summary(run["latencies"]),
+                    **agreement(reference, run),
+                })
+
+    print()
+    print_table(results, COLUMNS)
+    if not args.no_save:
+        save_results("quantization", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,140 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Benchmark exactitude / latence du re-classement cross-encoder
+# =============================================================================
+
+"""
+Benchmark du re-classement cross-encoder
+----------------------------------------
+Catalogue et requêtes synthétiques étiquetées (chaque requête paraphrase une
+pathologie connue). Pour chaque budget de latence, un reranker neuf (cache
+vide) re-classe les k meilleurs candidats de l'index exact :
+
+- exactitude du top-1 : bi-encodeur seul, puis après re-classement (replis
+  compris) ; le rappel@k des candidats est le plafond atteignable
+- latence de l'étape de re-classement : p50 / p95 / p99 (bornée par le budget)
+- replis : part des requêtes servies dans l'ordre du bi-encodeur
+- passe « warm » : mêmes requêtes rejouées avec le dernier budget (scores en cache)
+
+Par défaut, modèles réels (SBERT + cross-encoder) ; `--stub` utilise les
+backends factices de common.py pour exercer le budget hors ligne
+(l'exactitude n'a alors pas de sens).
+
+Usage :
+    python benchmarks/bench_rerank.py --budgets 50 150 500
+    python benchmarks/bench_rerank.py --stub --stub-tail-ms 400 --stub-tail-rate 0.05
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import (
+    BACKEND_DIR, StubCrossEncoder, StubEncoder, latency_summary, print_table, save_results,
+    synthetic_catalogue, synthetic_queries
+)
+
+sys.path.insert(0, str(BACKEND_DIR))
+from encoders import load_encoder  # noqa: E402
+from reranker import CrossEncoderReranker  # noqa: E402
+from vector_index import ExactIndex  # noqa: E402
+
+COLUMNS = [
+    ("case", "cas", ""), ("top1_accuracy", "top-1", ".3f"), ("fallback_pct", "replis (%)", ".1f"),
+    ("p50_ms", "p50 (ms)", ".2f"), ("p95_ms", "p95 (ms)", ".2f"), ("p99_ms", "p99 (ms)", ".2f"),
+    ("max_ms", "max (ms)", ".2f"),
+]
+
+
+def document_text(pathology: dict) -> str:
+    """Texte lu par le cross-encoder (comme `DoctisAIService._rerank`)."""
+    return f"{pathology['name']}. {pathology['symptoms_description']}"
+
+
+def run_pass(reranker, queries, candidates, pathologies) -> tuple[list[int], list[float], int]:
+    """Re-classe les candidats de chaque requête ; retourne (top-1, latences, replis)."""
+    top1, latencies, fallbacks = [], [], 0
+    for query, ids in zip(queries, candidates):
+        start = time.perf_counter()
+        scores = reranker.rerank(query, [(int(i), document_text(pathologies[i])) for i in ids])
+        latencies.append((time.perf_counter() - start) * 1000)
+        if scores is None:
+            fallbacks += 1
+            top1.append(int(ids[0]))
+        else:
+            top1.append(int(ids[int(np.argmax(scores))]))
+    return top1, latencies, fallbacks
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5, help="Candidats re-classés")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[50, 150, 500], help="Budgets (ms)")
+    parser.add_argument("--encoder", default="all-MiniLM-L6-v2")
+    parser.add_argument("--model", default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1")
+    parser.add_argument("--stub", action="store_true", help="Backends factices (hors ligne)")
+    parser.add_argument("--stub-latency-ms", type=float, default=10.0)
+    parser.add_argument("--stub-tail-ms", type=float, default=300.0)
+    parser.add_argument("--stub-tail-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    pathologies = synthetic_catalogue(args.size, rng)
+    queries, targets = synthetic_queries(pathologies, args.queries, rng, with_targets=True)
+
+    if args.stub:
+        encoder = StubEncoder()
+        loader = lambda name: StubCrossEncoder(  # noqa: E731
+            args.stub_latency_ms, tail_ms=args.stub_tail_ms, tail_rate=args.stub_tail_rate, seed=args.seed
+        )
+    else:
+        encoder = load_encoder(args.encoder)
+        loader = None
+
+    print(f"⏳ Encodage de {args.size} pathologies et {args.queries} requêtes...")
+    index = ExactIndex(encoder.encode([p["symptoms_description"] for p in pathologies], normalize_embeddings=True))
+    _, candidates = index.search(encoder.encode(queries, normalize_embeddings=True), args.k)
+
+    recall = float(np.mean([target in row for target, row in zip(targets, candidates)]))
+    results = [{
+        "case": "bi-encoder",
+        "top1_accuracy": round(float(np.mean(candidates[:, 0] == targets)), 4),
+        "recall_at_k": round(recall, 4),
+    }]
+
+    for budget in args.budgets:
+        print(f"⏳ Re-classement, budget {budget:g} ms...")
+        options = {} if loader is None else {"loader": loader}
+        reranker = CrossEncoderReranker(args.model, budget_ms=budget, **options)
+        reranker.warm_up()
+        passes = [("cold", run_pass(reranker, queries, candidates, pathologies))]
+        # Passe « warm » sur le dernier budget seulement : scores en cache
+        if budget == args.budgets[-1]:
+            passes.append(("warm", run_pass(reranker, queries, candidates, pathologies)))
+        for label, (top1, latencies, fallbacks) in passes:
+            results.append({
+                "case": f"rerank/budget={budget:g}/{label}",
+                "budget_ms": budget,
+                "top1_accuracy": round(float(np.mean(np.array(top1) == targets)), 4),
+                "recall_at_k": round(recall, 4),
+                "fallback_pct": round(100 * fallbacks / len(queries), 1),
+                **latency_summary(latencies),
+            })
+
+    print()
+    print_table(results, COLUMNS)
+    if not args.no_save:
+        save_results("rerank", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,113 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Benchmark rappel / latence des index vectoriels
+# =============================================================================
+
+"""
+Benchmark des index vectoriels
+------------------------------
+Compare l'index exact (argpartition) et l'index IVF sur un catalogue
+synthétique regroupé en clusters (proche de la structure des embeddings
+de pathologies : variantes d'une même condition). Résultats JSON dans
+`benchmarks/results/` (comparables avec `compare.py`).
+
+Usage:
+    python benchmarks/bench_vector_index.py --sizes 50000 200000 --dim 384
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import BACKEND_DIR, latency_summary, print_table, save_results
+
+sys.path.insert(0, str(BACKEND_DIR))
+from vector_index import ExactIndex, IVFIndex, normalize_rows  # noqa: E402
+
+COLUMNS = [
+    ("case", "cas", ""), ("build_s", "build (s)", ".2f"), ("p50_ms", "p50 (ms)", ".2f"),
+    ("p95_ms", "p95 (ms)", ".2f"), ("recall_at_k", "rappel@k", ".3f"),
+]
+
+
+def make_catalogue(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """Catalogue synthétique : n vecteurs autour de ~sqrt(n) centres."""
+    centers = rng.normal(size=(max(1, int(np.sqrt(n))), dim)).astype(np.float32)
+    owners = rng.integers(0, centers.shape[0], size=n)
+    noise = rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+    return normalize_rows(centers[owners] + noise)
+
+
+def time_queries(index, queries: np.ndarray, k: int) -> tuple[np.ndarray, list[float]]:
+    """Exécute les requêtes une à une et retourne (ids, latences en ms)."""
+    ids, latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, found = index.search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(found[0])
+    return np.array(ids), latencies
+
+
+def recall(reference: np.ndarray, found: np.ndarray) -> float:
+    """Rappel@k moyen de `found` par rapport aux résultats exacts."""
+    hits = [len(set(r) & set(f)) / len(r) for r, f in zip(reference, found)]
+    return float(np.mean(hits))
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Fichier JSON (défaut: benchmarks/results/)")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+
+    for n in args.sizes:
+        catalogue = make_catalogue(n, args.dim, rng)
+        # Requêtes = entrées bruitées du catalogue (paraphrases)
+        picks = rng.integers(0, n, size=args.queries)
+        queries = normalize_rows(catalogue[picks] + rng.normal(scale=0.3, size=(args.queries, args.dim)))
+
+        print(f"⏳ n={n} : exact...")
+        start = time.perf_counter()
+        exact = ExactIndex(catalogue, normalized=True)
+        build = time.perf_counter() - start
+        reference, latencies = time_queries(exact, queries, args.k)
+        results.append({
+            "case": f"exact/n={n}", "n": n, "index": "exact", "build_s": round(build, 3),
+            **latency_summary(latencies), "recall_at_k": 1.0,
+        })
+
+        print(f"⏳ n={n} : ivf...")
+        start = time.perf_counter()
+        ivf = IVFIndex(catalogue)
+        build = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            ivf.nprobe = min(nprobe, ivf.n_lists)
+            found, latencies = time_queries(ivf, queries, args.k)
+            results.append({
+                "case": f"ivf/nprobe={nprobe}/n={n}", "n": n, "index": "ivf", "nprobe": ivf.nprobe,
+                "n_lists": ivf.n_lists, "build_s": round(build, 3),
+                **latency_summary(latencies), "recall_at_k": round(recall(reference, found), 4),
+            })
+
+    print()
+    print_table(results, COLUMNS)
+    if not args.no_save:
+        save_results("vector_index", args, results, args.output)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,360 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Outils partagés des benchmarks (données synthétiques, stubs, rapports)
+# =============================================================================
+
+"""
+Outils communs des benchmarks
+-----------------------------
+- catalogues et requêtes synthétiques (10 à 100k pathologies, reproductibles
+  via la graine)
+- backends factices pour tourner hors ligne, sans modèle téléchargé :
+  `StubEncoder` (sac de mots haché, même interface que SentenceTransformer),
+  `StubCrossEncoder` (recouvrement de mots, latence et queue lente simulées)
+  et `StubLlama` (latences d'évaluation / génération simulées)
+- percentiles de latence, pic de RSS et résultats JSON horodatés par commit
+  dans `benchmarks/results/` (comparés par `compare.py`)
+
+Les stubs ne mesurent pas la qualité des modèles : ils isolent le coût du
+pipeline autour d'eux (retrieval, caches, pool, sérialisation HTTP).
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+BACKEND_DIR = REPO_DIR / "backend"
+SERVER_DIR = REPO_DIR / "server"
+RESULTS_DIR = BENCH_DIR / "results"
+
+SYMPTOM_VOCABULARY = [
+    "fièvre", "frissons", "toux sèche", "toux grasse", "maux de tête", "nausées", "vomissements",
+    "diarrhée", "constipation", "douleur abdominale", "douleur thoracique", "essoufflement",
+    "fatigue intense", "courbatures", "vertiges", "palpitations", "sueurs nocturnes",
+    "perte d'appétit", "perte de poids", "soif permanente", "brûlures en urinant",
+    "envie fréquente d'uriner", "éruption cutanée", "démangeaisons", "gonflement des chevilles",
+    "raideur de la nuque", "photophobie", "nez qui coule", "mal de gorge", "ganglions gonflés",
+    "douleur lombaire", "douleur articulaire", "crampes musculaires", "troubles de la vision",
+    "bourdonnements d'oreille", "saignement de nez", "confusion", "somnolence", "insomnie",
+    "anxiété", "tremblements", "engourdissement du bras", "faiblesse d'un côté du corps",
+    "difficulté à avaler", "brûlures d'estomac", "ballonnements", "sang dans les selles",
+    "jaunisse", "urines foncées", "peau pâle", "lèvres bleutées", "respiration sifflante",
+    "douleur au mollet", "œdème du visage", "perte d'odorat", "yeux rouges", "larmoiement",
+    "éternuements", "douleur en bas à droite du ventre", "douleur qui irradie dans le bras gauche",
+]
+_QUERY_OPENINGS = ["J'ai ", "Depuis deux jours j'ai ", "Je ressens ", "Mon enfant a ", "Ce matin : "]
+_SEVERITY_URGENCY = {1: "Non urgent", 2: "Non urgent", 3: "Consultation conseillée", 4: "Consultation rapide", 5: "URGENCE MÉDICALE"}
+
+
+# =============================================================================
+# Données synthétiques
+# =============================================================================
+
+def synthetic_catalogue(n: int, rng: np.random.Generator, symptoms_per_entry: tuple = (4, 9)) -> list[dict]:
+    """Catalogue de `n` pathologies au schéma de `pathologies.json`."""
+    low, high = symptoms_per_entry
+    counts = rng.integers(low, high, size=n)
+    severities = rng.integers(1, 6, size=n)
+    pathologies = []
+    for i in range(n):
+        picks = rng.choice(len(SYMPTOM_VOCABULARY), size=counts[i], replace=False)
+        symptoms = [SYMPTOM_VOCABULARY[j] for j in picks]
+        severity = int(severities[i])
+        pathologies.append({
+            "id": f"synthetic-{i:06d}",
+            "name": f"Pathologie synthétique {i}",
+            "symptoms_description": ", ".join(symptoms).capitalize() + ".",
+            "severity_level": severity,
+            "urgency": _SEVERITY_URGENCY[severity],
+            "advice": "Consultez votre médecin traitant si les symptômes persistent.",
+            "specialist": "Médecin généraliste",
+            "typical_age_range": "Tout âge",
+        })
+    return pathologies
+
+
+def synthetic_queries(
+    pathologies: Sequence[dict],
+    n: int,
+    rng: np.random.Generator,
+    with_targets: bool = False
+) -> Union[list[str], tuple[list[str], np.ndarray]]:
+    """
+    Requêtes patient paraphrasant partiellement une pathologie tirée au hasard
+    (avec `with_targets`, retourne aussi l'indice de cette pathologie).
+    """
+    queries = []
+    targets = rng.integers(0, len(pathologies), size=n)
+    for i in targets:
+        symptoms = pathologies[i]["symptoms_description"].rstrip(".").lower().split(", ")
+        keep = rng.choice(len(symptoms), size=min(len(symptoms), int(rng.integers(2, 5))), replace=False)
+        opening = _QUERY_OPENINGS[int(rng.integers(len(_QUERY_OPENINGS)))]
+        queries.append(opening + " et ".join(symptoms[j] for j in sorted(keep)))
+    return (queries, targets) if with_targets else queries
+
+
+def write_catalogue(path: Path, pathologies: list[dict]) -> Path:
+    """Écrit un catalogue au format `pathologies.json` (pour l'application)."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"pathologies": pathologies}, f, ensure_ascii=False)
+    return path
+
+
+def read_traffic(path: Path, id_field: str = "id", text_field: str = "symptoms") -> list[str]:
+    """Textes d'un fichier JSONL de requêtes (même format que /diagnose/batch)."""
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get(text_field) if isinstance(record, dict) else None
+            if isinstance(text, str) and text.strip():
+                texts.append(text)
+    if not texts:
+        raise ValueError(f"Aucune requête exploitable dans {path} (champ '{text_field}')")
+    return texts
+
+
+# =============================================================================
+# Backends factices
+# =============================================================================
+
+class StubEncoder:
+    """
+    Encodeur déterministe hors ligne : sac de mots haché (crc32) en `dim`
+    dimensions. Des textes partageant des mots restent proches, ce qui
+    suffit à exercer seuil, caches sémantiques et fusion.
+
+    `latency_ms` simule le coût d'un appel au modèle (par lot).
+    """
+
+    def __init__(self, dim: int = 384, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self._buckets: dict[str, tuple[int, float]] = {}
+
+    def _bucket(self, word: str) -> tuple[int, float]:
+        bucket = self._buckets.get(word)
+        if bucket is None:
+            h = zlib.crc32(word.encode("utf-8"))
+            bucket = self._buckets[word] = (h % self.dim, 1.0 if h & 1 << 31 else -1.0)
+        return bucket
+
+    def encode(
+        self,
+        sentences: Union[str, Sequence[str]],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                column, sign = self._bucket(word.strip(".,;:!?"))
+                vectors[row, column] += sign
+        # Un texte vide ne doit pas donner un vecteur nul
+        vectors[:, 0] += 1e-3
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+class StubCrossEncoder:
+    """
+    Remplaçant de `sentence_transformers.CrossEncoder` : score = recouvrement
+    des mots de la requête et du document. Une passe coûte `latency_ms` +
+    `pair_ms` par couple ; une fraction `tail_rate` des passes prend
+    `tail_ms` de plus (queue de latence d'un modèle sur CPU partagé).
+    """
+
+    def __init__(self, latency_ms: float = 10.0, pair_ms: float = 2.0, tail_ms: float = 0.0,
+                 tail_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.pair_ms = pair_ms
+        self.tail_ms = tail_ms
+        self.tail_rate = tail_rate
+        self._rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def _words(text: str) -> set[str]:
+        return {word.strip(".,;:!?") for word in text.lower().split()}
+
+    def predict(self, pairs: Sequence[tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        delay = self.latency_ms + self.pair_ms * len(pairs)
+        if self._rng.random() < self.tail_rate:
+            delay += self.tail_ms
+        time.sleep(delay / 1000)
+        scores = []
+        for query, document in pairs:
+            query_words, document_words = self._words(query), self._words(document)
+            scores.append(len(query_words & document_words) / np.sqrt(len(query_words) * len(document_words) or 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+class StubLlama:
+    """
+    Remplaçant de `llama_cpp.Llama` : même interface que celle utilisée par
+    le backend (complétion streamée ou non, état du KV-cache), latences
+    simulées par `time.sleep` (libère le GIL comme le code natif).
+
+    L'évaluation coûte `prompt_ms` pour le texte ajouté après le préfixe
+    restauré ; la génération coûte `token_ms` par token.
+    """
+
+    REPLY = "Vos symptômes méritent un avis médical. Reposez-vous, hydratez-vous et consultez si cela persiste."
+
+    def __init__(self, model_path: str = "", prompt_ms: float = 50.0, token_ms: float = 10.0,
+                 max_tokens: int = 32, **kwargs):
+        self.model_path = model_path
+        self.prompt_ms = prompt_ms
+        self.token_ms = token_ms
+        self.max_tokens = max_tokens
+        self._ids: list[int] = []
+
+    # --- État du contexte (PromptPrefixCache) ---
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> list[int]:
+        return ([1] if add_bos else []) + list(text)
+
+    def reset(self) -> None:
+        self._ids = []
+
+    def eval(self, tokens: Sequence[int]) -> None:
+        self._ids = self._ids + list(tokens)
+
+    def save_state(self) -> list[int]:
+        return list(self._ids)
+
+    def load_state(self, state: list[int]) -> None:
+        self._ids = list(state)
+
+    @property
+    def n_tokens(self) -> int:
+        return len(self._ids)
+
+    @property
+    def input_ids(self) -> np.ndarray:
+        return np.asarray(self._ids, dtype=np.intc)
+
+    # --- Complétion ---
+    def __call__(self, prompt: str, max_tokens: int = 16, stream: bool = False, **kwargs):
+        # Un mot = un token ; la réponse est répétée jusqu'au nombre demandé
+        words = self.REPLY.split(" ")
+        chunks = [
+            words[i % len(words)] if i == 0 else " " + words[i % len(words)]
+            for i in range(min(max_tokens, self.max_tokens))
+        ]
+
+        def generate():
+            time.sleep(self.prompt_ms / 1000)
+            for chunk in chunks:
+                time.sleep(self.token_ms / 1000)
+                yield {"choices": [{"text": chunk}]}
+
+        if stream:
+            return generate()
+        return {"choices": [{"text": "".join(c["choices"][0]["text"] for c in generate())}]}
+
+
+# =============================================================================
+# Mesures et rapports
+# =============================================================================
+
+def latency_summary(latencies_ms: Sequence[float]) -> dict:
+    """Nombre d'échantillons, moyenne et percentiles (ms)."""
+    if not len(latencies_ms):
+        return {"count": 0}
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(values.max()), 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Pic de RSS du processus depuis son démarrage (Mo)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss : Ko sous Linux, octets sous macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_revision() -> dict:
+    """Commit courant et présence de modifications non commitées."""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], cwd=REPO_DIR, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def save_results(name: str, args, results: list[dict], output: Optional[Path] = None) -> Path:
+    """
+    Enregistre les résultats d'un benchmark en JSON.
+
+    Chaque entrée de `results` porte une clé `case` qui l'identifie d'une
+    exécution à l'autre (comparaison par `compare.py`).
+    """
+    revision = git_revision()
+    started = datetime.now(timezone.utc)
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{name}-{started:%Y%m%d-%H%M%S}-{revision['commit'] or 'nogit'}.json"
+
+    payload = {
+        "benchmark": name,
+        "created_at": started.isoformat(timespec="seconds"),
+        "git": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats enregistrés: {output}")
+    return output
+
+
+def print_table(rows: list[dict], columns: Sequence[tuple[str, str, str]]) -> None:
+    """Affiche des lignes de résultats ; `columns` = (clé, titre, format)."""
+    cells = [
+        ["-" if row.get(key) is None else format(row[key], fmt) for key, _, fmt in columns]
+        for row in rows
+    ]
+    widths = [max([len(title)] + [len(line[i]) for line in cells]) for i, (_, title, _) in enumerate(columns)]
+    # Première colonne (nom du cas) alignée à gauche, valeurs à droite
+    align = ["<"] + [">"] * (len(columns) - 1)
+    print(" ".join(f"{title:{a}{w}}" for (_, title, _), a, w in zip(columns, align, widths)))
+    for line in cells:
+        print(" ".join(f"{cell:{a}{w}}" for cell, a, w in zip(line, align, widths)))
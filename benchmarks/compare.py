@@ -0,0 +1,84 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Comparaison de deux résultats de benchmark (détection de régressions)
+# =============================================================================
+
+"""
+Comparaison de résultats
+------------------------
+Apparie les cas (`case`) de deux fichiers JSON produits par les benchmarks
+(typiquement deux commits) et affiche l'évolution des percentiles de
+latence, du débit et du pic de mémoire.
+
+Le code de sortie est non nul si une métrique se dégrade de plus de
+`--threshold` (10 % par défaut) : utilisable en CI ou avant un merge.
+Relancer un benchmark deux fois sur le même commit donne l'ordre de
+grandeur du bruit de la machine.
+
+Usage :
+    python benchmarks/compare.py results/pipeline-...-abc1234.json results/pipeline-...-def5678.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# (clé, sens d'amélioration) : -1 = plus petit est meilleur
+TRACKED_METRICS = (
+    ("p50_ms", -1), ("p95_ms", -1), ("p99_ms", -1), ("throughput_rps", 1), ("peak_rss_mb", -1),
+)
+
+
+def load(path: Path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10, help="Dégradation relative tolérée")
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=0.05,
+        help="Écart de latence absolu ignoré (bruit de mesure des cas sub-milliseconde)"
+    )
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline["benchmark"] != candidate["benchmark"]:
+        sys.exit(f"Benchmarks différents: {baseline['benchmark']} / {candidate['benchmark']}")
+    print(f"📊 {baseline['benchmark']}: {baseline['git']['commit']} → {candidate['git']['commit']}")
+
+    reference = {row["case"]: row for row in baseline["results"]}
+    regressions = []
+    for row in candidate["results"]:
+        base = reference.get(row["case"])
+        if base is None:
+            print(f"   {row['case']}: nouveau cas (pas de référence)")
+            continue
+        changes = []
+        for key, direction in TRACKED_METRICS:
+            old, new = base.get(key), row.get(key)
+            if not old or new is None:
+                continue
+            delta = (new - old) / old
+            changes.append(f"{key} {old:g} → {new:g} ({delta:+.1%})")
+            if key.endswith("_ms") and abs(new - old) < args.min_delta_ms:
+                continue
+            if delta * direction < -args.threshold:
+                regressions.append(f"{row['case']} {key} {delta:+.1%}")
+        print(f"   {row['case']}: " + ", ".join(changes))
+
+    if regressions:
+        print(f"❌ {len(regressions)} régression(s) au-delà de {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        sys.exit(1)
+    print(f"✅ Aucune régression au-delà de {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
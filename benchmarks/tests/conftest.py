@@ -0,0 +1,21 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Fixtures communes des tests des outils de benchmark
+# =============================================================================
+
+"""
+Les tests couvrent les outils partagés (données synthétiques, stubs,
+rapports) et la comparaison de résultats, pas les benchmarks eux-mêmes.
+
+Usage :
+    cd benchmarks
+    pytest tests/ -v
+"""
+
+import sys
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent.parent
+if str(BENCH_DIR) not in sys.path:
+    sys.path.insert(0, str(BENCH_DIR))
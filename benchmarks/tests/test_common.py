@@ -0,0 +1,100 @@
+import argparse
+import json
+
+import numpy as np
+import pytest
+
+from common import (
+    StubCrossEncoder, StubEncoder, latency_summary, print_table, read_traffic, save_results,
+    synthetic_catalogue, synthetic_queries, write_catalogue
+)
+
+
+def test_synthetic_data_is_reproducible_from_the_seed():
+    first = synthetic_catalogue(20, np.random.default_rng(3))
+    second = synthetic_catalogue(20, np.random.default_rng(3))
+    assert first == second
+    assert len({p["id"] for p in first}) == 20
+    assert all(1 <= p["severity_level"] <= 5 for p in first)
+
+    queries, targets = synthetic_queries(first, 10, np.random.default_rng(1), with_targets=True)
+    assert queries == synthetic_queries(first, 10, np.random.default_rng(1))
+    # Chaque requête reprend au moins un symptôme de sa pathologie cible
+    for query, target in zip(queries, targets):
+        symptoms = first[target]["symptoms_description"].rstrip(".").lower().split(", ")
+        assert any(symptom in query for symptom in symptoms)
+
+
+def test_written_catalogue_has_the_application_schema(tmp_path):
+    pathologies = synthetic_catalogue(3, np.random.default_rng(0))
+    path = write_catalogue(tmp_path / "pathologies.json", pathologies)
+    assert json.loads(path.read_text(encoding="utf-8")) == {"pathologies": pathologies}
+
+
+def test_read_traffic_keeps_usable_texts_only(tmp_path):
+    path = tmp_path / "traffic.jsonl"
+    path.write_text(
+        '{"id": "a", "symptoms": "fièvre et toux"}\n\n'
+        '{"id": "b", "symptoms": "  "}\n'
+        '["pas un objet"]\n'
+        '{"id": "c", "texte": "maux de tête"}\n',
+        encoding="utf-8",
+    )
+    assert read_traffic(path) == ["fièvre et toux"]
+    assert read_traffic(path, text_field="texte") == ["maux de tête"]
+    with pytest.raises(ValueError):
+        read_traffic(path, text_field="absent")
+
+
+def test_stub_encoder_keeps_shared_words_close():
+    encoder = StubEncoder(dim=64)
+    vectors = encoder.encode(["fièvre et toux", "toux et fièvre", "douleur lombaire"], normalize_embeddings=True)
+    assert vectors.shape == (3, 64)
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-6)
+    assert vectors[0] @ vectors[1] == pytest.approx(1.0)
+    assert vectors[0] @ vectors[2] < 0.5
+    assert encoder.encode("").shape == (64,)
+
+
+def test_stub_cross_encoder_scores_word_overlap():
+    scores = StubCrossEncoder(latency_ms=0, pair_ms=0).predict(
+        [("fièvre et toux", "Toux, fièvre et frissons."), ("fièvre et toux", "Douleur lombaire.")]
+    )
+    assert scores.dtype == np.float32
+    assert scores[0] > scores[1] == 0
+
+
+def test_latency_summary_percentiles():
+    summary = latency_summary(list(range(1, 101)))
+    assert summary["count"] == 100
+    assert summary["mean_ms"] == 50.5
+    assert summary["p50_ms"] == 50.5
+    assert summary["p99_ms"] == pytest.approx(99.01)
+    assert summary["max_ms"] == 100
+    assert latency_summary([]) == {"count": 0}
+
+
+def test_save_results_layout(tmp_path, capsys):
+    args = argparse.Namespace(size=10, output=tmp_path / "out.json", no_save=False)
+    rows = [{"case": "exact/n=10", "p50_ms": 0.1}]
+    path = save_results("demo", args, rows, args.output)
+
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert payload["benchmark"] == "demo"
+    assert payload["results"] == rows
+    assert set(payload["git"]) == {"commit", "dirty"}
+    assert payload["args"]["output"] == str(tmp_path / "out.json")
+    assert payload["peak_rss_mb"] > 0
+    assert str(path) in capsys.readouterr().out
+
+
+def test_print_table_aligns_columns(capsys):
+    print_table(
+        [{"case": "court", "p50_ms": 1.234}, {"case": "beaucoup plus long", "p50_ms": None}],
+        [("case", "cas", ""), ("p50_ms", "p50 (ms)", ".2f")],
+    )
+    header, first, second = capsys.readouterr().out.splitlines()
+    assert header.split() == ["cas", "p50", "(ms)"]
+    assert first.startswith("court ") and first.endswith("1.23")
+    assert second.endswith("-")
+    assert len(header) == len(first) == len(second)
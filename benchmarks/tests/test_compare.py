@@ -0,0 +1,57 @@
+import json
+import sys
+
+import pytest
+
+import compare
+
+
+def write(path, commit, rows, benchmark="pipeline"):
+    path.write_text(json.dumps({"benchmark": benchmark, "git": {"commit": commit}, "results": rows}))
+    return path
+
+
+def run(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["compare.py", *map(str, argv)])
+    compare.main()
+
+
+def test_no_regression_within_threshold(tmp_path, monkeypatch, capsys):
+    baseline = write(tmp_path / "a.json", "aaa", [{"case": "c", "p50_ms": 10.0, "throughput_rps": 100}])
+    candidate = write(tmp_path / "b.json", "bbb", [
+        {"case": "c", "p50_ms": 10.5, "throughput_rps": 95}, {"case": "nouveau", "p50_ms": 1.0},
+    ])
+    run(monkeypatch, baseline, candidate)
+    out = capsys.readouterr().out
+    assert "aaa → bbb" in out
+    assert "nouveau: nouveau cas" in out
+    assert "✅ Aucune régression au-delà de 10%" in out
+
+
+def test_regressions_fail_with_their_direction(tmp_path, monkeypatch, capsys):
+    baseline = write(tmp_path / "a.json", "aaa", [{"case": "c", "p95_ms": 10.0, "throughput_rps": 100}])
+    candidate = write(tmp_path / "b.json", "bbb", [{"case": "c", "p95_ms": 12.0, "throughput_rps": 80}])
+    with pytest.raises(SystemExit) as exc:
+        run(monkeypatch, baseline, candidate)
+    assert exc.value.code == 1
+    out = capsys.readouterr().out
+    assert "❌ 2 régression(s)" in out
+    assert "c p95_ms +20.0%" in out and "c throughput_rps -20.0%" in out
+
+
+def test_sub_millisecond_noise_and_threshold_option(tmp_path, monkeypatch, capsys):
+    baseline = write(tmp_path / "a.json", "aaa", [{"case": "c", "p50_ms": 0.01}])
+    candidate = write(tmp_path / "b.json", "bbb", [{"case": "c", "p50_ms": 0.03}])
+    run(monkeypatch, baseline, candidate)
+    assert "✅" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        run(monkeypatch, baseline, candidate, "--min-delta-ms", "0")
+    run(monkeypatch, baseline, candidate, "--min-delta-ms", "0", "--threshold", "3")
+
+
+def test_different_benchmarks_are_refused(tmp_path, monkeypatch):
+    baseline = write(tmp_path / "a.json", "aaa", [], benchmark="pipeline")
+    candidate = write(tmp_path / "b.json", "bbb", [], benchmark="rerank")
+    with pytest.raises(SystemExit, match="Benchmarks différents"):
+        run(monkeypatch, baseline, candidate)
@@ -30,8 +30,17 @@ interface DiagnosisResponse {
   authors: string[];
 }
 
+// Événements NDJSON de POST /diagnose/stream
+type StreamEvent =
+  | ({ type: "match" } & Omit<DiagnosisResponse, "ai_response">)
+  | { type: "token"; text: string }
+  | { type: "done"; ai_response: string }
+  | { type: "error"; detail: string };
+
 // Configuration
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
+// Streaming de la réponse IA (désactivable via NEXT_PUBLIC_USE_STREAMING=false)
+const USE_STREAMING = process.env.NEXT_PUBLIC_USE_STREAMING !== "false";
 
 export default function Home() {
   const [symptoms, setSymptoms] = useState("");
@@ -39,6 +48,62 @@ export default function Home() {
   const [result, setResult] = useState<DiagnosisResponse | null>(null);
   const [error, setError] = useState<string | null>(null);
 
+  // Lit le flux NDJSON : la pathologie s'affiche dès le retrieval,
+  // puis la réponse IA se complète au fil des tokens
+  const streamDiagnosis = async (text: string) => {
+    const response = await fetch(`${API_URL}/diagnose/stream`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ symptoms: text }),
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`Erreur serveur: ${response.status}`);
+    }
+
+    const handleEvent = (event: StreamEvent) => {
+      switch (event.type) {
+        case "match": {
+          const { type, ...match } = event;
+          setResult({ ...match, ai_response: "" });
+          break;
+        }
+        case "token":
+          setResult((prev) =>
+            prev ? { ...prev, ai_response: prev.ai_response + event.text } : prev
+          );
+          break;
+        case "done":
+          setResult((prev) =>
+            prev ? { ...prev, ai_response: event.ai_response } : prev
+          );
+          break;
+        case "error":
+          throw new Error(event.detail);
+      }
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split("\n");
+      buffer = lines.pop() ?? "";
+      for (const line of lines) {
+        if (line.trim()) handleEvent(JSON.parse(line));
+      }
+    }
+
+    if (buffer.trim()) handleEvent(JSON.parse(buffer));
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
 
@@ -52,6 +117,11 @@ export default function Home() {
     setResult(null);
 
     try {
+      if (USE_STREAMING) {
+        await streamDiagnosis(symptoms.trim());
+        return;
+      }
+
       const response = await fetch(`${API_URL}/diagnose`, {
         method: "POST",
         headers: {
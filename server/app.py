@@ -1,16 +1,33 @@
 import os
+import sys
 import json
-import requests
+import hashlib
 import numpy as np
-import functools
+import threading
 import time
-from flask import Flask, request, jsonify
+from pathlib import Path
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-from sentence_transformers import SentenceTransformer, util
-import google.generativeai as genai
-from google.api_core import exceptions
 from dotenv import load_dotenv
 
+# Modules partagés avec le backend FastAPI (cache d'embeddings, index, ...)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+from embedding_cache import EmbeddingCache
+from llm_providers import (
+    AllProvidersFailedError, BackgroundLoop, GeminiProvider, HedgedRouter, fake_providers
+)
+from encoders import encoder_cache_key, load_encoder
+from languages import detect_language
+from metrics import Metrics, process_rss_bytes
+from model_server import RemoteEncoder
+from multi_vector import MultiVectorIndex, fragment_layout, text_fragments
+from quantization import build_index
+from reranker import CrossEncoderReranker
+from response_cache import ResponseCache
+from sessions import SessionStore
+from vector_index import top_k
+
 load_dotenv()
 
 app = Flask(__name__)
@@ -25,15 +42,64 @@ def add_security_headers(response):
     response.headers['X-XSS-Protection'] = '1; mode=block'
     return response
 
+# --- Metrics ---
+# Histogrammes par étape + en-tête Server-Timing (TIMING_HEADER=1 ou requête avec `X-Timing: 1`)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
+metrics = Metrics("doctis_server", enabled=METRICS_ENABLED)
+
+@app.before_request
+def start_request_timing():
+    g.timing_token = metrics.start_request()
+
+@app.after_request
+def record_request_timing(response):
+    timings = metrics.current_timings()
+    if timings is None:
+        return response
+    header = timings.header()
+    metrics.observe("total", time.perf_counter() - timings.started_at)
+    metrics.inc(
+        "http_requests_total", "HTTP requests by route and status",
+        {"route": request.url_rule.rule if request.url_rule else "unmatched", "status": response.status_code}
+    )
+    if TIMING_HEADER or request.headers.get("X-Timing") == "1":
+        response.headers['Server-Timing'] = header
+    return response
+
+@app.teardown_request
+def finish_request_timing(exc):
+    metrics.finish_request(g.pop("timing_token", None))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics disabled"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 # --- Health Check ---
+# Liveness : toujours 200, l'état du moteur indique la progression du chargement
 @app.route('/health')
 def health_check():
-    return jsonify({"status": "healthy", "service": "doctis-ai-mo"}), 200
+    return jsonify({
+        "status": "healthy" if engine_ready() else engine_state["status"],
+        "ready": engine_ready(),
+        "service": "doctis-ai-mo",
+        "engine": engine_state,
+        "response_cache": response_cache.stats()
+    }), 200
+
+# Readiness : 503 tant que le moteur SBERT n'est pas initialisé
+@app.route('/ready')
+def readiness_check():
+    if not engine_ready():
+        return not_ready_response()
+    return jsonify({"ready": True}), 200
 
 # --- Configuration Gemini ---
+# Le client (google.generativeai, gRPC) est importé et configuré hors du démarrage :
+# par le thread de chargement du moteur, ou au premier résumé
 GENAI_API_KEY = os.getenv("GOOGLE_API_KEY")
-if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
 
 # Liste de priorité des modèles (User Request)
 # Rotation automatique si Quota Exceeded
@@ -45,12 +111,90 @@ MODEL_ROTATION_LIST = [
     'gemini-pro'        # Fallback Standard
 ]
 
+# Fournisseur des résumés : "gemini", ou "fake" (local, sans réseau ni clé)
+SUMMARY_PROVIDER = os.getenv("SUMMARY_PROVIDER", "gemini")
+# Modèle suivant lancé en parallèle si le courant n'a pas répondu après ce délai
+LLM_HEDGE_DELAY_S = float(os.getenv("LLM_HEDGE_DELAY_S", 2.5))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 2))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", 30))
+# Un modèle en quota épuisé est écarté pendant ce délai
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", 60))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+
 # --- Engine Setup ---
 DATA_SOURCE_URL = "https://gist.githubusercontent.com/Adam-Blf/raw/fake-gist-id/diseases.json" 
 MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+EMBEDDING_CACHE_DIR = Path(__file__).resolve().parent / "cache"
+VECTOR_INDEX_KIND = os.getenv("VECTOR_INDEX", "exact")  # "exact" | "ivf"
+# Matrice de l'index exact : "float32" | "float16" | "int8" | "binary", puis re-scoring
+# float32 des RESCORE_CANDIDATES meilleurs candidats (fichier memory-mappé du cache)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+RESCORE_CANDIDATES = int(os.getenv("RESCORE_CANDIDATES", 200))
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")  # "torch" | "onnx" | "onnx-int8"
+# Socket du serveur de modèles (lancé par gunicorn_config.py) : SBERT chargé une fois pour tous les workers
+MODEL_SERVER = os.getenv("MODEL_SERVER")
+# "single" : un vecteur par maladie ; "multi" : un vecteur par symptôme + fusion tardive
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "single")
+# Re-classement des 3 résultats par un cross-encoder (ex: cross-encoder/mmarco-mMiniLMv2-L12-H384-v1),
+# ordre SBERT conservé au-delà de RERANK_BUDGET_MS ; vide = désactivé
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", 150))
+SUMMARY_UNAVAILABLE = "Service currently unavailable."
+NO_MATCH_ADVICE = (
+    "DISCLAIMER: I am an AI, consult a doctor. "
+    "Your symptoms do not match any condition in the knowledge base; please see a doctor for an assessment."
+)
+TRIAGE_LANGUAGES = ("en", "fr", "ar")
+
+# Cache des résumés partagé entre workers gunicorn (SQLite, TTL + LRU)
+response_cache = ResponseCache(
+    EMBEDDING_CACHE_DIR / "responses.sqlite3",
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_S", 24 * 3600)),
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000)),
+    similarity_threshold=float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.92)),
+)
+# Conversations multi-tours de /api/triage (par processus : un worker gunicorn
+# ne voit que ses sessions, d'où un routage collant en multi-workers)
+session_store = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX_COUNT", 10000)),
+    ttl_seconds=float(os.getenv("SESSION_TTL_S", 1800)),
+    max_bytes=int(os.getenv("SESSION_MAX_MB", 256)) * 1024 * 1024,
+    max_turns=int(os.getenv("SESSION_MAX_TURNS", 20)),
+)
+reranker = CrossEncoderReranker(RERANK_MODEL, budget_ms=RERANK_BUDGET_MS) if RERANK_MODEL else None
 model = None
 pathology_data = []
 pathology_embeddings = None
+pathology_index = None
+
+# État du chargement (thread d'arrière-plan) : pending | loading | ready | failed
+ENGINE_RETRY_AFTER_S = 10
+engine_state = {"status": "pending", "error": None, "load_seconds": None}
+_engine_thread = None
+
+def _response_cache_lookups():
+    stats = response_cache.stats()
+    return {"exact": stats["hits_exact"], "semantic": stats["hits_semantic"], "miss": stats["misses"]}
+
+metrics.gauge("process_resident_memory_bytes", "Process RSS", process_rss_bytes)
+metrics.gauge("engine_load_seconds", "SBERT engine load time", lambda: engine_state["load_seconds"])
+metrics.gauge(
+    "response_cache_lookups_total", "Summary cache lookups",
+    _response_cache_lookups, label="result", kind="counter"
+)
+metrics.gauge("response_cache_hit_ratio", "Summary cache hit ratio", lambda: response_cache.stats()["hit_rate"])
+metrics.gauge("sessions", "Active multi-turn triage sessions", lambda: len(session_store))
+
+def _rerank_results():
+    if reranker is None:
+        return None
+    stats = reranker.stats()
+    return {key: stats[key] for key in ("reranked", "timeouts", "skipped", "errors")}
+
+metrics.gauge(
+    "rerank_total", "Cross-encoder reranks (applied, or fallback to the SBERT order)",
+    _rerank_results, label="result", kind="counter"
+)
 
 # --- Logic ---
 
@@ -69,73 +213,259 @@ def fetch_disease_data():
         print(f"Error loading data: {e}")
         return []
 
+def disease_fingerprints(data):
+    """{id: empreinte de l'entrée} : les résumés en cache d'une maladie modifiée sont invalidés."""
+    return {
+        p["id"]: hashlib.blake2b(json.dumps(p, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+        for p in data
+    }
+
 def initialize_engine():
-    global model, pathology_data, pathology_embeddings
-    print(f"Loading SBERT model {MODEL_NAME}...")
-    model = SentenceTransformer(MODEL_NAME)
-    pathology_data = fetch_disease_data()
-    corpus = [", ".join(p["symptoms"]) for p in pathology_data]
-    print("Encoding vectors...")
-    pathology_embeddings = model.encode(corpus, convert_to_tensor=True)
-    print("Engine Initialized.")
+    global model, pathology_data, pathology_embeddings, pathology_index
+    engine_state["status"] = "loading"
+    start = time.perf_counter()
+    try:
+        print(f"Loading SBERT model {MODEL_NAME} ({ENCODER_BACKEND})...")
+        if MODEL_SERVER:
+            sbert = RemoteEncoder(MODEL_SERVER, MODEL_NAME, ENCODER_BACKEND)
+        else:
+            sbert = load_encoder(MODEL_NAME, ENCODER_BACKEND, cache_dir=EMBEDDING_CACHE_DIR)
+        data = fetch_disease_data()
+        encode = lambda texts: sbert.encode(texts, normalize_embeddings=True)
+        cache_key = encoder_cache_key(MODEL_NAME, ENCODER_BACKEND)
+        print("Encoding vectors...")
+        # Embeddings normalisés, memory-mappés depuis le cache disque (partagés entre workers)
+        if RETRIEVAL_MODE == "multi":
+            # Chaque symptôme de la liste est indexé séparément (+ la liste complète)
+            fragment_texts, owners = fragment_layout([p["symptoms"] for p in data])
+            cache = EmbeddingCache(EMBEDDING_CACHE_DIR, f"{cache_key}#fragments")
+            index = MultiVectorIndex(cache.get_embeddings(fragment_texts, encode), owners, normalized=True)
+            embeddings = index.document_vectors()
+        else:
+            corpus = [", ".join(p["symptoms"]) for p in data]
+            cache = EmbeddingCache(EMBEDDING_CACHE_DIR, cache_key)
+            embeddings = cache.get_embeddings(corpus, encode)
+            index = build_index(
+                VECTOR_INDEX_KIND, embeddings, EMBEDDING_STORAGE, RESCORE_CANDIDATES, store=cache.derived
+            )
+    except Exception as e:
+        engine_state.update(status="failed", error=str(e))
+        print(f"Engine initialization failed: {e}")
+        return
+
+    # Résumés générés sur une version antérieure des données (cache partagé, persistant)
+    purged = response_cache.sync_catalogue(disease_fingerprints(data))
+    if purged:
+        print(f"{purged} cached summaries invalidated (disease data changed).")
+
+    # Publication groupée une fois tout prêt (les requêtes concurrentes voient
+    # soit l'ancien état, soit le nouveau)
+    model, pathology_data, pathology_embeddings, pathology_index = sbert, data, embeddings, index
+    engine_state.update(status="ready", load_seconds=round(time.perf_counter() - start, 2))
+    print(f"Engine Initialized ({cache.last_encoded_count} vectors re-encoded).")
+
+    if reranker is not None:
+        try:
+            reranker.warm_up()
+        except Exception as e:
+            print(f"Cross-encoder warm-up failed: {e}")
+
+    # Clients des modèles de résumé préparés ici plutôt qu'à la première requête
+    if summary_router is not None:
+        try:
+            summary_router.warm_up()
+        except Exception as e:
+            print(f"Summary providers warm-up failed: {e}")
+
+def start_engine_background():
+    """
+    Lance l'initialisation dans un thread : sous gunicorn, chaque worker
+    charge son moteur à l'import sans bloquer le health check.
+    """
+    global _engine_thread
+    if _engine_thread is None:
+        _engine_thread = threading.Thread(target=initialize_engine, name="engine-init", daemon=True)
+        _engine_thread.start()
+
+def engine_ready():
+    return engine_state["status"] == "ready"
+
+def not_ready_response():
+    response = jsonify({"error": f"Engine not ready ({engine_state['status']})"})
+    response.headers['Retry-After'] = str(ENGINE_RETRY_AFTER_S)
+    return response, 503
+
+def record_llm_outcome(model_name, outcome):
+    metrics.inc("llm_calls_total", "LLM calls by model and outcome", {"model": model_name, "outcome": outcome})
+
+def build_summary_router():
+    """Routeur des modèles de résumé (None sans clé API hors mode fake)."""
+    if SUMMARY_PROVIDER == "fake":
+        providers = fake_providers(
+            MODEL_ROTATION_LIST,
+            os.getenv("FAKE_PROVIDER_BEHAVIOUR", ""),
+            float(os.getenv("FAKE_PROVIDER_LATENCY_S", 0.05)),
+        )
+    elif GENAI_API_KEY:
+        providers = [GeminiProvider(name, GENAI_API_KEY) for name in MODEL_ROTATION_LIST]
+    else:
+        return None
+    return HedgedRouter(
+        providers,
+        hedge_delay_s=LLM_HEDGE_DELAY_S,
+        timeout_s=LLM_TIMEOUT_S,
+        max_in_flight=LLM_MAX_IN_FLIGHT,
+        cooldown_s=LLM_BREAKER_COOLDOWN_S,
+        failure_threshold=LLM_BREAKER_FAILURES,
+        on_outcome=record_llm_outcome,
+    )
+
+summary_router = build_summary_router()
+# Appels asynchrones sur une boucle partagée : les threads Flask n'attendent que le résultat
+provider_loop = BackgroundLoop("summary-providers")
+metrics.gauge(
+    "llm_circuit_open", "Models paused by their circuit breaker",
+    lambda: summary_router.open_circuits() if summary_router else None, label="model"
+)
 
 def generate_summary_with_rotation(prompt):
     """
-    Tente de générer le résumé en essayant les modèles un par un si Quota Exceeded.
+    Génère le résumé via le routeur : modèles par ordre de priorité, modèles
+    en quota écartés, modèle suivant lancé en parallèle si le courant tarde.
     """
-    if not GENAI_API_KEY:
+    if summary_router is None:
+        metrics.inc("summary_fallbacks_total", "Summaries replaced by a fallback message", {"reason": "no_api_key"})
         return "API Key Missing."
 
-    last_error = None
+    try:
+        with metrics.stage("llm_generation"):
+            summary, model_name = provider_loop.run(summary_router.generate(prompt))
+        print(f"RAG summary generated by {model_name}")
+        return summary
+    except AllProvidersFailedError as e:
+        metrics.inc("summary_fallbacks_total", "Summaries replaced by a fallback message", {"reason": "all_models_failed"})
+        print(f"Summary generation failed: {e}")
+        return f"{SUMMARY_UNAVAILABLE} All models busy or failed. ({e.last_error or e})"
 
-    for model_name in MODEL_ROTATION_LIST:
-        try:
-            print(f"Attempting RAG with model: {model_name}")
-            gen_model = genai.GenerativeModel(model_name)
-            response = gen_model.generate_content(prompt)
-            return response.text
-        except exceptions.ResourceExhausted:
-            print(f"Quota Exceeded for {model_name}. Switching to next...")
-            continue # Try next model
-        except Exception as e:
-            print(f"Error with {model_name}: {e}")
-            last_error = e
-            # If it's not a quota error (e.g. Model Not Found), we strictly should try next too? 
-            # Yes, let's robust filtering.
-            continue
-            
-    return f"Service currently unavailable. All models busy or failed. ({str(last_error)})"
-
-@functools.lru_cache(maxsize=100)
-def cached_rag(user_input, top_matches_str, lang):
-    prompt = (
+def summary_prompt(pathology, best_score, lang):
+    """
+    Prompt du résumé, construit uniquement à partir de la clé du cache
+    (pathologie, tranche de confiance, langue) : le texte du patient n'y
+    figure pas, un résumé en cache peut donc être servi à un autre patient.
+    """
+    low = response_cache.bucket(best_score) * response_cache.bucket_width
+    high = min(1.0, low + response_cache.bucket_width)
+    return (
         f"Act as a medical assistant. Language: {lang}. "
-        f"Analysis: User reports '{user_input}'. "
-        f"Semantic match indicates: {top_matches_str}. "
+        f"Analysis: the reported symptoms semantically match {pathology['name']} "
+        f"(match confidence {low:.0%}-{high:.0%}; typical symptoms: {', '.join(pathology['symptoms'])}). "
         "Provide a brief, empathetic summary and advice. "
         "Strictly Start with: 'DISCLAIMER: I am an AI, consult a doctor.'"
     )
-    return generate_summary_with_rotation(prompt)
+
+def cached_rag(pathology, best_score, lang, user_embedding):
+    """
+    Résumé RAG mis en cache par (pathologie, tranche de confiance, langue),
+    avec repli sémantique sur l'embedding de la requête. Le résumé ne dépend
+    que de la clé (voir `summary_prompt`).
+    """
+    cached = response_cache.get(pathology["id"], best_score, lang, user_embedding)
+    if cached is not None:
+        return cached
+
+    summary = generate_summary_with_rotation(summary_prompt(pathology, best_score, lang))
+
+    # Les échecs (clé absente, quotas épuisés) ne sont pas mis en cache
+    if summary_router is not None and not summary.startswith(SUMMARY_UNAVAILABLE):
+        response_cache.put(pathology["id"], best_score, lang, summary, user_embedding)
+    return summary
+
+def session_search(session, user_desc, user_embedding, k):
+    """
+    Ajoute le tour à la session puis cherche avec la requête agrégée.
+    Scores incrémentaux pour l'index exact float32 (un produit matrice-vecteur
+    par tour), sinon recherche de l'index avec le vecteur agrégé.
+
+    Returns:
+        (scores, ids, vecteur agrégé, texte de la conversation)
+    """
+    embeddings = pathology_embeddings
+    score_fn = None
+    if RETRIEVAL_MODE == "single" and VECTOR_INDEX_KIND == "exact" and EMBEDDING_STORAGE == "float32":
+        score_fn = lambda vector: embeddings @ vector
+    with session.lock:
+        session.add_turn(user_desc, user_embedding, score_fn)
+        query = session.query_vector()
+        dense = session.dense_scores()
+        conversation = " ".join(session.texts)
+    session_store.update(session)
+    with metrics.stage("search"):
+        top_scores, top_ids = top_k(dense, k) if dense is not None else pathology_index.search(query, k)
+    return top_scores, top_ids, query, conversation
+
+def rerank_matches(user_desc, indexed_scores):
+    """Réordonne les résultats par score cross-encoder (ordre SBERT si le budget est dépassé)."""
+    with metrics.stage("rerank"):
+        scores = reranker.rerank(user_desc, [
+            (pathology_data[idx]["id"], f"{pathology_data[idx]['name']}. {', '.join(pathology_data[idx]['symptoms'])}")
+            for idx, _ in indexed_scores
+        ])
+    if scores is None:
+        return indexed_scores
+    return [indexed_scores[i] for i in np.argsort(-scores, kind="stable")]
 
 # --- Routes ---
 
 @app.route('/api/triage', methods=['POST'])
 def triage():
+    if not engine_ready():
+        return not_ready_response()
+
     try:
         data = request.json
         user_desc = data.get('description', '').strip()
-        lang = data.get('lang', 'en')
+        session_id = data.get('session_id')
 
         if not user_desc:
             return jsonify({"error": "No input"}), 400
 
-        user_embedding = model.encode(user_desc, convert_to_tensor=True)
-        cosine_scores = util.cos_sim(user_embedding, pathology_embeddings)[0]
+        # Conversation multi-tours : seul le nouveau message est envoyé et encodé
+        session = None
+        if session_id:
+            session = session_store.get(session_id)
+            if session is None:
+                return jsonify({"error": "Unknown or expired session"}), 404
+        elif data.get('session'):
+            session = session_store.create(data.get('lang') or detect_language(user_desc, TRIAGE_LANGUAGES, 'en'))
+        # Langue du résumé : celle de la session, explicite, sinon détectée (le modèle SBERT est multilingue)
+        lang = session.lang if session is not None else (
+            data.get('lang') or detect_language(user_desc, TRIAGE_LANGUAGES, 'en')
+        )
+        metrics.mark_since_request_start("validation")
+
+        # Vecteurs normalisés : produit scalaire == similarité cosinus
+        if session is not None:
+            with metrics.stage("encode"):
+                turn_embedding = model.encode(user_desc, normalize_embeddings=True)
+            top_scores, top_ids, user_embedding, user_desc = session_search(session, user_desc, turn_embedding, 3)
+        elif RETRIEVAL_MODE == "multi":
+            # Texte complet + un vecteur par symptôme mentionné, un seul encodage
+            with metrics.stage("encode"):
+                fragment_embeddings = model.encode(text_fragments(user_desc), normalize_embeddings=True)
+            user_embedding = fragment_embeddings[0]
+            with metrics.stage("search"):
+                top_scores, top_ids = pathology_index.search(fragment_embeddings, 3)
+        else:
+            with metrics.stage("encode"):
+                user_embedding = model.encode(user_desc, normalize_embeddings=True)
+            with metrics.stage("search"):
+                top_scores, top_ids = pathology_index.search(user_embedding, 3)
         
         top_results = []
         # Score processing
-        scores_list = cosine_scores.tolist()
-        indexed_scores = sorted(list(enumerate(scores_list)), key=lambda x: x[1], reverse=True)[:3]
+        indexed_scores = [(int(i), float(s)) for i, s in zip(top_ids[0], top_scores[0]) if i >= 0]
+        if reranker is not None and len(indexed_scores) > 1:
+            indexed_scores = rerank_matches(user_desc, indexed_scores)
 
         for idx, score in indexed_scores:
             path = pathology_data[idx]
@@ -145,18 +475,28 @@ def triage():
                 "probability": "High" if score >= 0.7 else "Moderate" if score >= 0.5 else "Low"
             })
 
-        matches_str = ", ".join([f"{r['name']} ({r['score']:.2f})" for r in top_results])
-        summary = cached_rag(user_desc, matches_str, lang)
+        if indexed_scores:
+            best_idx, best_score = indexed_scores[0]
+            summary = cached_rag(pathology_data[best_idx], best_score, lang, user_embedding)
+        else:
+            # Catalogue vide : aucun résultat, pas de résumé à générer
+            summary = NO_MATCH_ADVICE
 
-        return jsonify({
+        body = {
             "matches": top_results,
             "advice": summary
-        })
+        }
+        if session is not None:
+            body.update(session_id=session.id, turns=len(session))
+        return jsonify(body)
 
     except Exception as e:
         print(f"API Error: {e}")
         return jsonify({"error": str(e)}), 500
 
+# Chargement en arrière-plan dès l'import (gunicorn comme `python app.py`)
+if os.getenv("ENGINE_AUTOSTART", "1") == "1":
+    start_engine_background()
+
 if __name__ == '__main__':
-    initialize_engine()
     app.run(debug=True, port=5000)
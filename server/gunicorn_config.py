@@ -1,9 +1,38 @@
 import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+# Serveur de modèles partagé (ex: MODEL_SERVER=/tmp/doctis-models.sock) : SBERT est
+# chargé une seule fois, les workers HTTP restent légers et peuvent occuper tous les cœurs
+MODEL_SERVER = os.getenv("MODEL_SERVER")
 
 bind = "0.0.0.0:10000"
-workers = 1              # Reduced to 1 to fit SBERT model in 512MB RAM (Free Tier)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() if MODEL_SERVER else 1))
+                         # Without MODEL_SERVER: 1 worker to fit SBERT in 512MB RAM (Free Tier)
+                         # ENCODER_BACKEND=onnx-int8 keeps PyTorch out of RSS: check the footprint
+                         # with benchmarks/bench_encoder.py before raising this
 threads = 4              # Use threads for concurrency instead of processes
 timeout = 180            # Extended timeout for Slower Cold Starts
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+
+def on_starting(server):
+    """Lance le serveur de modèles avant le fork des workers."""
+    if not MODEL_SERVER:
+        return
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+    from model_server import spawn_model_server
+
+    server.model_server_process = spawn_model_server(
+        MODEL_SERVER, cache_dir=Path(__file__).resolve().parent / "cache"
+    )
+
+
+def on_exit(server):
+    process = getattr(server, "model_server_process", None)
+    if process is not None:
+        process.terminate()
+        process.wait(timeout=10)
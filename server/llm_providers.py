@@ -0,0 +1,317 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Fournisseurs LLM asynchrones (disjoncteurs + requêtes couvertes)
+# =============================================================================
+
+"""
+Fournisseurs de résumés
+-----------------------
+Couche d'accès aux modèles génératifs du serveur Flask :
+
+- `GeminiProvider` : client `GenerativeModel` construit une seule fois (à la
+  préparation du routeur, pas à l'import), appels `generate_content_async`
+  (pas de thread bloqué pendant l'attente)
+- `FakeProvider`   : fournisseur local (latence et pannes scriptées), pour
+  développer et tester sans réseau ni clé API
+- `CircuitBreaker` : un modèle en quota épuisé (ou en échecs répétés) est
+  écarté pendant `cooldown_s` au lieu d'être réessayé à chaque requête
+- `HedgedRouter`   : essaie les modèles par ordre de priorité ; si le modèle
+  en cours n'a pas répondu après `hedge_delay_s`, le suivant est lancé en
+  parallèle (au plus `max_in_flight` appels) et la première réponse gagne.
+  Un échec lance immédiatement le modèle suivant.
+- `BackgroundLoop` : boucle asyncio dans un thread démon, partagée par les
+  threads de requête Flask (`run` soumet une coroutine et attend son résultat)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Optional, Protocol, Sequence
+
+# Issues d'un appel, exposées dans llm_calls_total{outcome=...}
+OUTCOMES = ("ok", "quota", "error", "skipped", "cancelled", "timeout")
+
+
+class ProviderError(Exception):
+    """Échec d'un appel fournisseur (réseau, modèle introuvable, réponse bloquée...)."""
+
+
+class QuotaExceededError(ProviderError):
+    """Quota du modèle épuisé : inutile de réessayer avant le refroidissement."""
+
+
+class AllProvidersFailedError(ProviderError):
+    """Aucun modèle n'a produit de réponse (échecs, disjoncteurs ouverts ou délai)."""
+
+    def __init__(self, message: str, last_error: Optional[Exception] = None):
+        super().__init__(f"{message} ({last_error})" if last_error else message)
+        self.last_error = last_error
+
+
+class SummaryProvider(Protocol):
+    """Interface minimale d'un fournisseur de texte."""
+
+    name: str
+
+    async def generate(self, prompt: str) -> str:
+        ...
+
+
+class GeminiProvider:
+    """
+    Modèle Gemini ; le client est créé une fois et réutilisé.
+
+    `google.generativeai` (et gRPC) n'est importé qu'à la création du client
+    (`warm_up` ou premier appel) : pas au démarrage du serveur.
+    """
+
+    def __init__(self, model_name: str, api_key: Optional[str] = None):
+        self.name = model_name
+        self.api_key = api_key
+        self._model = None
+
+    def warm_up(self) -> None:
+        """Crée le client (import différé) hors du chemin d'une requête."""
+        if self._model is None:
+            import google.generativeai as genai
+
+            if self.api_key:
+                genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.name)
+
+    async def generate(self, prompt: str) -> str:
+        from google.api_core import exceptions
+
+        self.warm_up()
+        try:
+            response = await self._model.generate_content_async(prompt)
+            return response.text
+        except exceptions.ResourceExhausted as e:
+            raise QuotaExceededError(str(e)) from e
+        except Exception as e:
+            # `response.text` lève ValueError si la réponse a été bloquée
+            raise ProviderError(str(e)) from e
+
+
+class FakeProvider:
+    """
+    Fournisseur local pour le développement et les tests.
+
+    Args:
+        name: Nom du modèle simulé
+        latency_s: Durée d'un appel
+        failure: None, "quota" (QuotaExceededError) ou "error" (ProviderError)
+    """
+
+    def __init__(self, name: str, latency_s: float = 0.05, failure: Optional[str] = None):
+        if failure not in (None, "quota", "error"):
+            raise ValueError(f"Panne simulée inconnue: {failure} (attendu: quota, error)")
+        self.name = name
+        self.latency_s = latency_s
+        self.failure = failure
+        self.calls = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency_s)
+        if self.failure == "quota":
+            raise QuotaExceededError(f"{self.name}: quota épuisé (simulé)")
+        if self.failure == "error":
+            raise ProviderError(f"{self.name}: erreur simulée")
+        return f"DISCLAIMER: I am an AI, consult a doctor. [{self.name}]"
+
+
+def fake_providers(names: Sequence[str], spec: str = "", default_latency_s: float = 0.05) -> list[FakeProvider]:
+    """
+    Fournisseurs factices configurés par une chaîne `modele=comportement,...`
+    où comportement vaut "quota", "error" ou une latence en secondes.
+
+    Exemple : "gemini-2.5-flash-lite=quota,gemini-2.5-flash=3"
+    """
+    behaviours = dict(item.split("=", 1) for item in spec.split(",") if "=" in item)
+    providers = []
+    for name in names:
+        behaviour = behaviours.get(name, "").strip()
+        if behaviour in ("quota", "error"):
+            providers.append(FakeProvider(name, default_latency_s, failure=behaviour))
+        else:
+            providers.append(FakeProvider(name, float(behaviour) if behaviour else default_latency_s))
+    return providers
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par modèle.
+
+    Ouvert immédiatement sur un quota épuisé, ou après `failure_threshold`
+    erreurs consécutives. Après `cooldown_s`, il passe en semi-ouvert : le
+    modèle est réessayé, un succès le referme, le premier échec le rouvre
+    pour un nouveau `cooldown_s` (sans attendre `failure_threshold`).
+    """
+
+    def __init__(self, cooldown_s: float = 60.0, failure_threshold: int = 3,
+                 clock: Callable[[], float] = time.monotonic):
+        self.cooldown_s = cooldown_s
+        self.failure_threshold = failure_threshold
+        self.clock = clock
+        self.failures = 0
+        # 0 : fermé ; sinon fin du refroidissement (semi-ouvert une fois passée)
+        self.open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.clock() < self.open_until
+
+    @property
+    def is_half_open(self) -> bool:
+        return 0.0 < self.open_until <= self.clock()
+
+    def allow(self) -> bool:
+        return not self.is_open
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, quota: bool = False) -> None:
+        self.failures += 1
+        if quota or self.is_half_open or self.failures >= self.failure_threshold:
+            self.open_until = self.clock() + self.cooldown_s
+            self.failures = 0
+
+
+class HedgedRouter:
+    """Routage par priorité avec disjoncteurs et requêtes couvertes (hedging)."""
+
+    def __init__(
+        self,
+        providers: Sequence[SummaryProvider],
+        hedge_delay_s: float = 2.5,
+        timeout_s: float = 30.0,
+        max_in_flight: int = 2,
+        cooldown_s: float = 60.0,
+        failure_threshold: int = 3,
+        on_outcome: Optional[Callable[[str, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not providers:
+            raise ValueError("Au moins un fournisseur est requis")
+        self.providers = list(providers)
+        self.hedge_delay_s = hedge_delay_s
+        self.timeout_s = timeout_s
+        self.max_in_flight = max(1, max_in_flight)
+        self.breakers = {p.name: CircuitBreaker(cooldown_s, failure_threshold, clock) for p in self.providers}
+        self.on_outcome = on_outcome or (lambda name, outcome: None)
+
+    def warm_up(self) -> None:
+        """Prépare les clients des fournisseurs qui le permettent (imports différés)."""
+        for provider in self.providers:
+            warm_up = getattr(provider, "warm_up", None)
+            if warm_up is not None:
+                warm_up()
+
+    def open_circuits(self) -> dict:
+        """{modèle: 1 si écarté (disjoncteur ouvert), 0 sinon}."""
+        return {name: int(breaker.is_open) for name, breaker in self.breakers.items()}
+
+    async def generate(self, prompt: str) -> tuple[str, str]:
+        """
+        Returns:
+            (texte, nom du modèle qui a répondu)
+
+        Raises:
+            AllProvidersFailedError: Tous les modèles ont échoué, sont en
+            pause, ou aucun n'a répondu avant `timeout_s`
+        """
+        candidates = []
+        for provider in self.providers:
+            if self.breakers[provider.name].allow():
+                candidates.append(provider)
+            else:
+                self.on_outcome(provider.name, "skipped")
+        if not candidates:
+            raise AllProvidersFailedError("Tous les modèles sont en pause (quota ou échecs répétés)")
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_s
+        waiting = iter(candidates)
+        running: dict = {}
+        last_error: Optional[Exception] = None
+        pending_outcome = "cancelled"
+
+        def launch() -> bool:
+            provider = next(waiting, None)
+            if provider is None:
+                return False
+            running[asyncio.ensure_future(provider.generate(prompt))] = provider
+            return True
+
+        launch()
+        try:
+            while running:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    pending_outcome = "timeout"
+                    raise AllProvidersFailedError(f"Aucune réponse en {self.timeout_s:g}s", last_error)
+
+                can_hedge = len(running) < self.max_in_flight
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=min(self.hedge_delay_s, remaining) if can_hedge else remaining,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # Modèle trop lent : le suivant part en parallèle
+                    if can_hedge:
+                        launch()
+                    continue
+
+                for task in done:
+                    provider = running.pop(task)
+                    breaker = self.breakers[provider.name]
+                    error = task.exception()
+                    if error is None:
+                        breaker.record_success()
+                        self.on_outcome(provider.name, "ok")
+                        return task.result(), provider.name
+                    quota = isinstance(error, QuotaExceededError)
+                    breaker.record_failure(quota)
+                    self.on_outcome(provider.name, "quota" if quota else "error")
+                    last_error = error
+                    # Échec : pas d'attente, le modèle suivant est lancé
+                    if len(running) < self.max_in_flight:
+                        launch()
+        finally:
+            for task, provider in running.items():
+                task.cancel()
+                self.on_outcome(provider.name, pending_outcome)
+
+        raise AllProvidersFailedError("Tous les modèles ont échoué", last_error)
+
+
+class BackgroundLoop:
+    """
+    Boucle asyncio d'un processus, dans un thread démon créé au premier
+    appel (après le fork des workers gunicorn).
+    """
+
+    def __init__(self, name: str = "llm-providers"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coroutine, timeout: Optional[float] = None):
+        """Exécute `coroutine` sur la boucle partagée et attend son résultat."""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+        return future.result(timeout)
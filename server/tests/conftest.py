@@ -0,0 +1,39 @@
+# =============================================================================
+# Projet: Doctis AI
+# Auteurs: Adam Beloucif & Amina Medjdoub
+# Description: Fixtures communes des tests du serveur Flask
+# =============================================================================
+
+"""
+Le moteur SBERT n'est pas chargé à l'import (`ENGINE_AUTOSTART=0`) et les
+résumés passent par les fournisseurs factices de llm_providers.py : aucun
+accès réseau ni modèle.
+
+Usage :
+    cd server
+    pytest tests/ -v
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault("ENGINE_AUTOSTART", "0")
+os.environ.setdefault("SUMMARY_PROVIDER", "fake")
+os.environ.setdefault("FAKE_PROVIDER_LATENCY_S", "0")
+for path in (SERVER_DIR, SERVER_DIR.parent / "backend"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture
+def server_app(monkeypatch, tmp_path):
+    """Module `app` avec un cache de résumés temporaire."""
+    import app
+    from response_cache import ResponseCache
+
+    monkeypatch.setattr(app, "response_cache", ResponseCache(tmp_path / "responses.sqlite3"))
+    return app
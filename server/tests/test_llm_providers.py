@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from llm_providers import (
+    AllProvidersFailedError, CircuitBreaker, FakeProvider, HedgedRouter, fake_providers
+)
+
+
+class Clock:
+    """Horloge des disjoncteurs, avancée à la main."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def route(router, prompt="prompt"):
+    return asyncio.run(router.generate(prompt))
+
+
+def recording_router(providers, clock, **options):
+    outcomes = []
+    router = HedgedRouter(
+        providers, clock=clock, on_outcome=lambda name, outcome: outcomes.append((name, outcome)), **options
+    )
+    return router, outcomes
+
+
+def test_slow_model_is_hedged_and_first_answer_wins():
+    slow, fast = FakeProvider("slow", latency_s=1.0), FakeProvider("fast", latency_s=0.01)
+    router, outcomes = recording_router([slow, fast], Clock(), hedge_delay_s=0.05, timeout_s=2.0)
+
+    text, model = route(router)
+    assert model == "fast" and "[fast]" in text
+    assert (slow.calls, fast.calls) == (1, 1)
+    assert outcomes == [("fast", "ok"), ("slow", "cancelled")]
+
+
+def test_no_hedge_beyond_max_in_flight():
+    providers = [FakeProvider(name, latency_s=0.2) for name in ("a", "b", "c")]
+    router, outcomes = recording_router(providers, Clock(), hedge_delay_s=0.01, max_in_flight=2)
+
+    _, model = route(router)
+    assert model == "a"
+    assert [p.calls for p in providers] == [1, 1, 0]
+    assert outcomes == [("a", "ok"), ("b", "cancelled")]
+
+
+def test_failure_launches_next_model_without_waiting():
+    broken, backup = FakeProvider("broken", latency_s=0, failure="error"), FakeProvider("backup", latency_s=0)
+    router, outcomes = recording_router([broken, backup], Clock(), hedge_delay_s=10.0, timeout_s=1.0)
+
+    assert route(router)[1] == "backup"
+    assert outcomes == [("broken", "error"), ("backup", "ok")]
+    assert router.open_circuits() == {"broken": 0, "backup": 0}
+
+
+def test_quota_opens_breaker_and_model_is_skipped_until_cooldown():
+    clock = Clock()
+    exhausted, backup = fake_providers(["exhausted", "backup"], "exhausted=quota", default_latency_s=0)
+    router, outcomes = recording_router([exhausted, backup], clock, cooldown_s=60.0)
+
+    route(router)
+    assert router.open_circuits() == {"exhausted": 1, "backup": 0}
+    route(router)
+    assert exhausted.calls == 1
+    assert outcomes[-2:] == [("exhausted", "skipped"), ("backup", "ok")]
+
+    clock.now += 60.0
+    route(router)
+    assert exhausted.calls == 2
+
+
+def test_breaker_opens_after_consecutive_errors():
+    clock = Clock()
+    broken, backup = FakeProvider("broken", latency_s=0, failure="error"), FakeProvider("backup", latency_s=0)
+    router, _ = recording_router([broken, backup], clock, failure_threshold=3)
+
+    for _ in range(2):
+        route(router)
+    assert router.open_circuits()["broken"] == 0
+    route(router)
+    assert router.open_circuits()["broken"] == 1
+
+
+def test_every_breaker_open_fails_fast():
+    clock = Clock()
+    provider = FakeProvider("only", latency_s=0, failure="quota")
+    router, outcomes = recording_router([provider], clock)
+
+    with pytest.raises(AllProvidersFailedError):
+        route(router)
+    with pytest.raises(AllProvidersFailedError, match="en pause"):
+        route(router)
+    assert provider.calls == 1
+    assert outcomes == [("only", "quota"), ("only", "skipped")]
+
+
+def test_timeout_cancels_running_calls():
+    slow = FakeProvider("slow", latency_s=5.0)
+    router, outcomes = recording_router([slow], Clock(), hedge_delay_s=0.01, timeout_s=0.05)
+
+    with pytest.raises(AllProvidersFailedError, match="Aucune réponse"):
+        route(router)
+    assert outcomes == [("slow", "timeout")]
+
+
+def test_half_open_breaker_reopens_on_first_failure():
+    clock = Clock()
+    breaker = CircuitBreaker(cooldown_s=10.0, failure_threshold=3, clock=clock)
+    breaker.record_failure(quota=True)
+    assert not breaker.allow()
+
+    clock.now += 10.0
+    assert breaker.allow() and breaker.is_half_open
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 10.0
+    breaker.record_success()
+    assert breaker.allow() and not breaker.is_half_open
+    # Refermé : de nouveau `failure_threshold` erreurs avant d'ouvrir
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_fake_provider_spec():
+    providers = fake_providers(["a", "b", "c"], "a=quota,b=0.5", default_latency_s=0.1)
+    assert [(p.failure, p.latency_s) for p in providers] == [("quota", 0.1), (None, 0.5), (None, 0.1)]
+    with pytest.raises(ValueError):
+        FakeProvider("x", failure="panne")
@@ -0,0 +1,47 @@
+import numpy as np
+
+MIGRAINE = {"id": "D01", "name": "Migraine", "symptoms": ["unilateral head pain", "nausea"]}
+
+
+def test_prompt_only_contains_the_cache_key(server_app):
+    prompt = server_app.summary_prompt(MIGRAINE, 0.74, "fr")
+    assert "Migraine" in prompt and "Language: fr" in prompt
+    assert "70%-80%" in prompt
+    assert prompt == server_app.summary_prompt(MIGRAINE, 0.71, "fr")
+
+
+def test_cached_summary_never_carries_another_patients_text(server_app, monkeypatch):
+    prompts = []
+
+    def generate(prompt):
+        prompts.append(prompt)
+        return f"DISCLAIMER: I am an AI, consult a doctor. Summary #{len(prompts)}"
+
+    monkeypatch.setattr(server_app, "generate_summary_with_rotation", generate)
+    first_patient = np.array([1.0, 0.0], dtype=np.float32)
+    other_patient = np.array([0.0, 1.0], dtype=np.float32)
+
+    summary = server_app.cached_rag(MIGRAINE, 0.74, "fr", first_patient)
+    assert server_app.cached_rag(MIGRAINE, 0.72, "fr", other_patient) == summary
+    assert server_app.cached_rag(MIGRAINE, 0.74, "en", first_patient) != summary
+    assert prompts == [server_app.summary_prompt(MIGRAINE, 0.74, "fr"), server_app.summary_prompt(MIGRAINE, 0.74, "en")]
+
+
+def test_failed_summaries_are_not_cached(server_app, monkeypatch):
+    monkeypatch.setattr(
+        server_app, "generate_summary_with_rotation", lambda prompt: f"{server_app.SUMMARY_UNAVAILABLE} busy"
+    )
+    server_app.cached_rag(MIGRAINE, 0.74, "fr", None)
+    assert server_app.response_cache.stats()["entries"] == 0
+
+
+def test_changed_disease_data_invalidates_its_cached_summaries(server_app):
+    data = [MIGRAINE, {"id": "D02", "name": "Influenza (Flu)", "symptoms": ["fever"]}]
+    server_app.response_cache.sync_catalogue(server_app.disease_fingerprints(data))
+    for disease in data:
+        server_app.response_cache.put(disease["id"], 0.7, "en", f"summary {disease['id']}")
+
+    updated = [{**MIGRAINE, "symptoms": MIGRAINE["symptoms"] + ["aura"]}, data[1]]
+    assert server_app.response_cache.sync_catalogue(server_app.disease_fingerprints(updated)) == 1
+    assert server_app.response_cache.get("D01", 0.7, "en") is None
+    assert server_app.response_cache.get("D02", 0.7, "en") == "summary D02"
@@ -0,0 +1,25 @@
+import numpy as np
+
+from vector_index import ExactIndex
+
+
+class ConstantEncoder:
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        vectors = np.ones((1 if single else len(sentences), 8), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+def test_empty_catalogue_returns_no_matches_without_a_summary(server_app, monkeypatch):
+    def cached_rag(*args):
+        raise AssertionError("aucun résumé sans résultat")
+
+    monkeypatch.setitem(server_app.engine_state, "status", "ready")
+    monkeypatch.setattr(server_app, "model", ConstantEncoder())
+    monkeypatch.setattr(server_app, "pathology_data", [])
+    monkeypatch.setattr(server_app, "pathology_index", ExactIndex(np.empty((0, 8), dtype=np.float32)))
+    monkeypatch.setattr(server_app, "cached_rag", cached_rag)
+
+    response = server_app.app.test_client().post("/api/triage", json={"description": "headache", "lang": "en"})
+    assert response.status_code == 200
+    assert response.get_json() == {"matches": [], "advice": server_app.NO_MATCH_ADVICE}